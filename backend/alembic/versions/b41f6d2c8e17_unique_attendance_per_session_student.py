@@ -0,0 +1,61 @@
+"""Enforce one attendance record per student per session
+
+Revision ID: b41f6d2c8e17
+Revises: 9c5a22028615
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f6d2c8e17'
+down_revision: Union[str, Sequence[str], None] = '9c5a22028615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Point audit entries of duplicate records at the surviving (oldest) record
+    op.execute(sa.text(
+        """
+        UPDATE attendance_audit_logs
+        SET attendance_record_id = (
+            SELECT MIN(keep.id)
+            FROM attendance_records dup
+            JOIN attendance_records keep
+              ON keep.class_session_id = dup.class_session_id
+             AND keep.student_id = dup.student_id
+            WHERE dup.id = attendance_audit_logs.attendance_record_id
+        )
+        WHERE attendance_record_id IN (
+            SELECT id FROM attendance_records
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM attendance_records
+                GROUP BY class_session_id, student_id
+            )
+        )
+        """
+    ))
+    # Remove duplicate records, keeping the oldest one per (session, student)
+    op.execute(sa.text(
+        """
+        DELETE FROM attendance_records
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM attendance_records
+            GROUP BY class_session_id, student_id
+        )
+        """
+    ))
+    op.drop_index('idx_attendance_session_student', table_name='attendance_records')
+    op.create_index('idx_attendance_unique_session_student', 'attendance_records', ['class_session_id', 'student_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_attendance_unique_session_student', table_name='attendance_records')
+    op.create_index('idx_attendance_session_student', 'attendance_records', ['class_session_id', 'student_id'], unique=False)
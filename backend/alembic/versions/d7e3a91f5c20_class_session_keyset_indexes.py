@@ -0,0 +1,29 @@
+"""Add keyset pagination indexes for class sessions
+
+Revision ID: d7e3a91f5c20
+Revises: b41f6d2c8e17
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e3a91f5c20'
+down_revision: Union[str, Sequence[str], None] = 'b41f6d2c8e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_class_session_teacher_created_id', 'class_sessions', ['teacher_id', 'created_at', 'id'], unique=False)
+    op.create_index('idx_class_session_created_id', 'class_sessions', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_class_session_created_id', table_name='class_sessions')
+    op.drop_index('idx_class_session_teacher_created_id', table_name='class_sessions')
@@ -0,0 +1,84 @@
+"""Add attendance rollup tables and change-tracking indexes
+
+Revision ID: e4b8c2d61a93
+Revises: d7e3a91f5c20
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8c2d61a93'
+down_revision: Union[str, Sequence[str], None] = 'd7e3a91f5c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _count_columns():
+    return [
+        sa.Column(name, sa.Integer(), nullable=False, server_default='0')
+        for name in (
+            'present_count', 'late_count', 'absent_count', 'excused_count',
+            'late_arrivals', 'late_minutes_sum', 'late_minutes_sq_sum', 'late_minutes_max'
+        )
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'attendance_daily_rollups',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('subject', sa.String(length=100), nullable=False),
+        *_count_columns(),
+        sa.PrimaryKeyConstraint('day', 'subject')
+    )
+    op.create_table(
+        'attendance_class_rollups',
+        sa.Column('class_session_id', sa.Integer(), nullable=False),
+        sa.Column('class_id', sa.Integer(), nullable=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('subject', sa.String(length=100), nullable=False),
+        *_count_columns(),
+        sa.ForeignKeyConstraint(['class_session_id'], ['class_sessions.id']),
+        sa.ForeignKeyConstraint(['class_id'], ['classes.id']),
+        sa.PrimaryKeyConstraint('class_session_id')
+    )
+    op.create_index('idx_class_rollup_class_day', 'attendance_class_rollups', ['class_id', 'day'], unique=False)
+    op.create_index('idx_class_rollup_day', 'attendance_class_rollups', ['day'], unique=False)
+    op.create_table(
+        'attendance_student_rollups',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('subject', sa.String(length=100), nullable=False),
+        *_count_columns(),
+        sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('student_id', 'day', 'subject')
+    )
+    op.create_index('idx_student_rollup_day', 'attendance_student_rollups', ['day'], unique=False)
+    op.create_table(
+        'rollup_watermarks',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('watermark', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index('idx_attendance_created_at', 'attendance_records', ['created_at'], unique=False)
+    op.create_index('idx_attendance_updated_at', 'attendance_records', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_attendance_updated_at', table_name='attendance_records')
+    op.drop_index('idx_attendance_created_at', table_name='attendance_records')
+    op.drop_table('rollup_watermarks')
+    op.drop_index('idx_student_rollup_day', table_name='attendance_student_rollups')
+    op.drop_table('attendance_student_rollups')
+    op.drop_index('idx_class_rollup_day', table_name='attendance_class_rollups')
+    op.drop_index('idx_class_rollup_class_day', table_name='attendance_class_rollups')
+    op.drop_table('attendance_class_rollups')
+    op.drop_table('attendance_daily_rollups')
@@ -0,0 +1,103 @@
+"""Add the materialized student attendance timeline
+
+Revision ID: f2a7c9d3b5e1
+Revises: e4b8c2d61a93
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7c9d3b5e1'
+down_revision: Union[str, Sequence[str], None] = 'e4b8c2d61a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The attendancestatus type already exists on PostgreSQL
+ATTENDANCE_STATUS = sa.Enum('PRESENT', 'LATE', 'ABSENT', 'EXCUSED', name='attendancestatus').with_variant(
+    postgresql.ENUM('PRESENT', 'LATE', 'ABSENT', 'EXCUSED', name='attendancestatus', create_type=False),
+    'postgresql'
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'student_attendance_timeline',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('class_session_id', sa.Integer(), nullable=False),
+        sa.Column('class_name', sa.String(length=255), nullable=False),
+        sa.Column('subject', sa.String(length=100), nullable=True),
+        sa.Column('location', sa.String(length=255), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('teacher_name', sa.String(length=255), nullable=True),
+        sa.Column('session_status', sa.String(length=10), nullable=True),
+        sa.Column('session_start_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('session_end_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('verification_code', sa.String(length=6), nullable=True),
+        sa.Column('allow_late_join', sa.Boolean(), nullable=True),
+        sa.Column('session_created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('status', ATTENDANCE_STATUS, nullable=True),
+        sa.Column('check_in_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('check_out_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('verification_method', sa.String(length=50), nullable=True),
+        sa.Column('is_late', sa.Boolean(), nullable=True),
+        sa.Column('late_minutes', sa.Integer(), nullable=True),
+        sa.Column('is_manual_override', sa.Boolean(), nullable=True),
+        sa.Column('override_reason', sa.String(length=500), nullable=True),
+        sa.Column('override_teacher_name', sa.String(length=255), nullable=True),
+        sa.Column('notes', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['id'], ['attendance_records.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['class_session_id'], ['class_sessions.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_timeline_student_created', 'student_attendance_timeline', ['student_id', 'created_at', 'id'], unique=False)
+    op.create_index('idx_timeline_student_session_created', 'student_attendance_timeline', ['student_id', 'session_created_at', 'id'], unique=False)
+    op.create_index('idx_timeline_student_session_status', 'student_attendance_timeline', ['student_id', 'session_status', 'session_start_time'], unique=False)
+    op.create_index('idx_timeline_class_session', 'student_attendance_timeline', ['class_session_id', 'student_id'], unique=False)
+
+    # Backfill from the existing records
+    op.execute("""
+        INSERT INTO student_attendance_timeline (
+            id, student_id, class_session_id,
+            class_name, subject, location, description, teacher_name,
+            session_status, session_start_time, session_end_time, verification_code,
+            allow_late_join, session_created_at,
+            status, check_in_time, check_out_time, verification_method, is_late,
+            late_minutes, is_manual_override, override_reason, override_teacher_name,
+            notes, created_at, updated_at
+        )
+        SELECT
+            r.id, r.student_id, r.class_session_id,
+            s.name, s.subject, s.location, s.description, COALESCE(NULLIF(t.full_name, ''), t.username),
+            s.status, s.start_time, s.end_time, s.verification_code,
+            s.allow_late_join, s.created_at,
+            r.status, r.check_in_time, r.check_out_time, r.verification_method, COALESCE(r.is_late, false),
+            COALESCE(r.late_minutes, 0), COALESCE(r.is_manual_override, false), r.override_reason,
+            CASE WHEN r.is_manual_override
+                THEN COALESCE(NULLIF(o.full_name, ''), o.username, NULLIF(t.full_name, ''), t.username)
+            END,
+            r.notes, r.created_at, r.updated_at
+        FROM attendance_records r
+        JOIN class_sessions s ON r.class_session_id = s.id
+        JOIN users t ON s.teacher_id = t.id
+        LEFT JOIN users o ON r.override_by_teacher_id = o.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_timeline_class_session', table_name='student_attendance_timeline')
+    op.drop_index('idx_timeline_student_session_status', table_name='student_attendance_timeline')
+    op.drop_index('idx_timeline_student_session_created', table_name='student_attendance_timeline')
+    op.drop_index('idx_timeline_student_created', table_name='student_attendance_timeline')
+    op.drop_table('student_attendance_timeline')
@@ -1,10 +1,11 @@
 """
 Admin API endpoints for system management and statistics.
 """
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, status, Response, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 
 from app.core.database import get_db
@@ -12,6 +13,9 @@ from app.core.auth import get_current_admin
 from app.models.user import User, UserRole
 from app.models.class_session import ClassSession
 from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.services.system_stats import system_stats_snapshot
+from app.utils.pagination import apply_keyset, next_cursor, NEXT_CURSOR_HEADER
+from app.utils.export import export_response, stream_rows, json_array_chunks, EXPORT_FORMATS
 
 router = APIRouter()
 
@@ -21,52 +25,15 @@ async def get_system_stats(
     db: AsyncSession = Depends(get_db),
     current_admin: User = Depends(get_current_admin)
 ):
-    """Get system statistics for admin dashboard."""
+    """
+    Get system statistics for admin dashboard.
+    
+    Served from the system stats snapshot, which is rebuilt by one aggregate
+    query only when missing or stale.
+    """
     try:
-        # Total users count
-        total_users_result = await db.execute(select(func.count(User.id)))
-        total_users = total_users_result.scalar() or 0
-        
-        # Teachers count
-        teachers_result = await db.execute(
-            select(func.count(User.id)).where(User.role == UserRole.TEACHER)
-        )
-        total_teachers = teachers_result.scalar() or 0
-        
-        # Students count
-        students_result = await db.execute(
-            select(func.count(User.id)).where(User.role == UserRole.STUDENT)
-        )
-        total_students = students_result.scalar() or 0
-        
-        # Active classes count
-        active_classes_result = await db.execute(
-            select(func.count(ClassSession.id)).where(ClassSession.status == "active")
-        )
-        active_classes = active_classes_result.scalar() or 0
-        
-        # Total attendance records
-        attendance_records_result = await db.execute(select(func.count(AttendanceRecord.id)))
-        total_attendance_records = attendance_records_result.scalar() or 0
-        
-        # Attendance rate calculation
-        present_count_result = await db.execute(
-            select(func.count(AttendanceRecord.id)).where(
-                AttendanceRecord.status == AttendanceStatus.PRESENT
-            )
-        )
-        present_count = present_count_result.scalar() or 0
-        
-        attendance_rate = round((present_count / total_attendance_records * 100) if total_attendance_records > 0 else 0, 1)
-        
-        return {
-            "total_users": total_users,
-            "total_teachers": total_teachers,
-            "total_students": total_students,
-            "active_classes": active_classes,
-            "total_attendance_records": total_attendance_records,
-            "attendance_rate": attendance_rate
-        }
+        stats = await system_stats_snapshot.get(db)
+        return stats.to_dict()
         
     except Exception as e:
         raise HTTPException(
@@ -119,9 +86,18 @@ async def get_active_classes(
 ):
     """Get currently active classes for admin dashboard."""
     try:
+        # Student count per session, evaluated only for the returned rows
+        student_count = (
+            select(func.count(AttendanceRecord.id.distinct()))
+            .where(AttendanceRecord.class_session_id == ClassSession.id)
+            .correlate(ClassSession)
+            .scalar_subquery()
+            .label('student_count')
+        )
+        
         # Join with User table to get teacher name
         result = await db.execute(
-            select(ClassSession, User.full_name.label('teacher_name'))
+            select(ClassSession, User.full_name.label('teacher_name'), student_count)
             .join(User, ClassSession.teacher_id == User.id)
             .where(ClassSession.status == "active")
             .order_by(ClassSession.created_at.desc())
@@ -131,21 +107,13 @@ async def get_active_classes(
         class_data = result.all()
         
         classes_list = []
-        for session, teacher_name in class_data:
-            # Get student count for this class
-            student_count_result = await db.execute(
-                select(func.count(AttendanceRecord.id.distinct())).where(
-                    AttendanceRecord.class_session_id == session.id
-                )
-            )
-            student_count = student_count_result.scalar() or 0
-            
+        for session, teacher_name, count in class_data:
             classes_list.append({
                 "id": session.id,
                 "name": session.name,
                 "teacher_name": teacher_name,
                 "status": session.status,
-                "present_count": student_count,
+                "present_count": count or 0,
                 "start_time": session.start_time.isoformat() if session.start_time else None,
                 "created_at": session.created_at.isoformat() if session.created_at else None
             })
@@ -212,38 +180,62 @@ async def get_all_users(
 
 @router.get("/all-classes")
 async def get_all_classes(
+    response: Response,
     status_filter: str = None,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_admin: User = Depends(get_current_admin)
 ):
-    """Get all classes with optional status filtering for admin management."""
+    """
+    Get all classes with optional status filtering for admin management.
+    
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch the
+    next page; ``offset`` is still accepted for older clients.
+    """
     try:
-        query = select(ClassSession, User.full_name.label('teacher_name')).join(
+        # Attendance statistics per session, evaluated only for the rows on this page
+        total_records = (
+            select(func.count(AttendanceRecord.id))
+            .where(AttendanceRecord.class_session_id == ClassSession.id)
+            .correlate(ClassSession)
+            .scalar_subquery()
+            .label('total_records')
+        )
+        present_count = (
+            select(func.count(AttendanceRecord.id))
+            .where(
+                and_(
+                    AttendanceRecord.class_session_id == ClassSession.id,
+                    AttendanceRecord.status == AttendanceStatus.PRESENT
+                )
+            )
+            .correlate(ClassSession)
+            .scalar_subquery()
+            .label('present_count')
+        )
+        
+        query = select(
+            ClassSession, User.full_name.label('teacher_name'), total_records, present_count
+        ).join(
             User, ClassSession.teacher_id == User.id
         )
         
         if status_filter:
             query = query.where(ClassSession.status == status_filter)
         
-        query = query.order_by(ClassSession.created_at.desc()).offset(offset).limit(limit)
+        query = apply_keyset(query, ClassSession, cursor, limit)
+        if offset and not cursor:
+            query = query.offset(offset)
         
         result = await db.execute(query)
         class_data = result.all()
         
         classes_list = []
-        for session, teacher_name in class_data:
-            # Get attendance statistics
-            attendance_stats_result = await db.execute(
-                select(
-                    func.count(AttendanceRecord.id).label('total_records'),
-                    func.count(AttendanceRecord.id).filter(AttendanceRecord.status == AttendanceStatus.PRESENT).label('present_count')
-                ).where(AttendanceRecord.class_session_id == session.id)
-            )
-            stats = attendance_stats_result.first()
-            total_records = stats.total_records if stats and stats.total_records else 0
-            present_count = stats.present_count if stats and stats.present_count else 0
+        for session, teacher_name, total, present in class_data:
+            total = total or 0
+            present = present or 0
             
             classes_list.append({
                 "id": session.id,
@@ -255,14 +247,20 @@ async def get_all_classes(
                 "status": session.status,
                 "start_time": session.start_time,
                 "end_time": session.end_time,
-                "total_attendance_records": total_records,
-                "present_count": present_count,
-                "attendance_rate": round((present_count / total_records * 100) if total_records > 0 else 0, 1),
+                "total_attendance_records": total,
+                "present_count": present,
+                "attendance_rate": round((present / total * 100) if total > 0 else 0, 1),
                 "created_at": session.created_at
             })
         
+        cursor_value = next_cursor([row[0] for row in class_data], limit)
+        if cursor_value:
+            response.headers[NEXT_CURSOR_HEADER] = cursor_value
+        
         return classes_list
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -481,17 +479,53 @@ async def search_users(
         )
 
 
+USER_EXPORT_COLUMNS = [
+    'id', 'full_name', 'username', 'email', 'role', 'status', 'created_at', 'last_login'
+]
+USER_EXPORT_HEADERS = [
+    'ID', 'Full Name', 'Username', 'Email', 'Role', 'Status', 'Created At', 'Last Login'
+]
+
+
+def _user_export_row(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "full_name": row.full_name,
+        "username": row.username,
+        "email": row.email,
+        "role": row.role.value,
+        "is_active": row.is_active,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "last_login": row.last_login.isoformat() if row.last_login else None
+    }
+
+
+def _user_export_csv_row(row) -> Dict[str, Any]:
+    values = _user_export_row(row)
+    values["status"] = 'Active' if row.is_active else 'Inactive'
+    values["last_login"] = values["last_login"] or 'Never'
+    return values
+
+
 @router.get("/users/export")
 async def export_users(
     format: str = "csv",
     role: str = None,
     is_active: bool = None,
-    db: AsyncSession = Depends(get_db),
     current_admin: User = Depends(get_current_admin)
 ):
-    """Export users data in CSV format."""
+    """
+    Export users as a CSV or NDJSON download, or as a JSON array.
+    
+    The format is case-insensitive and any format other than CSV or NDJSON
+    returns the JSON array. Users are streamed from a server-side cursor, so
+    memory does not grow with the user table.
+    """
     try:
-        query = select(User)
+        query = select(
+            User.id, User.full_name, User.username, User.email, User.role,
+            User.is_active, User.created_at, User.last_login
+        )
         
         # Apply filters
         if role:
@@ -507,63 +541,22 @@ async def export_users(
         
         query = query.order_by(User.created_at.desc())
         
-        result = await db.execute(query)
-        users = result.scalars().all()
-        
-        if format.lower() == "csv":
-            import io
-            import csv
-            from datetime import datetime
-            from fastapi.responses import StreamingResponse
-            
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write header
-            writer.writerow([
-                'ID', 'Full Name', 'Username', 'Email', 'Role', 
-                'Status', 'Created At', 'Last Login'
-            ])
-            
-            # Write data
-            for user in users:
-                writer.writerow([
-                    user.id,
-                    user.full_name,
-                    user.username,
-                    user.email,
-                    user.role.value,
-                    'Active' if user.is_active else 'Inactive',
-                    user.created_at.isoformat() if user.created_at else '',
-                    user.last_login.isoformat() if user.last_login else 'Never'
-                ])
-            
-            output.seek(0)
-            
-            # Return CSV as download
-            filename = f"users_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            
-            return StreamingResponse(
-                io.BytesIO(output.getvalue().encode('utf-8')),
-                media_type="text/csv",
-                headers={"Content-Disposition": f"attachment; filename={filename}"}
+        export_format = format.lower()
+        filename = f"users_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        if export_format == "csv":
+            return export_response(
+                stream_rows(query, _user_export_csv_row), export_format, filename,
+                columns=USER_EXPORT_COLUMNS, headers=USER_EXPORT_HEADERS
+            )
+        if export_format == "ndjson":
+            return export_response(
+                stream_rows(query, _user_export_row), export_format, filename, columns=USER_EXPORT_COLUMNS
             )
         
-        else:
-            # Return JSON format
-            return [
-                {
-                    "id": user.id,
-                    "full_name": user.full_name,
-                    "username": user.username,
-                    "email": user.email,
-                    "role": user.role.value,
-                    "is_active": user.is_active,
-                    "created_at": user.created_at.isoformat() if user.created_at else None,
-                    "last_login": user.last_login.isoformat() if user.last_login else None
-                }
-                for user in users
-            ]
+        # Return JSON format
+        return StreamingResponse(
+            json_array_chunks(stream_rows(query, _user_export_row)), media_type=EXPORT_FORMATS["json"]
+        )
         
     except Exception as e:
         raise HTTPException(
@@ -10,10 +10,14 @@ from pydantic import BaseModel, Field
 
 from app.core.database import get_db
 from app.core.auth import get_current_user, require_teacher_or_admin
+from app.core.compute import compute_executor, event_loop_monitor
 from app.models.user import User, UserRole
 from app.services.pattern_detection import AdvancedPatternDetector
 from app.services.attendance_analytics import AttendanceAnalyticsService
+from app.services.analytics_cache import analytics_result_cache
+from app.services.attendance_rollups import attendance_rollups
 from app.schemas.attendance import AttendanceAlert
+from app.utils.export import export_response, flatten, iterate
 
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
@@ -442,18 +446,24 @@ async def get_analytics_insights_summary(
         raise HTTPException(status_code=500, detail=f"Insights summary failed: {str(e)}")
 
 
+REPORT_EXPORT_COLUMNS = ["field", "value"]
+
+
 @router.get("/export/report")
 async def export_analytics_report(
     report_type: str = Query(..., pattern="^(student|class|institutional|comparative)$"),
     target_id: Optional[int] = Query(default=None),
     period_days: int = Query(default=30, ge=7, le=365),
-    format: str = Query(default="json", pattern="^(json|csv)$"),
+    format: str = Query(default="json", pattern="^(json|csv|ndjson)$"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_teacher_or_admin)
 ):
     """
-    Export analytics reports in various formats (JSON, CSV) for external
-    analysis and reporting tools.
+    Export analytics reports in various formats (JSON, CSV, NDJSON) for
+    external analysis and reporting tools.
+    
+    CSV and NDJSON exports flatten the report into one ``field, value`` row
+    per leaf, with dotted field paths.
     """
     try:
         analytics_service = AttendanceAnalyticsService(db)
@@ -490,14 +500,14 @@ async def export_analytics_report(
         
         if format == "json":
             return report_data
-        elif format == "csv":
-            # For CSV format, we would need to flatten the data structure
-            # This is a simplified implementation
-            return {
-                "message": "CSV export not fully implemented",
-                "data": report_data
-            }
         
+        filename = f"{report_type}_report_{target_id or 'all'}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+        return export_response(
+            iterate(flatten(report_data)), format, filename, columns=REPORT_EXPORT_COLUMNS
+        )
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Report export failed: {str(e)}")
 
@@ -514,6 +524,10 @@ async def analytics_health_check():
             "analytics_service": "active",
             "forecasting": "active"
         },
+        "result_cache": analytics_result_cache.get_stats(),
+        "rollups": attendance_rollups.get_stats(),
+        "compute_executor": compute_executor.get_stats(),
+        "event_loop_lag": event_loop_monitor.get_stats(),
         "timestamp": datetime.utcnow()
     }
 
@@ -544,7 +558,7 @@ async def get_analytics_capabilities():
             "anomaly_detection": True,
             "configurable_thresholds": True
         },
-        "export_formats": ["json", "csv"],
+        "export_formats": ["json", "csv", "ndjson"],
         "max_analysis_period_days": 365,
         "max_forecast_days": 30
     }
\ No newline at end of file
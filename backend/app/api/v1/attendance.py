@@ -1,27 +1,43 @@
 """
 API endpoints for student attendance and check-in with advanced state management.
 """
-from fastapi import APIRouter, HTTPException, Depends, status, Request
+from fastapi import APIRouter, HTTPException, Depends, status, Request, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, aliased
+from collections import Counter
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Tuple
+import json
 import logging
 import asyncio
+import time
+
+try:
+    from prometheus_client import Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 from app.core.database import get_db
-from app.core.auth import get_current_user, decode_token
+from app.core.auth import get_current_user, require_teacher_or_admin, decode_token
 from app.core.security import verify_verification_code
-from app.core.websocket import websocket_server, MessageType
+from app.core.websocket import websocket_server, MessageType, TEACHER_ROLES
 from app.models.user import User, UserRole
 from app.models.class_session import ClassSession, StudentEnrollment
 from app.models.attendance import AttendanceRecord, AttendanceStatus, AttendanceAuditLog
+from app.models.student_timeline import StudentTimelineEntry
 from app.services.attendance_engine import AttendanceEngine
-from app.core.websocket import websocket_server, MessageType
+from app.services.session_cache import active_session_cache, CachedSession
+from app.services.live_counters import live_session_counters
+from app.services.student_timeline import upsert_timeline_entries
 from app.websocket.attendance_updates import attendance_ws_manager
+from app.utils.export import export_response, stream_rows, json_array_chunks, EXPORT_FORMATS
+from app.utils.pagination import apply_keyset, next_cursor, NEXT_CURSOR_HEADER
 from app.schemas.attendance import (
     StudentJoinRequest, AttendanceResponse, StudentJoinResponse,
     VerificationCodeJoinRequest, StudentCheckInRequest,
@@ -33,6 +49,21 @@ from app.schemas.attendance import (
 
 router = APIRouter()
 
+# Check-in latency, watchable on /metrics during the start-of-period scan burst
+if PROMETHEUS_AVAILABLE:
+    CHECK_IN_LATENCY = Histogram(
+        'attendance_check_in_seconds',
+        'Student self check-in latency',
+        ['method', 'outcome'],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    )
+else:
+    class MockMetric:
+        def labels(self, *args, **kwargs): return self
+        def observe(self, *args, **kwargs): pass
+    
+    CHECK_IN_LATENCY = MockMetric()
+
 
 async def broadcast_attendance_event(
     event_type: str,
@@ -60,7 +91,6 @@ async def broadcast_attendance_event(
         # Create broadcast tasks to run in background
         async def broadcast_tasks():
             try:
-                # Broadcast using the modern WebSocket server
                 message_data = {
                     "event_type": event_type,
                     "attendance_record": {
@@ -81,32 +111,24 @@ async def broadcast_attendance_event(
                     }
                 }
                 
-                # Broadcast to class using modern WebSocket server
                 message_type = MessageType.ATTENDANCE_UPDATE
                 if is_creation and event_type == "student_joined_class":
                     message_type = MessageType.STUDENT_JOINED
                 
-                await websocket_server.broadcast_to_class(
-                    str(class_session_id),
+                # One frame to the class's teachers, a limited one to the student
+                await attendance_ws_manager.publish_attendance_event(
+                    class_session_id,
                     message_type,
-                    message_data
+                    message_data,
+                    student_id=attendance_record.student_id,
+                    student_data={
+                        "student_id": attendance_record.student_id,
+                        "new_status": attendance_record.status.value,
+                        "is_override": attendance_record.is_manual_override or False,
+                        "timestamp": message_data["attendance_record"]["timestamp"]
+                    }
                 )
                 
-                # Also use the attendance-specific WebSocket manager for backwards compatibility
-                if event_type in ["attendance_created", "attendance_updated"]:
-                    await attendance_ws_manager.notify_attendance_change(
-                        class_session_id=class_session_id,
-                        student_id=attendance_record.student_id,
-                        student_name=student_name,
-                        old_status=old_status,
-                        new_status=attendance_record.status,
-                        updated_by=attendance_record.student_id if is_creation else (attendance_record.override_by_teacher_id or attendance_record.student_id),
-                        updated_by_name=updated_by_name,
-                        reason=attendance_record.override_reason,
-                        is_override=attendance_record.is_manual_override or False,
-                        late_minutes=attendance_record.late_minutes
-                    )
-                
                 logger.info(f"Successfully broadcast {event_type} for student {attendance_record.student_id} in class {class_session_id}")
                 
             except Exception as e:
@@ -121,6 +143,97 @@ async def broadcast_attendance_event(
         logger.error(f"Failed to create broadcast task for {event_type}: {str(e)}")
 
 
+async def _complete_check_in(
+    db: AsyncSession,
+    request: Request,
+    current_user: User,
+    session: CachedSession,
+    verification_method: str,
+    reason: str
+) -> Tuple[StudentJoinResponse, bool]:
+    """
+    Record a self check-in against a cached session and build the response.
+    
+    The attendance write is a single upsert that also detects duplicate scans;
+    the audit entry and enrollment are only written for new check-ins.
+    
+    Returns:
+        (response, recorded) where recorded is False for duplicate scans
+    """
+    engine = AttendanceEngine(db)
+    record, recorded = await engine.record_check_in(
+        session,
+        current_user.id,
+        verification_method,
+        reason,
+        str(request.client.host) if request.client else None,
+        request.headers.get("user-agent")
+    )
+    
+    # Ensure student is enrolled in the class if class_id exists
+    needs_enrollment = (
+        recorded and session.class_id
+        and current_user.id not in session.enrolled_student_ids
+    )
+    if needs_enrollment:
+        await engine.ensure_enrollment(current_user.id, session.class_id)
+    
+    await db.commit()
+    
+    if not recorded:
+        return StudentJoinResponse(
+            success=True,
+            message="Already checked in to this class",
+            class_session_id=session.id,
+            class_name=session.name,
+            join_time=record.check_in_time,
+            attendance_status=record.status,
+            is_late=record.is_late,
+            late_minutes=record.late_minutes
+        ), False
+    
+    if needs_enrollment:
+        active_session_cache.mark_enrolled(session.id, current_user.id)
+    
+    # WebSocket broadcast for check-in
+    try:
+        await websocket_server.broadcast_to_class(
+            str(session.id),
+            MessageType.STUDENT_JOINED,
+            {
+                "student_id": current_user.id,
+                "student_name": current_user.full_name or current_user.username,
+                "class_session_id": session.id,
+                "class_name": session.name,
+                "attendance_status": record.status.value,
+                "check_in_time": record.check_in_time.isoformat() if record.check_in_time else None,
+                "is_late": record.is_late,
+                "late_minutes": record.late_minutes,
+                "verification_method": verification_method
+            },
+            roles=TEACHER_ROLES
+        )
+    except Exception as e:
+        logger.error(f"WebSocket broadcast failed: {e}")
+    
+    status_message = "Successfully checked in"
+    if record.is_late:
+        status_message = f"Checked in late ({record.late_minutes} minutes)"
+    elif record.grace_period_used:
+        status_message = "Checked in (within grace period)"
+    
+    return StudentJoinResponse(
+        success=True,
+        message=f"{status_message} to {session.name}",
+        class_session_id=session.id,
+        class_name=session.name,
+        join_time=record.check_in_time,
+        attendance_status=record.status,
+        is_late=record.is_late,
+        late_minutes=record.late_minutes
+    ), True
+
+
 @router.post("/check-in/qr", response_model=StudentJoinResponse)
 async def student_check_in_qr(
     join_data: StudentJoinRequest,
@@ -129,11 +242,14 @@ async def student_check_in_qr(
     current_user: User = Depends(get_current_user)
 ):
     """Student self-check-in using QR code (JWT token) with late detection."""
+    started = time.perf_counter()
+    outcome = "error"
     try:
         # Decode and verify JWT token from QR code
         try:
             payload = decode_token(join_data.jwt_token)
         except Exception:
+            outcome = "rejected"
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or expired QR code"
@@ -144,6 +260,7 @@ async def student_check_in_qr(
         session_id = payload.get("session_id")
         
         if not teacher_id:
+            outcome = "rejected"
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid QR code format"
@@ -151,197 +268,23 @@ async def student_check_in_qr(
         
         # Find the class session
         if session_id:
-            result = await db.execute(
-                select(ClassSession).where(
-                    ClassSession.id == session_id,
-                    ClassSession.status == "active"
-                )
-            )
+            session = await active_session_cache.get(db, session_id)
         else:
-            result = await db.execute(
-                select(ClassSession).where(
-                    ClassSession.teacher_id == teacher_id,
-                    ClassSession.status == "active"
-                ).order_by(ClassSession.created_at.desc())
-            )
-        
-        session = result.scalar_one_or_none()
+            session = await active_session_cache.get_latest_for_teacher(db, teacher_id)
         
         if not session:
+            outcome = "rejected"
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Class session not found or has ended"
             )
         
-        # Check if student already has attendance record
-        existing_record = await db.execute(
-            select(AttendanceRecord).where(
-                and_(
-                    AttendanceRecord.student_id == current_user.id,
-                    AttendanceRecord.class_session_id == session.id
-                )
-            )
-        )
-        existing = existing_record.scalar_one_or_none()
-        
-        if existing and existing.check_in_time:
-
-        # WebSocket broadcast for attendance created
-        try:
-            await websocket_server.broadcast_to_class(
-                str(session.id),
-                MessageType.STUDENT_JOINED,
-                {
-                    "student_id": current_user.id,
-                    "student_name": current_user.full_name or current_user.username,
-                    "class_session_id": session.id,
-                    "class_name": session.name,
-                    "attendance_status": attendance_record.status.value,
-                    "check_in_time": attendance_record.check_in_time.isoformat() if attendance_record.check_in_time else None,
-                    "is_late": attendance_record.is_late,
-                    "late_minutes": attendance_record.late_minutes,
-                    "verification_method": "qr_code"
-                }
-            )
-        except Exception as ws_error:
-            logger.error(f"WebSocket broadcast failed: {ws_error}")
-            # Continue with response even if WebSocket fails
-
-
-        # WebSocket broadcast for attendance created
-        try:
-            await websocket_server.broadcast_to_class(
-                str(session.id),
-                MessageType.STUDENT_JOINED,
-                {
-                    "student_id": current_user.id,
-                    "student_name": current_user.full_name or current_user.username,
-                    "class_session_id": session.id,
-                    "class_name": session.name,
-                    "attendance_status": attendance_record.status.value,
-                    "check_in_time": attendance_record.check_in_time.isoformat() if attendance_record.check_in_time else None,
-                    "is_late": attendance_record.is_late,
-                    "late_minutes": attendance_record.late_minutes,
-                    "verification_method": "qr_code"
-                }
-            )
-        except Exception as ws_error:
-            logger.error(f"WebSocket broadcast failed: {ws_error}")
-            # Continue with response even if WebSocket fails
-
-            return StudentJoinResponse(
-                success=True,
-                message="Already checked in to this class",
-                class_session_id=session.id,
-                class_name=session.name,
-                join_time=existing.check_in_time,
-                attendance_status=existing.status,
-                is_late=existing.is_late,
-                late_minutes=existing.late_minutes
-            )
-        
-        # Initialize attendance engine
-        engine = AttendanceEngine(db)
-        
-        # Determine attendance status based on timing
-        check_in_time = datetime.utcnow()
-        attendance_status = await engine.determine_attendance_status(session, check_in_time)
-        
-        if existing:
-            # Update existing record
-            attendance_record = await engine.update_attendance_status(
-                existing,
-                attendance_status,
-                current_user.id,
-                f"Student self-check-in via QR code",
-                str(request.client.host) if request.client else None,
-                request.headers.get("user-agent")
-            )
-            attendance_record.check_in_time = check_in_time
-            attendance_record.verification_method = "qr_code"
-            
-            # Calculate late status
-            is_late, late_minutes, grace_period_used = await engine.calculate_late_status(
-                session, check_in_time
-            )
-            attendance_record.is_late = is_late
-            attendance_record.late_minutes = late_minutes
-            attendance_record.grace_period_used = grace_period_used
-        else:
-            # Create new attendance record
-            attendance_record = await engine.create_attendance_record(
-                current_user.id,
-                session.id,
-                attendance_status,
-                "qr_code",
-                current_user.id,
-                str(request.client.host) if request.client else None,
-                request.headers.get("user-agent"),
-                check_in_time=check_in_time
-            )
-        
-        # Ensure student is enrolled in the class if class_id exists
-        if session.class_id:
-            # Check if student enrollment already exists
-            enrollment_result = await db.execute(
-                select(StudentEnrollment).where(
-                    and_(
-                        StudentEnrollment.student_id == current_user.id,
-                        StudentEnrollment.class_id == session.class_id,
-                        StudentEnrollment.is_active == True
-                    )
-                )
-            )
-            existing_enrollment = enrollment_result.scalar_one_or_none()
-            
-            if not existing_enrollment:
-                # Create new student enrollment
-                enrollment = StudentEnrollment(
-                    student_id=current_user.id,
-                    class_id=session.class_id,
-                    is_active=True
-                )
-                db.add(enrollment)
-        
-        await db.commit()
-        await db.refresh(attendance_record)
-        
-        # WebSocket broadcast for QR check-in
-        try:
-            await websocket_server.broadcast_to_class(
-                str(session.id),
-                MessageType.STUDENT_JOINED,
-                {
-                    "student_id": current_user.id,
-                    "student_name": current_user.full_name or current_user.username,
-                    "class_session_id": session.id,
-                    "class_name": session.name,
-                    "attendance_status": attendance_record.status.value,
-                    "check_in_time": attendance_record.check_in_time.isoformat() if attendance_record.check_in_time else None,
-                    "is_late": attendance_record.is_late,
-                    "late_minutes": attendance_record.late_minutes,
-                    "verification_method": "qr_code"
-                }
-            )
-        except Exception as e:
-            logger.error(f"WebSocket broadcast failed: {e}")
-        
-        status_message = "Successfully checked in"
-        if attendance_record.is_late:
-            status_message = f"Checked in late ({attendance_record.late_minutes} minutes)"
-        elif attendance_record.grace_period_used:
-            status_message = "Checked in (within grace period)"
-        
-        return StudentJoinResponse(
-            success=True,
-            message=f"{status_message} to {session.name}",
-            class_session_id=session.id,
-            class_name=session.name,
-            join_time=attendance_record.check_in_time,
-            attendance_status=attendance_record.status,
-            is_late=attendance_record.is_late,
-            late_minutes=attendance_record.late_minutes
+        response, recorded = await _complete_check_in(
+            db, request, current_user, session,
+            "qr_code", "Student self-check-in via QR code"
         )
+        outcome = "recorded" if recorded else "duplicate"
+        return response
         
     except HTTPException:
         raise
@@ -351,6 +294,10 @@ async def student_check_in_qr(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to check in: {str(e)}"
         )
+    finally:
+        CHECK_IN_LATENCY.labels(method="qr_code", outcome=outcome).observe(
+            time.perf_counter() - started
+        )
 
 
 @router.post("/check-in/code", response_model=StudentJoinResponse)
@@ -361,18 +308,14 @@ async def student_check_in_code(
     current_user: User = Depends(get_current_user)
 ):
     """Student self-check-in using 6-digit verification code with late detection."""
+    started = time.perf_counter()
+    outcome = "error"
     try:
-        
         # Find the class session with this verification code
-        result = await db.execute(
-            select(ClassSession).where(
-                ClassSession.verification_code == join_data.verification_code,
-                ClassSession.status == "active"
-            )
-        )
-        session = result.scalar_one_or_none()
+        session = await active_session_cache.get_by_code(db, join_data.verification_code)
         
         if not session:
+            outcome = "rejected"
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Invalid verification code or class has ended"
@@ -382,180 +325,18 @@ async def student_check_in_code(
         if not session.allow_late_join:
             session_duration = datetime.utcnow() - session.start_time
             if session_duration.total_seconds() > 900:  # 15 minutes
+                outcome = "rejected"
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Late join not allowed for this class"
                 )
         
-        # Check if student already has attendance record
-        existing_record = await db.execute(
-            select(AttendanceRecord).where(
-                and_(
-                    AttendanceRecord.student_id == current_user.id,
-                    AttendanceRecord.class_session_id == session.id
-                )
-            )
-        )
-        existing = existing_record.scalar_one_or_none()
-        
-        if existing and existing.check_in_time:
-
-        # WebSocket broadcast for attendance created
-        try:
-            await websocket_server.broadcast_to_class(
-                str(session.id),
-                MessageType.STUDENT_JOINED,
-                {
-                    "student_id": current_user.id,
-                    "student_name": current_user.full_name or current_user.username,
-                    "class_session_id": session.id,
-                    "class_name": session.name,
-                    "attendance_status": attendance_record.status.value,
-                    "check_in_time": attendance_record.check_in_time.isoformat() if attendance_record.check_in_time else None,
-                    "is_late": attendance_record.is_late,
-                    "late_minutes": attendance_record.late_minutes,
-                    "verification_method": "verification_code"
-                }
-            )
-        except Exception as ws_error:
-            logger.error(f"WebSocket broadcast failed: {ws_error}")
-            # Continue with response even if WebSocket fails
-
-
-        # WebSocket broadcast for attendance created
-        try:
-            await websocket_server.broadcast_to_class(
-                str(session.id),
-                MessageType.STUDENT_JOINED,
-                {
-                    "student_id": current_user.id,
-                    "student_name": current_user.full_name or current_user.username,
-                    "class_session_id": session.id,
-                    "class_name": session.name,
-                    "attendance_status": attendance_record.status.value,
-                    "check_in_time": attendance_record.check_in_time.isoformat() if attendance_record.check_in_time else None,
-                    "is_late": attendance_record.is_late,
-                    "late_minutes": attendance_record.late_minutes,
-                    "verification_method": "verification_code"
-                }
-            )
-        except Exception as ws_error:
-            logger.error(f"WebSocket broadcast failed: {ws_error}")
-            # Continue with response even if WebSocket fails
-
-            return StudentJoinResponse(
-                success=True,
-                message="Already checked in to this class",
-                class_session_id=session.id,
-                class_name=session.name,
-                join_time=existing.check_in_time,
-                attendance_status=existing.status,
-                is_late=existing.is_late,
-                late_minutes=existing.late_minutes
-            )
-        
-        # Initialize attendance engine
-        engine = AttendanceEngine(db)
-        
-        # Determine attendance status based on timing
-        check_in_time = datetime.utcnow()
-        attendance_status = await engine.determine_attendance_status(session, check_in_time)
-        
-        if existing:
-            # Update existing record
-            attendance_record = await engine.update_attendance_status(
-                existing,
-                attendance_status,
-                current_user.id,
-                "Student self-check-in via verification code",
-                str(request.client.host) if request.client else None,
-                request.headers.get("user-agent")
-            )
-            attendance_record.check_in_time = check_in_time
-            attendance_record.verification_method = "verification_code"
-            
-            # Calculate late status
-            is_late, late_minutes, grace_period_used = await engine.calculate_late_status(
-                session, check_in_time
-            )
-            attendance_record.is_late = is_late
-            attendance_record.late_minutes = late_minutes
-            attendance_record.grace_period_used = grace_period_used
-        else:
-            # Create new attendance record
-            attendance_record = await engine.create_attendance_record(
-                current_user.id,
-                session.id,
-                attendance_status,
-                "verification_code",
-                current_user.id,
-                str(request.client.host) if request.client else None,
-                request.headers.get("user-agent"),
-                check_in_time=check_in_time
-            )
-        
-        # Ensure student is enrolled in the class if class_id exists
-        if session.class_id:
-            # Check if student enrollment already exists
-            enrollment_result = await db.execute(
-                select(StudentEnrollment).where(
-                    and_(
-                        StudentEnrollment.student_id == current_user.id,
-                        StudentEnrollment.class_id == session.class_id,
-                        StudentEnrollment.is_active == True
-                    )
-                )
-            )
-            existing_enrollment = enrollment_result.scalar_one_or_none()
-            
-            if not existing_enrollment:
-                # Create new student enrollment
-                enrollment = StudentEnrollment(
-                    student_id=current_user.id,
-                    class_id=session.class_id,
-                    is_active=True
-                )
-                db.add(enrollment)
-        
-        await db.commit()
-        await db.refresh(attendance_record)
-        
-        # WebSocket broadcast for verification code check-in
-        try:
-            await websocket_server.broadcast_to_class(
-                str(session.id),
-                MessageType.STUDENT_JOINED,
-                {
-                    "student_id": current_user.id,
-                    "student_name": current_user.full_name or current_user.username,
-                    "class_session_id": session.id,
-                    "class_name": session.name,
-                    "attendance_status": attendance_record.status.value,
-                    "check_in_time": attendance_record.check_in_time.isoformat() if attendance_record.check_in_time else None,
-                    "is_late": attendance_record.is_late,
-                    "late_minutes": attendance_record.late_minutes,
-                    "verification_method": "verification_code"
-                }
-            )
-        except Exception as e:
-            logger.error(f"WebSocket broadcast failed: {e}")
-        
-        status_message = "Successfully checked in"
-        if attendance_record.is_late:
-            status_message = f"Checked in late ({attendance_record.late_minutes} minutes)"
-        elif attendance_record.grace_period_used:
-            status_message = "Checked in (within grace period)"
-        
-        return StudentJoinResponse(
-            success=True,
-            message=f"{status_message} to {session.name}",
-            class_session_id=session.id,
-            class_name=session.name,
-            join_time=attendance_record.check_in_time,
-            attendance_status=attendance_record.status,
-            is_late=attendance_record.is_late,
-            late_minutes=attendance_record.late_minutes
+        response, recorded = await _complete_check_in(
+            db, request, current_user, session,
+            "verification_code", "Student self-check-in via verification code"
         )
+        outcome = "recorded" if recorded else "duplicate"
+        return response
         
     except HTTPException:
         raise
@@ -565,54 +346,71 @@ async def student_check_in_code(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to check in: {str(e)}"
         )
+    finally:
+        CHECK_IN_LATENCY.labels(method="verification_code", outcome=outcome).observe(
+            time.perf_counter() - started
+        )
 
 
 @router.get("/my-attendance", response_model=list[AttendanceResponse])
 async def get_my_attendance(
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ):
-    """Get current user's attendance history."""
+    """
+    Get current user's attendance history, newest first.
+    
+    Read from the student timeline in one index range. Pass the
+    ``X-Next-Cursor`` response header back as ``cursor`` to fetch the next
+    page; ``offset`` is still accepted for older clients.
+    """
     try:
-        # Join with teacher user table to get teacher name
-        result = await db.execute(
-            select(AttendanceRecord, ClassSession, User)
-            .join(ClassSession, AttendanceRecord.class_session_id == ClassSession.id)
-            .join(User, ClassSession.teacher_id == User.id)
-            .where(AttendanceRecord.student_id == current_user.id)
-            .order_by(AttendanceRecord.created_at.desc())
-            .offset(offset)
-            .limit(limit)
+        query = apply_keyset(
+            select(StudentTimelineEntry).where(StudentTimelineEntry.student_id == current_user.id),
+            StudentTimelineEntry, cursor, limit
         )
-        records = result.all()
-        
-        attendance_list = []
-        for attendance, session, teacher in records:
-            attendance_list.append(AttendanceResponse(
-                id=attendance.id,
-                class_session_id=attendance.class_session_id,
-                class_name=session.name,
-                subject=session.subject,
-                teacher_name=teacher.full_name or teacher.username,
-                student_name=current_user.full_name or current_user.username,
-                status=attendance.status,
-                check_in_time=attendance.check_in_time,
-                check_out_time=attendance.check_out_time,
-                verification_method=attendance.verification_method,
-                is_late=attendance.is_late or False,
-                late_minutes=attendance.late_minutes or 0,
-                is_manual_override=attendance.is_manual_override or False,
-                override_reason=attendance.override_reason,
-                override_teacher_name=teacher.full_name or teacher.username if attendance.is_manual_override else None,
-                notes=attendance.notes,
-                created_at=attendance.created_at,
-                updated_at=attendance.updated_at
-            ))
+        if offset and not cursor:
+            query = query.offset(offset)
+        
+        entries = (await db.execute(query)).scalars().all()
+        
+        student_name = current_user.full_name or current_user.username
+        attendance_list = [
+            AttendanceResponse(
+                id=entry.id,
+                class_session_id=entry.class_session_id,
+                class_name=entry.class_name,
+                subject=entry.subject,
+                teacher_name=entry.teacher_name,
+                student_name=student_name,
+                status=entry.status,
+                check_in_time=entry.check_in_time,
+                check_out_time=entry.check_out_time,
+                verification_method=entry.verification_method,
+                is_late=entry.is_late or False,
+                late_minutes=entry.late_minutes or 0,
+                is_manual_override=entry.is_manual_override or False,
+                override_reason=entry.override_reason,
+                override_teacher_name=entry.override_teacher_name,
+                notes=entry.notes,
+                created_at=entry.created_at,
+                updated_at=entry.updated_at
+            )
+            for entry in entries
+        ]
+        
+        cursor_value = next_cursor(entries, limit)
+        if cursor_value:
+            response.headers[NEXT_CURSOR_HEADER] = cursor_value
         
         return attendance_list
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -647,6 +445,8 @@ async def checkout_from_class(
         # Update checkout time
         attendance.check_out_time = datetime.utcnow()
         attendance.updated_at = datetime.utcnow()
+        await db.flush()
+        await upsert_timeline_entries(db, [attendance.id])
         
         await db.commit()
         
@@ -757,7 +557,8 @@ async def teacher_override_attendance(
                     "override_reason": override_data.reason,
                     "updated_by": current_user.full_name or current_user.username,
                     "verification_method": "teacher_override"
-                }
+                },
+                roles=TEACHER_ROLES
             )
         except Exception as e:
             logger.error(f"WebSocket broadcast failed: {e}")
@@ -840,7 +641,8 @@ async def bulk_attendance_operations(
                     "failed_count": result["failed_count"],
                     "updated_by": current_user.full_name or current_user.username,
                     "reason": bulk_data.reason
-                }
+                },
+                roles=TEACHER_ROLES
             )
         except Exception as e:
             logger.error(f"WebSocket broadcast failed: {e}")
@@ -870,51 +672,31 @@ async def get_class_attendance_status(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get real-time attendance status for a class session."""
+    """
+    Get real-time attendance status for a class session.
+    
+    Served from the in-memory live counters, which are seeded from the
+    database on the first request for a session.
+    """
     try:
-        # Get class session
-        result = await db.execute(
-            select(ClassSession).where(ClassSession.id == class_session_id)
-        )
-        session = result.scalar_one_or_none()
+        counts = await live_session_counters.get(class_session_id, db)
         
-        if not session:
+        if not counts:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Class session not found"
             )
         
-        # Initialize attendance engine
-        engine = AttendanceEngine(db)
-        
-        # Get attendance statistics
-        stats = await engine.calculate_attendance_stats(class_session_id)
-        
-        # Get enrolled student count
-        enrolled_count = len(session.enrolled_students) if session.enrolled_students else 0
-        
-        # Count checked-in students (those with check_in_time)
-        result = await db.execute(
-            select(func.count(AttendanceRecord.id))
-            .where(
-                and_(
-                    AttendanceRecord.class_session_id == class_session_id,
-                    AttendanceRecord.check_in_time.is_not(None)
-                )
-            )
-        )
-        checked_in_count = result.scalar()
-        
         return ClassAttendanceStatus(
             class_session_id=class_session_id,
-            class_name=session.name,
-            total_enrolled=enrolled_count,
-            checked_in_count=checked_in_count,
-            present_count=stats.present_count,
-            late_count=stats.late_count,
-            absent_count=stats.absent_count,
-            excused_count=stats.excused_count,
-            last_updated=datetime.utcnow()
+            class_name=counts.class_name,
+            total_enrolled=counts.total_enrolled,
+            checked_in_count=counts.checked_in_count,
+            present_count=counts.present_count,
+            late_count=counts.late_count,
+            absent_count=counts.absent_count,
+            excused_count=counts.excused_count,
+            last_updated=counts.last_updated
         )
         
     except HTTPException:
@@ -926,6 +708,80 @@ async def get_class_attendance_status(
         )
 
 
+def _class_report_records_query(class_session_id: int):
+    """
+    Attendance records of a session joined with the student and the overriding
+    teacher, so a report needs a single query however many overrides it has.
+    """
+    student = aliased(User)
+    override_teacher = aliased(User)
+    return (
+        select(
+            AttendanceRecord,
+            student.full_name.label('student_name'),
+            override_teacher.full_name.label('override_teacher_name')
+        )
+        .join(student, AttendanceRecord.student_id == student.id)
+        .outerjoin(override_teacher, AttendanceRecord.override_by_teacher_id == override_teacher.id)
+        .where(AttendanceRecord.class_session_id == class_session_id)
+        .order_by(student.full_name, AttendanceRecord.id)
+    )
+
+
+def _build_report_record(
+    attendance: AttendanceRecord,
+    session: ClassSession,
+    teacher_name: str,
+    student_name: str,
+    override_teacher_name: Optional[str]
+) -> AttendanceResponse:
+    return AttendanceResponse(
+        id=attendance.id,
+        class_session_id=attendance.class_session_id,
+        class_name=session.name,
+        subject=session.subject,
+        teacher_name=teacher_name,
+        student_name=student_name,
+        status=attendance.status,
+        check_in_time=attendance.check_in_time,
+        check_out_time=attendance.check_out_time,
+        verification_method=attendance.verification_method,
+        is_late=attendance.is_late,
+        late_minutes=attendance.late_minutes,
+        is_manual_override=attendance.is_manual_override,
+        override_reason=attendance.override_reason,
+        override_teacher_name=override_teacher_name,
+        notes=attendance.notes,
+        created_at=attendance.created_at,
+        updated_at=attendance.updated_at
+    )
+
+
+async def _get_report_session(db: AsyncSession, class_session_id: int) -> Tuple[ClassSession, str]:
+    """Get a class session with its teacher's name, or raise 404."""
+    result = await db.execute(
+        select(ClassSession, User.full_name)
+        .join(User, ClassSession.teacher_id == User.id)
+        .where(ClassSession.id == class_session_id)
+    )
+    session_data = result.first()
+    
+    if not session_data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Class session not found"
+        )
+    
+    return session_data
+
+
+def _session_duration_minutes(session: ClassSession) -> Optional[int]:
+    if not session.end_time:
+        return None
+    duration = session.end_time - session.start_time
+    return int(duration.total_seconds() / 60)
+
+
 @router.get("/class/{class_session_id}/report", response_model=ClassAttendanceReport)
 async def get_class_attendance_report(
     class_session_id: int,
@@ -936,78 +792,28 @@ async def get_class_attendance_report(
     """Get comprehensive attendance report for a class session."""
     try:
         # Get class session with teacher info
-        result = await db.execute(
-            select(ClassSession, User.full_name)
-            .join(User, ClassSession.teacher_id == User.id)
-            .where(ClassSession.id == class_session_id)
-        )
-        session_data = result.first()
+        session, teacher_name = await _get_report_session(db, class_session_id)
         
-        if not session_data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Class session not found"
-            )
-        
-        session, teacher_name = session_data
-        
-        # Get attendance records with student info
-        result = await db.execute(
-            select(AttendanceRecord, User.full_name)
-            .join(User, AttendanceRecord.student_id == User.id)
-            .where(AttendanceRecord.class_session_id == class_session_id)
-            .order_by(User.full_name)
-        )
+        # Get attendance records with student and override teacher names
+        result = await db.execute(_class_report_records_query(class_session_id))
         attendance_data = result.all()
         
-        # Initialize attendance engine
-        engine = AttendanceEngine(db)
-        
-        # Get statistics
-        stats = await engine.calculate_attendance_stats(class_session_id)
-        
-        # Build attendance records
+        # Build attendance records and derive statistics from the same rows
         records = []
-        for attendance, student_name in attendance_data:
-            # Get override teacher name if applicable
-            override_teacher_name = None
-            if attendance.override_by_teacher_id:
-                result = await db.execute(
-                    select(User.full_name).where(User.id == attendance.override_by_teacher_id)
-                )
-                override_teacher_name = result.scalar()
-            
-            records.append(AttendanceResponse(
-                id=attendance.id,
-                class_session_id=attendance.class_session_id,
-                class_name=session.name,
-                subject=session.subject,
-                teacher_name=teacher_name,
-                student_name=student_name,
-                status=attendance.status,
-                check_in_time=attendance.check_in_time,
-                check_out_time=attendance.check_out_time,
-                verification_method=attendance.verification_method,
-                is_late=attendance.is_late,
-                late_minutes=attendance.late_minutes,
-                is_manual_override=attendance.is_manual_override,
-                override_reason=attendance.override_reason,
-                override_teacher_name=override_teacher_name,
-                notes=attendance.notes,
-                created_at=attendance.created_at,
-                updated_at=attendance.updated_at
+        status_counts = Counter()
+        for attendance, student_name, override_teacher_name in attendance_data:
+            status_counts[attendance.status] += 1
+            records.append(_build_report_record(
+                attendance, session, teacher_name, student_name, override_teacher_name
             ))
         
-        # Calculate duration
-        duration_minutes = None
-        if session.end_time:
-            duration = session.end_time - session.start_time
-            duration_minutes = int(duration.total_seconds() / 60)
+        stats = AttendanceEngine.stats_from_status_counts(status_counts)
         
         # Get attendance patterns if requested
         patterns = []
         if include_patterns:
-            student_ids = [record.student_id for record, _ in attendance_data]
+            engine = AttendanceEngine(db)
+            student_ids = [record.student_id for record, _, _ in attendance_data]
             for student_id in student_ids:
                 pattern = await engine.analyze_student_attendance_pattern(student_id)
                 patterns.append(pattern)
@@ -1019,7 +825,7 @@ async def get_class_attendance_report(
             teacher_name=teacher_name,
             start_time=session.start_time,
             end_time=session.end_time,
-            duration_minutes=duration_minutes,
+            duration_minutes=_session_duration_minutes(session),
             stats=stats,
             records=records,
             patterns=patterns
@@ -1034,6 +840,179 @@ async def get_class_attendance_report(
         )
 
 
+REPORT_STREAM_BATCH_SIZE = 500
+
+REPORT_CSV_COLUMNS = [
+    'id', 'student_name', 'status', 'check_in_time', 'check_out_time',
+    'verification_method', 'is_late', 'late_minutes', 'is_manual_override',
+    'override_reason', 'override_teacher_name', 'notes', 'created_at', 'updated_at'
+]
+
+
+@router.get("/class/{class_session_id}/report/stream")
+async def stream_class_attendance_report(
+    class_session_id: int,
+    format: str = Query(default="json", pattern="^(json|csv)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher_or_admin)
+):
+    """
+    Stream the attendance report of a large class session as JSON or CSV.
+    
+    Teachers can stream the reports of their own sessions; admins may stream
+    any. Records are read in batches from a server-side cursor and written
+    out as they arrive, so memory stays flat regardless of the number of
+    records. The JSON document carries the same fields as the regular
+    report, with ``stats`` written after ``records``; the CSV contains the
+    records only.
+    """
+    session, teacher_name = await _get_report_session(db, class_session_id)
+    if current_user.role == UserRole.TEACHER and session.teacher_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    def report_row(row) -> dict:
+        attendance, student_name, override_teacher_name = row
+        return _build_report_record(
+            attendance, session, teacher_name, student_name, override_teacher_name
+        ).model_dump(mode="json")
+    
+    records = stream_rows(
+        _class_report_records_query(class_session_id), report_row, batch_size=REPORT_STREAM_BATCH_SIZE
+    )
+    filename = f"attendance_report_{class_session_id}"
+    if format == "csv":
+        return export_response(records, format, filename, columns=REPORT_CSV_COLUMNS)
+    
+    status_counts = Counter()
+    
+    async def counted_records():
+        async for record in records:
+            status_counts[record["status"]] += 1
+            yield record
+    
+    async def generate_json():
+        header = jsonable_encoder({
+            "class_session_id": class_session_id,
+            "class_name": session.name,
+            "subject": session.subject,
+            "teacher_name": teacher_name,
+            "start_time": session.start_time,
+            "end_time": session.end_time,
+            "duration_minutes": _session_duration_minutes(session)
+        })
+        yield (json.dumps(header)[:-1] + ', "records": ').encode()
+        async for chunk in json_array_chunks(counted_records()):
+            yield chunk
+        
+        # AttendanceStatus is a str enum, so the dumped values count as members
+        stats = AttendanceEngine.stats_from_status_counts(status_counts)
+        yield (', "stats": ' + stats.model_dump_json() + ', "patterns": []}').encode()
+    
+    return StreamingResponse(
+        generate_json(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{format}"}
+    )
+
+
+HISTORY_EXPORT_COLUMNS = [
+    'id', 'student_id', 'student_name', 'class_session_id', 'class_name', 'subject',
+    'session_start', 'status', 'check_in_time', 'check_out_time', 'verification_method',
+    'is_late', 'late_minutes', 'is_manual_override', 'override_reason', 'created_at', 'updated_at'
+]
+
+
+def _history_export_row(row) -> dict:
+    return {
+        "id": row.id,
+        "student_id": row.student_id,
+        "student_name": row.student_name,
+        "class_session_id": row.class_session_id,
+        "class_name": row.class_name,
+        "subject": row.subject,
+        "session_start": row.session_start,
+        "status": row.status.value,
+        "check_in_time": row.check_in_time,
+        "check_out_time": row.check_out_time,
+        "verification_method": row.verification_method,
+        "is_late": bool(row.is_late),
+        "late_minutes": row.late_minutes or 0,
+        "is_manual_override": bool(row.is_manual_override),
+        "override_reason": row.override_reason,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at
+    }
+
+
+@router.get("/history/export")
+async def export_attendance_history(
+    format: str = Query(default="csv", pattern="^(csv|json|ndjson)$"),
+    student_id: Optional[int] = None,
+    class_session_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Export attendance history as CSV, a JSON array or NDJSON, oldest session first.
+    
+    Students export their own records and teachers the records of their own
+    sessions; admins may export everything. Records are streamed from a
+    server-side cursor, so any period can be exported in bounded memory.
+    """
+    query = (
+        select(
+            AttendanceRecord.id,
+            AttendanceRecord.student_id,
+            User.full_name.label("student_name"),
+            AttendanceRecord.class_session_id,
+            ClassSession.name.label("class_name"),
+            ClassSession.subject,
+            ClassSession.start_time.label("session_start"),
+            AttendanceRecord.status,
+            AttendanceRecord.check_in_time,
+            AttendanceRecord.check_out_time,
+            AttendanceRecord.verification_method,
+            AttendanceRecord.is_late,
+            AttendanceRecord.late_minutes,
+            AttendanceRecord.is_manual_override,
+            AttendanceRecord.override_reason,
+            AttendanceRecord.created_at,
+            AttendanceRecord.updated_at
+        )
+        .join(ClassSession, AttendanceRecord.class_session_id == ClassSession.id)
+        .join(User, AttendanceRecord.student_id == User.id)
+        .order_by(ClassSession.start_time.asc(), AttendanceRecord.id.asc())
+    )
+    
+    if current_user.role == UserRole.STUDENT:
+        if student_id is not None and student_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+        student_id = current_user.id
+    elif current_user.role == UserRole.TEACHER:
+        query = query.where(ClassSession.teacher_id == current_user.id)
+    
+    if student_id is not None:
+        query = query.where(AttendanceRecord.student_id == student_id)
+    if class_session_id is not None:
+        query = query.where(AttendanceRecord.class_session_id == class_session_id)
+    if start_date is not None:
+        query = query.where(ClassSession.start_time >= start_date)
+    if end_date is not None:
+        query = query.where(ClassSession.start_time <= end_date)
+    
+    filename = f"attendance_history_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+    return export_response(
+        stream_rows(query, _history_export_row), format, filename, columns=HISTORY_EXPORT_COLUMNS
+    )
+
+
 @router.get("/patterns/analyze", response_model=List[AttendanceAlert])
 async def analyze_attendance_patterns(
     pattern_request: AttendancePatternRequest = Depends(),
@@ -1149,72 +1128,68 @@ async def test_route():
 
 @router.get("/my-classes")
 async def get_my_enrolled_classes(
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     status_filter: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ):
-    """Get classes that the current student has attended or is enrolled in."""
+    """
+    Get classes that the current student has attended or is enrolled in.
+    
+    A student has one attendance record per session, so each timeline entry
+    carries both the session and the student's attendance in it. Pass the
+    ``X-Next-Cursor`` response header back as ``cursor`` to fetch the next
+    page; ``offset`` is still accepted for older clients.
+    """
     try:
-        # Build base query to get classes where student has attendance records
-        query = (
-            select(ClassSession, User.full_name.label('teacher_name'))
-            .join(AttendanceRecord, ClassSession.id == AttendanceRecord.class_session_id)
-            .join(User, ClassSession.teacher_id == User.id)
-            .where(AttendanceRecord.student_id == current_user.id)
-        )
+        query = select(StudentTimelineEntry).where(StudentTimelineEntry.student_id == current_user.id)
         
         # Apply status filter if provided
         if status_filter:
-            query = query.where(ClassSession.status == status_filter)
+            query = query.where(StudentTimelineEntry.session_status == status_filter)
         
-        # Add ordering and pagination
-        query = query.order_by(ClassSession.created_at.desc()).offset(offset).limit(limit)
+        order_column = StudentTimelineEntry.session_created_at
+        query = apply_keyset(query, StudentTimelineEntry, cursor, limit, order_column=order_column)
+        if offset and not cursor:
+            query = query.offset(offset)
         
-        result = await db.execute(query)
-        classes_data = result.all()
+        entries = (await db.execute(query)).scalars().all()
         
         enrolled_classes = []
-        for session, teacher_name in classes_data:
-            # Get the student's latest attendance record for this class
-            attendance_result = await db.execute(
-                select(AttendanceRecord)
-                .where(
-                    and_(
-                        AttendanceRecord.student_id == current_user.id,
-                        AttendanceRecord.class_session_id == session.id
-                    )
-                )
-                .order_by(AttendanceRecord.created_at.desc())
-                .limit(1)
-            )
-            latest_attendance = attendance_result.scalar_one_or_none()
-            
+        for entry in entries:
             # Determine if there's an active session requiring check-in
-            is_active_session = session.status == "active"
-            requires_checkin = is_active_session and (not latest_attendance or not latest_attendance.check_in_time)
+            is_active_session = entry.session_status == "active"
+            requires_checkin = is_active_session and not entry.check_in_time
             
             enrolled_classes.append({
-                "id": session.id,
-                "name": session.name,
-                "subject": session.subject,
-                "teacher_name": teacher_name,
-                "status": session.status,
-                "start_time": session.start_time,
-                "end_time": session.end_time,
-                "verification_code": session.verification_code if is_active_session else None,
+                "id": entry.class_session_id,
+                "name": entry.class_name,
+                "subject": entry.subject,
+                "teacher_name": entry.teacher_name,
+                "status": entry.session_status,
+                "start_time": entry.session_start_time,
+                "end_time": entry.session_end_time,
+                "verification_code": entry.verification_code if is_active_session else None,
                 "is_active_session": is_active_session,
                 "requires_checkin": requires_checkin,
-                "last_attendance_status": latest_attendance.status if latest_attendance else None,
-                "last_check_in_time": latest_attendance.check_in_time if latest_attendance else None,
-                "created_at": session.created_at,
-                "location": getattr(session, 'location', None),
-                "description": getattr(session, 'description', None)
+                "last_attendance_status": entry.status,
+                "last_check_in_time": entry.check_in_time,
+                "created_at": entry.session_created_at,
+                "location": entry.location,
+                "description": entry.description
             })
         
+        cursor_value = next_cursor(entries, limit, order_column=order_column)
+        if cursor_value:
+            response.headers[NEXT_CURSOR_HEADER] = cursor_value
+        
         return enrolled_classes
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1229,44 +1204,40 @@ async def get_active_sessions_for_student(
 ):
     """Get active class sessions that require check-in from student."""
     try:
-        # Get all active sessions where student has an attendance record (i.e., is enrolled)
-        # but hasn't checked in yet
-        query = (
-            select(ClassSession, User.full_name.label('teacher_name'), AttendanceRecord)
-            .join(AttendanceRecord, ClassSession.id == AttendanceRecord.class_session_id)
-            .join(User, ClassSession.teacher_id == User.id)
+        # Active sessions where the student has an attendance record (i.e., is
+        # enrolled) but hasn't checked in yet
+        result = await db.execute(
+            select(StudentTimelineEntry)
             .where(
                 and_(
-                    AttendanceRecord.student_id == current_user.id,
-                    ClassSession.status == "active",
-                    AttendanceRecord.check_in_time.is_(None)
+                    StudentTimelineEntry.student_id == current_user.id,
+                    StudentTimelineEntry.session_status == "active",
+                    StudentTimelineEntry.check_in_time.is_(None)
                 )
             )
-            .order_by(ClassSession.start_time.desc())
+            .order_by(StudentTimelineEntry.session_start_time.desc())
         )
-        
-        result = await db.execute(query)
-        active_sessions_data = result.all()
+        entries = result.scalars().all()
         
         active_sessions = []
-        for session, teacher_name, attendance_record in active_sessions_data:
+        for entry in entries:
             # Check if session just started (within last 30 minutes)
-            session_age = datetime.utcnow() - session.start_time
+            session_age = datetime.utcnow() - entry.session_start_time
             is_newly_started = session_age.total_seconds() <= 1800  # 30 minutes
             
             active_sessions.append({
-                "id": session.id,
-                "name": session.name,
-                "subject": session.subject,
-                "teacher_name": teacher_name,
-                "start_time": session.start_time,
-                "end_time": session.end_time,
-                "verification_code": session.verification_code,
+                "id": entry.class_session_id,
+                "name": entry.class_name,
+                "subject": entry.subject,
+                "teacher_name": entry.teacher_name,
+                "start_time": entry.session_start_time,
+                "end_time": entry.session_end_time,
+                "verification_code": entry.verification_code,
                 "is_newly_started": is_newly_started,
                 "session_age_minutes": int(session_age.total_seconds() / 60),
-                "location": getattr(session, 'location', None),
-                "allow_late_join": session.allow_late_join,
-                "attendance_record_id": attendance_record.id
+                "location": entry.location,
+                "allow_late_join": entry.allow_late_join,
+                "attendance_record_id": entry.id
             })
         
         return active_sessions
@@ -1,19 +1,23 @@
 """
 API endpoints for class session management.
 """
-from fastapi import APIRouter, HTTPException, Depends, status, Request
+from fastapi import APIRouter, HTTPException, Depends, status, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, text
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timedelta
 import logging
 
 from app.core.database import get_db
-from app.core.auth import get_current_teacher
+from app.core.auth import get_current_teacher, get_current_user
 from app.core.security import create_class_token, create_verification_code
 from app.core.config import settings
-from app.core.websocket import websocket_server, MessageType
+from app.core.websocket import websocket_server, MessageType, TEACHER_ROLES
 from app.services.qr_generator import generate_class_qr_code
+from app.services.session_cache import active_session_cache
+from app.services.live_counters import live_session_counters
+from app.services.student_timeline import update_session_timeline
+from app.services.attendance_engine import AttendanceEngine
 from app.models.user import User
 from app.models.class_session import ClassSession
 from app.models.attendance import AttendanceRecord
@@ -22,6 +26,7 @@ from app.schemas.class_session import (
     QRCodeResponse
 )
 from app.schemas.auth import UserResponse
+from app.utils.pagination import apply_keyset, next_cursor, NEXT_CURSOR_HEADER
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -111,36 +116,45 @@ async def create_class_session(
 
 @router.get("/", response_model=List[ClassSessionResponse])
 async def list_sessions(
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_teacher: User = Depends(get_current_teacher),
     status_filter: str = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ):
-    """List class sessions for the current teacher."""
+    """
+    List class sessions for the current teacher.
+    
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch the
+    next page; ``offset`` is still accepted for older clients.
+    """
     try:
-        query = select(ClassSession).where(ClassSession.teacher_id == current_teacher.id)
+        # Unique students per session, evaluated only for the rows on this page
+        student_count = (
+            select(func.count(func.distinct(AttendanceRecord.student_id)))
+            .where(AttendanceRecord.class_session_id == ClassSession.id)
+            .correlate(ClassSession)
+            .scalar_subquery()
+            .label("student_count")
+        )
+        
+        query = select(ClassSession, student_count).where(ClassSession.teacher_id == current_teacher.id)
         
         if status_filter:
             query = query.where(ClassSession.status == status_filter)
         
-        query = query.order_by(ClassSession.created_at.desc()).offset(offset).limit(limit)
+        query = apply_keyset(query, ClassSession, cursor, limit)
+        if offset and not cursor:
+            query = query.offset(offset)
         
         result = await db.execute(query)
-        sessions = result.scalars().all()
+        rows = result.all()
         
         # Build responses with student counts
         session_responses = []
-        for session in sessions:
-            # Calculate student count manually to avoid join issues
-            count_result = await db.execute(
-                select(func.count(func.distinct(AttendanceRecord.student_id))).where(
-                    AttendanceRecord.class_session_id == session.id
-                )
-            )
-            student_count = count_result.scalar() or 0
-            
-            # Create response with student count
+        for session, count in rows:
             response_data = {
                 "id": session.id,
                 "name": session.name,
@@ -156,14 +170,19 @@ async def list_sessions(
                 "allow_late_join": session.allow_late_join,
                 "require_verification": session.require_verification,
                 "created_at": session.created_at,
-                "student_count": student_count
+                "student_count": count or 0
             }
             
-            response = ClassSessionResponse(**response_data)
-            session_responses.append(response)
+            session_responses.append(ClassSessionResponse(**response_data))
+        
+        cursor_value = next_cursor([session for session, _ in rows], limit)
+        if cursor_value:
+            response.headers[NEXT_CURSOR_HEADER] = cursor_value
         
         return session_responses
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -233,9 +252,14 @@ async def update_session(
             setattr(session, field, value)
         
         session.updated_at = datetime.utcnow()
+        await update_session_timeline(db, session)
         await db.commit()
         await db.refresh(session)
         
+        # Status or late-join settings may have changed
+        active_session_cache.invalidate(session_id)
+        live_session_counters.discard(session_id)
+        
         return session_to_response(session)
         
     except HTTPException:
@@ -343,10 +367,14 @@ async def regenerate_verification_code(
         deep_link = f"attendance://join/{new_verification_code}"
         new_qr_data = generate_class_qr_code(deep_link, session.name)
         session.qr_data = new_qr_data
+        await update_session_timeline(db, session)
         
         await db.commit()
         await db.refresh(session)
         
+        # The old verification code must stop resolving to this session
+        active_session_cache.invalidate(session_id)
+        
         # Broadcast verification code update to connected clients
         try:
             await websocket_server.broadcast_to_class(
@@ -358,7 +386,8 @@ async def regenerate_verification_code(
                     "verification_code": new_verification_code,
                     "qr_data": new_qr_data,
                     "timestamp": datetime.utcnow().isoformat()
-                }
+                },
+                roles=TEACHER_ROLES
             )
             logger.info(f"Broadcasted verification code update for session {session_id}")
         except Exception as ws_error:
@@ -450,9 +479,13 @@ async def end_session(
         session.status = "ended"
         session.end_time = datetime.utcnow()
         session.updated_at = datetime.utcnow()
+        await update_session_timeline(db, session)
         
         await db.commit()
         
+        active_session_cache.invalidate(session_id)
+        live_session_counters.discard(session_id)
+        
         return {"message": "Session ended successfully", "ended_at": session.end_time}
         
     except HTTPException:
@@ -635,16 +668,19 @@ async def student_join_class(
                     detail="Late join not allowed for this class"
                 )
         
-        # Check if student already joined
-        existing_record = await db.execute(
-            select(AttendanceRecord).where(
-                AttendanceRecord.student_id == current_user.id,
-                AttendanceRecord.class_session_id == session.id
-            )
+        # The engine decides present/late, skips duplicate scans and keeps the
+        # live counters, analytics and timeline in step with the write
+        attendance_record, recorded = await AttendanceEngine(db).record_check_in(
+            session,
+            current_user.id,
+            "verification_code",
+            "Student joined with verification code",
+            str(request.client.host) if request.client else None,
+            request.headers.get("user-agent")
         )
-        existing = existing_record.scalar_one_or_none()
+        await db.commit()
         
-        if existing and existing.check_in_time:
+        if not recorded:
             # Broadcast student already in class
             try:
                 await websocket_server.broadcast_to_class(
@@ -655,10 +691,11 @@ async def student_join_class(
                         "student_name": current_user.full_name or current_user.username,
                         "session_id": session.id,
                         "event": "student_already_joined",
-                        "join_time": existing.check_in_time.isoformat(),
-                        "is_late": existing.is_late or False,
+                        "join_time": attendance_record.check_in_time.isoformat(),
+                        "is_late": attendance_record.is_late or False,
                         "timestamp": datetime.utcnow().isoformat()
-                    }
+                    },
+                    roles=TEACHER_ROLES
                 )
             except Exception as ws_error:
                 logger.warning(f"Failed to broadcast student already joined: {ws_error}")
@@ -668,36 +705,13 @@ async def student_join_class(
                 "message": "Already joined this class",
                 "class_session_id": session.id,
                 "class_name": session.name,
-                "join_time": existing.check_in_time,
+                "join_time": attendance_record.check_in_time,
                 "already_joined": True
             }
         
-        # Create new attendance record (simplified - this would integrate with attendance.py logic)
-        check_in_time = datetime.utcnow()
-        is_late = check_in_time > session.start_time + timedelta(minutes=10)
-        late_minutes = max(0, int((check_in_time - session.start_time).total_seconds() / 60) - 10) if is_late else 0
-        
-        if existing:
-            existing.check_in_time = check_in_time
-            existing.is_late = is_late
-            existing.late_minutes = late_minutes
-            existing.verification_method = "verification_code"
-            attendance_record = existing
-        else:
-            # This should use the AttendanceEngine from attendance.py
-            attendance_record = AttendanceRecord(
-                student_id=current_user.id,
-                class_session_id=session.id,
-                check_in_time=check_in_time,
-                verification_method="verification_code",
-                is_late=is_late,
-                late_minutes=late_minutes,
-                status="present"
-            )
-            db.add(attendance_record)
-        
-        await db.commit()
-        await db.refresh(attendance_record)
+        check_in_time = attendance_record.check_in_time
+        is_late = attendance_record.is_late
+        late_minutes = attendance_record.late_minutes
         
         # Broadcast student_joined_class message
         try:
@@ -714,7 +728,8 @@ async def student_join_class(
                     "late_minutes": late_minutes,
                     "verification_method": "verification_code",
                     "timestamp": datetime.utcnow().isoformat()
-                }
+                },
+                roles=TEACHER_ROLES
             )
             logger.info(f"Broadcasted student_joined_class for student {current_user.id} in session {session.id}")
         except Exception as ws_error:
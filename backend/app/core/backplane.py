@@ -0,0 +1,226 @@
+"""
+Pub/sub backplane for WebSocket fan-out across worker processes.
+
+``websocket_server`` only knows the connections of its own process. When the
+API runs with several workers (or on several nodes), a check-in handled by
+one worker must still reach teachers connected to another. Every broadcast
+is therefore delivered to local connections directly and also published on
+a backplane; the other workers receive it and deliver it to their own
+connections. A worker ignores its own messages.
+
+Two implementations are provided:
+
+- ``InMemoryBackplane``: workers sharing an ``InMemoryBroker`` in the same
+  process. With the default private broker this is the single-worker setup
+  and publishing costs nothing.
+- ``RedisBackplane``: Redis pub/sub, used when ``settings.REDIS_ENABLED`` is
+  set.
+"""
+import asyncio
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Any, Callable, Awaitable
+
+try:
+    import orjson
+    json_dumps_bytes = orjson.dumps
+    json_loads = orjson.loads
+except ImportError:
+    import json
+    json_dumps_bytes = lambda x: json.dumps(x).encode()
+    json_loads = json.loads
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Channel shared by all workers of a deployment
+DEFAULT_CHANNEL = "websocket:broadcast"
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class Backplane(ABC):
+    """
+    Base class for backplanes.
+
+    Envelopes are plain dicts; ``publish`` stamps them with this node's id so
+    that ``_dispatch`` can skip messages the node published itself.
+    """
+
+    def __init__(self, node_id: Optional[str] = None):
+        self.node_id = node_id or uuid.uuid4().hex
+        self._handler: Optional[MessageHandler] = None
+
+        self._stats = {
+            'published': 0,
+            'received': 0,
+            'errors': 0
+        }
+
+    async def start(self, handler: MessageHandler):
+        """Start receiving messages published by other nodes."""
+        self._handler = handler
+
+    @abstractmethod
+    async def publish(self, envelope: Dict[str, Any]):
+        """Publish a message to all other nodes."""
+
+    async def close(self):
+        """Stop receiving messages and release resources."""
+        self._handler = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backplane statistics."""
+        return {
+            **self._stats,
+            'backend': type(self).__name__,
+            'node_id': self.node_id
+        }
+
+    async def _dispatch(self, raw: bytes):
+        """Decode a received message and pass it to the handler."""
+        try:
+            envelope = json_loads(raw)
+            if envelope.get("origin") == self.node_id or self._handler is None:
+                return
+            self._stats['received'] += 1
+            await self._handler(envelope)
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.error(f"Error handling backplane message: {e}")
+
+
+class InMemoryBroker:
+    """In-process message broker connecting InMemoryBackplane instances."""
+
+    def __init__(self):
+        self._subscribers: List["InMemoryBackplane"] = []
+
+    def subscribe(self, backplane: "InMemoryBackplane"):
+        if backplane not in self._subscribers:
+            self._subscribers.append(backplane)
+
+    def unsubscribe(self, backplane: "InMemoryBackplane"):
+        if backplane in self._subscribers:
+            self._subscribers.remove(backplane)
+
+    async def publish(self, sender: "InMemoryBackplane", raw: bytes):
+        for backplane in list(self._subscribers):
+            if backplane is not sender:
+                await backplane._dispatch(raw)
+
+    def has_peers(self, backplane: "InMemoryBackplane") -> bool:
+        return any(subscriber is not backplane for subscriber in self._subscribers)
+
+
+class InMemoryBackplane(Backplane):
+    """Backplane between nodes in one process, e.g. for tests or a single worker."""
+
+    def __init__(self, broker: Optional[InMemoryBroker] = None, node_id: Optional[str] = None):
+        super().__init__(node_id)
+        self.broker = broker or InMemoryBroker()
+
+    async def start(self, handler: MessageHandler):
+        await super().start(handler)
+        self.broker.subscribe(self)
+
+    async def publish(self, envelope: Dict[str, Any]):
+        # Nobody else is listening: skip the encoding entirely
+        if not self.broker.has_peers(self):
+            return
+        self._stats['published'] += 1
+        await self.broker.publish(self, json_dumps_bytes({**envelope, "origin": self.node_id}))
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+        await super().close()
+
+
+class RedisBackplane(Backplane):
+    """Backplane over Redis pub/sub, for multiple workers and nodes."""
+
+    def __init__(
+        self,
+        url: str = settings.REDIS_URL,
+        channel: str = DEFAULT_CHANNEL,
+        client=None,
+        node_id: Optional[str] = None
+    ):
+        super().__init__(node_id)
+        self._owns_client = client is None
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis is required for the Redis WebSocket backplane")
+            client = redis.from_url(url)
+        self.client = client
+        self.channel = channel
+
+        self._pubsub = None
+        self._listener_task: Optional[asyncio.Task] = None
+
+    async def start(self, handler: MessageHandler):
+        await super().start(handler)
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener_task = asyncio.get_running_loop().create_task(self._listen())
+        logger.info(f"WebSocket backplane subscribed to Redis channel {self.channel}")
+
+    async def publish(self, envelope: Dict[str, Any]):
+        try:
+            await self.client.publish(
+                self.channel, json_dumps_bytes({**envelope, "origin": self.node_id})
+            )
+            self._stats['published'] += 1
+        except Exception as e:
+            # Local delivery already happened; other workers miss this event
+            self._stats['errors'] += 1
+            logger.error(f"Error publishing to WebSocket backplane: {e}")
+
+    async def close(self):
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(self.channel)
+                await self._pubsub.reset()
+            except Exception as e:
+                logger.error(f"Error closing Redis backplane subscription: {e}")
+            self._pubsub = None
+
+        if self._owns_client:
+            await self.client.connection_pool.disconnect()
+        await super().close()
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self._stats['errors'] += 1
+                logger.error(f"Redis backplane listener error: {e}")
+                await asyncio.sleep(1)
+
+
+def create_backplane() -> Backplane:
+    """Create the backplane configured by ``REDIS_ENABLED`` and ``REDIS_URL``."""
+    if settings.REDIS_ENABLED:
+        return RedisBackplane(settings.REDIS_URL)
+    return InMemoryBackplane()
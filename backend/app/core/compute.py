@@ -0,0 +1,243 @@
+"""
+Off-loop execution of CPU-bound analytics stages.
+
+The analytics and pattern detection services compute statistics in pure
+Python inside ``async def`` methods. A large report then holds the event
+loop for as long as it takes, stalling every request and WebSocket served by
+the worker. ``ComputeExecutor`` runs such stages elsewhere:
+
+- in a ``ThreadPoolExecutor`` by default; this only keeps the loop
+  responsive between the stage's bytecodes, but needs no pickling and no
+  extra processes per worker
+- in a ``ProcessPoolExecutor`` when ``use_processes`` is set, so they use
+  another core and do not contend for the GIL; stage functions must be
+  module-level and take and return plain picklable data (no ORM objects or
+  sessions). Threads are used instead if processes cannot be created on
+  the platform or the pool breaks
+- inline for inputs smaller than ``min_offload_items``, where shipping the
+  data to a worker costs more than computing on the loop
+
+Arguments are pickled in a thread of the event loop's process, and pickling
+holds the GIL for the whole object. ``map_batches`` therefore splits large
+inputs into batches of about ``batch_items`` items, which also spreads them
+over the workers.
+
+``EventLoopLagMonitor`` measures how late the loop wakes up from a periodic
+sleep, which is the delay every other coroutine sees; compare its
+percentiles with offloading on and off.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+import numpy as np
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ComputeExecutor:
+    """Runs CPU-bound functions in a thread pool, or a process pool if enabled."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        use_processes: bool = False,
+        min_offload_items: int = 0,
+        batch_items: int = 10000
+    ):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.use_processes = use_processes
+        self.min_offload_items = min_offload_items
+        self.batch_items = batch_items
+
+        self._executor: Optional[Executor] = None
+        self.mode: Optional[str] = None
+
+        self._stats = {
+            'offloaded': 0,
+            'inline': 0,
+            'fallbacks': 0,
+            'errors': 0,
+            'compute_ms': 0.0
+        }
+
+    async def run(self, fn: Callable[..., T], *args: Any, size: Optional[int] = None) -> T:
+        """
+        Run ``fn(*args)`` off the event loop and return its result.
+
+        ``size`` is the number of items the call processes; calls below
+        ``min_offload_items`` run inline.
+        """
+        if size is not None and size < self.min_offload_items:
+            self._stats['inline'] += 1
+            return fn(*args)
+
+        call = functools.partial(fn, *args)
+        started = time.perf_counter()
+        try:
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), call)
+            except BrokenProcessPool as e:
+                logger.error(f"Compute process pool broke, falling back to threads: {e}")
+                self._fall_back_to_threads()
+                result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), call)
+        except Exception:
+            self._stats['errors'] += 1
+            raise
+
+        self._stats['offloaded'] += 1
+        self._stats['compute_ms'] += (time.perf_counter() - started) * 1000
+        return result
+
+    async def map_batches(
+        self,
+        fn: Callable[[Sequence[Any]], List[T]],
+        items: Sequence[Any],
+        sizes: Optional[Sequence[int]] = None
+    ) -> List[T]:
+        """
+        Run ``fn`` over batches of ``items`` and concatenate the results.
+
+        ``fn`` maps a list of items to a list of results. ``sizes`` weighs the
+        items (e.g. records per history); batches hold about ``batch_items``.
+        """
+        sizes = sizes if sizes is not None else [1] * len(items)
+        total = sum(sizes)
+        if total < self.min_offload_items:
+            self._stats['inline'] += 1
+            return fn(list(items))
+
+        batches, batch, batch_size = [], [], 0
+        for item, size in zip(items, sizes):
+            if batch and batch_size + size > self.batch_items:
+                batches.append(batch)
+                batch, batch_size = [], 0
+            batch.append(item)
+            batch_size += size
+        if batch:
+            batches.append(batch)
+
+        results = await asyncio.gather(*(self.run(fn, batch) for batch in batches))
+        return [result for batch_results in results for result in batch_results]
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                try:
+                    # Forking a process that runs an event loop and threads is unsafe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                    self.mode = "process"
+                except (OSError, NotImplementedError, ImportError) as e:
+                    logger.warning(f"Process pool unavailable, using threads for analytics: {e}")
+                    self._stats['fallbacks'] += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="compute"
+                )
+                self.mode = "thread"
+        return self._executor
+
+    def _fall_back_to_threads(self):
+        self._stats['fallbacks'] += 1
+        self.use_processes = False
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers; a later ``run`` starts new ones."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get executor statistics."""
+        return {
+            **self._stats,
+            'compute_ms': round(self._stats['compute_ms'], 1),
+            'mode': self.mode or ("process" if self.use_processes else "thread"),
+            'max_workers': self.max_workers,
+            'min_offload_items': self.min_offload_items,
+            'batch_items': self.batch_items
+        }
+
+
+class EventLoopLagMonitor:
+    """Samples event loop lag: how late a periodic sleep wakes up."""
+
+    def __init__(self, interval_seconds: float = 0.5, window: int = 600):
+        self.interval_seconds = interval_seconds
+        self._samples: deque = deque(maxlen=window)
+        self._max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sampling on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._sample())
+
+    async def shutdown(self):
+        """Stop sampling."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def record(self, lag_seconds: float):
+        lag_seconds = max(0.0, lag_seconds)
+        self._samples.append(lag_seconds)
+        self._max_lag = max(self._max_lag, lag_seconds)
+
+    def reset(self):
+        self._samples.clear()
+        self._max_lag = 0.0
+
+    async def _sample(self):
+        while True:
+            try:
+                expected = time.perf_counter() + self.interval_seconds
+                await asyncio.sleep(self.interval_seconds)
+                self.record(time.perf_counter() - expected)
+            except asyncio.CancelledError:
+                break
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Lag percentiles over the recent window, in milliseconds."""
+        if not self._samples:
+            return {'samples': 0, 'current_ms': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        samples = np.fromiter(self._samples, dtype=np.float64, count=len(self._samples)) * 1000
+        p50, p99 = np.percentile(samples, [50, 99])
+        return {
+            'samples': int(samples.size),
+            'current_ms': round(float(samples[-1]), 2),
+            'p50_ms': round(float(p50), 2),
+            'p99_ms': round(float(p99), 2),
+            'max_ms': round(self._max_lag * 1000, 2)
+        }
+
+
+# Global instances
+compute_executor = ComputeExecutor(
+    max_workers=settings.COMPUTE_EXECUTOR_WORKERS,
+    use_processes=settings.COMPUTE_EXECUTOR_PROCESSES,
+    min_offload_items=settings.COMPUTE_OFFLOAD_MIN_ITEMS,
+    batch_items=settings.COMPUTE_BATCH_ITEMS
+)
+event_loop_monitor = EventLoopLagMonitor(interval_seconds=settings.EVENT_LOOP_LAG_INTERVAL_SECONDS)
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field, validator
-from typing import List
+from typing import List, Optional
 import secrets
 
 
@@ -25,9 +25,59 @@ class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite+aiosqlite:///./attendance.db"
     DATABASE_ECHO: bool = False
     
-    # Redis settings (optional for caching)
+    # Redis settings (optional; also relays WebSocket broadcasts between workers)
     REDIS_URL: str = "redis://localhost:6379"
     REDIS_ENABLED: bool = False
+
+    # Rate limiting settings
+    # Client/category keys kept by the in-memory rate limiter before the least recently seen are dropped
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+
+    # Check-in settings
+    SESSION_CACHE_TTL_SECONDS: float = 30.0
+    LIVE_COUNTERS_RECONCILE_SECONDS: float = 60.0
+    
+    # Admin dashboard settings
+    # Interval of the background rebuild of the system stats snapshot
+    SYSTEM_STATS_REFRESH_SECONDS: float = 60.0
+    # Reads rebuild the snapshot when it is older than this
+    SYSTEM_STATS_MAX_AGE_SECONDS: float = 300.0
+    
+    # WebSocket settings
+    # Window for batching attendance broadcasts per class; 0 sends every event immediately
+    WEBSOCKET_COALESCE_WINDOW_MS: float = 0
+    # Frames buffered per connection before the overflow policy applies
+    WEBSOCKET_SEND_QUEUE_SIZE: int = 256
+    # drop_oldest, coalesce or disconnect
+    WEBSOCKET_OVERFLOW_POLICY: str = "drop_oldest"
+    
+    # Analytics settings
+    # Students whose history is loaded and scored together when generating alerts
+    ALERT_BATCH_CHUNK_SIZE: int = 500
+    # Chunks processed at once, each on its own database session
+    ALERT_BATCH_CONCURRENCY: int = 4
+    # Interval of the background refresh of the attendance rollups
+    ROLLUP_REFRESH_SECONDS: float = 60.0
+    # Analytics fall back to the raw records when the rollups are older than this
+    ROLLUP_MAX_STALENESS_SECONDS: float = 300.0
+    # Changes are looked up this far before the watermark to catch late commits
+    ROLLUP_REFRESH_OVERLAP_SECONDS: float = 300.0
+    # Days rebuilt per refresh transaction
+    ROLLUP_REFRESH_DAY_CHUNK: int = 31
+    # Memoized analytics results; writes by this worker invalidate them immediately, 0 disables
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 1024
+    ANALYTICS_CACHE_TTL_SECONDS: float = 60.0
+    # CPU-bound analytics stages run in a thread pool; enable to use worker processes
+    # instead (spawned per app worker, falling back to threads if unavailable)
+    COMPUTE_EXECUTOR_PROCESSES: bool = False
+    # Workers of the compute executor; unset uses up to 4 cores
+    COMPUTE_EXECUTOR_WORKERS: Optional[int] = None
+    # Stages over fewer records than this run inline on the event loop
+    COMPUTE_OFFLOAD_MIN_ITEMS: int = 2000
+    # Records shipped to a worker per call; pickling a batch holds the GIL
+    COMPUTE_BATCH_ITEMS: int = 10000
+    # Sampling interval of the event loop lag metric
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = 0.5
     
     # Application URLs
     BASE_URL: str = "http://localhost:8000"
@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import MetaData
+from sqlalchemy.dialects import postgresql, sqlite
 from typing import AsyncGenerator
 
 from app.core.config import settings
@@ -33,6 +34,18 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+def upsert_insert(session: AsyncSession, table):
+    """
+    Build an INSERT supporting ``on_conflict_do_*`` for the session's database.
+    
+    SQLite is used in development and PostgreSQL in production; both accept
+    the same ON CONFLICT clauses through their dialect-specific insert().
+    """
+    if session.bind.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         try:
@@ -0,0 +1,194 @@
+"""
+Shared counters for request rate limiting.
+
+Limits are enforced with an approximate sliding window: every key keeps the
+request count of the current fixed window and of the one before it, and the
+number of requests in the last ``window`` seconds is estimated as
+
+    previous * (1 - elapsed / window) + current
+
+where ``elapsed`` is the time since the current window started. That is two
+integers per key instead of one timestamp per request, and a check costs the
+same however busy the client is. Like the exact log it replaces, only
+allowed requests are counted, so a client that keeps retrying while limited
+is let through again once the estimate drops below the limit.
+
+Two implementations are provided:
+
+- ``InMemoryRateLimitStore``: per-process counters in an LRU-bounded table,
+  so addresses that go quiet are eventually dropped.
+- ``RedisRateLimitStore``: counters in Redis, shared by all workers, used
+  when ``settings.REDIS_ENABLED`` is set. Keys expire on their own.
+"""
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the Redis keys holding the window counters
+DEFAULT_KEY_PREFIX = "ratelimit"
+
+# Checks the estimate and counts the request in one round trip, atomically.
+# KEYS: current window counter, previous window counter
+# ARGV: limit, window seconds, seconds elapsed in the current window
+_SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * (window - elapsed) / window + current >= limit then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], math.ceil(window * 2))
+return 1
+"""
+
+
+def sliding_window_estimate(previous: int, current: int, window: float, elapsed: float) -> float:
+    """Estimate the requests in the last ``window`` seconds from two fixed-window counts."""
+    return previous * (window - elapsed) / window + current
+
+
+class _WindowCounter:
+    """Counts of one key: the current fixed window and the one before it."""
+
+    __slots__ = ("window_index", "current", "previous")
+
+    def __init__(self, window_index: int):
+        self.window_index = window_index
+        self.current = 0
+        self.previous = 0
+
+
+class RateLimitStore(ABC):
+    """Base class for rate limit stores."""
+
+    def __init__(self):
+        self._stats = {
+            'allowed': 0,
+            'limited': 0,
+            'errors': 0
+        }
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> bool:
+        """
+        Count a request for ``key`` if it is within ``limit`` requests per
+        ``window`` seconds.
+
+        Returns False, without counting the request, when the limit is reached.
+        """
+
+    async def close(self):
+        """Release resources."""
+
+    def _record(self, allowed: bool) -> bool:
+        self._stats['allowed' if allowed else 'limited'] += 1
+        return allowed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get rate limit store statistics."""
+        return {**self._stats, 'store': type(self).__name__}
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Per-process sliding window counters, keeping at most ``max_keys`` keys."""
+
+    def __init__(self, max_keys: int = 100_000):
+        super().__init__()
+        self.max_keys = max_keys
+        self._counters: "OrderedDict[str, _WindowCounter]" = OrderedDict()
+        self._stats['evicted'] = 0
+
+    async def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        window_index = int(now // window)
+
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = _WindowCounter(window_index)
+            # An evicted key starts over with an empty window
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+                self._stats['evicted'] += 1
+        else:
+            self._counters.move_to_end(key)
+
+        if counter.window_index != window_index:
+            # Roll over; after more than one idle window nothing is left to carry
+            counter.previous = counter.current if counter.window_index == window_index - 1 else 0
+            counter.current = 0
+            counter.window_index = window_index
+
+        elapsed = now - window_index * window
+        if sliding_window_estimate(counter.previous, counter.current, window, elapsed) >= limit:
+            return self._record(False)
+
+        counter.current += 1
+        return self._record(True)
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**super().get_stats(), 'keys': len(self._counters)}
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Sliding window counters in Redis, shared by all workers."""
+
+    def __init__(self, url: str = settings.REDIS_URL, key_prefix: str = DEFAULT_KEY_PREFIX, client=None):
+        super().__init__()
+        self._owns_client = client is None
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis is required for the Redis rate limit store")
+            client = redis.from_url(url)
+        self.client = client
+        self.key_prefix = key_prefix
+
+    async def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        window_index = int(now // window)
+
+        try:
+            allowed = await self.client.eval(
+                _SLIDING_WINDOW_SCRIPT,
+                2,
+                f"{self.key_prefix}:{key}:{window_index}",
+                f"{self.key_prefix}:{key}:{window_index - 1}",
+                limit,
+                window,
+                now - window_index * window
+            )
+        except Exception as e:
+            # Fail open: an unreachable store must not take the API down with it
+            self._stats['errors'] += 1
+            logger.error(f"Error checking rate limit in Redis: {e}")
+            return True
+
+        return self._record(bool(int(allowed)))
+
+    async def close(self):
+        if self._owns_client:
+            await self.client.connection_pool.disconnect()
+
+
+def create_rate_limit_store() -> RateLimitStore:
+    """Create the rate limit store configured by ``REDIS_ENABLED`` and ``REDIS_URL``."""
+    if settings.REDIS_ENABLED:
+        return RedisRateLimitStore(settings.REDIS_URL)
+    return InMemoryRateLimitStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
@@ -0,0 +1,57 @@
+"""
+Single-flight loading for in-process caches.
+
+When many requests miss the same cache key at once, only the first one runs
+the load; the others wait for and share its result. If the load fails every
+waiter sees the same exception, and if the task running it is cancelled
+(e.g. its client disconnected) the next waiter takes over the load instead
+of hanging on a result that will never arrive.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Runs at most one load per key at a time, sharing its outcome with concurrent callers."""
+
+    def __init__(self):
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether a load for ``key`` is in progress."""
+        return key in self._pending
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of ``load()``, or of the load for ``key`` already in progress."""
+        while True:
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Only retry if the load was cancelled, not this caller
+                if not pending.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._pending[key]
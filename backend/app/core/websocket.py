@@ -10,23 +10,28 @@ This module provides:
 """
 import asyncio
 import logging
+import math
 import time
-import weakref
 from datetime import datetime, timezone
-from typing import Dict, List, Set, Optional, Any, Callable
+from typing import Dict, List, Set, Optional, Any, Callable, Awaitable, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
-from collections import defaultdict
+from collections import defaultdict, deque
 try:
     import orjson
     # Use orjson for better performance
-    json_dumps = lambda x: orjson.dumps(x).decode()
+    json_dumps_bytes = orjson.dumps
     json_loads = orjson.loads
 except ImportError:
     import json
     # Fallback to standard json
-    json_dumps = json.dumps
+    json_dumps_bytes = lambda x: json.dumps(x).encode()
     json_loads = json.loads
+
+
+def json_dumps(message: Any) -> str:
+    """Encode a message for a text frame."""
+    return json_dumps_bytes(message).decode()
 try:
     import psutil
     PSUTIL_AVAILABLE = True
@@ -40,7 +45,9 @@ except ImportError:
     PROMETHEUS_AVAILABLE = False
 
 from fastapi import WebSocket, WebSocketDisconnect, status
+from ..core.config import settings
 from ..core.security import jwt_manager
+from ..core.backplane import Backplane, create_backplane
 
 
 # Metrics for monitoring
@@ -49,6 +56,12 @@ if PROMETHEUS_AVAILABLE:
     WEBSOCKET_MESSAGES = Counter('websocket_messages_total', 'Total WebSocket messages', ['type', 'direction'])
     WEBSOCKET_LATENCY = Histogram('websocket_latency_seconds', 'WebSocket message latency')
     WEBSOCKET_ERRORS = Counter('websocket_errors_total', 'WebSocket errors', ['error_type'])
+    WEBSOCKET_FRAMES_SAVED = Counter('websocket_coalesced_frames_saved_total', 'Frames not sent thanks to broadcast coalescing')
+    WEBSOCKET_QUEUE_OVERFLOWS = Counter('websocket_send_queue_overflows_total', 'Outbound queue overflows', ['policy'])
+    WEBSOCKET_COALESCE_DELAY = Histogram(
+        'websocket_coalesce_delay_seconds', 'Latency added to events by broadcast coalescing',
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+    )
 else:
     # Mock metrics when prometheus is not available
     class MockMetric:
@@ -61,6 +74,9 @@ else:
     WEBSOCKET_MESSAGES = MockMetric()
     WEBSOCKET_LATENCY = MockMetric()
     WEBSOCKET_ERRORS = MockMetric()
+    WEBSOCKET_FRAMES_SAVED = MockMetric()
+    WEBSOCKET_COALESCE_DELAY = MockMetric()
+    WEBSOCKET_QUEUE_OVERFLOWS = MockMetric()
 
 logger = logging.getLogger(__name__)
 
@@ -102,12 +118,82 @@ class MessageType(Enum):
     ATTENDANCE_STATE_CHANGED = "attendance_state_changed"
     BULK_ATTENDANCE_UPDATE = "bulk_attendance_update"
     ATTENDANCE_STATS_UPDATE = "attendance_stats_update"
+    # Teacher dashboard events (/ws/attendance)
+    STATS_UPDATED = "stats_updated"
+    BULK_OPERATION_COMPLETED = "bulk_operation_completed"
+    ATTENDANCE_ALERT = "attendance_alert"
+    OPERATION_CONFLICT = "operation_conflict"
+    OPERATION_STARTED = "operation_started"
+    OPERATION_BLOCKED = "operation_blocked"
     
     # System events
     ERROR = "error"
     SYSTEM_NOTIFICATION = "system_notification"
 
 
+# Roles that receive full teacher dashboard events
+TEACHER_ROLES = ("teacher", "admin")
+
+
+class OverflowPolicy(Enum):
+    """What to do when a connection's outbound queue is full."""
+    DROP_OLDEST = "drop_oldest"  # Discard the oldest queued frame
+    COALESCE = "coalesce"  # Replace the newest queued frame of the same type, else drop the oldest
+    DISCONNECT = "disconnect"  # Close the connection; the client reconnects and resyncs
+
+
+class OutboundQueue:
+    """
+    Bounded queue of serialized frames waiting to be written to one connection.
+    
+    Each connection has its own queue drained by its own writer task, so a
+    slow client only delays itself instead of the whole broadcast.
+    """
+    
+    def __init__(self, maxsize: int = 256, policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST):
+        self.maxsize = maxsize
+        self.policy = policy
+        self._frames: deque = deque()  # (message_type, payload)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+    
+    def put(self, message_type: str, payload: str) -> bool:
+        """
+        Queue a frame, applying the overflow policy when the queue is full.
+        
+        Returns False if the connection should be disconnected instead.
+        """
+        if len(self._frames) >= self.maxsize:
+            WEBSOCKET_QUEUE_OVERFLOWS.labels(policy=self.policy.value).inc()
+            if self.policy == OverflowPolicy.DISCONNECT:
+                return False
+            
+            self.dropped += 1
+            if self.policy == OverflowPolicy.COALESCE:
+                for index in range(len(self._frames) - 1, -1, -1):
+                    if self._frames[index][0] == message_type:
+                        del self._frames[index]
+                        break
+                else:
+                    self._frames.popleft()
+            else:
+                self._frames.popleft()
+        
+        self._frames.append((message_type, payload))
+        self._ready.set()
+        return True
+    
+    async def get(self) -> str:
+        """Wait for the next frame."""
+        while not self._frames:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._frames.popleft()[1]
+    
+    def __len__(self) -> int:
+        return len(self._frames)
+
+
 @dataclass
 class ConnectionInfo:
     """Information about a WebSocket connection."""
@@ -119,24 +205,105 @@ class ConnectionInfo:
     state: ConnectionState = ConnectionState.CONNECTING
     connected_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     last_ping: Optional[datetime] = None
-    last_activity: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    # time.monotonic() of the last received message
+    last_activity: float = field(default_factory=time.monotonic)
     message_count: int = 0
     error_count: int = 0
+    outbound: Optional[OutboundQueue] = None
+    writer_task: Optional[asyncio.Task] = None
+
+
+class IdleTimerWheel:
+    """
+    Timing wheel of connection idle deadlines.
+    
+    Connections are hashed into one-``resolution_seconds`` buckets by the
+    monotonic time at which they become idle. Recording activity only
+    updates ``ConnectionInfo.last_activity``; the bucket is not moved. When a
+    bucket comes due the pool re-checks each connection in it and schedules
+    active ones again at their new deadline, so a sweep only touches
+    connections whose deadline has passed, and each active connection is
+    re-bucketed at most once per idle timeout.
+    """
+    
+    def __init__(self, resolution_seconds: float = 1.0):
+        self.resolution_seconds = resolution_seconds
+        
+        # tick -> connection ids due in that tick
+        self._buckets: Dict[int, Set[str]] = {}
+        # connection id -> its tick, for O(1) cancellation
+        self._ticks: Dict[str, int] = {}
+        # First tick that has not been swept yet
+        self._cursor = int(time.monotonic() // resolution_seconds)
+    
+    def schedule(self, connection_id: str, deadline: float):
+        """Schedule (or reschedule) a connection to come due at ``deadline``."""
+        self.cancel(connection_id)
+        tick = max(math.ceil(deadline / self.resolution_seconds), self._cursor)
+        self._buckets.setdefault(tick, set()).add(connection_id)
+        self._ticks[connection_id] = tick
+    
+    def cancel(self, connection_id: str):
+        """Forget a connection."""
+        tick = self._ticks.pop(connection_id, None)
+        if tick is not None:
+            bucket = self._buckets[tick]
+            bucket.discard(connection_id)
+            if not bucket:
+                del self._buckets[tick]
+    
+    def pop_due(self, now: float) -> List[str]:
+        """Remove and return the connections whose bucket is due at ``now``."""
+        now_tick = int(now // self.resolution_seconds)
+        if now_tick < self._cursor:
+            return []
+        
+        if now_tick - self._cursor < len(self._buckets):
+            due_ticks = [tick for tick in range(self._cursor, now_tick + 1) if tick in self._buckets]
+        else:
+            # Long gap since the last sweep: cheaper to scan the occupied buckets
+            due_ticks = [tick for tick in self._buckets if tick <= now_tick]
+        self._cursor = now_tick + 1
+        
+        due = []
+        for tick in due_ticks:
+            for connection_id in self._buckets.pop(tick):
+                del self._ticks[connection_id]
+                due.append(connection_id)
+        return due
+    
+    def __len__(self) -> int:
+        return len(self._ticks)
 
 
 class ConnectionPool:
     """Manages WebSocket connections with resource pooling and cleanup."""
     
-    def __init__(self, max_connections_per_class: int = 100):
+    def __init__(
+        self,
+        max_connections_per_class: int = 100,
+        send_queue_size: int = 256,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        max_connections: int = 10000,
+        idle_timeout_seconds: float = 300.0,
+        sweep_interval_seconds: float = 30.0
+    ):
         self.max_connections_per_class = max_connections_per_class
+        self.max_connections = max_connections
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.send_queue_size = send_queue_size
+        self.overflow_policy = overflow_policy
         
         # Connection storage
         self._connections: Dict[str, ConnectionInfo] = {}
         self._class_connections: Dict[str, Set[str]] = defaultdict(set)
         self._user_connections: Dict[str, Set[str]] = defaultdict(set)
+        # class_id -> role -> connection ids
+        self._class_role_connections: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
         
-        # Weak references for automatic cleanup
-        self._websocket_refs: Dict[str, weakref.ref] = {}
+        # Idle deadlines of all connections
+        self._idle_wheel = IdleTimerWheel()
         
         # Performance tracking
         self._connection_stats = {
@@ -144,7 +311,10 @@ class ConnectionPool:
             'peak_connections': 0,
             'messages_sent': 0,
             'messages_received': 0,
-            'errors': 0
+            'errors': 0,
+            'frames_dropped': 0,
+            'slow_disconnects': 0,
+            'idle_disconnects': 0
         }
         
         # Start background tasks
@@ -166,43 +336,48 @@ class ConnectionPool:
         """Periodically clean up stale connections."""
         while True:
             try:
-                await asyncio.sleep(30)  # Cleanup every 30 seconds
+                await asyncio.sleep(self.sweep_interval_seconds)
                 await self._cleanup_stale_connections()
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error in periodic cleanup: {e}")
     
-    async def _cleanup_stale_connections(self):
-        """Remove stale and disconnected connections."""
-        current_time = datetime.now(timezone.utc)
+    async def _cleanup_stale_connections(self, now: Optional[float] = None) -> int:
+        """Remove connections idle for longer than the idle timeout."""
+        now = time.monotonic() if now is None else now
         stale_connections = []
         
-        for conn_id, conn_info in self._connections.items():
-            # Check for stale connections (no activity for 5 minutes)
-            if (current_time - conn_info.last_activity).total_seconds() > 300:
-                stale_connections.append(conn_id)
+        for conn_id in self._idle_wheel.pop_due(now):
+            conn_info = self._connections.get(conn_id)
+            if conn_info is None:
+                continue
             
-            # Check if websocket is still alive
-            websocket_ref = self._websocket_refs.get(conn_id)
-            if websocket_ref and websocket_ref() is None:
+            deadline = conn_info.last_activity + self.idle_timeout_seconds
+            if deadline <= now:
                 stale_connections.append(conn_id)
+            else:
+                # Active since it was scheduled: move it to its new deadline
+                self._idle_wheel.schedule(conn_id, deadline)
         
         for conn_id in stale_connections:
             await self._remove_connection(conn_id)
+        self._connection_stats['idle_disconnects'] += len(stale_connections)
+        return len(stale_connections)
     
     async def add_connection(self, websocket: WebSocket, connection_id: str) -> ConnectionInfo:
         """Add a new WebSocket connection to the pool."""
-        if len(self._connections) >= 10000:  # Global connection limit
+        if len(self._connections) >= self.max_connections:  # Global connection limit
             raise RuntimeError("Maximum global connections exceeded")
         
         conn_info = ConnectionInfo(
             websocket=websocket,
-            connection_id=connection_id
+            connection_id=connection_id,
+            outbound=OutboundQueue(self.send_queue_size, self.overflow_policy)
         )
         
         self._connections[connection_id] = conn_info
-        self._websocket_refs[connection_id] = weakref.ref(websocket)
+        self._idle_wheel.schedule(connection_id, conn_info.last_activity + self.idle_timeout_seconds)
         
         # Update stats
         self._connection_stats['total_connections'] += 1
@@ -234,6 +409,9 @@ class ConnectionPool:
             logger.warning(f"Class {class_id} exceeded connection limit")
             return False
         
+        # A re-authenticated connection leaves its previous class
+        self._unindex(conn_info)
+        
         # Update connection info
         conn_info.class_id = class_id
         conn_info.user_id = user_id
@@ -243,10 +421,32 @@ class ConnectionPool:
         # Add to indexes
         self._class_connections[class_id].add(connection_id)
         self._user_connections[user_id].add(connection_id)
+        self._class_role_connections[class_id][user_type].add(connection_id)
         
         logger.info(f"Authenticated connection {connection_id} for user {user_id} in class {class_id}")
         return True
     
+    def _unindex(self, conn_info: ConnectionInfo):
+        """Remove a connection from the class, role and user indexes."""
+        connection_id = conn_info.connection_id
+        if conn_info.class_id:
+            self._class_connections[conn_info.class_id].discard(connection_id)
+            if not self._class_connections[conn_info.class_id]:
+                del self._class_connections[conn_info.class_id]
+            
+            roles = self._class_role_connections.get(conn_info.class_id)
+            if roles is not None:
+                roles[conn_info.user_type].discard(connection_id)
+                if not roles[conn_info.user_type]:
+                    del roles[conn_info.user_type]
+                if not roles:
+                    del self._class_role_connections[conn_info.class_id]
+        
+        if conn_info.user_id:
+            self._user_connections[conn_info.user_id].discard(connection_id)
+            if not self._user_connections[conn_info.user_id]:
+                del self._user_connections[conn_info.user_id]
+    
     async def remove_connection(self, connection_id: str):
         """Remove a connection from the pool."""
         await self._remove_connection(connection_id)
@@ -258,49 +458,106 @@ class ConnectionPool:
         
         conn_info = self._connections[connection_id]
         
-        # Remove from indexes
-        if conn_info.class_id:
-            self._class_connections[conn_info.class_id].discard(connection_id)
-            if not self._class_connections[conn_info.class_id]:
-                del self._class_connections[conn_info.class_id]
-        
-        if conn_info.user_id:
-            self._user_connections[conn_info.user_id].discard(connection_id)
-            if not self._user_connections[conn_info.user_id]:
-                del self._user_connections[conn_info.user_id]
+        self._unindex(conn_info)
         
         # Remove from main storage
         del self._connections[connection_id]
-        self._websocket_refs.pop(connection_id, None)
+        self._idle_wheel.cancel(connection_id)
+        
+        # Stop the writer; queued frames are discarded
+        self._connection_stats['frames_dropped'] += conn_info.outbound.dropped
+        if conn_info.writer_task and conn_info.writer_task is not asyncio.current_task():
+            conn_info.writer_task.cancel()
         
         # Update metrics
         WEBSOCKET_CONNECTIONS.labels(status='connected').dec()
         
         logger.info(f"Removed connection {connection_id}, total: {len(self._connections)}")
     
+    async def enqueue(self, conn_info: ConnectionInfo, message_type: str, payload: str):
+        """Queue a serialized frame for a connection's writer task."""
+        if conn_info.connection_id not in self._connections:
+            return
+        
+        if not conn_info.outbound.put(message_type, payload):
+            logger.warning(f"Disconnecting slow connection {conn_info.connection_id}: send queue full")
+            self._connection_stats['slow_disconnects'] += 1
+            await self._remove_connection(conn_info.connection_id)
+            try:
+                await conn_info.websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            except Exception:
+                pass
+            return
+        
+        if conn_info.writer_task is None:
+            conn_info.writer_task = asyncio.get_running_loop().create_task(self._writer(conn_info))
+    
+    async def _writer(self, conn_info: ConnectionInfo):
+        """Drain a connection's outbound queue onto its websocket."""
+        try:
+            while True:
+                payload = await conn_info.outbound.get()
+                await conn_info.websocket.send_text(payload)
+                self._connection_stats['messages_sent'] += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error sending message to {conn_info.connection_id}: {e}")
+            self._connection_stats['errors'] += 1
+            await self._remove_connection(conn_info.connection_id)
+    
     def get_connection(self, connection_id: str) -> Optional[ConnectionInfo]:
         """Get connection info by ID."""
         return self._connections.get(connection_id)
     
-    def get_class_connections(self, class_id: str) -> List[ConnectionInfo]:
-        """Get all connections for a class."""
-        connection_ids = self._class_connections.get(class_id, set())
+    def get_class_connections(
+        self,
+        class_id: str,
+        roles: Optional[Tuple[str, ...]] = None
+    ) -> List[ConnectionInfo]:
+        """Get all connections for a class, optionally only those with one of ``roles``."""
+        if roles is None:
+            connection_ids = self._class_connections.get(class_id, ())
+        else:
+            by_role = self._class_role_connections.get(class_id)
+            if not by_role:
+                return []
+            connection_ids = [
+                conn_id for role in roles for conn_id in by_role.get(role, ())
+            ]
         return [self._connections[conn_id] for conn_id in connection_ids if conn_id in self._connections]
     
-    def get_user_connections(self, user_id: str) -> List[ConnectionInfo]:
-        """Get all connections for a user."""
+    def get_user_connections(self, user_id: str, class_id: Optional[str] = None) -> List[ConnectionInfo]:
+        """Get all connections for a user, optionally only those in one class."""
         connection_ids = self._user_connections.get(user_id, set())
-        return [self._connections[conn_id] for conn_id in connection_ids if conn_id in self._connections]
+        return [
+            self._connections[conn_id] for conn_id in connection_ids
+            if conn_id in self._connections
+            and (class_id is None or self._connections[conn_id].class_id == class_id)
+        ]
+    
+    def count_class_connections(self, class_id: str) -> Dict[str, int]:
+        """Get the number of connections of a class by role."""
+        return {
+            role: len(connection_ids)
+            for role, connection_ids in self._class_role_connections.get(class_id, {}).items()
+        }
     
     def update_activity(self, connection_id: str):
         """Update last activity timestamp for a connection."""
-        if connection_id in self._connections:
-            self._connections[connection_id].last_activity = datetime.now(timezone.utc)
+        conn_info = self._connections.get(connection_id)
+        if conn_info is not None:
+            # The idle wheel picks up the new deadline when the old one comes due
+            conn_info.last_activity = time.monotonic()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get connection pool statistics."""
         return {
             **self._connection_stats,
+            'frames_dropped': self._connection_stats['frames_dropped'] + sum(
+                conn_info.outbound.dropped for conn_info in self._connections.values()
+            ),
+            'queued_frames': sum(len(conn_info.outbound) for conn_info in self._connections.values()),
             'active_connections': len(self._connections),
             'active_classes': len(self._class_connections),
             'active_users': len(self._user_connections),
@@ -316,6 +573,15 @@ class ConnectionPool:
             except asyncio.CancelledError:
                 pass
         
+        # Stop the writers
+        writer_tasks = [
+            conn_info.writer_task for conn_info in self._connections.values()
+            if conn_info.writer_task
+        ]
+        for task in writer_tasks:
+            task.cancel()
+        await asyncio.gather(*writer_tasks, return_exceptions=True)
+        
         # Close all connections
         for conn_info in self._connections.values():
             try:
@@ -327,7 +593,8 @@ class ConnectionPool:
         self._connections.clear()
         self._class_connections.clear()
         self._user_connections.clear()
-        self._websocket_refs.clear()
+        self._class_role_connections.clear()
+        self._idle_wheel = IdleTimerWheel()
 
 
 class MessageRouter:
@@ -377,19 +644,201 @@ class MessageRouter:
             WEBSOCKET_ERRORS.labels(error_type='routing_error').inc()
 
 
+# Event types that may be merged into batched frames when coalescing is enabled
+COALESCED_MESSAGE_TYPES = {
+    MessageType.STUDENT_JOINED,
+    MessageType.ATTENDANCE_UPDATE,
+    MessageType.STATS_UPDATE,
+    MessageType.ATTENDANCE_CREATED,
+    MessageType.ATTENDANCE_UPDATED,
+    MessageType.STUDENT_JOINED_CLASS,
+    MessageType.ATTENDANCE_STATE_CHANGED,
+    MessageType.ATTENDANCE_STATS_UPDATE,
+}
+
+# Event types where only the latest message in a batch matters
+SUPERSEDING_MESSAGE_TYPES = {
+    MessageType.STATS_UPDATE.value,
+    MessageType.ATTENDANCE_STATS_UPDATE.value,
+}
+
+
+class BroadcastCoalescer:
+    """
+    Buffers class broadcasts for a short window and sends them as one frame.
+    
+    During a check-in burst every student produces several events for the
+    teacher dashboards of the class. The coalescer collects the events of a
+    class for ``window_seconds`` and then flushes them as a single
+    ATTENDANCE_UPDATE frame whose ``data.events`` holds the original messages
+    in order. Statistics updates supersede each other, so only the latest one
+    is kept. A window containing a single event is sent unchanged.
+    """
+    
+    def __init__(
+        self,
+        window_seconds: float,
+        deliver: Callable[[Tuple, Dict[str, Any], str], Awaitable[int]]
+    ):
+        self.window_seconds = window_seconds
+        self._deliver = deliver
+        
+        # (class_id, roles) -> [(enqueued monotonic time, message)]
+        self._buffers: Dict[Tuple, List[Tuple[float, Dict[str, Any]]]] = {}
+        self._flush_tasks: Dict[Tuple, asyncio.Task] = {}
+        
+        self._stats = {
+            'events_buffered': 0,
+            'batches_sent': 0,
+            'frames_saved': 0,
+            'total_delay_seconds': 0.0,
+            'max_delay_seconds': 0.0
+        }
+    
+    def add(self, key: Tuple, message: Dict[str, Any]):
+        """
+        Buffer a message, scheduling a flush at the end of the window.
+        
+        ``key`` is ``(class_id, roles)``: messages are only merged with
+        messages going to the same audience.
+        """
+        self._buffers.setdefault(key, []).append((time.monotonic(), message))
+        self._stats['events_buffered'] += 1
+        
+        if key not in self._flush_tasks:
+            self._flush_tasks[key] = asyncio.get_running_loop().create_task(
+                self._flush_later(key)
+            )
+    
+    async def flush_class(self, class_id: str):
+        """Send everything buffered for a class now."""
+        for key in [key for key in self._buffers if key[0] == class_id]:
+            await self.flush(key)
+    
+    async def flush(self, key: Tuple):
+        """Send the buffered messages of one audience now."""
+        task = self._flush_tasks.pop(key, None)
+        if task and task is not asyncio.current_task():
+            task.cancel()
+        
+        buffered = self._buffers.pop(key, None)
+        if not buffered:
+            return
+        
+        now = time.monotonic()
+        for enqueued_at, _ in buffered:
+            delay = now - enqueued_at
+            WEBSOCKET_COALESCE_DELAY.observe(delay)
+            self._stats['total_delay_seconds'] += delay
+            self._stats['max_delay_seconds'] = max(self._stats['max_delay_seconds'], delay)
+        
+        events = self._merge([message for _, message in buffered])
+        if len(events) == 1:
+            message = events[0]
+        else:
+            message = {
+                "type": MessageType.ATTENDANCE_UPDATE.value,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "data": {
+                    "batched": True,
+                    "count": len(events),
+                    "events": events
+                }
+            }
+        
+        delivered = await self._deliver(key, message, message["type"])
+        
+        saved = (len(buffered) - 1) * delivered
+        self._stats['batches_sent'] += 1
+        self._stats['frames_saved'] += saved
+        WEBSOCKET_FRAMES_SAVED.inc(saved)
+    
+    async def flush_all(self):
+        """Send everything that is buffered, e.g. on shutdown."""
+        for key in list(self._buffers):
+            await self.flush(key)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics."""
+        events = self._stats['events_buffered'] - sum(len(b) for b in self._buffers.values())
+        return {
+            **self._stats,
+            'window_seconds': self.window_seconds,
+            'avg_delay_seconds': self._stats['total_delay_seconds'] / events if events else 0.0,
+            'pending_classes': len(self._buffers)
+        }
+    
+    async def _flush_later(self, key: Tuple):
+        try:
+            await asyncio.sleep(self.window_seconds)
+            await self.flush(key)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error flushing coalesced broadcast for class {key[0]}: {e}")
+    
+    @staticmethod
+    def _merge(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop superseded statistics updates, keeping the latest of each type."""
+        latest_index = {
+            message["type"]: index
+            for index, message in enumerate(messages)
+            if message["type"] in SUPERSEDING_MESSAGE_TYPES
+        }
+        return [
+            message for index, message in enumerate(messages)
+            if message["type"] not in SUPERSEDING_MESSAGE_TYPES or latest_index[message["type"]] == index
+        ]
+
+
 class WebSocketServer:
     """Production-grade WebSocket server with comprehensive features."""
     
-    def __init__(self):
-        self.connection_pool = ConnectionPool()
+    def __init__(
+        self,
+        coalesce_window_ms: float = 0,
+        send_queue_size: int = 256,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        backplane: Optional[Backplane] = None
+    ):
+        self.connection_pool = ConnectionPool(
+            send_queue_size=send_queue_size,
+            overflow_policy=overflow_policy
+        )
         self.message_router = MessageRouter()
         
+        # Relays broadcasts to the other worker processes; None keeps them process-local
+        self.backplane = backplane
+        
+        # Opt-in coalescing of class broadcasts (disabled when the window is 0)
+        self.coalescer: Optional[BroadcastCoalescer] = None
+        if coalesce_window_ms > 0:
+            self.enable_coalescing(coalesce_window_ms)
+        
         # Performance tracking
         self.start_time = datetime.now(timezone.utc)
         
         # Register default handlers
         self._register_default_handlers()
     
+    def enable_coalescing(self, window_ms: float):
+        """Batch attendance events per class over a window of ``window_ms`` milliseconds."""
+        self.coalescer = BroadcastCoalescer(
+            window_ms / 1000,
+            lambda key, message, message_type: self._deliver_to_class(*key, message, message_type)
+        )
+    
+    async def start(self):
+        """Start receiving broadcasts published by other workers."""
+        if self.backplane:
+            await self.backplane.start(self._handle_backplane_message)
+    
+    async def disable_coalescing(self):
+        """Flush any buffered events and send broadcasts immediately again."""
+        if self.coalescer:
+            coalescer, self.coalescer = self.coalescer, None
+            await coalescer.flush_all()
+    
     def _register_default_handlers(self):
         """Register default message handlers."""
         self.message_router.register_handler(MessageType.PING, self._handle_ping)
@@ -493,6 +942,31 @@ class WebSocketServer:
             WEBSOCKET_ERRORS.labels(error_type='connection_error').inc()
             return False
     
+    async def attach(
+        self,
+        websocket: WebSocket,
+        connection_id: str,
+        class_id: str,
+        user_id: str,
+        user_type: str
+    ) -> Optional[ConnectionInfo]:
+        """
+        Accept and register a connection that was authenticated by its endpoint.
+        
+        Used by protocol adapters (e.g. /ws/attendance) that authenticate
+        from a query parameter instead of an AUTH message. Returns None if
+        the class is full.
+        """
+        await websocket.accept()
+        conn_info = await self.connection_pool.add_connection(websocket, connection_id)
+        conn_info.state = ConnectionState.CONNECTED
+        
+        if not await self.connection_pool.authenticate_connection(connection_id, class_id, user_id, user_type):
+            await self.connection_pool.remove_connection(connection_id)
+            return None
+        
+        return conn_info
+    
     async def disconnect(self, connection_id: str):
         """Handle WebSocket disconnection."""
         await self.connection_pool.remove_connection(connection_id)
@@ -535,12 +1009,19 @@ class WebSocketServer:
                 conn_info.error_count += 1
                 await self._send_error(conn_info, f"Message processing error: {str(e)}")
     
-    async def broadcast_to_class(self, class_id: str, message_type: MessageType, data: Dict[str, Any]):
-        """Broadcast a message to all connections in a class."""
-        connections = self.connection_pool.get_class_connections(class_id)
-        if not connections:
-            return
+    async def broadcast_to_class(
+        self,
+        class_id: str,
+        message_type: MessageType,
+        data: Dict[str, Any],
+        roles: Optional[Tuple[str, ...]] = None
+    ):
+        """
+        Broadcast a message to all connections in a class, on every worker.
         
+        With ``roles``, only connections of users with one of those roles
+        (see TEACHER_ROLES) receive it.
+        """
         # Prepare message
         message = {
             "type": message_type.value,
@@ -548,31 +1029,116 @@ class WebSocketServer:
             "data": data
         }
         
-        # Send to all connections concurrently
-        tasks = [
-            self._send_raw_message(conn_info, message)
-            for conn_info in connections
+        # Local connections first, so they do not wait on the backplane
+        await self._broadcast_local(class_id, roles, message, message_type)
+        
+        if self.backplane:
+            await self.backplane.publish({
+                "kind": "class",
+                "class_id": class_id,
+                "roles": roles,
+                "message": message
+            })
+    
+    async def _broadcast_local(
+        self,
+        class_id: str,
+        roles: Optional[Tuple[str, ...]],
+        message: Dict[str, Any],
+        message_type: MessageType
+    ):
+        """Broadcast a prepared message to this worker's connections in a class."""
+        if not self.connection_pool.get_class_connections(class_id, roles):
+            return
+        
+        if self.coalescer:
+            if message_type in COALESCED_MESSAGE_TYPES:
+                self.coalescer.add((class_id, roles), message)
+                return
+            # Keep ordering: anything buffered for the class goes out first
+            await self.coalescer.flush_class(class_id)
+        
+        await self._deliver_to_class(class_id, roles, message, message_type.value)
+    
+    async def _deliver_to_class(
+        self,
+        class_id: str,
+        roles: Optional[Tuple[str, ...]],
+        message: Dict[str, Any],
+        message_type: str
+    ) -> int:
+        """Serialize a message once and queue it for every authenticated connection of a class."""
+        connections = [
+            conn_info for conn_info in self.connection_pool.get_class_connections(class_id, roles)
             if conn_info.state == ConnectionState.AUTHENTICATED
         ]
+        if not connections:
+            return 0
         
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
-            WEBSOCKET_MESSAGES.labels(type=message_type.value, direction='sent').inc(len(tasks))
+        payload = json_dumps(message)
+        
+        # Queueing never waits on the network; each connection's writer sends at its own pace
+        for conn_info in connections:
+            await self._send_serialized(conn_info, message_type, payload)
+        WEBSOCKET_MESSAGES.labels(type=message_type, direction='sent').inc(len(connections))
+        return len(connections)
     
-    async def send_to_user(self, user_id: str, message_type: MessageType, data: Dict[str, Any]):
-        """Send a message to all connections for a specific user."""
-        connections = self.connection_pool.get_user_connections(user_id)
-        if not connections:
-            return
+    async def send_to_user(
+        self,
+        user_id: str,
+        message_type: MessageType,
+        data: Dict[str, Any],
+        class_id: Optional[str] = None
+    ):
+        """
+        Send a message to all connections for a specific user, on every worker,
+        optionally only in one class.
+        """
+        message = {
+            "type": message_type.value,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": data
+        }
+        
+        await self._send_to_user_local(user_id, class_id, message)
         
-        tasks = [
-            self._send_message(conn_info, message_type, data)
-            for conn_info in connections
+        if self.backplane:
+            await self.backplane.publish({
+                "kind": "user",
+                "user_id": user_id,
+                "class_id": class_id,
+                "message": message
+            })
+    
+    async def _send_to_user_local(self, user_id: str, class_id: Optional[str], message: Dict[str, Any]):
+        """Send a prepared message to this worker's connections of a user."""
+        connections = [
+            conn_info for conn_info in self.connection_pool.get_user_connections(user_id, class_id)
             if conn_info.state == ConnectionState.AUTHENTICATED
         ]
+        if not connections:
+            return
         
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        payload = json_dumps(message)
+        for conn_info in connections:
+            await self._send_serialized(conn_info, message["type"], payload)
+    
+    async def _handle_backplane_message(self, envelope: Dict[str, Any]):
+        """Deliver a broadcast published by another worker to local connections."""
+        message = envelope["message"]
+        if envelope["kind"] == "class":
+            roles = tuple(envelope["roles"]) if envelope.get("roles") is not None else None
+            await self._broadcast_local(
+                envelope["class_id"], roles, message, MessageType(message["type"])
+            )
+        elif envelope["kind"] == "user":
+            await self._send_to_user_local(envelope["user_id"], envelope.get("class_id"), message)
+    
+    async def send_to_connection(self, connection_id: str, message_type: MessageType, data: Dict[str, Any]):
+        """Send a message to a single connection."""
+        conn_info = self.connection_pool.get_connection(connection_id)
+        if conn_info:
+            await self._send_message(conn_info, message_type, data)
     
     async def _send_message(
         self, 
@@ -590,13 +1156,16 @@ class WebSocketServer:
     
     async def _send_raw_message(self, conn_info: ConnectionInfo, message: Dict[str, Any]):
         """Send a raw message to a connection."""
+        await self._send_serialized(conn_info, message.get("type", ""), json_dumps(message))
+    
+    async def _send_serialized(self, conn_info: ConnectionInfo, message_type: str, payload: str):
+        """Queue an already serialized message for a connection."""
         try:
             if conn_info.websocket.client_state.name == 'DISCONNECTED':
                 await self.connection_pool.remove_connection(conn_info.connection_id)
                 return
             
-            json_data = json_dumps(message)
-            await conn_info.websocket.send_text(json_data)
+            await self.connection_pool.enqueue(conn_info, message_type, payload)
             
         except Exception as e:
             logger.error(f"Error sending message to {conn_info.connection_id}: {e}")
@@ -610,28 +1179,29 @@ class WebSocketServer:
     
     # Attendance-specific broadcasting methods
     async def broadcast_attendance_created(self, class_id: str, attendance_data: Dict[str, Any]):
-        """Broadcast attendance created message to class."""
-        await self.broadcast_to_class(class_id, MessageType.ATTENDANCE_CREATED, attendance_data)
+        """Broadcast attendance created message to the class's teachers."""
+        await self.broadcast_to_class(class_id, MessageType.ATTENDANCE_CREATED, attendance_data, roles=TEACHER_ROLES)
     
     async def broadcast_attendance_updated(self, class_id: str, attendance_data: Dict[str, Any]):
-        """Broadcast attendance updated message to class."""
-        await self.broadcast_to_class(class_id, MessageType.ATTENDANCE_UPDATED, attendance_data)
+        """Broadcast attendance updated message to the class's teachers."""
+        await self.broadcast_to_class(class_id, MessageType.ATTENDANCE_UPDATED, attendance_data, roles=TEACHER_ROLES)
     
     async def broadcast_student_joined_class(self, class_id: str, join_data: Dict[str, Any]):
-        """Broadcast student joined class message to class."""
-        await self.broadcast_to_class(class_id, MessageType.STUDENT_JOINED_CLASS, join_data)
+        """Broadcast student joined class message to the class's teachers."""
+        await self.broadcast_to_class(class_id, MessageType.STUDENT_JOINED_CLASS, join_data, roles=TEACHER_ROLES)
     
     async def broadcast_attendance_state_changed(self, class_id: str, state_data: Dict[str, Any]):
-        """Broadcast general attendance state change message to class."""
-        await self.broadcast_to_class(class_id, MessageType.ATTENDANCE_STATE_CHANGED, state_data)
+        """Broadcast general attendance state change message to the class's teachers."""
+        await self.broadcast_to_class(class_id, MessageType.ATTENDANCE_STATE_CHANGED, state_data, roles=TEACHER_ROLES)
     
     async def broadcast_bulk_attendance_update(self, class_id: str, bulk_data: Dict[str, Any]):
-        """Broadcast bulk attendance update message to class."""
-        await self.broadcast_to_class(class_id, MessageType.BULK_ATTENDANCE_UPDATE, bulk_data)
+        """Broadcast bulk attendance update message to the class's teachers."""
+        await self.broadcast_to_class(class_id, MessageType.BULK_ATTENDANCE_UPDATE, bulk_data, roles=TEACHER_ROLES)
     
     async def broadcast_attendance_stats_update(self, class_id: str, stats_data: Dict[str, Any]):
-        """Broadcast attendance statistics update message to class."""
-        await self.broadcast_to_class(class_id, MessageType.ATTENDANCE_STATS_UPDATE, stats_data)
+        """Broadcast attendance statistics update message to the class's teachers."""
+        await self.broadcast_to_class(class_id, MessageType.ATTENDANCE_STATS_UPDATE, stats_data, roles=TEACHER_ROLES)
+    
     def get_health_status(self) -> Dict[str, Any]:
         """Get server health status and metrics."""
         stats = self.connection_pool.get_stats()
@@ -659,14 +1229,24 @@ class WebSocketServer:
                 "memory_mb": stats['memory_usage'],
                 "cpu_percent": psutil.Process().cpu_percent() if PSUTIL_AVAILABLE else 0
             },
-            "errors": stats['errors']
+            "errors": stats['errors'],
+            "coalescing": self.coalescer.get_stats() if self.coalescer else None,
+            "backplane": self.backplane.get_stats() if self.backplane else None
         }
     
     async def shutdown(self):
         """Shutdown the WebSocket server."""
         logger.info("Shutting down WebSocket server")
+        if self.backplane:
+            await self.backplane.close()
+        await self.disable_coalescing()
         await self.connection_pool.shutdown()
 
 
 # Global WebSocket server instance
-websocket_server = WebSocketServer()
\ No newline at end of file
+websocket_server = WebSocketServer(
+    coalesce_window_ms=settings.WEBSOCKET_COALESCE_WINDOW_MS,
+    send_queue_size=settings.WEBSOCKET_SEND_QUEUE_SIZE,
+    overflow_policy=OverflowPolicy(settings.WEBSOCKET_OVERFLOW_POLICY),
+    backplane=create_backplane()
+)
\ No newline at end of file
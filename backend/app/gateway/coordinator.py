@@ -16,7 +16,7 @@ from app.services.api_gateway import (
     ProviderType, RequestMethod, gateway_service
 )
 from app.gateway.router import GatewayRouter
-from app.gateway.request_queue import RequestQueue, RequestPriority
+from app.gateway.request_queue import RequestQueue, RequestPriority, QueueStrategy, PROVIDER_QUEUE_WEIGHTS
 from app.gateway.throttler import RequestThrottler, ThrottleManager, throttle_manager
 from app.gateway.api_key_manager import APIKeyManager, api_key_manager
 from app.middleware.rate_limiting import RateLimitMiddleware, rate_limit_middleware
@@ -102,10 +102,14 @@ class GatewayCoordinator:
             await self.router.start()
             
             # Initialize and start request queue
+            # Share the processors between providers so one provider's bulk sync
+            # cannot hold up the others
             self.request_queue = RequestQueue(
                 max_size=10000,
+                strategy=QueueStrategy.WEIGHTED_FAIR,
                 processor_count=20,
-                processor_callable=self._process_queued_request
+                processor_callable=self._process_queued_request,
+                provider_weights=PROVIDER_QUEUE_WEIGHTS
             )
             await self.request_queue.start()
             
@@ -508,8 +512,10 @@ class GatewayCoordinator:
                     await self.request_queue.stop()
                     self.request_queue = RequestQueue(
                         max_size=10000,
+                        strategy=QueueStrategy.WEIGHTED_FAIR,
                         processor_count=20,
-                        processor_callable=self._process_queued_request
+                        processor_callable=self._process_queued_request,
+                        provider_weights=PROVIDER_QUEUE_WEIGHTS
                     )
                     await self.request_queue.start()
                     return {"status": "request_queue_cleared"}
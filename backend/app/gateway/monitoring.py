@@ -10,12 +10,14 @@ import json
 import logging
 import time
 from typing import Dict, List, Any, Optional, Callable
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 from collections import deque, defaultdict
 import threading
 
+import numpy as np
+
 from app.services.api_gateway import ProviderType, GatewayResponse
 
 
@@ -76,17 +78,109 @@ class Alert:
         }
 
 
+def _epoch(timestamp: datetime) -> float:
+    """Epoch seconds of a timestamp; naive timestamps are UTC, as from ``datetime.utcnow()``."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+class MetricSeries:
+    """
+    Fixed-size time series of one metric.
+    
+    Samples are kept in preallocated float64 arrays of epoch timestamps and
+    values used as a ring buffer, so recording a sample once the series is
+    full overwrites the oldest one instead of copying the rest. Both arrays
+    stay sorted by time within the two segments of the ring, which lets a
+    time-range lookup binary search them and hand the values to numpy
+    without building intermediate lists.
+    
+    Samples must be recorded in time order; a timestamp older than the
+    latest sample is recorded at the latest sample's time.
+    """
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros(capacity, dtype=np.float64)
+        self._labels: List[Optional[Dict[str, str]]] = [None] * capacity
+        self._next = 0
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def append(self, timestamp: float, value: float, labels: Optional[Dict[str, str]] = None):
+        """Record a sample, overwriting the oldest one when the series is full."""
+        if self._size:
+            timestamp = max(timestamp, self._timestamps[self._next - 1])
+        
+        self._timestamps[self._next] = timestamp
+        self._values[self._next] = value
+        self._labels[self._next] = labels
+        
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+    
+    def _segments(self) -> List[slice]:
+        """Slices of the buffers holding the samples, oldest first."""
+        if self._size < self.capacity:
+            return [slice(0, self._size)]
+        return [slice(self._next, self.capacity), slice(0, self._next)]
+    
+    def position_since(self, since: float) -> int:
+        """Position, counting from the oldest sample, of the first sample at or after ``since``."""
+        offset = 0
+        for segment in self._segments():
+            timestamps = self._timestamps[segment]
+            if timestamps.size and timestamps[-1] >= since:
+                return offset + int(np.searchsorted(timestamps, since, side="left"))
+            offset += timestamps.size
+        return offset
+    
+    def _select(self, buffer, start: int):
+        """Samples of ``buffer`` from position ``start`` to the latest."""
+        parts = []
+        for segment in self._segments():
+            length = segment.stop - segment.start
+            if start >= length:
+                start -= length
+                continue
+            parts.append(buffer[segment.start + start:segment.stop])
+            start = 0
+        
+        if isinstance(buffer, list):
+            return [item for part in parts for item in part]
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else buffer[:0]
+    
+    def timestamps(self, start: int = 0) -> np.ndarray:
+        """Timestamps from position ``start``; may be a view of the buffer."""
+        return self._select(self._timestamps, start)
+    
+    def values(self, start: int = 0) -> np.ndarray:
+        """Values from position ``start``; may be a view of the buffer."""
+        return self._select(self._values, start)
+    
+    def labels(self, start: int = 0) -> List[Optional[Dict[str, str]]]:
+        """Labels from position ``start``."""
+        return self._select(self._labels, start)
+
+
 class MetricCollector:
     """
     Collects and aggregates metrics for monitoring.
     
     Supports different metric types and provides time-series data
-    for analysis and alerting.
+    for analysis and alerting. Each metric keeps its latest
+    ``max_data_points`` samples in a MetricSeries.
     """
     
     def __init__(self, max_data_points: int = 10000):
         self.max_data_points = max_data_points
-        self.metrics: Dict[str, List[MetricDataPoint]] = defaultdict(list)
+        self.metrics: Dict[str, MetricSeries] = {}
         self.metric_types: Dict[str, MetricType] = {}
         self.lock = threading.RLock()
     
@@ -99,22 +193,15 @@ class MetricCollector:
         timestamp: Optional[datetime] = None
     ):
         """Record a metric data point."""
+        epoch = time.time() if timestamp is None else _epoch(timestamp)
+        
         with self.lock:
-            if timestamp is None:
-                timestamp = datetime.utcnow()
+            series = self.metrics.get(metric_name)
+            if series is None:
+                series = self.metrics[metric_name] = MetricSeries(self.max_data_points)
             
-            data_point = MetricDataPoint(
-                timestamp=timestamp,
-                value=value,
-                labels=labels or {}
-            )
-            
-            self.metrics[metric_name].append(data_point)
+            series.append(epoch, value, labels)
             self.metric_types[metric_name] = metric_type
-            
-            # Keep only the most recent data points
-            if len(self.metrics[metric_name]) > self.max_data_points:
-                self.metrics[metric_name] = self.metrics[metric_name][-self.max_data_points:]
     
     def get_metric_data(
         self,
@@ -124,43 +211,60 @@ class MetricCollector:
     ) -> List[MetricDataPoint]:
         """Get metric data points."""
         with self.lock:
-            data_points = self.metrics.get(metric_name, [])
-            
-            if since:
-                data_points = [dp for dp in data_points if dp.timestamp >= since]
+            series = self.metrics.get(metric_name)
+            if series is None:
+                return []
             
+            start = series.position_since(_epoch(since)) if since else 0
             if limit:
-                data_points = data_points[-limit:]
+                start = max(start, len(series) - limit)
             
-            return data_points
+            return [
+                MetricDataPoint(
+                    timestamp=datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None),
+                    value=value,
+                    labels=labels or {}
+                )
+                for timestamp, value, labels in zip(
+                    series.timestamps(start).tolist(), series.values(start).tolist(), series.labels(start)
+                )
+            ]
     
     def get_metric_summary(self, metric_name: str, minutes: int = 60) -> Dict[str, Any]:
         """Get metric summary statistics."""
-        since = datetime.utcnow() - timedelta(minutes=minutes)
-        data_points = self.get_metric_data(metric_name, since=since)
+        since = time.time() - minutes * 60
         
-        if not data_points:
+        with self.lock:
+            series = self.metrics.get(metric_name)
+            values = series.values(series.position_since(since)) if series is not None else None
+            
+            if values is None or not values.size:
+                return {
+                    'metric_name': metric_name,
+                    'data_points': 0,
+                    'min': None,
+                    'max': None,
+                    'avg': None,
+                    'sum': None
+                }
+            
+            # Computed under the lock: the values may be a view of the ring buffer
+            total = float(values.sum())
+            p50, p95, p99 = np.percentile(values, [50, 95, 99]).tolist()
+            
             return {
                 'metric_name': metric_name,
-                'data_points': 0,
-                'min': None,
-                'max': None,
-                'avg': None,
-                'sum': None
+                'data_points': int(values.size),
+                'min': float(values.min()),
+                'max': float(values.max()),
+                'avg': total / values.size,
+                'sum': total,
+                'p50': p50,
+                'p95': p95,
+                'p99': p99,
+                'latest': float(values[-1]),
+                'time_range_minutes': minutes
             }
-        
-        values = [dp.value for dp in data_points]
-        
-        return {
-            'metric_name': metric_name,
-            'data_points': len(values),
-            'min': min(values),
-            'max': max(values),
-            'avg': sum(values) / len(values),
-            'sum': sum(values),
-            'latest': values[-1],
-            'time_range_minutes': minutes
-        }
     
     def get_all_metrics(self) -> List[str]:
         """Get list of all metric names."""
@@ -8,7 +8,7 @@ backpressure and flow control.
 import asyncio
 import logging
 import time
-from typing import Dict, List, Optional, Any, Callable, Awaitable
+from typing import Dict, List, Optional, Any, Callable, Awaitable, Set
 from datetime import datetime, timedelta
 from enum import Enum
 from dataclasses import dataclass, field
@@ -38,6 +38,16 @@ class QueueStrategy(str, Enum):
     WEIGHTED_FAIR = "weighted_fair"
 
 
+# Default share of the queue processors per provider under weighted fair
+# queuing, proportional to the providers' hourly API limits
+PROVIDER_QUEUE_WEIGHTS = {
+    'powerschool': 1.0,
+    'infinite_campus': 0.5,
+    'skyward': 2.0,
+    'custom': 1.0
+}
+
+
 @dataclass
 class QueuedRequest:
     """A request in the queue with metadata."""
@@ -144,11 +154,21 @@ class RequestQueue:
     Advanced request queue with priority handling and flow control.
     
     Features:
-    - Multiple queue strategies (FIFO, priority, weighted fair queuing)
+    - Multiple queue strategies (FIFO, priority, round robin, weighted fair queuing)
     - Request prioritization and timeout handling
     - Automatic retries with exponential backoff
     - Flow control and backpressure management
     - Comprehensive metrics and monitoring
+    
+    The round robin and weighted fair strategies keep one queue per provider
+    and schedule them with deficit round robin: each provider with queued
+    requests takes a turn in order, and a turn serves as many requests as
+    the provider's weight (fractional weights carry over to later turns).
+    Over any stretch where providers stay busy, they are served in
+    proportion to their weights, and no provider waits more than one round
+    for its next turn however deep another provider's backlog is. Round
+    robin is the same with every weight 1. Within a provider, higher
+    priority and then older requests go first.
     """
     
     def __init__(
@@ -157,7 +177,8 @@ class RequestQueue:
         strategy: QueueStrategy = QueueStrategy.PRIORITY,
         processor_count: int = 10,
         processor_callable: Optional[Callable[[GatewayRequest], Awaitable[GatewayResponse]]] = None,
-        enable_metrics: bool = True
+        enable_metrics: bool = True,
+        provider_weights: Optional[Dict[str, float]] = None
     ):
         self.max_size = max_size
         self.strategy = strategy
@@ -168,7 +189,16 @@ class RequestQueue:
         # Queue storage
         self._priority_queue: List[QueuedRequest] = []
         self._fifo_queue: deque[QueuedRequest] = deque()
-        self._provider_queues: Dict[str, deque[QueuedRequest]] = {}
+        self._provider_queues: Dict[str, List[QueuedRequest]] = {}
+        
+        # Deficit round robin state: providers with queued requests in turn
+        # order, and the requests each may still send in its current turn
+        self.provider_weights: Dict[str, float] = {}
+        for provider, weight in (provider_weights or {}).items():
+            self.set_provider_weight(provider, weight)
+        self._active_providers: deque[str] = deque()
+        self._scheduled_providers: Set[str] = set()
+        self._deficits: Dict[str, float] = {}
         
         # Processing state
         self._processors: List[asyncio.Task] = []
@@ -330,6 +360,12 @@ class RequestQueue:
         logger.debug(f"Cancelled request {request_id}")
         return True
     
+    def set_provider_weight(self, provider: str, weight: float):
+        """Set a provider's share under the weighted fair strategy."""
+        if weight <= 0:
+            raise ValueError(f"Provider weight must be positive, got {weight} for {provider}")
+        self.provider_weights[provider] = weight
+    
     def get_queue_status(self) -> Dict[str, Any]:
         """Get current queue status and metrics."""
         status = {
@@ -341,6 +377,9 @@ class RequestQueue:
             'active_requests': len(self._active_requests)
         }
         
+        if self.strategy == QueueStrategy.WEIGHTED_FAIR:
+            status['provider_weights'] = dict(self.provider_weights)
+        
         if self.metrics:
             status['metrics'] = self.metrics.get_stats()
         
@@ -365,9 +404,13 @@ class RequestQueue:
         
         elif self.strategy in (QueueStrategy.ROUND_ROBIN, QueueStrategy.WEIGHTED_FAIR):
             provider = queued_request.request.provider.value
-            if provider not in self._provider_queues:
-                self._provider_queues[provider] = deque()
-            self._provider_queues[provider].append(queued_request)
+            heapq.heappush(self._provider_queues.setdefault(provider, []), queued_request)
+            
+            # Join the end of the round if the provider was idle
+            if provider not in self._scheduled_providers:
+                self._scheduled_providers.add(provider)
+                self._active_providers.append(provider)
+                self._deficits[provider] = 0.0
         
         else:
             # Default to FIFO
@@ -388,7 +431,10 @@ class RequestQueue:
             elif self.strategy in (QueueStrategy.ROUND_ROBIN, QueueStrategy.WEIGHTED_FAIR):
                 provider = queued_request.request.provider.value
                 if provider in self._provider_queues:
-                    self._provider_queues[provider].remove(queued_request)
+                    # An emptied provider leaves the round on its next turn
+                    queue = self._provider_queues[provider]
+                    queue.remove(queued_request)
+                    heapq.heapify(queue)
                     return True
             
         except ValueError:
@@ -415,43 +461,62 @@ class RequestQueue:
         return None
     
     def _round_robin_selection(self) -> Optional[QueuedRequest]:
-        """Round-robin selection from provider queues."""
-        if not self._provider_queues:
-            return None
-        
-        # Find non-empty queues
-        non_empty_queues = [
-            (provider, queue) 
-            for provider, queue in self._provider_queues.items() 
-            if queue
-        ]
-        
-        if not non_empty_queues:
-            return None
-        
-        # Simple round-robin (could be improved with state tracking)
-        provider, queue = non_empty_queues[0]
-        return queue.popleft()
+        """Round-robin selection from provider queues, one request per turn."""
+        return self._deficit_round_robin_selection(lambda provider: 1.0)
     
     def _weighted_fair_selection(self) -> Optional[QueuedRequest]:
-        """Weighted fair selection based on provider priority."""
-        # For now, implement as round-robin with priority consideration
-        # TODO: Implement proper weighted fair queuing
-        priority_requests = []
-        
-        for provider, queue in self._provider_queues.items():
-            if queue:
-                request = queue[0]  # Peek at first request
-                priority_requests.append((request.priority, provider, queue))
+        """Weighted fair selection, serving providers in proportion to their weights."""
+        return self._deficit_round_robin_selection(
+            lambda provider: self.provider_weights.get(provider, 1.0)
+        )
+    
+    def _deficit_round_robin_selection(self, weight_of: Callable[[str], float]) -> Optional[QueuedRequest]:
+        """
+        Take the next request in deficit round robin order.
         
-        if not priority_requests:
-            return None
+        Every request costs 1. A provider's turn starts by adding its weight
+        to its deficit and lasts while the deficit covers a request, so each
+        call does constant work apart from skipping providers emptied by
+        cancellation and, for weights below 1, at most 1/weight turns.
+        """
+        active = self._active_providers
         
-        # Sort by priority and select highest
-        priority_requests.sort(key=lambda x: x[0], reverse=True)
-        _, _, selected_queue = priority_requests[0]
+        while active:
+            provider = active[0]
+            queue = self._provider_queues[provider]
+            
+            if not queue:
+                # Emptied by cancellation or expiry; an idle provider keeps no credit
+                active.popleft()
+                self._scheduled_providers.discard(provider)
+                self._deficits[provider] = 0.0
+                continue
+            
+            deficit = self._deficits[provider]
+            if deficit < 1.0:
+                # Start of a new turn
+                deficit += weight_of(provider)
+                if deficit < 1.0:
+                    # Not enough credit yet; keep it for the next round
+                    self._deficits[provider] = deficit
+                    active.rotate(-1)
+                    continue
+            
+            queued_request = heapq.heappop(queue)
+            deficit -= 1.0
+            
+            if not queue:
+                active.popleft()
+                self._scheduled_providers.discard(provider)
+                deficit = 0.0
+            elif deficit < 1.0:
+                # Turn over, go to the back of the round
+                active.rotate(-1)
+            
+            self._deficits[provider] = deficit
+            return queued_request
         
-        return selected_queue.popleft()
+        return None
     
     async def _processor_worker(self, worker_id: str):
         """Background worker to process queued requests."""
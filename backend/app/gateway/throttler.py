@@ -7,12 +7,13 @@ their rate limits and prevent overwhelming their systems.
 """
 import asyncio
 import logging
+import math
 import time
-from typing import Dict, List, Optional, Any, Set
+from typing import Dict, List, Optional, Any, Set, Tuple
 from datetime import datetime, timedelta
 from enum import Enum
 from dataclasses import dataclass, field
-from collections import defaultdict, deque
+from collections import defaultdict
 import json
 
 from app.services.api_gateway import ProviderType, GatewayRequest
@@ -104,6 +105,52 @@ class ThrottleMetrics:
         }
 
 
+class RequestHistory:
+    """
+    Fixed-size record of recent request times.
+    
+    Keeps the last ``size`` request times in a ring, which answers "how many
+    requests in the last second" for any rate up to ``size`` per second, and
+    per-second counts for the last minute for the reported rates. Recording
+    and checking a request take constant time and allocate nothing.
+    """
+    
+    SECONDS = 60
+    
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._times = [float("-inf")] * self.size
+        self._next = 0
+        self._second_counts = [0] * self.SECONDS
+        self._second_stamps = [-1] * self.SECONDS
+    
+    def record(self, now: float):
+        """Record a request made at ``now``."""
+        self._times[self._next] = now
+        self._next = (self._next + 1) % self.size
+        
+        second = int(now)
+        slot = second % self.SECONDS
+        if self._second_stamps[slot] != second:
+            self._second_stamps[slot] = second
+            self._second_counts[slot] = 0
+        self._second_counts[slot] += 1
+    
+    def nth_latest(self, n: int) -> float:
+        """Time of the n-th most recent request (1 is the latest), or -inf."""
+        if n > self.size:
+            return float("-inf")
+        return self._times[(self._next - n) % self.size]
+    
+    def count_since(self, now: float, seconds: int) -> int:
+        """Requests in the last ``seconds`` whole seconds, up to a minute."""
+        oldest = int(now) - min(seconds, self.SECONDS)
+        return sum(
+            count for count, stamp in zip(self._second_counts, self._second_stamps)
+            if stamp > oldest
+        )
+
+
 class RequestThrottler:
     """
     Advanced request throttler with multiple strategies.
@@ -125,25 +172,23 @@ class RequestThrottler:
         self.provider = provider
         self.config = config or ThrottleConfig(provider=provider)
         
-        # Throttling state
-        self.last_request_time = 0.0
+        # Throttling state, on the monotonic clock
+        self.last_request_time = float("-inf")
         self.burst_tokens = self.config.max_burst_size
-        self.burst_window_start = time.time()
-        self.request_times: deque = deque()  # Rolling window of request times
+        self.burst_window_start = time.monotonic()
+        # Enough history for the configured rate; adaptive changes never exceed it
+        self.request_history = RequestHistory(math.ceil(self.config.max_requests_per_second))
         
         # Adaptive state
         self.current_rate = self.config.max_requests_per_second
         self.consecutive_errors = 0
-        self.last_error_time = 0.0
+        self.last_error_time = float("-inf")
         self.rate_adjustment_history: List[Tuple[float, float, str]] = []
         
         # Request tracking
         self.pending_requests: Set[str] = set()
         self.metrics = ThrottleMetrics()
         
-        # Locks for thread safety
-        self._throttle_lock = asyncio.Lock()
-        
         logger.info(f"Request throttler initialized for {provider}: {self.config.max_requests_per_second} req/s")
     
     async def should_throttle(self, request: GatewayRequest) -> Tuple[bool, float]:
@@ -153,35 +198,32 @@ class RequestThrottler:
         Returns:
             Tuple of (should_throttle, delay_seconds)
         """
-        async with self._throttle_lock:
-            now = time.time()
-            
-            # Clean up old request times
-            self._cleanup_request_history(now)
-            
-            # Check different throttling conditions
-            throttle_decision = await self._evaluate_throttling(request, now)
-            
-            if throttle_decision[0]:  # Should throttle
-                delay = throttle_decision[1]
-                self.metrics.record_request(throttled=True, delay=delay)
-                logger.debug(f"Throttling request for {self.provider}: delay={delay:.2f}s")
-                return throttle_decision
-            
-            # Update request tracking
-            self.last_request_time = now
-            self.request_times.append(now)
-            self.pending_requests.add(request.metadata.get('request_id', str(id(request))))
-            
-            # Update current rate
-            self._update_current_rate(now)
-            
-            # Record metrics
-            self.metrics.record_request(throttled=False)
-            
-            return False, 0.0
+        # Nothing below awaits, so the check is atomic on the event loop
+        now = time.monotonic()
+        
+        # Clean up old adjustment history
+        self._cleanup_request_history(now)
+        
+        # Check different throttling conditions
+        throttle_decision = self._evaluate_throttling(request, now)
+        
+        if throttle_decision[0]:  # Should throttle
+            delay = throttle_decision[1]
+            self.metrics.record_request(throttled=True, delay=delay)
+            logger.debug(f"Throttling request for {self.provider}: delay={delay:.2f}s")
+            return throttle_decision
+        
+        # Update request tracking
+        self.last_request_time = now
+        self.request_history.record(now)
+        self.pending_requests.add(request.metadata.get('request_id', str(id(request))))
+        
+        # Record metrics
+        self.metrics.record_request(throttled=False)
+        
+        return False, 0.0
     
-    async def _evaluate_throttling(self, request: GatewayRequest, now: float) -> Tuple[bool, float]:
+    def _evaluate_throttling(self, request: GatewayRequest, now: float) -> Tuple[bool, float]:
         """Evaluate whether to throttle based on configured strategy."""
         # Check minimum interval
         min_interval = self.config.min_interval_ms / 1000.0
@@ -192,40 +234,44 @@ class RequestThrottler:
         
         # Strategy-specific evaluation
         if self.config.adaptive_enabled:
-            return await self._adaptive_throttling_evaluation(request, now)
+            return self._adaptive_throttling_evaluation(request, now)
         else:
-            return await self._fixed_throttling_evaluation(request, now)
+            return self._fixed_throttling_evaluation(request, now)
     
-    async def _fixed_throttling_evaluation(self, request: GatewayRequest, now: float) -> Tuple[bool, float]:
+    def _rate_slot_time(self) -> float:
+        """
+        Time of the request that fills the last-second window at the current
+        rate: the window is full while it is less than a second old.
+        """
+        return self.request_history.nth_latest(math.ceil(self.current_rate))
+    
+    def _fixed_throttling_evaluation(self, request: GatewayRequest, now: float) -> Tuple[bool, float]:
         """Fixed rate throttling evaluation."""
         # Check rate limit
-        requests_in_window = len([t for t in self.request_times if now - t <= 1.0])
+        slot_time = self._rate_slot_time()
         
-        if requests_in_window >= self.current_rate:
+        if now - slot_time <= 1.0:
             # Calculate delay until next slot is available
-            oldest_in_window = min([t for t in self.request_times if now - t <= 1.0])
-            delay = 1.0 - (now - oldest_in_window)
+            delay = 1.0 - (now - slot_time)
             return True, max(delay, 0.1)  # Minimum 0.1s delay
         
         # Check burst limits
-        return await self._check_burst_limits(now)
+        return self._check_burst_limits(now)
     
-    async def _adaptive_throttling_evaluation(self, request: GatewayRequest, now: float) -> Tuple[bool, float]:
+    def _adaptive_throttling_evaluation(self, request: GatewayRequest, now: float) -> Tuple[bool, float]:
         """Adaptive throttling evaluation based on system feedback."""
         # Adjust rate based on recent errors
-        await self._adjust_adaptive_rate(now)
+        self._adjust_adaptive_rate(now)
         
         # Use adjusted rate for evaluation
-        requests_in_window = len([t for t in self.request_times if now - t <= 1.0])
-        
-        if requests_in_window >= self.current_rate:
+        if now - self._rate_slot_time() <= 1.0:
             delay = 1.0 / self.current_rate
             return True, delay
         
         # Additional adaptive checks
-        return await self._check_adaptive_conditions(request, now)
+        return self._check_adaptive_conditions(request, now)
     
-    async def _check_burst_limits(self, now: float) -> Tuple[bool, float]:
+    def _check_burst_limits(self, now: float) -> Tuple[bool, float]:
         """Check burst limits and token bucket."""
         # Reset burst window if needed
         if now - self.burst_window_start >= self.config.burst_window_seconds:
@@ -245,7 +291,7 @@ class RequestThrottler:
         self.burst_tokens -= 1
         return False, 0.0
     
-    async def _check_adaptive_conditions(self, request: GatewayRequest, now: float) -> Tuple[bool, float]:
+    def _check_adaptive_conditions(self, request: GatewayRequest, now: float) -> Tuple[bool, float]:
         """Check adaptive conditions like circuit breaker state."""
         # Circuit breaker logic
         if self.consecutive_errors >= self.config.circuit_breaker_threshold:
@@ -263,7 +309,7 @@ class RequestThrottler:
         
         return False, 0.0
     
-    async def _adjust_adaptive_rate(self, now: float):
+    def _adjust_adaptive_rate(self, now: float):
         """Adjust rate based on recent performance."""
         if not self.config.adaptive_enabled:
             return
@@ -308,12 +354,7 @@ class RequestThrottler:
         )
     
     def _cleanup_request_history(self, now: float):
-        """Clean up old request times to maintain memory efficiency."""
-        # Keep only requests from last 60 seconds
-        cutoff_time = now - 60.0
-        while self.request_times and self.request_times[0] < cutoff_time:
-            self.request_times.popleft()
-        
+        """Clean up old history to maintain memory efficiency."""
         # Clean up rate adjustment history (keep last 100 entries)
         if len(self.rate_adjustment_history) > 100:
             self.rate_adjustment_history = self.rate_adjustment_history[-100:]
@@ -321,33 +362,28 @@ class RequestThrottler:
     def _update_current_rate(self, now: float):
         """Update current rate based on recent requests."""
         # Calculate rate over last 10 seconds
-        recent_requests = [t for t in self.request_times if now - t <= 10.0]
-        if recent_requests:
-            self.metrics.current_rate = len(recent_requests) / 10.0
-        else:
-            self.metrics.current_rate = 0.0
+        self.metrics.current_rate = self.request_history.count_since(now, 10) / 10.0
     
     async def record_response(self, request_id: str, success: bool, response_time: float):
         """Record response feedback for adaptive throttling."""
-        async with self._throttle_lock:
-            # Remove from pending requests
-            self.pending_requests.discard(request_id)
-            
-            now = time.time()
-            
-            if success:
-                # Reset consecutive errors on success
-                self.consecutive_errors = 0
-            else:
-                # Increment error count
-                self.consecutive_errors += 1
-                self.last_error_time = now
-                
-                # Record error for adaptive adjustment
-                if self.config.adaptive_enabled:
-                    self.rate_adjustment_history.append((now, self.current_rate, f"error_{response_time}"))
+        # Remove from pending requests
+        self.pending_requests.discard(request_id)
+        
+        now = time.monotonic()
+        
+        if success:
+            # Reset consecutive errors on success
+            self.consecutive_errors = 0
+        else:
+            # Increment error count
+            self.consecutive_errors += 1
+            self.last_error_time = now
             
-            logger.debug(f"Response recorded for {self.provider}: success={success}, time={response_time:.2f}s")
+            # Record error for adaptive adjustment
+            if self.config.adaptive_enabled:
+                self.rate_adjustment_history.append((now, self.current_rate, f"error_{response_time}"))
+        
+        logger.debug(f"Response recorded for {self.provider}: success={success}, time={response_time:.2f}s")
     
     async def wait_if_throttled(self, request: GatewayRequest) -> bool:
         """
@@ -370,7 +406,8 @@ class RequestThrottler:
     
     def get_status(self) -> Dict[str, Any]:
         """Get current throttler status and metrics."""
-        now = time.time()
+        now = time.monotonic()
+        self._update_current_rate(now)
         
         return {
             'provider': self.provider,
@@ -386,7 +423,7 @@ class RequestThrottler:
                 'burst_tokens_remaining': self.burst_tokens,
                 'consecutive_errors': self.consecutive_errors,
                 'pending_requests': len(self.pending_requests),
-                'requests_last_minute': len([t for t in self.request_times if now - t <= 60.0])
+                'requests_last_minute': self.request_history.count_since(now, 60)
             },
             'metrics': self.metrics.get_stats(),
             'recent_adjustments': self.rate_adjustment_history[-5:] if self.rate_adjustment_history else []
@@ -96,44 +96,48 @@ class TokenBucket:
     Token bucket implementation for smooth rate limiting.
     
     Allows bursts up to bucket capacity while maintaining average rate.
+    
+    Tokens are refilled lazily from the monotonic clock when the bucket is
+    checked. Checks never await, so they are atomic on the event loop and
+    need no lock.
     """
     
     def __init__(self, rate: float, capacity: int):
         self.rate = rate  # Tokens per second
         self.capacity = capacity  # Maximum tokens
         self.tokens = capacity  # Current tokens
-        self.last_update = time.time()
-        self._lock = asyncio.Lock()
+        self.last_update = time.monotonic()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_update) * self.rate)
+        self.last_update = now
+    
+    def try_consume(self, tokens: int = 1) -> bool:
+        """Try to consume tokens from the bucket without waiting."""
+        self._refill(time.monotonic())
+        
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        
+        return False
     
     async def consume(self, tokens: int = 1) -> bool:
         """Try to consume tokens from the bucket."""
-        async with self._lock:
-            now = time.time()
-            
-            # Add tokens based on elapsed time
-            elapsed = now - self.last_update
-            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
-            self.last_update = now
-            
-            # Try to consume tokens
-            if self.tokens >= tokens:
-                self.tokens -= tokens
-                return True
-            
-            return False
+        return self.try_consume(tokens)
+    
+    def wait_time(self, tokens: int = 1) -> float:
+        """Get estimated wait time for tokens to be available."""
+        self._refill(time.monotonic())
+        
+        if self.tokens >= tokens:
+            return 0.0
+        
+        return (tokens - self.tokens) / self.rate
     
     async def get_wait_time(self, tokens: int = 1) -> float:
         """Get estimated wait time for tokens to be available."""
-        async with self._lock:
-            now = time.time()
-            elapsed = now - self.last_update
-            current_tokens = min(self.capacity, self.tokens + elapsed * self.rate)
-            
-            if current_tokens >= tokens:
-                return 0.0
-            
-            needed_tokens = tokens - current_tokens
-            return needed_tokens / self.rate
+        return self.wait_time(tokens)
 
 
 @dataclass
@@ -147,7 +151,7 @@ class QueuedRequest:
     @property
     def is_expired(self) -> bool:
         """Check if request has timed out."""
-        return time.time() - self.timestamp > self.timeout
+        return time.monotonic() - self.timestamp > self.timeout
 
 
 class RateLimiter:
@@ -238,10 +242,10 @@ class RateLimiter:
         Returns True if request can proceed immediately, False if denied.
         May queue the request for later processing.
         """
-        start_time = time.time()
+        start_time = time.monotonic()
         
         # Check if we can consume a token immediately
-        if await self.token_bucket.consume():
+        if self.token_bucket.try_consume():
             self.metrics.record_request(allowed=True)
             return True
         
@@ -268,7 +272,7 @@ class RateLimiter:
         try:
             # Wait for the request to be processed or timeout
             result = await asyncio.wait_for(future, timeout=timeout)
-            queue_time = time.time() - start_time
+            queue_time = time.monotonic() - start_time
             self.metrics.record_request(allowed=True, queue_time=queue_time)
             return result
             
@@ -293,7 +297,7 @@ class RateLimiter:
                 await self._cleanup_expired_requests()
                 
                 # Process requests that can be fulfilled
-                while self.request_queue and await self.token_bucket.consume():
+                while self.request_queue and self.token_bucket.try_consume():
                     queued_request = self.request_queue.popleft()
                     self.metrics.current_queue_size = len(self.request_queue)
                     
@@ -333,9 +337,13 @@ class RateLimiter:
                 pass  # Already removed
     
     async def get_wait_time(self) -> float:
+        """Get estimated wait time for next available slot."""
+        return self.wait_time()
+    
+    def wait_time(self) -> float:
         """Get estimated wait time for next available slot."""
         # Check token bucket wait time
-        token_wait = await self.token_bucket.get_wait_time()
+        token_wait = self.token_bucket.wait_time()
         
         # Add queue processing time estimate
         queue_wait = len(self.request_queue) / max(self.rate, 0.1)
@@ -378,7 +386,7 @@ class RateLimiter:
                 'available_tokens': self.token_bucket.tokens,
                 'token_capacity': self.token_bucket.capacity,
                 'queue_size': len(self.request_queue),
-                'estimated_wait_time': asyncio.create_task(self.get_wait_time())
+                'estimated_wait_time': self.wait_time()
             },
             'metrics': self.metrics.get_stats()
         }
@@ -6,11 +6,11 @@ and automated security controls integration.
 """
 
 import asyncio
+import re
 import time
-import json
 from datetime import datetime, timedelta
-from typing import Dict, Set, Optional, Callable
-from collections import defaultdict, deque
+from typing import Dict, Set, Optional, Callable, List, Iterable
+from collections import defaultdict
 import logging
 from fastapi import Request, Response, HTTPException, status
 from fastapi.responses import JSONResponse
@@ -19,6 +19,7 @@ from starlette.types import ASGIApp
 import ipaddress
 
 from app.core.database import get_db
+from app.core.rate_limit_store import RateLimitStore, create_rate_limit_store
 from app.models.user import User
 from app.security.audit_logger import audit_logger
 from app.security.monitoring import security_monitor
@@ -31,6 +32,66 @@ from app.services.audit_service import security_audit_service
 logger = logging.getLogger(__name__)
 
 
+# Known threat patterns by category, matched case-insensitively. Groups are
+# non-capturing and patterns have no leading ``\w*``, which would only slow
+# the search down without changing whether it matches.
+THREAT_PATTERNS = {
+    "sql_injection": [
+        r"%27|'|--|%23|#",
+        r"(?:%3D|=)[^\n]*(?:%27|'|--|%3B|;)",
+        r"(?:%27|')(?:%6F|o|%4F)(?:%72|r|%52)",
+    ],
+    "xss": [
+        r"<[^>]*script[^>]*>",
+        r"javascript:",
+        r"on\w+\s*=",
+        r"<[^>]*iframe[^>]*>",
+    ],
+    "path_traversal": [
+        r"\.\./",
+        r"\.\.\\",
+        r"%2e%2e%2f",
+        r"%2e%2e%5c",
+    ],
+    "command_injection": [
+        r"[;&|`]",
+        r"\$\(.*\)",
+        r"curl\s",
+        r"wget\s",
+    ]
+}
+
+
+class ThreatMatcher:
+    """
+    Threat patterns compiled once into one alternation per category.
+
+    Scanning a request is one regex search per category and component
+    instead of one per pattern, and a category stops being searched once it
+    has matched. Components are searched in full, so padding a payload past
+    any length cannot hide it.
+    """
+    
+    def __init__(self, patterns: Dict[str, List[str]]):
+        self.patterns = patterns
+        self._compiled = {
+            threat_type: re.compile(
+                "|".join(f"(?:{pattern})" for pattern in category_patterns),
+                re.IGNORECASE
+            )
+            for threat_type, category_patterns in patterns.items()
+        }
+    
+    def scan(self, components: Iterable[str]) -> List[str]:
+        """Get the threat types matched by any of ``components``, in pattern order."""
+        components = [component for component in components if component]
+        return [
+            threat_type
+            for threat_type, regex in self._compiled.items()
+            if any(regex.search(component) for component in components)
+        ]
+
+
 class SecurityMiddleware(BaseHTTPMiddleware):
     """
     Comprehensive security middleware that provides:
@@ -48,7 +109,8 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         enable_rate_limiting: bool = True,
         enable_ip_blocking: bool = True,
         enable_anomaly_detection: bool = True,
-        enable_audit_logging: bool = True
+        enable_audit_logging: bool = True,
+        rate_limit_store: Optional[RateLimitStore] = None
     ):
         super().__init__(app)
         
@@ -66,8 +128,8 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             "admin": {"requests": 50, "window": 60}      # 50 admin requests per minute
         }
         
-        # Rate limiting storage (in production, use Redis)
-        self.rate_limit_storage: Dict[str, Dict[str, deque]] = defaultdict(lambda: defaultdict(deque))
+        # Sliding window counters per IP and category, shared by all workers when Redis is enabled
+        self.rate_limit_store = rate_limit_store if rate_limit_store is not None else create_rate_limit_store()
         
         # IP blocking
         self.blocked_ips: Set[str] = set()
@@ -105,32 +167,9 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         self.session_timeout = 3600  # 1 hour
         self.active_sessions: Dict[str, Dict] = {}
         
-        # Threat detection patterns
-        self.threat_patterns = {
-            "sql_injection": [
-                r"(\%27)|(\')|(\-\-)|(\%23)|(#)",
-                r"((\%3D)|(=))[^\n]*((\%27)|(\')|(\-\-)|(\%3B)|(;))",
-                r"\w*((\%27)|(\'))((\%6F)|o|(\%4F))((\%72)|r|(\%52))",
-            ],
-            "xss": [
-                r"<[^>]*script[^>]*>",
-                r"javascript:",
-                r"on\w+\s*=",
-                r"<[^>]*iframe[^>]*>",
-            ],
-            "path_traversal": [
-                r"\.\.\/",
-                r"\.\.\\",
-                r"\%2e\%2e\%2f",
-                r"\%2e\%2e\%5c",
-            ],
-            "command_injection": [
-                r"[;&|`]",
-                r"\$\(.*\)",
-                r"curl\s",
-                r"wget\s",
-            ]
-        }
+        # Threat detection patterns, compiled once
+        self.threat_patterns = THREAT_PATTERNS
+        self.threat_matcher = ThreatMatcher(self.threat_patterns)
         
         # Initialize components
         self._initialize_security_components()
@@ -267,16 +306,10 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         window_size = rate_config["window"]
         max_requests = rate_config["requests"]
         
-        # Clean old entries and count current requests
-        current_time = time.time()
-        request_times = self.rate_limit_storage[client_ip][category]
+        # Count the request, unless the IP is already over the limit
+        allowed = await self.rate_limit_store.hit(f"{client_ip}:{category}", max_requests, window_size)
         
-        # Remove requests outside the window
-        while request_times and request_times[0] < current_time - window_size:
-            request_times.popleft()
-        
-        # Check if rate limit exceeded
-        if len(request_times) >= max_requests:
+        if not allowed:
             logger.warning(f"Rate limit exceeded for IP {client_ip} in category {category}")
             await self._log_rate_limit_exceeded(client_ip, request, category)
             
@@ -292,41 +325,20 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 detail=f"Rate limit exceeded for {category} requests",
                 headers={"Retry-After": str(window_size)}
             )
-        
-        # Add current request timestamp
-        request_times.append(current_time)
     
     async def _check_threat_patterns(self, request: Request):
         """Check request for known threat patterns."""
         # Get request data to analyze
-        url_path = str(request.url.path)
-        query_params = str(request.query_params)
-        
-        # Check headers for threats
-        headers_str = json.dumps(dict(request.headers))
+        url_path = request.url.path
+        query_params = request.url.query
         
-        # Analyze all components for threat patterns
-        components = [url_path, query_params, headers_str]
-        
-        # If request has body, include it (carefully)
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                # Note: This is a simplified example
-                # In production, you'd need to handle body reading more carefully
-                pass
-            except Exception:
-                pass
-        
-        detected_threats = []
-        
-        # Check each component against threat patterns
-        for component in components:
-            for threat_type, patterns in self.threat_patterns.items():
-                for pattern in patterns:
-                    import re
-                    if re.search(pattern, component, re.IGNORECASE):
-                        detected_threats.append(threat_type)
-                        logger.warning(f"Threat pattern detected: {threat_type} in request from {self._get_client_ip(request)}")
+        # Check each header value separately so patterns do not match across headers
+        detected_threats = self.threat_matcher.scan([url_path, query_params, *request.headers.values()])
+        if detected_threats:
+            logger.warning(
+                f"Threat patterns detected: {', '.join(detected_threats)} "
+                f"in request from {self._get_client_ip(request)}"
+            )
         
         # If threats detected, block request and log
         if detected_threats:
@@ -1,6 +1,10 @@
 from .user import User, UserRole
 from .class_session import ClassSession
 from .attendance import AttendanceRecord, AttendanceStatus, AttendanceAuditLog
+from .attendance_rollup import (
+    AttendanceDailyRollup, AttendanceClassRollup, AttendanceStudentRollup, RollupWatermark
+)
+from .student_timeline import StudentTimelineEntry
 from .attendance_pattern import (
     AttendancePatternAnalysis, AttendanceAlert, AttendanceInsight, 
     AttendancePrediction, PatternType, AlertSeverity, RiskLevel
@@ -21,6 +25,11 @@ __all__ = [
     "AttendanceRecord",
     "AttendanceStatus",
     "AttendanceAuditLog",
+    "AttendanceDailyRollup",
+    "AttendanceClassRollup",
+    "AttendanceStudentRollup",
+    "RollupWatermark",
+    "StudentTimelineEntry",
     "AttendancePatternAnalysis",
     "AttendanceAlert", 
     "AttendanceInsight",
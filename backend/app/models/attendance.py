@@ -57,14 +57,16 @@ class AttendanceRecord(Base):
     
     # Composite indexes for optimized queries
     __table_args__ = (
-        # Primary lookup pattern: finding attendance for a specific student in a specific session
-        Index('idx_attendance_session_student', 'class_session_id', 'student_id'),
+        # Primary lookup pattern: one attendance record per student per session.
+        # Also the conflict target for the single-statement check-in upsert.
+        Index('idx_attendance_unique_session_student', 'class_session_id', 'student_id', unique=True),
         # Time-based queries: finding attendance records for a session ordered by check-in time
         Index('idx_attendance_session_checkin', 'class_session_id', 'check_in_time'),
         # Student attendance history: finding all attendance records for a student over time
         Index('idx_attendance_student_created', 'student_id', 'created_at'),
-        # Note: Unique constraint will be added later after data cleanup
-        # Index('idx_attendance_unique_session_student', 'class_session_id', 'student_id', unique=True),
+        # Changes since the analytics rollup watermark
+        Index('idx_attendance_created_at', 'created_at'),
+        Index('idx_attendance_updated_at', 'updated_at'),
     )
 
 
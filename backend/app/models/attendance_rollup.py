@@ -0,0 +1,86 @@
+"""
+Precomputed attendance rollups for the analytics layer.
+
+Each rollup row holds the status counts and late-minute sums of a group of
+attendance records, bucketed by the UTC day of the class session's start:
+
+- ``AttendanceDailyRollup``: per day and subject
+- ``AttendanceClassRollup``: per class session
+- ``AttendanceStudentRollup``: per student, day and subject
+
+Sessions without a subject are stored under the empty string so that the
+subject can be part of the primary key. ``RollupWatermark`` records how far
+the rollups have been refreshed; see app.services.attendance_rollups.
+"""
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index
+
+from app.core.database import Base
+
+
+class RollupCountsMixin:
+    """Status counts and late-minute aggregates shared by all rollups."""
+    present_count = Column(Integer, nullable=False, default=0)
+    late_count = Column(Integer, nullable=False, default=0)
+    absent_count = Column(Integer, nullable=False, default=0)
+    excused_count = Column(Integer, nullable=False, default=0)
+
+    # Records flagged is_late, and their late minutes
+    late_arrivals = Column(Integer, nullable=False, default=0)
+    late_minutes_sum = Column(Integer, nullable=False, default=0)
+    late_minutes_sq_sum = Column(Integer, nullable=False, default=0)
+    late_minutes_max = Column(Integer, nullable=False, default=0)
+
+    @property
+    def total_count(self) -> int:
+        return self.present_count + self.late_count + self.absent_count + self.excused_count
+
+    @property
+    def attended_count(self) -> int:
+        return self.present_count + self.late_count + self.excused_count
+
+
+class AttendanceDailyRollup(RollupCountsMixin, Base):
+    __tablename__ = "attendance_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    subject = Column(String(100), primary_key=True, default="")
+
+
+class AttendanceClassRollup(RollupCountsMixin, Base):
+    __tablename__ = "attendance_class_rollups"
+
+    class_session_id = Column(Integer, ForeignKey("class_sessions.id"), primary_key=True)
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=True)
+    day = Column(Date, nullable=False)
+    subject = Column(String(100), nullable=False, default="")
+
+    __table_args__ = (
+        # Session history of a class, for time series
+        Index('idx_class_rollup_class_day', 'class_id', 'day'),
+        # Window scans and refresh deletes
+        Index('idx_class_rollup_day', 'day'),
+    )
+
+
+class AttendanceStudentRollup(RollupCountsMixin, Base):
+    __tablename__ = "attendance_student_rollups"
+
+    student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    subject = Column(String(100), primary_key=True, default="")
+
+    __table_args__ = (
+        # Window scans and refresh deletes
+        Index('idx_student_rollup_day', 'day'),
+    )
+
+
+class RollupWatermark(Base):
+    """Refresh progress of a set of rollups."""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    # Latest record change folded into the rollups
+    watermark = Column(DateTime(timezone=True), nullable=True)
+    # When the last refresh started; the rollups reflect every change before it
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
@@ -148,4 +148,7 @@ class ClassSession(Base):
         Index('idx_class_session_class_created', 'class_id', 'created_at'),
         # Active sessions within time range
         Index('idx_class_session_status_time', 'status', 'start_time', 'end_time'),
+        # Keyset pagination of session lists (teacher and admin views)
+        Index('idx_class_session_teacher_created_id', 'teacher_id', 'created_at', 'id'),
+        Index('idx_class_session_created_id', 'created_at', 'id'),
     )
\ No newline at end of file
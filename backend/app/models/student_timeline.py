@@ -0,0 +1,61 @@
+"""
+Materialized per-student attendance timeline.
+
+``StudentTimelineEntry`` is a denormalized copy of one attendance record
+together with the class session and the teacher names the student screens
+show, so that "my attendance", "my classes" and "active sessions" are a
+single indexed range read over ``student_id`` instead of a join of
+attendance, session and user rows. The entry shares its id with the
+attendance record. Entries are written by app.services.student_timeline in
+the same transaction as the writes they reflect.
+"""
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum as SQLEnum, Text, Index
+
+from app.core.database import Base
+from app.models.attendance import AttendanceStatus
+
+
+class StudentTimelineEntry(Base):
+    __tablename__ = "student_attendance_timeline"
+
+    id = Column(Integer, ForeignKey("attendance_records.id", ondelete="CASCADE"), primary_key=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    class_session_id = Column(Integer, ForeignKey("class_sessions.id"), nullable=False)
+
+    # Class session
+    class_name = Column(String(255), nullable=False)
+    subject = Column(String(100), nullable=True)
+    location = Column(String(255), nullable=True)
+    description = Column(Text, nullable=True)
+    teacher_name = Column(String(255), nullable=True)
+    session_status = Column(String(10), nullable=True)
+    session_start_time = Column(DateTime(timezone=True), nullable=True)
+    session_end_time = Column(DateTime(timezone=True), nullable=True)
+    verification_code = Column(String(6), nullable=True)
+    allow_late_join = Column(Boolean, nullable=True)
+    session_created_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Attendance record
+    status = Column(SQLEnum(AttendanceStatus), nullable=True)
+    check_in_time = Column(DateTime(timezone=True), nullable=True)
+    check_out_time = Column(DateTime(timezone=True), nullable=True)
+    verification_method = Column(String(50), nullable=True)
+    is_late = Column(Boolean, nullable=True)
+    late_minutes = Column(Integer, nullable=True)
+    is_manual_override = Column(Boolean, nullable=True)
+    override_reason = Column(String(500), nullable=True)
+    override_teacher_name = Column(String(255), nullable=True)
+    notes = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # My attendance: newest records first
+        Index('idx_timeline_student_created', 'student_id', 'created_at', 'id'),
+        # My classes: newest sessions first
+        Index('idx_timeline_student_session_created', 'student_id', 'session_created_at', 'id'),
+        # Active sessions awaiting check-in
+        Index('idx_timeline_student_session_status', 'student_id', 'session_status', 'session_start_time'),
+        # Rebuilding the entries of a class session
+        Index('idx_timeline_class_session', 'class_session_id', 'student_id'),
+    )
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, validator
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from enum import Enum
 
 from app.models.attendance import AttendanceStatus
@@ -208,7 +208,7 @@ class WebSocketMessageBase(BaseModel):
 
 class AttendanceCreatedMessage(WebSocketMessageBase):
     """Message sent when a new attendance record is created."""
-    type: str = Field(default="attendance_created", const=True)
+    type: Literal["attendance_created"] = "attendance_created"
     data: Dict[str, Any] = Field(..., description="Attendance record data")
     student_id: int = Field(..., description="Student ID for authorization")
     student_name: str = Field(..., description="Student name for display")
@@ -220,7 +220,7 @@ class AttendanceCreatedMessage(WebSocketMessageBase):
 
 class AttendanceUpdatedMessage(WebSocketMessageBase):
     """Message sent when an attendance record is updated."""
-    type: str = Field(default="attendance_updated", const=True)
+    type: Literal["attendance_updated"] = "attendance_updated"
     data: Dict[str, Any] = Field(..., description="Updated attendance record data")
     attendance_id: int = Field(..., description="Attendance record ID")
     student_id: int = Field(..., description="Student ID for authorization")
@@ -234,7 +234,7 @@ class AttendanceUpdatedMessage(WebSocketMessageBase):
 
 class StudentJoinedClassMessage(WebSocketMessageBase):
     """Message sent when a student successfully joins a class."""
-    type: str = Field(default="student_joined_class", const=True)
+    type: Literal["student_joined_class"] = "student_joined_class"
     data: Dict[str, Any] = Field(..., description="Join event data")
     student_id: int = Field(..., description="Student ID for authorization")
     student_name: str = Field(..., description="Student name for display")
@@ -247,7 +247,7 @@ class StudentJoinedClassMessage(WebSocketMessageBase):
 
 class AttendanceStateChangedMessage(WebSocketMessageBase):
     """General message for any attendance state changes."""
-    type: str = Field(default="attendance_state_changed", const=True)
+    type: Literal["attendance_state_changed"] = "attendance_state_changed"
     data: Dict[str, Any] = Field(..., description="State change data")
     change_type: str = Field(..., description="Type of change (created, updated, bulk_update, etc.)")
     affected_students: List[int] = Field(..., description="List of affected student IDs")
@@ -257,7 +257,7 @@ class AttendanceStateChangedMessage(WebSocketMessageBase):
 
 class BulkAttendanceUpdateMessage(WebSocketMessageBase):
     """Message sent when bulk attendance operations are performed."""
-    type: str = Field(default="bulk_attendance_update", const=True)
+    type: Literal["bulk_attendance_update"] = "bulk_attendance_update"
     data: Dict[str, Any] = Field(..., description="Bulk update data")
     operation: str = Field(..., description="Type of bulk operation performed")
     affected_students: List[Dict[str, Any]] = Field(..., description="List of affected students with their new status")
@@ -268,7 +268,7 @@ class BulkAttendanceUpdateMessage(WebSocketMessageBase):
 
 class AttendanceStatsUpdateMessage(WebSocketMessageBase):
     """Message sent when attendance statistics need to be updated."""
-    type: str = Field(default="attendance_stats_update", const=True)
+    type: Literal["attendance_stats_update"] = "attendance_stats_update"
     data: Dict[str, Any] = Field(..., description="Updated statistics data")
     stats: AttendanceStats = Field(..., description="Current attendance statistics")
     updated_at: datetime = Field(default_factory=lambda: datetime.now())
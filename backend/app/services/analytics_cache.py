@@ -0,0 +1,240 @@
+"""
+In-process results cache for the analytics services.
+
+Teacher dashboards poll the same class and student analytics every few
+seconds, and every call used to rebuild the result from the database.
+AnalyticsResultCache memoizes the results of AttendanceAnalyticsService and
+AdvancedPatternDetector methods:
+
+- entries are keyed by ``(method, target, arguments)``, where the target is
+  the student or class session the result is about (None for
+  institution-wide results) and the arguments are the period and options
+- the cache is bounded: least recently used entries are evicted beyond
+  ``max_entries``, and entries expire after ``ttl_seconds``
+- AttendanceEngine queues an invalidation for every record it writes; when
+  the transaction commits, the entries of the record's class session and
+  student, and all institution-wide entries, are dropped from every cache
+
+Concurrent misses for the same key share one computation. Every caller gets
+its own copy of the result, so callers may change what they are given
+without affecting the cached value. Writes made by other worker processes
+are only picked up when entries expire.
+"""
+import copy
+import functools
+import inspect
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Any, Hashable, Iterable, Tuple, Callable, Awaitable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Key under which uncommitted invalidations are kept in Session.info
+_PENDING_KEY = "analytics_cache_invalidations"
+
+# Tag of the entries that depend on every attendance record
+INSTITUTION_TAG = ("institution",)
+
+# Every live cache, so that committed writes invalidate all of them
+_caches: "weakref.WeakSet[AnalyticsResultCache]" = weakref.WeakSet()
+
+# Method arguments that identify the target of a result, and their tag kind
+TARGET_ARGUMENTS = {
+    "student_id": "student",
+    "class_session_id": "class_session"
+}
+
+
+@dataclass
+class CachedResult:
+    value: Any
+    expires_at: float
+    tag: Tuple
+
+
+class AnalyticsResultCache:
+    """LRU cache with TTL of analytics results, invalidated by tag."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[Hashable, CachedResult]" = OrderedDict()
+        self._keys_by_tag: Dict[Tuple, Set[Hashable]] = {}
+        # Bumped on invalidation, so results computed across a write are not
+        # stored. Only kept for tags with a computation in flight.
+        self._tag_versions: Dict[Tuple, int] = {}
+        self._computing_tags: Dict[Tuple, int] = {}
+        self._computations = SingleFlight()
+
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+        _caches.add(self)
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        tag: Tuple,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return the cached result for ``key``, computing and storing it on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return copy.deepcopy(entry.value)
+            self._stats['expirations'] += 1
+            self._remove(key)
+
+        if key in self._computations:
+            self._stats['hits'] += 1
+
+        async def compute_and_store() -> Any:
+            self._stats['misses'] += 1
+            watched = {tag, INSTITUTION_TAG}
+            for watched_tag in watched:
+                self._computing_tags[watched_tag] = self._computing_tags.get(watched_tag, 0) + 1
+            try:
+                versions = [self._tag_versions.get(watched_tag, 0) for watched_tag in watched]
+                value = await compute()
+                if versions == [self._tag_versions.get(watched_tag, 0) for watched_tag in watched]:
+                    self._store(key, tag, value)
+                return value
+            finally:
+                for watched_tag in watched:
+                    self._computing_tags[watched_tag] -= 1
+                    if not self._computing_tags[watched_tag]:
+                        del self._computing_tags[watched_tag]
+                        self._tag_versions.pop(watched_tag, None)
+
+        return copy.deepcopy(await self._computations.do(key, compute_and_store))
+
+    def invalidate(self, tags: Iterable[Tuple]):
+        """Drop the entries of ``tags``."""
+        for tag in tags:
+            if tag in self._computing_tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+            for key in list(self._keys_by_tag.get(tag, ())):
+                self._remove(key)
+                self._stats['invalidations'] += 1
+
+    def invalidate_records(self, class_session_id: int, student_ids: Iterable[int]):
+        """Drop the entries affected by attendance records of a class session."""
+        self.invalidate([
+            ("class_session", class_session_id),
+            *(("student", student_id) for student_id in student_ids),
+            INSTITUTION_TAG
+        ])
+
+    def clear(self):
+        """Drop all entries."""
+        self._entries.clear()
+        self._keys_by_tag.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self._stats['hits'] + self._stats['misses']
+        return {
+            **self._stats,
+            'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries
+        }
+
+    def _store(self, key: Hashable, tag: Tuple, value: Any):
+        if self.max_entries <= 0:
+            return
+        if key in self._entries:
+            self._remove(key)
+        while len(self._entries) >= self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._stats['evictions'] += 1
+
+        self._entries[key] = CachedResult(value, time.monotonic() + self.ttl_seconds, tag)
+        self._keys_by_tag.setdefault(tag, set()).add(key)
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_tag.get(entry.tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_tag[entry.tag]
+
+
+def cached_result(method: Callable) -> Callable:
+    """
+    Memoize an analytics method in its instance's ``result_cache``.
+
+    The first of the method's TARGET_ARGUMENTS that is given identifies the
+    target; the remaining arguments (period, options) complete the key and
+    must be hashable.
+    """
+    signature = inspect.signature(method)
+    target_names = [name for name in TARGET_ARGUMENTS if name in signature.parameters]
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        cache: Optional[AnalyticsResultCache] = getattr(self, "result_cache", None)
+        if cache is None:
+            return await method(self, *args, **kwargs)
+
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        del arguments["self"]
+
+        tag = INSTITUTION_TAG
+        for name in target_names:
+            if arguments.get(name) is not None:
+                tag = (TARGET_ARGUMENTS[name], arguments.pop(name))
+                break
+
+        key = (method.__qualname__, tag, tuple(arguments.items()))
+        return await cache.get_or_compute(key, tag, lambda: method(self, *args, **kwargs))
+
+    return wrapper
+
+
+def record_analytics_change(db: AsyncSession, class_session_id: int, student_ids: Iterable[int]):
+    """Queue an invalidation for records of ``student_ids`` in a class session, applied when ``db`` commits."""
+    db.sync_session.info.setdefault(_PENDING_KEY, []).append((class_session_id, tuple(student_ids)))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_invalidations(session: Session):
+    for class_session_id, student_ids in session.info.pop(_PENDING_KEY, []):
+        for cache in list(_caches):
+            cache.invalidate_records(class_session_id, student_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_invalidations(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Global cache instance
+analytics_result_cache = AnalyticsResultCache(
+    max_entries=settings.ANALYTICS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANALYTICS_CACHE_TTL_SECONDS
+)
@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass
 from collections import defaultdict
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func, or_, distinct, case
 from sqlalchemy.orm import joinedload
@@ -15,6 +16,11 @@ from app.models.attendance import AttendanceRecord, AttendanceStatus, Attendance
 from app.models.class_session import ClassSession
 from app.models.user import User, UserRole
 from app.schemas.attendance import AttendanceStats
+from app.services.attendance_facts import AttendanceSummary, load_attendance_facts, epoch_seconds
+from app.services.attendance_rollups import AttendanceRollups, attendance_rollups
+from app.services.analytics_cache import AnalyticsResultCache, analytics_result_cache, cached_result
+from app.services.history_statistics import history_rows, compute_history_statistics
+from app.core.compute import ComputeExecutor, compute_executor
 
 
 @dataclass
@@ -65,8 +71,20 @@ class AttendanceAnalyticsService:
     statistical analysis, reporting, and insights.
     """
     
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        rollups: Optional[AttendanceRollups] = None,
+        result_cache: Optional[AnalyticsResultCache] = None,
+        executor: Optional[ComputeExecutor] = None
+    ):
         self.db = db
+        # Precomputed aggregates, used whenever they are fresh enough
+        self.rollups = rollups or attendance_rollups
+        # Memoized results of the generate_* methods
+        self.result_cache = result_cache or analytics_result_cache
+        # Runs the CPU-bound statistics off the event loop
+        self.executor = executor or compute_executor
         
         # Analytics configuration
         self.percentile_thresholds = [10, 25, 50, 75, 90]
@@ -78,6 +96,9 @@ class AttendanceAnalyticsService:
             "critical": 0.0
         }
         
+        # Sessions shown in a class's time series
+        self.class_time_series_sessions = 30
+        
         # Benchmark values
         self.institutional_benchmarks = {
             "target_attendance_rate": 0.90,
@@ -85,6 +106,7 @@ class AttendanceAnalyticsService:
             "max_consecutive_absences": 3
         }
 
+    @cached_result
     async def generate_class_analytics(
         self,
         class_session_id: int,
@@ -125,7 +147,7 @@ class AttendanceAnalyticsService:
         )
         
         # Generate time series data for visualization
-        time_series_data = await self._generate_class_time_series(class_session_id)
+        time_series_data = await self._generate_class_time_series(session)
         
         return ClassAnalytics(
             class_session_id=class_session_id,
@@ -140,6 +162,7 @@ class AttendanceAnalyticsService:
             time_series_data=time_series_data
         )
 
+    @cached_result
     async def generate_student_analytics(
         self,
         student_id: int,
@@ -158,6 +181,11 @@ class AttendanceAnalyticsService:
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=analysis_period_days)
         
+        if await self.rollups.covers(self.db, end_date):
+            return await self._student_analytics_from_rollups(
+                student_id, student_name, start_date, end_date
+            )
+        
         attendance_records = await self._get_student_attendance_records(
             student_id, start_date, end_date
         )
@@ -196,6 +224,7 @@ class AttendanceAnalyticsService:
             improvement_suggestions=improvement_suggestions
         )
 
+    @cached_result
     async def generate_institutional_analytics(
         self,
         period_days: int = 30,
@@ -206,52 +235,39 @@ class AttendanceAnalyticsService:
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=period_days)
         
-        # Get all attendance data for the period
-        base_query = select(AttendanceRecord, ClassSession, User.full_name.label('student_name')).\
-            join(ClassSession, AttendanceRecord.class_session_id == ClassSession.id).\
-            join(User, AttendanceRecord.student_id == User.id).\
-            where(ClassSession.start_time.between(start_date, end_date))
-        
-        if department_filter:
-            # This would need department field in class sessions
-            pass  # Add department filter when implemented
-        
-        result = await self.db.execute(base_query)
-        all_records = result.all()
+        # Aggregate from the rollups (whole days) when fresh, otherwise load the
+        # period's records as compact columns; departments are session subjects
+        if await self.rollups.covers(self.db, end_date):
+            summary = await self.rollups.load_summary(
+                self.db, start_date, end_date, subject=department_filter
+            )
+        else:
+            facts = await load_attendance_facts(
+                self.db, start_date, end_date, subject=department_filter
+            )
+            summary = facts.summarize()
         
-        if not all_records:
+        if not summary.total_records:
             return self._empty_institutional_analytics(start_date, end_date)
         
-        # Calculate basic metrics
-        total_students = len(set(record.student_id for record, _, _ in all_records))
-        total_classes = len(set(record.class_session_id for record, _, _ in all_records))
-        
-        # Calculate overall attendance rate
-        total_records = len(all_records)
-        attending_records = sum(1 for record, _, _ in all_records 
-                              if record.status in [AttendanceStatus.PRESENT, 
-                                                 AttendanceStatus.LATE, 
-                                                 AttendanceStatus.EXCUSED])
-        overall_attendance_rate = attending_records / total_records if total_records > 0 else 0
-        
-        # Generate department breakdown (simplified for now)
-        department_breakdown = await self._generate_department_breakdown(all_records)
+        # Generate department breakdown
+        department_breakdown = await self._generate_department_breakdown(summary)
         
         # Analyze trends
-        trend_analysis = await self._analyze_institutional_trends(all_records, start_date)
+        trend_analysis = await self._analyze_institutional_trends(summary, start_date)
         
         # Calculate performance distribution
-        performance_distribution = await self._calculate_performance_distribution(all_records)
+        performance_distribution = await self._calculate_performance_distribution(summary)
         
         # Generate alert summary
-        alert_summary = await self._generate_institutional_alert_summary(all_records)
+        alert_summary = await self._generate_institutional_alert_summary(summary)
         
         return InstitutionalAnalytics(
             period_start=start_date,
             period_end=end_date,
-            total_students=total_students,
-            total_classes=total_classes,
-            overall_attendance_rate=round(overall_attendance_rate, 3),
+            total_students=summary.total_students,
+            total_classes=summary.total_classes,
+            overall_attendance_rate=round(summary.attendance_rate, 3),
             department_breakdown=department_breakdown,
             trend_analysis=trend_analysis,
             performance_distribution=performance_distribution,
@@ -489,11 +505,24 @@ class AttendanceAnalyticsService:
             }
         }
 
-    async def _generate_class_time_series(self, class_session_id: int) -> List[Dict[str, Any]]:
-        """Generate time series data for class attendance visualization."""
-        # This is simplified - in practice would generate data points over time
-        # For now, return empty list as this requires historical class sessions
-        return []
+    async def _generate_class_time_series(self, session: ClassSession) -> List[Dict[str, Any]]:
+        """Attendance of the class's recent sessions, from the per-class rollups."""
+        if session.class_id is None or not await self.rollups.covers(self.db, datetime.utcnow()):
+            return []
+        
+        history = await self.rollups.load_class_history(
+            self.db, session.class_id, self.class_time_series_sessions
+        )
+        return [
+            {
+                "class_session_id": rollup.class_session_id,
+                "date": rollup.day.isoformat(),
+                "total_records": rollup.total_count,
+                "attendance_rate": round(rollup.attended_count / rollup.total_count, 3) if rollup.total_count else 0.0,
+                "late_rate": round(rollup.late_count / rollup.total_count, 3) if rollup.total_count else 0.0
+            }
+            for rollup in history
+        ]
 
     async def _calculate_student_overall_stats(
         self, 
@@ -536,18 +565,14 @@ class AttendanceAnalyticsService:
         if len(records) < 5:
             return {"insufficient_data": True}
         
-        # Group by weeks
-        weekly_data = defaultdict(list)
-        for record, session in records:
-            week_key = session.start_time.strftime("%Y-%W")
-            score = self._status_to_score(record.status)
-            weekly_data[week_key].append(score)
-        
-        # Calculate weekly averages
-        weekly_averages = []
-        for week, scores in weekly_data.items():
-            weekly_averages.append(statistics.mean(scores))
+        # Weekly average scores, computed off the event loop
+        rows = history_rows(records)
+        history = await self.executor.run(compute_history_statistics, rows, size=len(rows))
         
+        return self._summarize_weekly_trend(list(history.weekly_scores.averages().values()))
+
+    def _summarize_weekly_trend(self, weekly_averages: List[float]) -> Dict[str, Any]:
+        """Compare the last two weekly average scores with the earlier weeks."""
         if len(weekly_averages) < 3:
             return {"insufficient_weeks": True}
         
@@ -593,6 +618,101 @@ class AttendanceAnalyticsService:
             "consistency_score": round(1 - (statistics.stdev(late_minutes) / 10), 3) if len(late_minutes) > 1 else 1.0
         }
 
+    async def _student_analytics_from_rollups(
+        self,
+        student_id: int,
+        student_name: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> StudentAnalytics:
+        """Student analytics from the per-student daily rollups (whole days)."""
+        days = await self.rollups.load_student_days(self.db, student_id, start_date, end_date)
+        
+        present = sum(day.present_count for day in days)
+        late = sum(day.late_count for day in days)
+        absent = sum(day.absent_count for day in days)
+        excused = sum(day.excused_count for day in days)
+        total = present + late + absent + excused
+        
+        if not total:
+            return self._empty_student_analytics(student_id, student_name)
+        
+        overall_stats = AttendanceStats(
+            total_students=1,  # Individual student
+            present_count=present,
+            late_count=late,
+            absent_count=absent,
+            excused_count=excused,
+            attendance_rate=round((present + late + excused) / total, 3),
+            late_rate=round(late / total, 3)
+        )
+        
+        # Weekly average of the status scores
+        if total < 5:
+            performance_trends = {"insufficient_data": True}
+        else:
+            weekly_scores = defaultdict(lambda: [0.0, 0])
+            for day in days:
+                week = weekly_scores[day.day.strftime("%Y-%W")]
+                week[0] += (
+                    day.present_count * self._status_to_score(AttendanceStatus.PRESENT) +
+                    day.late_count * self._status_to_score(AttendanceStatus.LATE) +
+                    day.excused_count * self._status_to_score(AttendanceStatus.EXCUSED)
+                )
+                week[1] += (
+                    day.present_count + day.late_count + day.absent_count + day.excused_count
+                )
+            performance_trends = self._summarize_weekly_trend([
+                score / count for score, count in weekly_scores.values()
+            ])
+        
+        punctuality_analysis = self._punctuality_from_rollups(days, total)
+        comparative_ranking = await self._generate_student_ranking(student_id, overall_stats)
+        risk_indicators = await self._assess_student_risks([], overall_stats)
+        improvement_suggestions = await self._generate_improvement_suggestions(
+            overall_stats, performance_trends, punctuality_analysis, risk_indicators
+        )
+        
+        return StudentAnalytics(
+            student_id=student_id,
+            student_name=student_name,
+            overall_stats=overall_stats,
+            performance_trends=performance_trends,
+            punctuality_analysis=punctuality_analysis,
+            comparative_ranking=comparative_ranking,
+            risk_indicators=risk_indicators,
+            improvement_suggestions=improvement_suggestions
+        )
+
+    def _punctuality_from_rollups(self, days, total_sessions: int) -> Dict[str, Any]:
+        """Punctuality figures from late-arrival counts and late-minute sums."""
+        late_arrivals = sum(day.late_arrivals for day in days)
+        
+        if not late_arrivals:
+            return {
+                "punctuality_score": 1.0,
+                "average_late_minutes": 0,
+                "late_frequency": 0,
+                "improvement_trend": "excellent"
+            }
+        
+        minutes_sum = sum(day.late_minutes_sum for day in days)
+        minutes_sq_sum = sum(day.late_minutes_sq_sum for day in days)
+        
+        # Sample standard deviation from the sums
+        consistency_score = 1.0
+        if late_arrivals > 1:
+            variance = (minutes_sq_sum - minutes_sum ** 2 / late_arrivals) / (late_arrivals - 1)
+            consistency_score = round(1 - (max(variance, 0) ** 0.5 / 10), 3)
+        
+        return {
+            "punctuality_score": round(1 - (late_arrivals / total_sessions), 3),
+            "average_late_minutes": round(minutes_sum / late_arrivals, 1),
+            "late_frequency": round(late_arrivals / total_sessions, 3),
+            "max_late_minutes": max(day.late_minutes_max for day in days),
+            "consistency_score": consistency_score
+        }
+
     def _status_to_score(self, status: AttendanceStatus) -> float:
         """Convert attendance status to numerical score."""
         return {
@@ -644,10 +764,6 @@ class AttendanceAnalyticsService:
     # - _generate_student_ranking
     # - _assess_student_risks  
     # - _generate_improvement_suggestions
-    # - _generate_department_breakdown
-    # - _analyze_institutional_trends
-    # - _calculate_performance_distribution
-    # - _generate_institutional_alert_summary
     # - Comparison methods (_compare_student_vs_class, etc.)
     # - Forecasting methods (_forecast_student_attendance, etc.)
 
@@ -694,19 +810,121 @@ class AttendanceAnalyticsService:
         
         return suggestions if suggestions else ["Continue maintaining good attendance"]
 
-    # Simplified implementations for remaining methods
-    async def _generate_department_breakdown(self, records) -> Dict[str, Any]:
-        return {"status": "not_implemented"}
+    async def _generate_department_breakdown(self, summary: AttendanceSummary) -> Dict[str, Any]:
+        """Attendance per department (session subject)."""
+        records = summary.subject_records
+        attended = summary.subject_attended
+        late = summary.subject_late
+        students = summary.subject_students
+        sessions = summary.subject_sessions
+        
+        departments = {}
+        for code, name in enumerate(summary.subjects):
+            if not records[code]:
+                continue
+            attendance_rate = attended[code] / records[code]
+            departments[name or "Unassigned"] = {
+                "total_records": int(records[code]),
+                "total_students": int(students[code]),
+                "total_classes": int(sessions[code]),
+                "attendance_rate": round(float(attendance_rate), 3),
+                "late_rate": round(float(late[code] / records[code]), 3),
+                "meets_target": bool(attendance_rate >= self.institutional_benchmarks["target_attendance_rate"])
+            }
+        
+        return {
+            "department_count": len(departments),
+            "departments": departments
+        }
 
-    async def _analyze_institutional_trends(self, records, start_date) -> Dict[str, Any]:
-        return {"status": "not_implemented"}
+    async def _analyze_institutional_trends(self, summary: AttendanceSummary, start_date: datetime) -> Dict[str, Any]:
+        """Weekly attendance rates over the period and their linear trend."""
+        week_seconds = 7 * 24 * 3600
+        period_start = epoch_seconds([start_date])[0]
+        weeks = np.maximum((summary.times - period_start) // week_seconds, 0)
+        
+        records = np.bincount(weeks, weights=summary.time_records)
+        attended = np.bincount(weeks, weights=summary.time_attended, minlength=records.size)
+        active_weeks = np.nonzero(records)[0]
+        rates = attended[active_weeks] / records[active_weeks]
+        
+        weekly = [
+            {
+                "week_start": (start_date + timedelta(weeks=int(week))).isoformat(),
+                "attendance_rate": round(float(rate), 3),
+                "total_records": int(records[week])
+            }
+            for week, rate in zip(active_weeks, rates)
+        ]
+        
+        if active_weeks.size < 2:
+            return {
+                "weekly_attendance": weekly,
+                "trend_direction": "insufficient_data",
+                "weekly_change": 0.0
+            }
+        
+        # Least-squares slope of the weekly rate, in rate change per week
+        weekly_change = float(np.polyfit(active_weeks.astype(float), rates, 1)[0])
+        if weekly_change > 0.01:
+            trend_direction = "improving"
+        elif weekly_change < -0.01:
+            trend_direction = "declining"
+        else:
+            trend_direction = "stable"
+        
+        return {
+            "weekly_attendance": weekly,
+            "trend_direction": trend_direction,
+            "weekly_change": round(weekly_change, 4),
+            "best_week": weekly[int(np.argmax(rates))]["week_start"],
+            "worst_week": weekly[int(np.argmin(rates))]["week_start"]
+        }
 
-    async def _calculate_performance_distribution(self, records) -> Dict[str, Any]:
-        return {"status": "not_implemented"}
+    async def _calculate_performance_distribution(self, summary: AttendanceSummary) -> Dict[str, Any]:
+        """Distribution of per-student attendance rates over the performance categories."""
+        rates = summary.student_attended / summary.student_records
+        
+        # Categories from the highest threshold down; each student lands in the first one met
+        categories = sorted(self.performance_categories.items(), key=lambda item: item[1], reverse=True)
+        thresholds = np.array([threshold for _, threshold in categories])
+        category_index = np.argmax(rates[:, None] >= thresholds[None, :], axis=1)
+        counts = np.bincount(category_index, minlength=len(categories))
+        
+        return {
+            "total_students": int(rates.size),
+            "categories": {
+                name: {
+                    "count": int(counts[index]),
+                    "percentage": round(float(counts[index] / rates.size), 3)
+                }
+                for index, (name, _) in enumerate(categories)
+            },
+            "percentiles": {
+                f"p{percentile}": round(float(value), 3)
+                for percentile, value in zip(
+                    self.percentile_thresholds, np.percentile(rates, self.percentile_thresholds)
+                )
+            },
+            "mean_attendance_rate": round(float(rates.mean()), 3),
+            "std_attendance_rate": round(float(rates.std()), 3)
+        }
 
-    async def _generate_institutional_alert_summary(self, records) -> Dict[str, Any]:
-        return {"status": "not_implemented"}
+    async def _generate_institutional_alert_summary(self, summary: AttendanceSummary) -> Dict[str, Any]:
+        """Count students whose attendance warrants attention."""
+        rates = summary.student_attended / summary.student_records
+        late_rates = summary.student_late / summary.student_records
+        
+        return {
+            "students_below_target": int(np.count_nonzero(
+                rates < self.institutional_benchmarks["target_attendance_rate"]
+            )),
+            # Same thresholds as the per-student risk assessment
+            "students_at_risk": int(np.count_nonzero(rates < 0.7)),
+            "students_frequently_late": int(np.count_nonzero(late_rates > 0.3))
+        }
 
+    # Simplified implementations for remaining methods
     async def _compare_student_vs_class(self, student_id: int, class_id: int, days: int) -> Dict[str, Any]:
         return {"status": "not_implemented"}
 
@@ -7,11 +7,16 @@ import json
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, or_
-from sqlalchemy.orm import joinedload
+from sqlalchemy import select, and_, func, or_, insert, union, case, literal
 
+from app.core.database import upsert_insert
+from app.services.live_counters import (
+    record_status_change, record_status_changes, record_unknown_change
+)
+from app.services.analytics_cache import record_analytics_change
+from app.services.student_timeline import upsert_timeline_entries
 from app.models.attendance import AttendanceRecord, AttendanceStatus, AttendanceAuditLog
-from app.models.class_session import ClassSession
+from app.models.class_session import ClassSession, StudentEnrollment
 from app.models.user import User, UserRole
 from app.models.attendance_pattern import (
     AttendancePatternAnalysis, AttendanceAlert as AlertModel, 
@@ -143,8 +148,131 @@ class AttendanceEngine:
             user_agent
         )
         
+        record_status_change(
+            self.db, class_session_id, None, status, 1 if check_in_time else 0
+        )
+        record_analytics_change(self.db, class_session_id, [student_id])
+        await upsert_timeline_entries(self.db, [attendance_record.id])
+        
         return attendance_record
     
+    async def record_check_in(
+        self,
+        class_session: Any,
+        student_id: int,
+        verification_method: str,
+        reason: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        check_in_time: Optional[datetime] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Record a student self check-in with a single INSERT ... ON CONFLICT.
+        
+        The statement creates the record, fills in a record that exists without
+        a check-in (e.g. pre-marked absent by the teacher), or leaves an
+        existing check-in untouched. ``class_session`` only needs ``id`` and
+        ``start_time``, so a cached session snapshot can be passed.
+        
+        Returns:
+            (record_row, recorded) - the stored record and whether this call
+            recorded the check-in (False for duplicate scans)
+        """
+        if check_in_time is None:
+            check_in_time = datetime.utcnow()
+        
+        status = await self.determine_attendance_status(class_session, check_in_time)
+        is_late, late_minutes, grace_period_used = await self.calculate_late_status(
+            class_session, check_in_time
+        )
+        
+        stmt = upsert_insert(self.db, AttendanceRecord).values(
+            student_id=student_id,
+            class_session_id=class_session.id,
+            status=status,
+            check_in_time=check_in_time,
+            verification_method=verification_method,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            is_late=is_late,
+            late_minutes=late_minutes,
+            grace_period_used=grace_period_used,
+            version=1
+        )
+        
+        # Only overwrite columns when the existing record has no check-in yet
+        not_checked_in = AttendanceRecord.check_in_time.is_(None)
+        update_columns = [
+            "status", "check_in_time", "verification_method", "ip_address",
+            "user_agent", "is_late", "late_minutes", "grace_period_used"
+        ]
+        set_values = {
+            column: case(
+                (not_checked_in, stmt.excluded[column]),
+                else_=AttendanceRecord.__table__.c[column]
+            )
+            for column in update_columns
+        }
+        set_values["version"] = case(
+            (not_checked_in, AttendanceRecord.version + 1),
+            else_=AttendanceRecord.version
+        )
+        # The upsert bypasses the column's onupdate; analytics rollups track updated_at
+        set_values["updated_at"] = case(
+            (not_checked_in, func.now()),
+            else_=AttendanceRecord.updated_at
+        )
+        
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["class_session_id", "student_id"],
+            set_=set_values
+        ).returning(
+            AttendanceRecord.id,
+            AttendanceRecord.status,
+            AttendanceRecord.check_in_time,
+            AttendanceRecord.is_late,
+            AttendanceRecord.late_minutes,
+            AttendanceRecord.grace_period_used,
+            AttendanceRecord.version,
+            (AttendanceRecord.check_in_time == check_in_time).label("recorded")
+        )
+        
+        result = await self.db.execute(stmt)
+        record = result.one()
+        recorded = bool(record.recorded)
+        
+        if recorded:
+            await self._create_audit_log(
+                record.id,
+                student_id,
+                "create" if record.version == 1 else "update_status",
+                None,
+                record.status,
+                reason,
+                ip_address,
+                user_agent
+            )
+            
+            if record.version == 1:
+                record_status_change(self.db, class_session.id, None, record.status, 1)
+            else:
+                # The status the record had before the check-in is not returned
+                record_unknown_change(self.db, class_session.id)
+            record_analytics_change(self.db, class_session.id, [student_id])
+            await upsert_timeline_entries(self.db, [record.id])
+        
+        return record, recorded
+    
+    async def ensure_enrollment(self, student_id: int, class_id: int):
+        """
+        Enroll a student in a class unless an enrollment already exists.
+        """
+        await self.db.execute(
+            upsert_insert(self.db, StudentEnrollment)
+            .values(student_id=student_id, class_id=class_id, is_active=True)
+            .on_conflict_do_nothing(index_elements=["student_id", "class_id"])
+        )
+    
     async def update_attendance_status(
         self,
         attendance_record: AttendanceRecord,
@@ -186,6 +314,15 @@ class AttendanceEngine:
             user_agent
         )
         
+        record_status_change(
+            self.db, attendance_record.class_session_id, old_status, new_status
+        )
+        record_analytics_change(
+            self.db, attendance_record.class_session_id, [attendance_record.student_id]
+        )
+        await self.db.flush()
+        await upsert_timeline_entries(self.db, [attendance_record.id])
+        
         return attendance_record
     
     async def bulk_update_attendance(
@@ -201,6 +338,10 @@ class AttendanceEngine:
     ) -> Dict[str, Any]:
         """
         Perform bulk attendance operations.
+        
+        The roster lookup, record writes and audit trail are each issued as a
+        single set-based statement, so the number of database round trips
+        stays constant no matter how many students are affected.
         """
         # Map operations to status
         operation_to_status = {
@@ -211,88 +352,173 @@ class AttendanceEngine:
         }
         
         new_status = operation_to_status[operation]
-        processed_count = 0
-        failed_count = 0
         failed_students = []
         
-        # Get target students
+        result = await self.db.execute(
+            select(ClassSession).where(ClassSession.id == class_session_id)
+        )
+        class_session = result.scalar_one()
+        
+        # Resolve target students
         if student_ids is None:
-            # Get all enrolled students for the class session
-            result = await self.db.execute(
-                select(ClassSession).where(ClassSession.id == class_session_id)
-                .options(joinedload(ClassSession.enrolled_students))
+            # Active enrollments for the class plus anyone already recorded in the session
+            roster_query = union(
+                select(StudentEnrollment.student_id).where(
+                    and_(
+                        StudentEnrollment.class_id == class_session.class_id,
+                        StudentEnrollment.is_active == True
+                    )
+                ),
+                select(AttendanceRecord.student_id).where(
+                    AttendanceRecord.class_session_id == class_session_id
+                )
             )
-            session = result.scalar_one()
-            target_student_ids = [student.id for student in session.enrolled_students]
+            result = await self.db.execute(roster_query)
+            target_student_ids = sorted(row[0] for row in result.all())
         else:
-            target_student_ids = student_ids
-        
-        # Process each student
-        for student_id in target_student_ids:
-            try:
-                # Check if attendance record exists
-                result = await self.db.execute(
-                    select(AttendanceRecord).where(
-                        and_(
-                            AttendanceRecord.student_id == student_id,
-                            AttendanceRecord.class_session_id == class_session_id
-                        )
+            requested_ids = list(dict.fromkeys(student_ids))
+            result = await self.db.execute(
+                select(User.id).where(
+                    and_(
+                        User.id.in_(requested_ids),
+                        User.role == UserRole.STUDENT
                     )
                 )
-                attendance_record = result.scalar_one_or_none()
-                
-                if attendance_record:
-                    # Update existing record
-                    await self.update_attendance_status(
-                        attendance_record,
-                        new_status,
-                        teacher_id,
-                        reason,
-                        ip_address,
-                        user_agent,
-                        notes
-                    )
-                else:
-                    # Create new record
-                    check_in_time = datetime.utcnow() if new_status != AttendanceStatus.ABSENT else None
-                    await self.create_attendance_record(
-                        student_id,
-                        class_session_id,
-                        new_status,
-                        "teacher_override",
-                        teacher_id,
-                        ip_address,
-                        user_agent,
-                        notes,
-                        check_in_time,
-                        reason
-                    )
-                
-                processed_count += 1
-                
-                # Create bulk audit log
-                await self._create_audit_log(
-                    attendance_record.id if attendance_record else None,
-                    teacher_id,
-                    "bulk_update",
-                    attendance_record.status if attendance_record else None,
-                    new_status,
-                    f"Bulk operation: {operation.value} - {reason}",
-                    ip_address,
-                    user_agent,
-                    {"operation": operation.value, "bulk_reason": reason}
+            )
+            known_ids = {row[0] for row in result.all()}
+            target_student_ids = [sid for sid in requested_ids if sid in known_ids]
+            failed_students = [
+                {"student_id": sid, "error": "Student not found"}
+                for sid in requested_ids if sid not in known_ids
+            ]
+        
+        if not target_student_ids:
+            return {
+                "processed_count": 0,
+                "failed_count": len(failed_students),
+                "failed_students": failed_students
+            }
+        
+        # Previous status of the targeted students' records, for the audit trail
+        result = await self.db.execute(
+            select(AttendanceRecord.student_id, AttendanceRecord.status)
+            .where(
+                and_(
+                    AttendanceRecord.class_session_id == class_session_id,
+                    AttendanceRecord.student_id.in_(target_student_ids)
                 )
-                
-            except Exception as e:
-                failed_count += 1
-                failed_students.append({
-                    "student_id": student_id,
-                    "error": str(e)
-                })
+            )
+        )
+        previous_status = {row.student_id: row.status for row in result.all()}
+        
+        now = datetime.utcnow()
+        check_in_time = now if new_status != AttendanceStatus.ABSENT else None
+        is_late, late_minutes, grace_period_used = False, 0, False
+        if check_in_time:
+            is_late, late_minutes, grace_period_used = await self.calculate_late_status(
+                class_session, check_in_time
+            )
+        
+        # One INSERT ... SELECT ... ON CONFLICT for every targeted student, so a
+        # check-in landing between the read above and this write updates
+        # instead of failing the batch on the unique index
+        record_values = {
+            "class_session_id": class_session_id,
+            "status": new_status,
+            "check_in_time": check_in_time,
+            "verification_method": "teacher_override",
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "notes": notes,
+            "is_late": is_late,
+            "late_minutes": late_minutes,
+            "grace_period_used": grace_period_used,
+            "is_manual_override": True,
+            "override_reason": reason,
+            "override_by_teacher_id": teacher_id,
+            "version": 1
+        }
+        columns = AttendanceRecord.__table__.c
+        stmt = upsert_insert(self.db, AttendanceRecord).from_select(
+            ["student_id", *record_values],
+            select(
+                User.id,
+                *(literal(value, columns[name].type) for name, value in record_values.items())
+            ).where(User.id.in_(target_student_ids))
+        )
+        
+        set_values = {
+            "status": stmt.excluded.status,
+            "updated_at": now,
+            "is_manual_override": True,
+            "override_by_teacher_id": teacher_id,
+            "override_reason": reason,
+            "verification_method": "teacher_override",
+            "version": AttendanceRecord.version + 1
+        }
+        if notes:
+            set_values["notes"] = notes
+        
+        result = await self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["class_session_id", "student_id"],
+                set_=set_values
+            ).returning(
+                AttendanceRecord.id,
+                AttendanceRecord.student_id,
+                AttendanceRecord.version
+            )
+        )
+        written_rows = result.all()
+        
+        # version 1 is a record this statement created; a record it updated
+        # without one read above was created concurrently, status unknown
+        transitions = []
+        created_count = 0
+        unknown_previous = False
+        for row in written_rows:
+            if row.version == 1:
+                created_count += 1
+                transitions.append((None, new_status))
+            elif row.student_id in previous_status:
+                transitions.append((previous_status[row.student_id], new_status))
+            else:
+                unknown_previous = True
+        
+        # One multi-row insert for the whole audit trail
+        audit_metadata = json.dumps({"operation": operation.value, "bulk_reason": reason})
+        audit_reason = f"Bulk operation: {operation.value} - {reason}"
+        audit_rows = [
+            {
+                "attendance_record_id": row.id,
+                "user_id": teacher_id,
+                "action": "bulk_update",
+                "old_status": None if row.version == 1 else previous_status.get(row.student_id),
+                "new_status": new_status,
+                "reason": audit_reason,
+                "ip_address": ip_address,
+                "user_agent": user_agent,
+                "audit_metadata": audit_metadata
+            }
+            for row in written_rows
+        ]
+        await self.db.execute(insert(AttendanceAuditLog.__table__), audit_rows)
+        
+        if unknown_previous:
+            record_unknown_change(self.db, class_session_id)
+        else:
+            record_status_changes(
+                self.db,
+                class_session_id,
+                transitions,
+                created_count if new_status != AttendanceStatus.ABSENT else 0
+            )
+        record_analytics_change(self.db, class_session_id, target_student_ids)
+        await upsert_timeline_entries(self.db, [row.id for row in written_rows])
         
         return {
-            "processed_count": processed_count,
-            "failed_count": failed_count,
+            "processed_count": len(target_student_ids),
+            "failed_count": len(failed_students),
             "failed_students": failed_students
         }
     
@@ -313,7 +539,22 @@ class AttendanceEngine:
         
         stats = result.first()
         
-        if stats.total == 0:
+        return self.build_attendance_stats(
+            stats.total, stats.present, stats.late, stats.absent, stats.excused
+        )
+    
+    @staticmethod
+    def build_attendance_stats(
+        total: int,
+        present: int,
+        late: int,
+        absent: int,
+        excused: int
+    ) -> AttendanceStats:
+        """
+        Build attendance statistics from per-status counts.
+        """
+        if total == 0:
             return AttendanceStats(
                 total_students=0,
                 present_count=0,
@@ -324,19 +565,33 @@ class AttendanceEngine:
                 late_rate=0.0
             )
         
-        attendance_rate = (stats.present + stats.late + stats.excused) / stats.total
-        late_rate = stats.late / stats.total if stats.total > 0 else 0.0
+        attendance_rate = (present + late + excused) / total
+        late_rate = late / total
         
         return AttendanceStats(
-            total_students=stats.total,
-            present_count=stats.present,
-            late_count=stats.late,
-            absent_count=stats.absent,
-            excused_count=stats.excused,
+            total_students=total,
+            present_count=present,
+            late_count=late,
+            absent_count=absent,
+            excused_count=excused,
             attendance_rate=round(attendance_rate, 3),
             late_rate=round(late_rate, 3)
         )
     
+    @classmethod
+    def stats_from_status_counts(cls, status_counts: Dict[AttendanceStatus, int]) -> AttendanceStats:
+        """
+        Build attendance statistics from records that were already fetched,
+        e.g. a Counter of their statuses, without another aggregate query.
+        """
+        return cls.build_attendance_stats(
+            sum(status_counts.values()),
+            status_counts.get(AttendanceStatus.PRESENT, 0),
+            status_counts.get(AttendanceStatus.LATE, 0),
+            status_counts.get(AttendanceStatus.ABSENT, 0),
+            status_counts.get(AttendanceStatus.EXCUSED, 0)
+        )
+    
     async def analyze_student_attendance_pattern(
         self,
         student_id: int,
@@ -0,0 +1,225 @@
+"""
+Columnar attendance fact store for the analytics layer.
+
+Institution-wide analytics used to load every (AttendanceRecord,
+ClassSession, student name) ORM tuple of the period, which at a year's
+worth of records means millions of objects per request. AttendanceFacts
+keeps only what the aggregates need, one NumPy column per field:
+
+- ``student_id`` / ``session_id``: int64
+- ``start_time``: int64 session start, seconds since the epoch (UTC)
+- ``status``: int8 index into STATUSES
+- ``subject``: int32 index into ``subjects`` (the session's subject, used as
+  the department)
+
+That is 29 bytes per record. The columns are filled from a streaming Core
+query, so no ORM objects are created, and the aggregates over them are
+vectorized.
+
+The institutional analytics consume an AttendanceSummary, which is built
+either from the facts (``AttendanceFacts.summarize``) or directly from the
+precomputed rollups (app.services.attendance_rollups).
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.models.class_session import ClassSession
+
+# Status codes are indexes into this tuple
+STATUSES: Tuple[AttendanceStatus, ...] = tuple(AttendanceStatus)
+STATUS_CODES: Dict[AttendanceStatus, int] = {status: code for code, status in enumerate(STATUSES)}
+ATTENDING_CODES = np.array([
+    STATUS_CODES[AttendanceStatus.PRESENT],
+    STATUS_CODES[AttendanceStatus.LATE],
+    STATUS_CODES[AttendanceStatus.EXCUSED]
+], dtype=np.int8)
+LATE_CODE = STATUS_CODES[AttendanceStatus.LATE]
+
+FACTS_STREAM_BATCH_SIZE = 10000
+
+
+@dataclass
+class AttendanceSummary:
+    """
+    Aggregates of a period's attendance, as used by the institutional analytics.
+
+    Per-subject arrays are aligned with ``subjects``; per-time-bucket arrays
+    with ``times`` (epoch seconds of session starts or of days); per-student
+    arrays with ``student_ids``.
+    """
+    total_classes: int
+    subjects: List[Optional[str]]
+    subject_records: np.ndarray
+    subject_attended: np.ndarray
+    subject_late: np.ndarray
+    subject_students: np.ndarray
+    subject_sessions: np.ndarray
+    times: np.ndarray
+    time_records: np.ndarray
+    time_attended: np.ndarray
+    student_ids: np.ndarray
+    student_records: np.ndarray
+    student_attended: np.ndarray
+    student_late: np.ndarray
+
+    @property
+    def total_records(self) -> int:
+        return int(self.subject_records.sum())
+
+    @property
+    def total_students(self) -> int:
+        return int(self.student_ids.size)
+
+    @property
+    def attendance_rate(self) -> float:
+        total = self.total_records
+        return float(self.subject_attended.sum() / total) if total else 0.0
+
+
+@dataclass
+class AttendanceFacts:
+    """Attendance records of a period as parallel NumPy columns."""
+    student_id: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    session_id: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    start_time: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    status: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int8))
+    subject: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    subjects: List[Optional[str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the columns."""
+        return sum(column.nbytes for column in (
+            self.student_id, self.session_id, self.start_time, self.status, self.subject
+        ))
+
+    def attending(self) -> np.ndarray:
+        """Boolean mask of records counted as attended (present, late or excused)."""
+        return np.isin(self.status, ATTENDING_CODES)
+
+    def late(self) -> np.ndarray:
+        """Boolean mask of late records."""
+        return self.status == LATE_CODE
+
+    def student_count(self) -> int:
+        return int(np.unique(self.student_id).size)
+
+    def session_count(self) -> int:
+        return int(np.unique(self.session_id).size)
+
+    def per_student(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Aggregate by student.
+
+        Returns ``(student_ids, records, attended, late)``, where the last
+        three are per-student counts aligned with the sorted ``student_ids``.
+        """
+        student_ids, index = np.unique(self.student_id, return_inverse=True)
+        records = np.bincount(index, minlength=student_ids.size)
+        attended = np.bincount(index, weights=self.attending(), minlength=student_ids.size)
+        late = np.bincount(index, weights=self.late(), minlength=student_ids.size)
+        return student_ids, records, attended, late
+
+    def summarize(self) -> AttendanceSummary:
+        """Aggregate the facts for the institutional analytics."""
+        attending = self.attending()
+        late = self.late()
+        subject_count = len(self.subjects)
+
+        # Distinct (subject, student) and (subject, session) pairs
+        subject_students = np.bincount(
+            np.unique(np.stack([self.subject, self.student_id]), axis=1)[0],
+            minlength=subject_count
+        )
+        subject_sessions = np.bincount(
+            np.unique(np.stack([self.subject, self.session_id]), axis=1)[0],
+            minlength=subject_count
+        )
+
+        times, time_index = np.unique(self.start_time, return_inverse=True)
+        student_ids, student_records, student_attended, student_late = self.per_student()
+
+        return AttendanceSummary(
+            total_classes=self.session_count(),
+            subjects=list(self.subjects),
+            subject_records=np.bincount(self.subject, minlength=subject_count),
+            subject_attended=np.bincount(self.subject, weights=attending, minlength=subject_count),
+            subject_late=np.bincount(self.subject, weights=late, minlength=subject_count),
+            subject_students=subject_students,
+            subject_sessions=subject_sessions,
+            times=times,
+            time_records=np.bincount(time_index, minlength=times.size),
+            time_attended=np.bincount(time_index, weights=attending, minlength=times.size),
+            student_ids=student_ids,
+            student_records=student_records,
+            student_attended=student_attended,
+            student_late=student_late
+        )
+
+
+async def load_attendance_facts(
+    db: AsyncSession,
+    start_date: datetime,
+    end_date: datetime,
+    subject: Optional[str] = None,
+    batch_size: int = FACTS_STREAM_BATCH_SIZE
+) -> AttendanceFacts:
+    """Stream the attendance records of sessions starting in the period into columns."""
+    query = (
+        select(
+            AttendanceRecord.student_id,
+            AttendanceRecord.class_session_id,
+            ClassSession.start_time,
+            AttendanceRecord.status,
+            ClassSession.subject
+        )
+        .join(ClassSession, AttendanceRecord.class_session_id == ClassSession.id)
+        .where(ClassSession.start_time.between(start_date, end_date))
+    )
+    if subject is not None:
+        query = query.where(ClassSession.subject == subject)
+
+    subject_index: Dict[Optional[str], int] = {}
+    columns: Dict[str, List[np.ndarray]] = {
+        "student_id": [], "session_id": [], "start_time": [], "status": [], "subject": []
+    }
+
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for partition in result.partitions():
+        student_ids, session_ids, start_times, statuses, subjects = zip(*partition)
+        count = len(partition)
+
+        columns["student_id"].append(np.fromiter(student_ids, dtype=np.int64, count=count))
+        columns["session_id"].append(np.fromiter(session_ids, dtype=np.int64, count=count))
+        columns["start_time"].append(epoch_seconds(start_times))
+        columns["status"].append(np.fromiter(
+            (STATUS_CODES[status] for status in statuses), dtype=np.int8, count=count
+        ))
+        columns["subject"].append(np.fromiter(
+            (subject_index.setdefault(name, len(subject_index)) for name in subjects),
+            dtype=np.int32, count=count
+        ))
+
+    if not columns["status"]:
+        return AttendanceFacts()
+
+    return AttendanceFacts(
+        **{name: np.concatenate(parts) for name, parts in columns.items()},
+        subjects=list(subject_index)
+    )
+
+
+def epoch_seconds(times) -> np.ndarray:
+    """Convert datetimes (naive UTC or aware) to int64 epoch seconds."""
+    if times and times[0].tzinfo is not None:
+        times = [t.astimezone(timezone.utc).replace(tzinfo=None) for t in times]
+    return np.array(times, dtype="datetime64[s]").astype(np.int64)
@@ -0,0 +1,447 @@
+"""
+Incremental maintenance of the attendance rollup tables.
+
+The analytics endpoints aggregate attendance over windows of weeks to years.
+Rather than scanning ``attendance_records`` on every request, the rollups in
+app.models.attendance_rollup keep per-day, per-class and per-student status
+counts, and AttendanceAnalyticsService reads those whenever they are fresh.
+
+Refreshing is incremental. A watermark records the latest record change
+(``created_at``/``updated_at``) already folded in; a refresh finds the session
+days touched by records changed since then and rebuilds the rollup rows of
+those days from the raw records, in chunks of days. Rebuilding a day is
+idempotent, so changes are looked up with some overlap before the watermark
+to catch transactions that committed late. The first refresh builds the
+rollups for the whole history.
+
+A background task refreshes the rollups periodically. Reads see every
+change: the session days with record changes since the watermark (with the
+same overlap) are aggregated from the raw records on the fly and take the
+place of those days' rollup rows. Reads fall back to the raw records
+entirely when the last refresh is older than ``max_staleness_seconds``.
+
+Limitations: deleted records and rescheduled sessions (a changed
+``start_time`` or subject) are not detected by the watermark; run
+``refresh(db, full=True)`` after such maintenance.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Sequence
+
+import numpy as np
+from sqlalchemy import select, delete, insert, func, case, or_, union_all, Date
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.models.attendance_rollup import (
+    AttendanceDailyRollup, AttendanceClassRollup, AttendanceStudentRollup, RollupWatermark
+)
+from app.models.class_session import ClassSession
+from app.services.attendance_facts import AttendanceSummary
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "attendance"
+
+COUNT_COLUMNS = (
+    "present_count", "late_count", "absent_count", "excused_count",
+    "late_arrivals", "late_minutes_sum", "late_minutes_sq_sum", "late_minutes_max"
+)
+
+
+def _session_day():
+    return func.date(ClassSession.start_time, type_=Date)
+
+
+def _session_subject():
+    return func.coalesce(ClassSession.subject, "")
+
+
+def _count_expressions() -> List:
+    """Aggregates over AttendanceRecord for the rollup count columns, in COUNT_COLUMNS order."""
+    status = AttendanceRecord.status
+    is_late = AttendanceRecord.is_late == True
+    late_minutes = case((is_late, func.coalesce(AttendanceRecord.late_minutes, 0)), else_=0)
+    return [
+        func.sum(case((status == AttendanceStatus.PRESENT, 1), else_=0)),
+        func.sum(case((status == AttendanceStatus.LATE, 1), else_=0)),
+        func.sum(case((status == AttendanceStatus.ABSENT, 1), else_=0)),
+        func.sum(case((status == AttendanceStatus.EXCUSED, 1), else_=0)),
+        func.sum(case((is_late, 1), else_=0)),
+        func.sum(late_minutes),
+        func.sum(late_minutes * late_minutes),
+        func.max(late_minutes)
+    ]
+
+
+def _changes_since(since: Optional[datetime]):
+    """Session days with records changed since ``since`` (all days if None), with their latest change."""
+    changed_at = func.coalesce(AttendanceRecord.updated_at, AttendanceRecord.created_at)
+    changes = (
+        select(_session_day().label("day"), func.max(changed_at).label("changed_at"))
+        .join(ClassSession, AttendanceRecord.class_session_id == ClassSession.id)
+        .where(ClassSession.start_time.is_not(None))
+        .group_by(_session_day())
+    )
+    if since is not None:
+        # Separate conditions so each can use its own index
+        changes = changes.where(or_(
+            AttendanceRecord.created_at >= since,
+            AttendanceRecord.updated_at >= since
+        ))
+    return changes
+
+
+def _group_columns(model) -> Dict[str, Any]:
+    """The columns a rollup is grouped by, keyed by the rollup's column names."""
+    columns = {"day": _session_day(), "subject": _session_subject()}
+    if model is AttendanceClassRollup:
+        columns = {"class_session_id": ClassSession.id, "class_id": ClassSession.class_id, **columns}
+    elif model is AttendanceStudentRollup:
+        columns = {"student_id": AttendanceRecord.student_id, **columns}
+    return columns
+
+
+def _aggregate_days(model, days: List[date]):
+    """SELECT of ``model``'s rows for the sorted ``days``, aggregated from the raw records."""
+    group_columns = _group_columns(model)
+    return (
+        select(
+            *(column.label(name) for name, column in group_columns.items()),
+            *(count.label(name) for name, count in zip(COUNT_COLUMNS, _count_expressions()))
+        )
+        .select_from(AttendanceRecord)
+        .join(ClassSession, AttendanceRecord.class_session_id == ClassSession.id)
+        .where(
+            # Range bounds let the start_time index narrow the scan
+            ClassSession.start_time >= datetime.combine(days[0], datetime.min.time()),
+            ClassSession.start_time < datetime.combine(days[-1] + timedelta(days=1), datetime.min.time()),
+            _session_day().in_(days)
+        )
+        .group_by(*group_columns.values())
+    )
+
+
+def _total(model):
+    return model.present_count + model.late_count + model.absent_count + model.excused_count
+
+
+def _attended(model):
+    return model.present_count + model.late_count + model.excused_count
+
+
+def _day_epochs(days: Sequence[date]) -> np.ndarray:
+    return np.array(days, dtype="datetime64[D]").astype("datetime64[s]").astype(np.int64)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class AttendanceRollups:
+    """Refreshes the attendance rollups and reads analytics aggregates from them."""
+
+    def __init__(
+        self,
+        refresh_interval_seconds: float = 60.0,
+        max_staleness_seconds: float = 300.0,
+        overlap_seconds: float = 300.0,
+        day_chunk: int = 31
+    ):
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.max_staleness_seconds = max_staleness_seconds
+        self.overlap_seconds = overlap_seconds
+        self.day_chunk = day_chunk
+
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        self._stats = {
+            'refreshes': 0,
+            'days_rebuilt': 0,
+            'last_refresh_ms': 0.0
+        }
+
+    # Refresh
+
+    async def refresh(self, db: AsyncSession, full: bool = False) -> int:
+        """
+        Fold record changes since the watermark into the rollups.
+
+        Returns the number of days rebuilt. With ``full``, or when the
+        rollups were never built, every day with attendance is rebuilt.
+        """
+        started = time.perf_counter()
+        refreshed_at = datetime.utcnow()
+
+        state = await db.get(RollupWatermark, ROLLUP_NAME)
+        since = None
+        if state is not None and state.watermark is not None and not full:
+            since = _naive_utc(state.watermark) - timedelta(seconds=self.overlap_seconds)
+
+        rows = (await db.execute(_changes_since(since))).all()
+        days = sorted(row.day for row in rows)
+
+        for offset in range(0, len(days), self.day_chunk):
+            await self._rebuild_days(db, days[offset:offset + self.day_chunk])
+            await db.commit()
+
+        watermark = max((row.changed_at for row in rows), default=None)
+        if state is None:
+            state = RollupWatermark(name=ROLLUP_NAME, watermark=watermark, refreshed_at=refreshed_at)
+            db.add(state)
+        else:
+            if watermark is not None and (state.watermark is None or full or watermark > state.watermark):
+                state.watermark = watermark
+            state.refreshed_at = refreshed_at
+        await db.commit()
+
+        self._stats['refreshes'] += 1
+        self._stats['days_rebuilt'] += len(days)
+        self._stats['last_refresh_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return len(days)
+
+    async def _rebuild_days(self, db: AsyncSession, days: List[date]):
+        """Replace the rollup rows of ``days`` with fresh aggregates of their records."""
+        for model in (AttendanceDailyRollup, AttendanceClassRollup, AttendanceStudentRollup):
+            await db.execute(delete(model).where(model.day.in_(days)))
+
+        for model in (AttendanceDailyRollup, AttendanceClassRollup, AttendanceStudentRollup):
+            await db.execute(insert(model).from_select(
+                [*_group_columns(model), *COUNT_COLUMNS], _aggregate_days(model, days)
+            ))
+
+    # Reads
+
+    async def covers(self, db: AsyncSession, end_date: datetime) -> bool:
+        """
+        Whether the rollups can answer a window ending at ``end_date``.
+
+        The rollups span the whole history once built, and changes since the
+        last refresh are read from the raw records, so this only bounds how
+        much of the window is aggregated on the fly.
+        """
+        refreshed_at = await db.scalar(
+            select(RollupWatermark.refreshed_at).where(RollupWatermark.name == ROLLUP_NAME)
+        )
+        if refreshed_at is None:
+            return False
+        return _naive_utc(refreshed_at) >= _naive_utc(end_date) - timedelta(seconds=self.max_staleness_seconds)
+
+    async def _changed_days(
+        self,
+        db: AsyncSession,
+        first_day: Optional[date] = None,
+        last_day: Optional[date] = None
+    ) -> List[date]:
+        """Sorted session days whose records may have changed since the last refresh."""
+        watermark = await db.scalar(
+            select(RollupWatermark.watermark).where(RollupWatermark.name == ROLLUP_NAME)
+        )
+        since = None
+        if watermark is not None:
+            since = _naive_utc(watermark) - timedelta(seconds=self.overlap_seconds)
+
+        changes = _changes_since(since)
+        if first_day is not None:
+            changes = changes.where(_session_day().between(first_day, last_day))
+        return sorted((await db.execute(changes)).scalars())
+
+    def _current(self, model, changed_days: List[date]):
+        """
+        ``model`` with the rows of ``changed_days`` aggregated from the raw
+        records instead of read from the rollup table.
+        """
+        if not changed_days:
+            return model
+        columns = [*_group_columns(model), *COUNT_COLUMNS]
+        rolled_up = select(*(model.__table__.c[name] for name in columns)).where(model.day.not_in(changed_days))
+        return aliased(model, union_all(rolled_up, _aggregate_days(model, changed_days)).subquery())
+
+    async def load_summary(
+        self,
+        db: AsyncSession,
+        start_date: datetime,
+        end_date: datetime,
+        subject: Optional[str] = None
+    ) -> AttendanceSummary:
+        """
+        Aggregate the rollups of the days from ``start_date`` to ``end_date``.
+
+        Windows are widened to whole days.
+        """
+        first_day, last_day = start_date.date(), end_date.date()
+        changed_days = await self._changed_days(db, first_day, last_day)
+        daily_rollup = self._current(AttendanceDailyRollup, changed_days)
+        student_rollup = self._current(AttendanceStudentRollup, changed_days)
+        class_rollup = self._current(AttendanceClassRollup, changed_days)
+
+        def window(model):
+            conditions = [model.day.between(first_day, last_day)]
+            if subject is not None:
+                conditions.append(model.subject == subject)
+            return conditions
+
+        daily = (await db.execute(
+            select(
+                daily_rollup.day,
+                daily_rollup.subject,
+                _total(daily_rollup),
+                _attended(daily_rollup),
+                daily_rollup.late_count
+            ).where(*window(daily_rollup))
+        )).all()
+
+        # Per student and subject; split into per-student totals and per-subject
+        # student counts below, so the largest rollup is scanned once
+        students = (await db.execute(
+            select(
+                student_rollup.student_id,
+                student_rollup.subject,
+                func.sum(_total(student_rollup)),
+                func.sum(_attended(student_rollup)),
+                func.sum(student_rollup.late_count)
+            )
+            .where(*window(student_rollup))
+            .group_by(student_rollup.student_id, student_rollup.subject)
+        )).all()
+
+        subject_sessions = dict((await db.execute(
+            select(class_rollup.subject, func.count())
+            .where(*window(class_rollup))
+            .group_by(class_rollup.subject)
+        )).all())
+
+        subject_index: Dict[str, int] = {}
+        day_rows = list(zip(*daily)) if daily else [[], [], [], [], []]
+        days, subjects, records, attended, late = day_rows
+        subject_codes = np.array(
+            [subject_index.setdefault(name, len(subject_index)) for name in subjects], dtype=np.int64
+        )
+        subject_names = list(subject_index)
+        subject_count = len(subject_names)
+        records = np.array(records, dtype=np.int64)
+        attended = np.array(attended, dtype=np.int64)
+
+        times, time_index = np.unique(_day_epochs(days), return_inverse=True)
+
+        student_columns = list(zip(*students)) if students else [[], [], [], [], []]
+        student_ids, student_index = np.unique(
+            np.array(student_columns[0], dtype=np.int64), return_inverse=True
+        )
+        subject_students = Counter(student_columns[1])
+
+        def per_student(column):
+            return np.bincount(
+                student_index, weights=np.array(column, dtype=np.int64), minlength=student_ids.size
+            ).astype(np.int64)
+
+        return AttendanceSummary(
+            total_classes=sum(subject_sessions.values()),
+            subjects=subject_names,
+            subject_records=np.bincount(subject_codes, weights=records, minlength=subject_count),
+            subject_attended=np.bincount(subject_codes, weights=attended, minlength=subject_count),
+            subject_late=np.bincount(
+                subject_codes, weights=np.array(late, dtype=np.int64), minlength=subject_count
+            ),
+            subject_students=np.array([subject_students.get(name, 0) for name in subject_names], dtype=np.int64),
+            subject_sessions=np.array([subject_sessions.get(name, 0) for name in subject_names], dtype=np.int64),
+            times=times,
+            time_records=np.bincount(time_index, weights=records, minlength=times.size),
+            time_attended=np.bincount(time_index, weights=attended, minlength=times.size),
+            student_ids=student_ids,
+            student_records=per_student(student_columns[2]),
+            student_attended=per_student(student_columns[3]),
+            student_late=per_student(student_columns[4])
+        )
+
+    async def load_student_days(
+        self,
+        db: AsyncSession,
+        student_id: int,
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[Any]:
+        """A student's rollup counts per day (all subjects combined), oldest first."""
+        changed_days = await self._changed_days(db, start_date.date(), end_date.date())
+        student_rollup = self._current(AttendanceStudentRollup, changed_days)
+        result = await db.execute(
+            select(
+                student_rollup.day,
+                *(
+                    func.max(getattr(student_rollup, column)).label(column)
+                    if column == "late_minutes_max"
+                    else func.sum(getattr(student_rollup, column)).label(column)
+                    for column in COUNT_COLUMNS
+                )
+            )
+            .where(
+                student_rollup.student_id == student_id,
+                student_rollup.day.between(start_date.date(), end_date.date())
+            )
+            .group_by(student_rollup.day)
+            .order_by(student_rollup.day)
+        )
+        return result.all()
+
+    async def load_class_history(self, db: AsyncSession, class_id: int, limit: int) -> List[AttendanceClassRollup]:
+        """The rollups of a class's latest ``limit`` sessions, oldest first."""
+        class_rollup = self._current(AttendanceClassRollup, await self._changed_days(db))
+        result = await db.execute(
+            select(class_rollup)
+            .where(class_rollup.class_id == class_id)
+            .order_by(class_rollup.day.desc(), class_rollup.class_session_id.desc())
+            .limit(limit)
+            # Rows aggregated on the fly must not be served from the identity map
+            .execution_options(populate_existing=True)
+        )
+        return list(reversed(result.scalars().all()))
+
+    # Background refresh
+
+    def start_refresh(self):
+        """Start the periodic refresh task on the running event loop."""
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.get_running_loop().create_task(self._periodic_refresh())
+
+    async def shutdown(self):
+        """Stop the periodic refresh task."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _periodic_refresh(self):
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self.refresh(db)
+                await asyncio.sleep(self.refresh_interval_seconds)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error refreshing attendance rollups: {e}")
+                await asyncio.sleep(self.refresh_interval_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get refresh statistics."""
+        return dict(self._stats)
+
+
+# Global rollups instance
+attendance_rollups = AttendanceRollups(
+    refresh_interval_seconds=settings.ROLLUP_REFRESH_SECONDS,
+    max_staleness_seconds=settings.ROLLUP_MAX_STALENESS_SECONDS,
+    overlap_seconds=settings.ROLLUP_REFRESH_OVERLAP_SECONDS,
+    day_chunk=settings.ROLLUP_REFRESH_DAY_CHUNK
+)
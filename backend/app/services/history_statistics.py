@@ -0,0 +1,180 @@
+"""
+Single-pass statistics kernel for a student's attendance history.
+
+AdvancedPatternDetector derives basic statistics, weekly trends, seasonal
+patterns and behavioral patterns from the same history. Each helper used to
+walk the (AttendanceRecord, ClassSession, User) tuples on its own, several
+times over (one ``list.count`` per status, one scan per streak, one per
+grouping). ``compute_history_statistics`` walks the history once and keeps
+every aggregate those helpers need:
+
+- status counts and the longest run of each status
+- count, mean, spread and maximum of late minutes (records with any)
+- per-week, per-weekday and per-hour attendance score sums, in history order
+- check-in delays, grace period and late arrival counts of attended records
+- manual overrides and status changes
+
+Means and spreads are accumulated with Welford's algorithm, so the helpers
+only do O(weeks) work on top of the O(n) pass.
+
+The kernel takes plain tuples (see ``HistoryRow``) rather than ORM objects,
+so that it can run in the compute executor's worker processes
+(app.core.compute).
+"""
+import math
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Tuple, Sequence, Optional, NamedTuple, Any
+
+from app.models.attendance import AttendanceStatus
+
+# Score of each status in trend and seasonal analysis
+STATUS_SCORES: Dict[AttendanceStatus, float] = {
+    AttendanceStatus.PRESENT: 1.0,
+    AttendanceStatus.LATE: 0.8,
+    AttendanceStatus.EXCUSED: 0.6,
+    AttendanceStatus.ABSENT: 0.0
+}
+
+
+class HistoryRow(NamedTuple):
+    """Fields of an attendance record and its session used by the kernel, in row order."""
+    status: AttendanceStatus
+    start_time: datetime
+    check_in_time: Optional[datetime]
+    late_minutes: Optional[int]
+    is_late: bool
+    grace_period_used: bool
+    is_manual_override: bool
+
+
+@dataclass
+class RunningMoments:
+    """Count, mean and sum of squared deviations of a stream of values."""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    maximum: float = 0
+
+    def add(self, value: float):
+        if self.count == 0 or value > self.maximum:
+            self.maximum = value
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def stdev(self) -> float:
+        """Sample standard deviation, 0 with fewer than two values."""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+@dataclass
+class ScoreBuckets:
+    """Attendance score sums and counts per bucket, in first-seen order."""
+    sums: Dict[Any, float] = field(default_factory=dict)
+    counts: Dict[Any, int] = field(default_factory=dict)
+
+    def add(self, bucket: Any, score: float):
+        if bucket in self.counts:
+            self.sums[bucket] += score
+            self.counts[bucket] += 1
+        else:
+            self.sums[bucket] = score
+            self.counts[bucket] = 1
+
+    def averages(self) -> Dict[Any, float]:
+        return {bucket: self.sums[bucket] / count for bucket, count in self.counts.items()}
+
+
+@dataclass
+class HistoryStatistics:
+    """Aggregates of an attendance history, ordered by session start."""
+    total: int = 0
+    status_counts: Dict[AttendanceStatus, int] = field(
+        default_factory=lambda: {status: 0 for status in AttendanceStatus}
+    )
+    max_streaks: Dict[AttendanceStatus, int] = field(
+        default_factory=lambda: {status: 0 for status in AttendanceStatus}
+    )
+    late_minutes: RunningMoments = field(default_factory=RunningMoments)
+    weekly_scores: ScoreBuckets = field(default_factory=ScoreBuckets)
+    weekday_scores: ScoreBuckets = field(default_factory=ScoreBuckets)
+    hour_scores: ScoreBuckets = field(default_factory=ScoreBuckets)
+    check_in_delays: RunningMoments = field(default_factory=RunningMoments)
+    grace_period_uses: int = 0
+    late_arrivals: int = 0
+    manual_overrides: int = 0
+    status_changes: int = 0
+
+    def __len__(self) -> int:
+        return self.total
+
+
+def week_key(start_time: datetime) -> Tuple[int, int]:
+    """``(year, week)`` with weeks starting on Monday, as ``strftime("%Y-%W")``."""
+    return start_time.year, (start_time.timetuple().tm_yday + 6 - start_time.weekday()) // 7
+
+
+def history_rows(attendance_data: Sequence[Tuple[Any, ...]]) -> List[Tuple]:
+    """
+    Rows of (record, session, ...) tuples, in HistoryRow field order.
+
+    Plain tuples rather than HistoryRow instances, as they pickle about twice
+    as fast on their way to a worker process.
+    """
+    return [
+        (
+            record.status, session.start_time, record.check_in_time, record.late_minutes,
+            bool(record.is_late), bool(record.grace_period_used), bool(record.is_manual_override)
+        )
+        for record, session, *_ in attendance_data
+    ]
+
+
+def compute_history_statistics(rows: Sequence[Tuple]) -> HistoryStatistics:
+    """Aggregate a history's rows, oldest first, in one pass."""
+    stats = HistoryStatistics(total=len(rows))
+    status_counts = stats.status_counts
+    max_streaks = stats.max_streaks
+
+    previous_status = None
+    streak = 0
+
+    for status, start_time, check_in_time, late_minutes, is_late, grace_period_used, is_manual_override in rows:
+        status_counts[status] += 1
+
+        if status == previous_status:
+            streak += 1
+        else:
+            if previous_status is not None:
+                stats.status_changes += 1
+            streak = 1
+        if streak > max_streaks[status]:
+            max_streaks[status] = streak
+        previous_status = status
+
+        if late_minutes:
+            stats.late_minutes.add(late_minutes)
+        if is_manual_override:
+            stats.manual_overrides += 1
+
+        score = STATUS_SCORES[status]
+        stats.weekly_scores.add(week_key(start_time), score)
+        stats.weekday_scores.add(start_time.weekday(), score)
+        stats.hour_scores.add(start_time.hour, score)
+
+        if check_in_time and status != AttendanceStatus.ABSENT:
+            stats.check_in_delays.add((check_in_time - start_time).total_seconds() / 60)
+            if grace_period_used:
+                stats.grace_period_uses += 1
+            if is_late:
+                stats.late_arrivals += 1
+
+    return stats
+
+
+def compute_history_statistics_batch(histories: Sequence[Sequence[Tuple]]) -> List[HistoryStatistics]:
+    """``compute_history_statistics`` of several histories, in one executor call."""
+    return [compute_history_statistics(rows) for rows in histories]
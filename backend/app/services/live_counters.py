@@ -0,0 +1,396 @@
+"""
+In-memory live attendance counters for active class sessions.
+
+Teacher dashboards ask for session statistics after every check-in, which
+used to mean a fresh COUNT aggregate over the session's attendance records.
+LiveSessionCounters keeps those counts in memory instead:
+
+- each session is seeded from the database once, on first use
+- AttendanceEngine records a delta for every create, status change and bulk
+  operation; deltas are applied when the surrounding transaction commits and
+  dropped if it rolls back
+- a background task periodically reconciles the counters with the database
+  to correct drift from writes made by other worker processes
+
+Reading the statistics of a seeded session is then O(1).
+"""
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Any, Iterable
+
+from sqlalchemy import select, func, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.single_flight import SingleFlight
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.models.class_session import ClassSession, StudentEnrollment
+from app.schemas.attendance import AttendanceStats
+from app.services.system_stats import system_stats_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Key under which uncommitted deltas are kept in Session.info
+_PENDING_KEY = "live_counter_deltas"
+
+
+@dataclass
+class SessionCounts:
+    """Attendance counts of one class session."""
+    class_session_id: int
+    class_name: str
+    status: str
+    total_enrolled: int
+    ends_at: Optional[datetime] = None
+    checked_in_count: int = 0
+    status_counts: Counter = field(default_factory=Counter)
+    last_updated: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    # Incremented on every applied delta so reconciliation can detect races
+    generation: int = 0
+
+    @property
+    def present_count(self) -> int:
+        return self.status_counts[AttendanceStatus.PRESENT]
+
+    @property
+    def late_count(self) -> int:
+        return self.status_counts[AttendanceStatus.LATE]
+
+    @property
+    def absent_count(self) -> int:
+        return self.status_counts[AttendanceStatus.ABSENT]
+
+    @property
+    def excused_count(self) -> int:
+        return self.status_counts[AttendanceStatus.EXCUSED]
+
+    @property
+    def time_remaining_minutes(self) -> Optional[int]:
+        if self.ends_at is None:
+            return None
+        now = datetime.utcnow() if self.ends_at.tzinfo is None else datetime.now(timezone.utc)
+        return max(0, int((self.ends_at - now).total_seconds() // 60))
+
+    def to_stats(self) -> AttendanceStats:
+        """Get the counts as AttendanceStats."""
+        from app.services.attendance_engine import AttendanceEngine
+        return AttendanceEngine.stats_from_status_counts(self.status_counts)
+
+
+class LiveSessionCounters:
+    """Per-session attendance counters, seeded once and maintained by deltas."""
+
+    def __init__(self, reconcile_interval_seconds: float = 60.0):
+        self.reconcile_interval_seconds = reconcile_interval_seconds
+
+        self._sessions: Dict[int, SessionCounts] = {}
+        self._seeds = SingleFlight()
+        # Sessions that received deltas while their seed query was running
+        self._changed_while_seeding: set = set()
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+        self._stats = {
+            'seeds': 0,
+            'deltas_applied': 0,
+            'reconciliations': 0,
+            'corrections': 0
+        }
+
+    # Reads
+
+    async def get(self, class_session_id: int, db: Optional[AsyncSession] = None) -> Optional[SessionCounts]:
+        """
+        Get the counts of a session, seeding them from the database on first use.
+
+        Returns None if the session does not exist.
+        """
+        counts = self._sessions.get(class_session_id)
+        if counts is not None:
+            return counts
+
+        return await self._seeds.do(class_session_id, lambda: self._seed_and_store(class_session_id, db))
+
+    async def _seed_and_store(self, class_session_id: int, db: Optional[AsyncSession]) -> Optional[SessionCounts]:
+        self._changed_while_seeding.discard(class_session_id)
+        try:
+            if db is None:
+                async with AsyncSessionLocal() as own_db:
+                    counts = await self._seed(own_db, class_session_id)
+            else:
+                counts = await self._seed(db, class_session_id)
+
+            # A delta that raced the seed query may or may not be included in
+            # it; serve this result but seed again on the next read
+            if counts is not None and class_session_id not in self._changed_while_seeding:
+                self._sessions[class_session_id] = counts
+            return counts
+        finally:
+            self._changed_while_seeding.discard(class_session_id)
+
+    def peek(self, class_session_id: int) -> Optional[SessionCounts]:
+        """Get the counts of a session only if they are already seeded."""
+        return self._sessions.get(class_session_id)
+
+    # Writes
+
+    def apply(
+        self,
+        class_session_id: int,
+        status_deltas: Dict[AttendanceStatus, int],
+        checked_in_delta: int = 0
+    ):
+        """Apply committed changes to a seeded session; unseeded sessions are ignored."""
+        if class_session_id in self._seeds:
+            self._changed_while_seeding.add(class_session_id)
+
+        counts = self._sessions.get(class_session_id)
+        if counts is None:
+            return
+
+        for status, delta in status_deltas.items():
+            counts.status_counts[status] += delta
+        counts.checked_in_count += checked_in_delta
+        counts.generation += 1
+        counts.last_updated = datetime.now(timezone.utc)
+        self._stats['deltas_applied'] += 1
+
+    def discard(self, class_session_id: int):
+        """Forget a session, e.g. after it ended; it is seeded again if read later."""
+        self._sessions.pop(class_session_id, None)
+        if class_session_id in self._seeds:
+            self._changed_while_seeding.add(class_session_id)
+
+    def clear(self):
+        """Forget all sessions."""
+        self._sessions.clear()
+
+    # Reconciliation
+
+    async def reconcile(self, db: AsyncSession) -> int:
+        """
+        Recount every seeded session from the database and correct drift.
+
+        Sessions that are no longer active are dropped. Returns the number of
+        sessions whose counters had drifted.
+        """
+        if not self._sessions:
+            return 0
+
+        session_ids = list(self._sessions)
+        generations = {sid: self._sessions[sid].generation for sid in session_ids}
+
+        result = await db.execute(
+            select(ClassSession.id, ClassSession.status).where(ClassSession.id.in_(session_ids))
+        )
+        session_status = {row.id: row.status for row in result.all()}
+
+        result = await db.execute(
+            select(
+                AttendanceRecord.class_session_id,
+                AttendanceRecord.status,
+                func.count(AttendanceRecord.id).label('count'),
+                func.count(AttendanceRecord.check_in_time).label('checked_in')
+            )
+            .where(AttendanceRecord.class_session_id.in_(session_ids))
+            .group_by(AttendanceRecord.class_session_id, AttendanceRecord.status)
+        )
+        actual: Dict[int, SessionCounts] = {}
+        for row in result.all():
+            counts = actual.setdefault(
+                row.class_session_id,
+                SessionCounts(row.class_session_id, "", "", 0)
+            )
+            counts.status_counts[row.status] = row.count
+            counts.checked_in_count += row.checked_in
+
+        corrections = 0
+        for sid in session_ids:
+            counts = self._sessions.get(sid)
+            # Skip sessions that changed while the recount was running
+            if counts is None or counts.generation != generations[sid]:
+                continue
+
+            if session_status.get(sid) != "active":
+                self.discard(sid)
+                continue
+
+            fresh = actual.get(sid) or SessionCounts(sid, "", "", 0)
+            fresh_status_counts = _nonzero(fresh.status_counts)
+            if (
+                _nonzero(counts.status_counts) != fresh_status_counts
+                or counts.checked_in_count != fresh.checked_in_count
+            ):
+                logger.warning(
+                    f"Live counters for session {sid} drifted "
+                    f"({dict(counts.status_counts)} != {dict(fresh_status_counts)}), correcting"
+                )
+                counts.status_counts = Counter(fresh_status_counts)
+                counts.checked_in_count = fresh.checked_in_count
+                counts.last_updated = datetime.now(timezone.utc)
+                corrections += 1
+
+        self._stats['reconciliations'] += 1
+        self._stats['corrections'] += corrections
+        return corrections
+
+    def start_reconciliation(self):
+        """Start the periodic reconciliation task on the running event loop."""
+        if self._reconcile_task is None:
+            self._reconcile_task = asyncio.get_running_loop().create_task(
+                self._periodic_reconcile()
+            )
+
+    async def shutdown(self):
+        """Stop the periodic reconciliation task."""
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+            try:
+                await self._reconcile_task
+            except asyncio.CancelledError:
+                pass
+            self._reconcile_task = None
+
+    async def _periodic_reconcile(self):
+        while True:
+            try:
+                await asyncio.sleep(self.reconcile_interval_seconds)
+                async with AsyncSessionLocal() as db:
+                    await self.reconcile(db)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error reconciling live session counters: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counter statistics."""
+        return {
+            **self._stats,
+            'tracked_sessions': len(self._sessions)
+        }
+
+    async def _seed(self, db: AsyncSession, class_session_id: int) -> Optional[SessionCounts]:
+        enrolled_count = (
+            select(func.count(StudentEnrollment.id))
+            .where(
+                StudentEnrollment.class_id == ClassSession.class_id,
+                StudentEnrollment.is_active == True
+            )
+            .correlate(ClassSession)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            select(
+                ClassSession.name,
+                ClassSession.status,
+                ClassSession.start_time,
+                ClassSession.end_time,
+                ClassSession.duration_minutes,
+                ClassSession.auto_end_minutes,
+                enrolled_count.label('enrolled')
+            )
+            .where(ClassSession.id == class_session_id)
+        )
+        session_row = result.first()
+        if session_row is None:
+            return None
+
+        result = await db.execute(
+            select(
+                AttendanceRecord.status,
+                func.count(AttendanceRecord.id).label('count'),
+                func.count(AttendanceRecord.check_in_time).label('checked_in')
+            )
+            .where(AttendanceRecord.class_session_id == class_session_id)
+            .group_by(AttendanceRecord.status)
+        )
+        ends_at = session_row.end_time
+        planned_minutes = session_row.duration_minutes or session_row.auto_end_minutes
+        if ends_at is None and session_row.start_time and planned_minutes:
+            ends_at = session_row.start_time + timedelta(minutes=planned_minutes)
+
+        counts = SessionCounts(
+            class_session_id=class_session_id,
+            class_name=session_row.name,
+            status=session_row.status,
+            total_enrolled=session_row.enrolled or 0,
+            ends_at=ends_at
+        )
+        for row in result.all():
+            counts.status_counts[row.status] = row.count
+            counts.checked_in_count += row.checked_in
+
+        # Sessions without a class roster count everyone who has a record
+        if counts.total_enrolled == 0:
+            counts.total_enrolled = sum(counts.status_counts.values())
+
+        self._stats['seeds'] += 1
+        return counts
+
+
+def _nonzero(status_counts: Counter) -> Counter:
+    return Counter({status: count for status, count in status_counts.items() if count != 0})
+
+
+def record_status_change(
+    db: AsyncSession,
+    class_session_id: int,
+    old_status: Optional[AttendanceStatus],
+    new_status: AttendanceStatus,
+    checked_in_delta: int = 0
+):
+    """Queue a single record change to be applied when ``db`` commits."""
+    record_status_changes(db, class_session_id, [(old_status, new_status)], checked_in_delta)
+
+
+def record_status_changes(
+    db: AsyncSession,
+    class_session_id: int,
+    transitions: Iterable,
+    checked_in_delta: int = 0
+):
+    """
+    Queue ``(old_status, new_status)`` transitions to be applied when ``db``
+    commits; ``old_status`` is None for newly created records.
+    """
+    status_deltas: Dict[AttendanceStatus, int] = Counter()
+    for old_status, new_status in transitions:
+        if old_status is not None:
+            status_deltas[old_status] -= 1
+        status_deltas[new_status] += 1
+
+    db.sync_session.info.setdefault(_PENDING_KEY, []).append(
+        (class_session_id, status_deltas, checked_in_delta)
+    )
+
+
+def record_unknown_change(db: AsyncSession, class_session_id: int):
+    """Queue a change whose previous state is unknown; the session and system stats are rebuilt."""
+    db.sync_session.info.setdefault(_PENDING_KEY, []).append((class_session_id, None, 0))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_deltas(session: Session):
+    for class_session_id, status_deltas, checked_in_delta in session.info.pop(_PENDING_KEY, []):
+        if status_deltas is None:
+            live_session_counters.discard(class_session_id)
+            # The system stats cannot apply an unknown change either; rebuild them
+            system_stats_snapshot.clear()
+        else:
+            live_session_counters.apply(class_session_id, status_deltas, checked_in_delta)
+            system_stats_snapshot.apply_attendance_deltas(status_deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_deltas(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Global counters instance
+live_session_counters = LiveSessionCounters(
+    reconcile_interval_seconds=settings.LIVE_COUNTERS_RECONCILE_SECONDS
+)
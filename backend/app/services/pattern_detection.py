@@ -3,22 +3,38 @@ Advanced pattern detection service for sophisticated attendance analytics.
 Implements machine learning algorithms and statistical analysis for 
 early intervention and attendance prediction.
 """
+import asyncio
+import inspect
+import json
+import logging
 import math
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Callable
 from dataclasses import dataclass
 from collections import defaultdict
-import statistics
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, or_, distinct
+from sqlalchemy import select, and_, func, or_, distinct, insert
 from sqlalchemy.orm import joinedload
 
+import numpy as np
+
 from app.models.attendance import AttendanceRecord, AttendanceStatus, AttendanceAuditLog
 from app.models.class_session import ClassSession
 from app.models.user import User, UserRole
+from app.models.attendance_pattern import (
+    AttendanceAlert as AttendanceAlertRecord, AlertSeverity, PatternType
+)
 from app.schemas.attendance import (
     StudentAttendancePattern, AttendanceAlert, AttendanceStats
 )
+from app.core.config import settings
+from app.services.analytics_cache import AnalyticsResultCache, analytics_result_cache, cached_result
+from app.services.history_statistics import (
+    HistoryStatistics, STATUS_SCORES, history_rows, compute_history_statistics, compute_history_statistics_batch
+)
+from app.core.compute import ComputeExecutor, compute_executor
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -51,14 +67,44 @@ class PredictionResult:
     recommended_actions: List[str]
 
 
+@dataclass
+class AlertBatchProgress:
+    """Progress of a batched early warning alert run."""
+    total_students: int
+    total_chunks: int
+    processed_students: int = 0
+    chunks_completed: int = 0
+    alerts_generated: int = 0
+    alerts_persisted: int = 0
+
+
+# Persisted alert type for the first matching risk factor
+RISK_FACTOR_ALERT_TYPES = [
+    ("critical_attendance_rate", PatternType.LOW_ATTENDANCE),
+    ("high_consecutive_absences", PatternType.CONSECUTIVE_ABSENCE),
+    ("declining_trend", PatternType.DECLINING_TREND),
+    ("low_attendance_rate", PatternType.LOW_ATTENDANCE),
+    ("medium_consecutive_absences", PatternType.CONSECUTIVE_ABSENCE),
+]
+
+
 class AdvancedPatternDetector:
     """
     Advanced pattern detection with machine learning algorithms,
     statistical analysis, and early warning system.
     """
     
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        result_cache: Optional[AnalyticsResultCache] = None,
+        executor: Optional[ComputeExecutor] = None
+    ):
         self.db = db
+        # Memoized results of the read-only analyses
+        self.result_cache = result_cache or analytics_result_cache
+        # Runs the CPU-bound statistics off the event loop
+        self.executor = executor or compute_executor
         
         # Configuration parameters
         self.min_data_points = 10
@@ -73,6 +119,11 @@ class AdvancedPatternDetector:
         self.low_attendance_rate = 0.75
         self.high_lateness_rate = 0.3
         
+        # Anomaly detection
+        self.anomaly_min_records = 5
+        self.absence_spike_threshold = 0.3
+        self.history_stream_batch_size = 5000
+        
         # Pattern detection weights
         self.pattern_weights = {
             "consecutive_absences": 0.4,
@@ -81,6 +132,7 @@ class AdvancedPatternDetector:
             "trend_direction": 0.15
         }
 
+    @cached_result
     async def detect_advanced_patterns(
         self,
         student_id: int,
@@ -101,14 +153,12 @@ class AdvancedPatternDetector:
         if len(attendance_data) < self.min_data_points:
             return self._insufficient_data_response(student_id, len(attendance_data))
         
-        # Perform various analyses
-        basic_stats = await self._calculate_advanced_statistics(attendance_data)
-        trend_analysis = await self._analyze_attendance_trends(attendance_data)
-        seasonal_patterns = await self._detect_seasonal_patterns(attendance_data)
-        behavioral_patterns = await self._analyze_behavioral_patterns(attendance_data)
-        risk_assessment = await self._assess_comprehensive_risk(
-            basic_stats, trend_analysis, behavioral_patterns
+        # Perform various analyses over one pass of the history
+        history = await self._compute_history_statistics(attendance_data)
+        basic_stats, trend_analysis, behavioral_patterns, risk_assessment = (
+            await self._assess_history_risk(history)
         )
+        seasonal_patterns = await self._detect_seasonal_patterns(history)
         
         return {
             "student_id": student_id,
@@ -122,6 +172,7 @@ class AdvancedPatternDetector:
             "generated_at": datetime.utcnow()
         }
 
+    @cached_result
     async def predict_future_attendance(
         self,
         student_id: int,
@@ -142,9 +193,10 @@ class AdvancedPatternDetector:
             return []
         
         # Analyze patterns for prediction
-        trend_analysis = await self._analyze_attendance_trends(attendance_data)
-        behavioral_patterns = await self._analyze_behavioral_patterns(attendance_data)
-        seasonal_patterns = await self._detect_seasonal_patterns(attendance_data)
+        history = await self._compute_history_statistics(attendance_data)
+        trend_analysis = await self._analyze_attendance_trends(history)
+        behavioral_patterns = await self._analyze_behavioral_patterns(history)
+        seasonal_patterns = await self._detect_seasonal_patterns(history)
         
         predictions = []
         
@@ -160,6 +212,7 @@ class AdvancedPatternDetector:
         
         return predictions
 
+    @cached_result
     async def detect_attendance_anomalies(
         self,
         student_id: Optional[int] = None,
@@ -169,45 +222,80 @@ class AdvancedPatternDetector:
         """
         Detect attendance anomalies using statistical methods.
         """
-        anomalies = []
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=detection_period_days)
         
         if student_id:
-            student_ids = [student_id]
-        else:
-            # Get all active students
-            student_ids = await self._get_active_students(start_date)
-        
-        for sid in student_ids:
-            student_anomalies = await self._detect_student_anomalies(
-                sid, start_date, end_date
-            )
-            anomalies.extend(student_anomalies)
+            return await self._detect_student_anomalies(student_id, start_date, end_date)
         
-        return anomalies
+        # Whole population in one query and one vectorized pass
+        return await self._detect_population_anomalies(start_date, end_date)
 
     async def generate_early_warning_alerts(
         self,
         class_session_id: Optional[int] = None,
-        alert_severity_threshold: str = "medium"
+        alert_severity_threshold: str = "medium",
+        chunk_size: Optional[int] = None,
+        concurrency: int = 1,
+        persist: bool = False,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        progress_callback: Optional[Callable[[AlertBatchProgress], Any]] = None
     ) -> List[AttendanceAlert]:
         """
         Generate sophisticated early warning alerts with multiple criteria.
+        
+        Students are processed in chunks of ``chunk_size``: the 30-day history
+        of a whole chunk is loaded in one query, risk is assessed in memory,
+        and with ``persist`` the chunk's alerts are stored with a single
+        insert. Without ``session_factory`` all chunks run one at a time on
+        this detector's session; with it, up to ``concurrency`` chunks run at
+        once, each on a short-lived session of its own, so long runs never
+        hold one session throughout. ``progress_callback`` (sync or async)
+        is called with an AlertBatchProgress after every chunk.
         """
-        alerts = []
+        chunk_size = chunk_size or settings.ALERT_BATCH_CHUNK_SIZE
         
         # Get students to analyze
-        if class_session_id:
-            student_ids = await self._get_class_students(class_session_id)
+        if session_factory:
+            async with session_factory() as db:
+                student_ids = await self._get_alert_students(class_session_id, db)
         else:
-            student_ids = await self._get_active_students()
+            student_ids = await self._get_alert_students(class_session_id)
+            concurrency = 1
         
-        for student_id in student_ids:
-            student_alerts = await self._generate_student_alerts(
-                student_id, alert_severity_threshold
-            )
-            alerts.extend(student_alerts)
+        chunks = [student_ids[i:i + chunk_size] for i in range(0, len(student_ids), chunk_size)]
+        progress = AlertBatchProgress(total_students=len(student_ids), total_chunks=len(chunks))
+        chunk_alerts: List[List[AttendanceAlert]] = [[] for _ in chunks]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        end_date = datetime.utcnow()
+        
+        async def run_chunk(index: int):
+            async with semaphore:
+                if session_factory:
+                    async with session_factory() as db:
+                        alerts = await self._process_alert_chunk(
+                            db, chunks[index], end_date, alert_severity_threshold, class_session_id, persist
+                        )
+                else:
+                    alerts = await self._process_alert_chunk(
+                        self.db, chunks[index], end_date, alert_severity_threshold, class_session_id, persist
+                    )
+                
+                chunk_alerts[index] = alerts
+                progress.processed_students += len(chunks[index])
+                progress.chunks_completed += 1
+                progress.alerts_generated += len(alerts)
+                if persist:
+                    progress.alerts_persisted += len(alerts)
+                if progress_callback:
+                    outcome = progress_callback(progress)
+                    if inspect.isawaitable(outcome):
+                        await outcome
+        
+        await asyncio.gather(*(run_chunk(index) for index in range(len(chunks))))
+        
+        # Keep the students' order within equally ranked alerts
+        alerts = [alert for chunk in chunk_alerts for alert in chunk]
         
         # Sort alerts by severity and confidence
         alerts.sort(key=lambda x: (
@@ -217,6 +305,77 @@ class AdvancedPatternDetector:
         
         return alerts
 
+    async def _process_alert_chunk(
+        self,
+        db: AsyncSession,
+        student_ids: List[int],
+        end_date: datetime,
+        severity_threshold: str,
+        class_session_id: Optional[int],
+        persist: bool
+    ) -> List[AttendanceAlert]:
+        """Load, score and optionally persist the alerts of one chunk of students."""
+        result = await db.execute(
+            select(AttendanceRecord, ClassSession, User)
+            .join(ClassSession, AttendanceRecord.class_session_id == ClassSession.id)
+            .join(User, AttendanceRecord.student_id == User.id)
+            .where(
+                and_(
+                    AttendanceRecord.student_id.in_(student_ids),
+                    ClassSession.start_time.between(end_date - timedelta(days=30), end_date)
+                )
+            )
+            .order_by(AttendanceRecord.student_id, ClassSession.start_time.asc())
+        )
+        histories: Dict[int, List[Tuple[AttendanceRecord, ClassSession, User]]] = defaultdict(list)
+        for record, session, user in result.all():
+            histories[record.student_id].append((record, session, user))
+        
+        scored = [
+            (student_id, histories[student_id]) for student_id in student_ids
+            if len(histories.get(student_id, ())) >= self.min_data_points
+        ]
+        # The chunk's statistics in as few executor calls as the batch size allows
+        rows = [history_rows(attendance_data) for _, attendance_data in scored]
+        chunk_statistics = await self.executor.map_batches(
+            compute_history_statistics_batch, rows, sizes=[len(history) for history in rows]
+        )
+        
+        alerts = []
+        for (student_id, attendance_data), history in zip(scored, chunk_statistics):
+            *_, risk_assessment = await self._assess_history_risk(history)
+            alert = self._build_risk_alert(
+                student_id, attendance_data[0][2].full_name, risk_assessment, severity_threshold
+            )
+            if alert:
+                alerts.append(alert)
+        
+        if persist and alerts:
+            await db.execute(insert(AttendanceAlertRecord), [
+                self._alert_record_values(alert, class_session_id) for alert in alerts
+            ])
+            await db.commit()
+        
+        return alerts
+
+    def _alert_record_values(self, alert: AttendanceAlert, class_session_id: Optional[int]) -> Dict[str, Any]:
+        """Column values of the AttendanceAlert row stored for an alert."""
+        risk_factors = alert.data.get("risk_factors", [])
+        alert_type = next(
+            (pattern for factor, pattern in RISK_FACTOR_ALERT_TYPES if factor in risk_factors),
+            PatternType.IRREGULAR_PATTERN
+        )
+        return {
+            "alert_type": alert_type,
+            "severity": AlertSeverity(alert.severity),
+            "student_id": alert.student_id,
+            "class_session_id": class_session_id,
+            "title": f"{alert.severity.capitalize()} attendance risk: {alert.student_name}",
+            "message": alert.message,
+            "alert_data": json.dumps(alert.data),
+            "requires_followup": alert.severity == "high"
+        }
+
     async def _get_attendance_history(
         self,
         student_id: int,
@@ -239,35 +398,30 @@ class AdvancedPatternDetector:
         
         return result.all()
 
-    async def _calculate_advanced_statistics(
+    async def _compute_history_statistics(
         self,
         attendance_data: List[Tuple[AttendanceRecord, ClassSession, User]]
-    ) -> Dict[str, Any]:
+    ) -> HistoryStatistics:
+        """Run the statistics kernel over a history in the compute executor."""
+        rows = history_rows(attendance_data)
+        return await self.executor.run(compute_history_statistics, rows, size=len(rows))
+
+    async def _calculate_advanced_statistics(self, history: HistoryStatistics) -> Dict[str, Any]:
         """Calculate comprehensive statistical metrics."""
-        if not attendance_data:
+        if not history.total:
             return {}
         
-        statuses = [record.status for record, _, _ in attendance_data]
-        late_minutes = [record.late_minutes for record, _, _ in attendance_data if record.late_minutes]
-        
         # Basic counts
-        status_counts = {status.value: statuses.count(status) for status in AttendanceStatus}
-        total_sessions = len(attendance_data)
+        status_counts = {status.value: count for status, count in history.status_counts.items()}
+        total_sessions = history.total
         
         # Advanced metrics
         attendance_rate = (status_counts["present"] + status_counts["late"] + status_counts["excused"]) / total_sessions
-        punctuality_rate = status_counts["present"] / total_sessions if total_sessions > 0 else 0
-        absence_rate = status_counts["absent"] / total_sessions if total_sessions > 0 else 0
+        punctuality_rate = status_counts["present"] / total_sessions
+        absence_rate = status_counts["absent"] / total_sessions
         
         # Late analysis
-        avg_late_minutes = statistics.mean(late_minutes) if late_minutes else 0
-        max_late_minutes = max(late_minutes) if late_minutes else 0
-        late_consistency = statistics.stdev(late_minutes) if len(late_minutes) > 1 else 0
-        
-        # Consecutive patterns
-        consecutive_absences = self._calculate_max_consecutive(statuses, AttendanceStatus.ABSENT)
-        consecutive_late = self._calculate_max_consecutive(statuses, AttendanceStatus.LATE)
-        consecutive_present = self._calculate_max_consecutive(statuses, AttendanceStatus.PRESENT)
+        late_minutes = history.late_minutes
         
         return {
             "total_sessions": total_sessions,
@@ -275,22 +429,19 @@ class AdvancedPatternDetector:
             "attendance_rate": round(attendance_rate, 3),
             "punctuality_rate": round(punctuality_rate, 3),
             "absence_rate": round(absence_rate, 3),
-            "average_late_minutes": round(avg_late_minutes, 1),
-            "max_late_minutes": max_late_minutes,
-            "late_consistency_score": round(late_consistency, 2),
+            "average_late_minutes": round(late_minutes.mean, 1),
+            "max_late_minutes": late_minutes.maximum,
+            "late_consistency_score": round(late_minutes.stdev, 2),
             "consecutive_patterns": {
-                "max_absences": consecutive_absences,
-                "max_late": consecutive_late,
-                "max_present": consecutive_present
+                "max_absences": history.max_streaks[AttendanceStatus.ABSENT],
+                "max_late": history.max_streaks[AttendanceStatus.LATE],
+                "max_present": history.max_streaks[AttendanceStatus.PRESENT]
             }
         }
 
-    async def _analyze_attendance_trends(
-        self,
-        attendance_data: List[Tuple[AttendanceRecord, ClassSession, User]]
-    ) -> AttendanceTrend:
+    async def _analyze_attendance_trends(self, history: HistoryStatistics) -> AttendanceTrend:
         """Analyze attendance trends over time using statistical methods."""
-        if len(attendance_data) < 5:
+        if history.total < 5:
             return AttendanceTrend(
                 period="insufficient_data",
                 trend_direction="unknown",
@@ -299,24 +450,8 @@ class AdvancedPatternDetector:
                 data_points=[]
             )
         
-        # Group by weekly periods
-        weekly_rates = defaultdict(list)
-        for record, session, _ in attendance_data:
-            week_key = session.start_time.strftime("%Y-%W")
-            # Score: present=1, late=0.8, excused=0.6, absent=0
-            score = {
-                AttendanceStatus.PRESENT: 1.0,
-                AttendanceStatus.LATE: 0.8,
-                AttendanceStatus.EXCUSED: 0.6,
-                AttendanceStatus.ABSENT: 0.0
-            }[record.status]
-            weekly_rates[week_key].append(score)
-        
-        # Calculate weekly averages
-        weekly_averages = []
-        for week, scores in weekly_rates.items():
-            avg_score = statistics.mean(scores)
-            weekly_averages.append(avg_score)
+        # Weekly average scores (present=1, late=0.8, excused=0.6, absent=0)
+        weekly_averages = list(history.weekly_scores.averages().values())
         
         if len(weekly_averages) < 3:
             return AttendanceTrend(
@@ -333,8 +468,8 @@ class AdvancedPatternDetector:
         y_values = weekly_averages
         
         # Linear regression for trend detection
-        x_mean = statistics.mean(x_values)
-        y_mean = statistics.mean(y_values)
+        x_mean = (n - 1) / 2
+        y_mean = sum(y_values) / n
         
         slope_numerator = sum((x - x_mean) * (y - y_mean) for x, y in zip(x_values, y_values))
         slope_denominator = sum((x - x_mean) ** 2 for x in x_values)
@@ -368,25 +503,15 @@ class AdvancedPatternDetector:
             data_points=list(zip(x_values, y_values))
         )
 
-    async def _detect_seasonal_patterns(
-        self,
-        attendance_data: List[Tuple[AttendanceRecord, ClassSession, User]]
-    ) -> Dict[str, SeasonalPattern]:
+    async def _detect_seasonal_patterns(self, history: HistoryStatistics) -> Dict[str, SeasonalPattern]:
         """Detect seasonal and recurring patterns."""
         patterns = {}
         
-        if len(attendance_data) < self.seasonal_analysis_min_weeks * 7:
+        if history.total < self.seasonal_analysis_min_weeks * 7:
             return patterns
         
-        # Day of week patterns
-        dow_scores = defaultdict(list)
-        for record, session, _ in attendance_data:
-            dow = session.start_time.weekday()  # 0=Monday, 6=Sunday
-            score = self._status_to_score(record.status)
-            dow_scores[dow].append(score)
-        
-        # Calculate average scores per day
-        dow_averages = {dow: statistics.mean(scores) for dow, scores in dow_scores.items() if scores}
+        # Day of week patterns (0=Monday, 6=Sunday)
+        dow_averages = history.weekday_scores.averages()
         
         if len(dow_averages) >= 3:
             best_days = sorted(dow_averages.items(), key=lambda x: x[1], reverse=True)[:2]
@@ -408,13 +533,7 @@ class AdvancedPatternDetector:
             )
         
         # Time of day patterns
-        hour_scores = defaultdict(list)
-        for record, session, _ in attendance_data:
-            hour = session.start_time.hour
-            score = self._status_to_score(record.status)
-            hour_scores[hour].append(score)
-        
-        hour_averages = {hour: statistics.mean(scores) for hour, scores in hour_scores.items() if scores}
+        hour_averages = history.hour_scores.averages()
         
         if len(hour_averages) >= 3:
             best_hours = sorted(hour_averages.items(), key=lambda x: x[1], reverse=True)[:2]
@@ -434,49 +553,26 @@ class AdvancedPatternDetector:
         
         return patterns
 
-    async def _analyze_behavioral_patterns(
-        self,
-        attendance_data: List[Tuple[AttendanceRecord, ClassSession, User]]
-    ) -> Dict[str, Any]:
+    async def _analyze_behavioral_patterns(self, history: HistoryStatistics) -> Dict[str, Any]:
         """Analyze behavioral patterns and habits."""
-        if len(attendance_data) < 10:
+        if history.total < 10:
             return {}
         
         # Check-in timing patterns
-        check_in_delays = []
-        grace_period_usage = 0
-        late_arrivals = 0
-        
-        for record, session, _ in attendance_data:
-            if record.check_in_time and record.status != AttendanceStatus.ABSENT:
-                delay = (record.check_in_time - session.start_time).total_seconds() / 60
-                check_in_delays.append(delay)
-                
-                if record.grace_period_used:
-                    grace_period_usage += 1
-                if record.is_late:
-                    late_arrivals += 1
+        check_in_delays = history.check_in_delays
         
         # Override patterns
-        manual_overrides = sum(1 for record, _, _ in attendance_data if record.is_manual_override)
-        override_rate = manual_overrides / len(attendance_data)
+        override_rate = history.manual_overrides / history.total
         
         # Consistency patterns
-        status_changes = 0
-        prev_status = None
-        for record, _, _ in attendance_data:
-            if prev_status and prev_status != record.status:
-                status_changes += 1
-            prev_status = record.status
-        
-        consistency_score = 1 - (status_changes / max(len(attendance_data) - 1, 1))
+        consistency_score = 1 - (history.status_changes / max(history.total - 1, 1))
         
         return {
             "check_in_patterns": {
-                "average_delay_minutes": round(statistics.mean(check_in_delays), 1) if check_in_delays else 0,
-                "delay_consistency": round(statistics.stdev(check_in_delays), 2) if len(check_in_delays) > 1 else 0,
-                "grace_period_usage_rate": round(grace_period_usage / len(attendance_data), 3),
-                "late_arrival_rate": round(late_arrivals / len(attendance_data), 3)
+                "average_delay_minutes": round(check_in_delays.mean, 1),
+                "delay_consistency": round(check_in_delays.stdev, 2),
+                "grace_period_usage_rate": round(history.grace_period_uses / history.total, 3),
+                "late_arrival_rate": round(history.late_arrivals / history.total, 3)
             },
             "intervention_patterns": {
                 "manual_override_rate": round(override_rate, 3),
@@ -575,26 +671,7 @@ class AdvancedPatternDetector:
 
     def _status_to_score(self, status: AttendanceStatus) -> float:
         """Convert attendance status to numerical score for analysis."""
-        return {
-            AttendanceStatus.PRESENT: 1.0,
-            AttendanceStatus.LATE: 0.8,
-            AttendanceStatus.EXCUSED: 0.6,
-            AttendanceStatus.ABSENT: 0.0
-        }[status]
-
-    def _calculate_max_consecutive(self, statuses: List[AttendanceStatus], target_status: AttendanceStatus) -> int:
-        """Calculate maximum consecutive occurrences of a status."""
-        max_consecutive = 0
-        current_consecutive = 0
-        
-        for status in statuses:
-            if status == target_status:
-                current_consecutive += 1
-                max_consecutive = max(max_consecutive, current_consecutive)
-            else:
-                current_consecutive = 0
-        
-        return max_consecutive
+        return STATUS_SCORES[status]
 
     def _insufficient_data_response(self, student_id: int, data_points: int) -> Dict[str, Any]:
         """Return response for insufficient data cases."""
@@ -661,24 +738,40 @@ class AdvancedPatternDetector:
             recommended_actions=[]
         )
 
-    async def _get_active_students(self, since_date: Optional[datetime] = None) -> List[int]:
-        """Get list of active student IDs."""
+    async def _get_alert_students(
+        self,
+        class_session_id: Optional[int],
+        db: Optional[AsyncSession] = None
+    ) -> List[int]:
+        """Get the students an alert run covers."""
+        if class_session_id:
+            return await self._get_class_students(class_session_id, db)
+        return await self._get_active_students(db=db)
+
+    async def _get_active_students(
+        self,
+        since_date: Optional[datetime] = None,
+        db: Optional[AsyncSession] = None
+    ) -> List[int]:
+        """Get list of active student IDs, in id order."""
         if since_date is None:
             since_date = datetime.utcnow() - timedelta(days=30)
         
-        result = await self.db.execute(
+        result = await (db or self.db).execute(
             select(distinct(AttendanceRecord.student_id))
             .join(ClassSession, AttendanceRecord.class_session_id == ClassSession.id)
             .where(ClassSession.start_time >= since_date)
+            .order_by(AttendanceRecord.student_id)
         )
         
         return [row[0] for row in result.all()]
 
-    async def _get_class_students(self, class_session_id: int) -> List[int]:
-        """Get student IDs for a specific class session."""
-        result = await self.db.execute(
+    async def _get_class_students(self, class_session_id: int, db: Optional[AsyncSession] = None) -> List[int]:
+        """Get student IDs for a specific class session, in id order."""
+        result = await (db or self.db).execute(
             select(distinct(AttendanceRecord.student_id))
             .where(AttendanceRecord.class_session_id == class_session_id)
+            .order_by(AttendanceRecord.student_id)
         )
         
         return [row[0] for row in result.all()]
@@ -695,7 +788,7 @@ class AdvancedPatternDetector:
         # Get student's attendance pattern
         attendance_data = await self._get_attendance_history(student_id, start_date, end_date)
         
-        if len(attendance_data) < 5:
+        if len(attendance_data) < self.anomaly_min_records:
             return anomalies
         
         # Calculate baseline metrics
@@ -713,24 +806,124 @@ class AdvancedPatternDetector:
             week_absence_rate = week_statuses.count(AttendanceStatus.ABSENT) / len(week_statuses)
             
             # Flag if absence rate is significantly higher than baseline
-            if week_absence_rate > baseline_absence_rate + 0.3:  # 30% threshold
-                anomalies.append({
-                    "student_id": student_id,
-                    "type": "unusual_absence_spike",
-                    "period": week,
-                    "severity": "medium",
-                    "description": f"Unusually high absence rate: {week_absence_rate:.1%} vs baseline {baseline_absence_rate:.1%}",
-                    "detected_at": datetime.utcnow()
-                })
+            if week_absence_rate > baseline_absence_rate + self.absence_spike_threshold:
+                anomalies.append(self._absence_spike_anomaly(
+                    student_id, week, week_absence_rate, baseline_absence_rate
+                ))
         
         return anomalies
 
+    async def _detect_population_anomalies(
+        self,
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[Dict[str, Any]]:
+        """
+        Detect absence spikes for every student with records in the period.
+        
+        Streams ``(student_id, session start, status)`` in one query and builds
+        a students x weeks matrix of record and absence counts, so the
+        per-student baselines and weekly rates are computed for everyone at
+        once. Gives the same result as running _detect_student_anomalies for
+        each active student, ordered by student and week.
+        """
+        student_index: Dict[int, int] = {}
+        week_index: Dict[str, int] = {}
+        # Sessions share start dates, so map each date to its week column once
+        date_weeks: Dict[Any, int] = {}
+        student_cols: List[Any] = []
+        week_cols: List[Any] = []
+        absent_cols: List[Any] = []
+        
+        result = await self.db.stream(
+            select(AttendanceRecord.student_id, ClassSession.start_time, AttendanceRecord.status)
+            .join(ClassSession, AttendanceRecord.class_session_id == ClassSession.id)
+            .where(ClassSession.start_time.between(start_date, end_date))
+            .execution_options(yield_per=self.history_stream_batch_size)
+        )
+        async for partition in result.partitions():
+            students = np.empty(len(partition), dtype=np.int64)
+            weeks = np.empty(len(partition), dtype=np.int64)
+            absent = np.empty(len(partition), dtype=bool)
+            for i, (sid, start_time, status) in enumerate(partition):
+                students[i] = student_index.setdefault(sid, len(student_index))
+                day = start_time.date()
+                week = date_weeks.get(day)
+                if week is None:
+                    week = week_index.setdefault(start_time.strftime("%Y-%W"), len(week_index))
+                    date_weeks[day] = week
+                weeks[i] = week
+                absent[i] = status == AttendanceStatus.ABSENT
+            student_cols.append(students)
+            week_cols.append(weeks)
+            absent_cols.append(absent)
+        
+        if not student_index:
+            return []
+        
+        student_count, week_count = len(student_index), len(week_index)
+        cells = np.concatenate(student_cols) * week_count + np.concatenate(week_cols)
+        absent = np.concatenate(absent_cols)
+        
+        totals = np.bincount(cells, minlength=student_count * week_count).reshape(student_count, week_count)
+        absences = np.bincount(
+            cells[absent], minlength=student_count * week_count
+        ).reshape(student_count, week_count)
+        
+        student_totals = totals.sum(axis=1)
+        eligible = student_totals >= self.anomaly_min_records
+        baseline = absences.sum(axis=1) / np.maximum(student_totals, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weekly_rate = absences / totals
+        spikes = (
+            (totals > 0)
+            & eligible[:, None]
+            & (weekly_rate > (baseline + self.absence_spike_threshold)[:, None])
+        )
+        
+        student_ids = np.fromiter(student_index, dtype=np.int64, count=student_count)
+        week_keys = list(week_index)
+        # Report students in id order and weeks chronologically
+        week_order = sorted(range(week_count), key=lambda w: week_keys[w])
+        week_rank = np.empty(week_count, dtype=np.int64)
+        week_rank[week_order] = np.arange(week_count)
+        
+        rows, cols = np.nonzero(spikes)
+        order = np.lexsort((week_rank[cols], student_ids[rows]))
+        return [
+            self._absence_spike_anomaly(
+                int(student_ids[row]), week_keys[col], float(weekly_rate[row, col]), float(baseline[row])
+            )
+            for row, col in zip(rows[order], cols[order])
+        ]
+
+    def _absence_spike_anomaly(
+        self,
+        student_id: int,
+        week: str,
+        week_absence_rate: float,
+        baseline_absence_rate: float
+    ) -> Dict[str, Any]:
+        return {
+            "student_id": student_id,
+            "type": "unusual_absence_spike",
+            "period": week,
+            "severity": "medium",
+            "description": f"Unusually high absence rate: {week_absence_rate:.1%} vs baseline {baseline_absence_rate:.1%}",
+            "detected_at": datetime.utcnow()
+        }
+
     async def _generate_student_alerts(
         self,
         student_id: int,
         severity_threshold: str
     ) -> List[AttendanceAlert]:
-        """Generate alerts for a specific student."""
+        """
+        Generate alerts for a specific student.
+        
+        The single-student counterpart of generate_early_warning_alerts,
+        built on detect_advanced_patterns instead of the chunked history.
+        """
         alerts = []
         
         # Get recent pattern analysis
@@ -741,6 +934,38 @@ class AdvancedPatternDetector:
         
         risk_assessment = pattern_data.get("risk_assessment", {})
         
+        alert = self._build_risk_alert(student_id, None, risk_assessment, severity_threshold)
+        if alert:
+            # Get student name
+            result = await self.db.execute(
+                select(User.full_name).where(User.id == student_id)
+            )
+            alert.student_name = result.scalar_one_or_none() or "Unknown Student"
+            alerts.append(alert)
+        
+        return alerts
+
+    async def _assess_history_risk(
+        self,
+        history: HistoryStatistics
+    ) -> Tuple[Dict[str, Any], AttendanceTrend, Dict[str, Any], Dict[str, Any]]:
+        """Compute statistics, trend, behavior and the resulting risk of a history."""
+        basic_stats = await self._calculate_advanced_statistics(history)
+        trend_analysis = await self._analyze_attendance_trends(history)
+        behavioral_patterns = await self._analyze_behavioral_patterns(history)
+        risk_assessment = await self._assess_comprehensive_risk(
+            basic_stats, trend_analysis, behavioral_patterns
+        )
+        return basic_stats, trend_analysis, behavioral_patterns, risk_assessment
+
+    def _build_risk_alert(
+        self,
+        student_id: int,
+        student_name: Optional[str],
+        risk_assessment: Dict[str, Any],
+        severity_threshold: str
+    ) -> Optional[AttendanceAlert]:
+        """Build the alert for a risk assessment, or None if below the threshold."""
         # Generate alerts based on risk level
         risk_level = risk_assessment.get("risk_level", "minimal")
         risk_factors = risk_assessment.get("risk_factors", [])
@@ -748,31 +973,25 @@ class AdvancedPatternDetector:
         severity_order = {"low": 1, "medium": 2, "high": 3}
         threshold_level = severity_order.get(severity_threshold, 2)
         
-        if severity_order.get(risk_level, 0) >= threshold_level:
-            # Get student name
-            result = await self.db.execute(
-                select(User.full_name).where(User.id == student_id)
-            )
-            student_name = result.scalar_one_or_none() or "Unknown Student"
-            
-            alert_message = self._generate_alert_message(risk_factors, risk_level)
-            
-            alerts.append(AttendanceAlert(
-                type="comprehensive_risk",
-                severity=risk_level,
-                student_id=student_id,
-                student_name=student_name,
-                message=alert_message,
-                data={
-                    "risk_score": risk_assessment.get("risk_score", 0),
-                    "risk_factors": risk_factors,
-                    "recommended_actions": risk_assessment.get("recommended_actions", []),
-                    "confidence": 0.85
-                },
-                created_at=datetime.utcnow()
-            ))
+        if severity_order.get(risk_level, 0) < threshold_level:
+            return None
         
-        return alerts
+        alert_message = self._generate_alert_message(risk_factors, risk_level)
+        
+        return AttendanceAlert(
+            type="comprehensive_risk",
+            severity=risk_level,
+            student_id=student_id,
+            student_name=student_name or "Unknown Student",
+            message=alert_message,
+            data={
+                "risk_score": risk_assessment.get("risk_score", 0),
+                "risk_factors": risk_factors,
+                "recommended_actions": risk_assessment.get("recommended_actions", []),
+                "confidence": 0.85
+            },
+            created_at=datetime.utcnow()
+        )
 
     def _generate_alert_message(self, risk_factors: List[str], risk_level: str) -> str:
         """Generate human-readable alert message."""
@@ -0,0 +1,198 @@
+"""
+In-process cache of active class sessions for the student check-in hot path.
+
+At the start of a period thousands of students scan within a minute, and every
+scan used to load the same ClassSession row. This cache keeps a small snapshot
+of each active session, addressable by session id and by verification code,
+so check-ins only touch the database to write the attendance record.
+
+Entries are invalidated explicitly when a session is ended, updated or gets a
+new verification code, and expire after a short TTL so that changes made by
+other worker processes are picked up.
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Set, Any, Hashable
+
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.single_flight import SingleFlight
+from app.models.class_session import ClassSession, StudentEnrollment
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedSession:
+    """Snapshot of the ClassSession fields needed to check a student in."""
+    id: int
+    name: str
+    subject: Optional[str]
+    class_id: Optional[int]
+    teacher_id: int
+    status: str
+    verification_code: str
+    start_time: datetime
+    allow_late_join: bool
+    enrolled_student_ids: Set[int] = field(default_factory=set)
+    expires_at: float = 0.0
+
+
+class ActiveSessionCache:
+    """Cache of active class sessions keyed by session id and verification code."""
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 5000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._sessions: Dict[int, CachedSession] = {}
+        self._codes: Dict[str, int] = {}
+        self._loads = SingleFlight()
+
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'invalidations': 0
+        }
+
+    async def get(self, db: AsyncSession, session_id: int) -> Optional[CachedSession]:
+        """Get an active session by id, loading it from the database on a miss."""
+        cached = self._get_fresh(session_id)
+        if cached:
+            return cached
+
+        return await self._load(
+            db,
+            ("id", session_id),
+            and_(ClassSession.id == session_id, ClassSession.status == "active")
+        )
+
+    async def get_by_code(self, db: AsyncSession, verification_code: str) -> Optional[CachedSession]:
+        """Get an active session by verification code, loading it on a miss."""
+        session_id = self._codes.get(verification_code)
+        if session_id is not None:
+            cached = self._get_fresh(session_id)
+            if cached and cached.verification_code == verification_code:
+                return cached
+
+        return await self._load(
+            db,
+            ("code", verification_code),
+            and_(
+                ClassSession.verification_code == verification_code,
+                ClassSession.status == "active"
+            )
+        )
+
+    async def get_latest_for_teacher(self, db: AsyncSession, teacher_id: int) -> Optional[CachedSession]:
+        """Get the most recently created active session of a teacher (legacy QR codes)."""
+        result = await db.execute(
+            select(ClassSession.id).where(
+                ClassSession.teacher_id == teacher_id,
+                ClassSession.status == "active"
+            ).order_by(ClassSession.created_at.desc()).limit(1)
+        )
+        session_id = result.scalar_one_or_none()
+        if session_id is None:
+            return None
+        return await self.get(db, session_id)
+
+    def mark_enrolled(self, session_id: int, student_id: int):
+        """Record that a student is now enrolled in the session's class."""
+        cached = self._sessions.get(session_id)
+        if cached:
+            cached.enrolled_student_ids.add(student_id)
+
+    def invalidate(self, session_id: int):
+        """Drop a session from the cache, e.g. after it ended or its code changed."""
+        cached = self._sessions.pop(session_id, None)
+        if cached:
+            if self._codes.get(cached.verification_code) == session_id:
+                del self._codes[cached.verification_code]
+            self._stats['invalidations'] += 1
+            logger.debug(f"Invalidated cached session {session_id}")
+
+    def clear(self):
+        """Drop all cached sessions."""
+        self._sessions.clear()
+        self._codes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            **self._stats,
+            'cached_sessions': len(self._sessions)
+        }
+
+    def _get_fresh(self, session_id: int) -> Optional[CachedSession]:
+        cached = self._sessions.get(session_id)
+        if cached is None:
+            return None
+
+        if cached.expires_at <= time.monotonic():
+            self.invalidate(session_id)
+            return None
+
+        self._stats['hits'] += 1
+        return cached
+
+    async def _load(self, db: AsyncSession, key: Hashable, criteria) -> Optional[CachedSession]:
+        """Load a session, letting concurrent misses for the same key share one query."""
+        async def fetch() -> Optional[CachedSession]:
+            self._stats['misses'] += 1
+            return await self._fetch(db, criteria)
+
+        return await self._loads.do(key, fetch)
+
+    async def _fetch(self, db: AsyncSession, criteria) -> Optional[CachedSession]:
+        result = await db.execute(select(ClassSession).where(criteria))
+        session = result.scalars().first()
+        if session is None:
+            return None
+
+        enrolled_student_ids: Set[int] = set()
+        if session.class_id:
+            result = await db.execute(
+                select(StudentEnrollment.student_id).where(
+                    StudentEnrollment.class_id == session.class_id,
+                    StudentEnrollment.is_active == True
+                )
+            )
+            enrolled_student_ids = set(result.scalars().all())
+
+        cached = CachedSession(
+            id=session.id,
+            name=session.name,
+            subject=session.subject,
+            class_id=session.class_id,
+            teacher_id=session.teacher_id,
+            status=session.status,
+            verification_code=session.verification_code,
+            start_time=session.start_time,
+            allow_late_join=session.allow_late_join,
+            enrolled_student_ids=enrolled_student_ids,
+            expires_at=time.monotonic() + self.ttl_seconds
+        )
+        self._store(cached)
+        return cached
+
+    def _store(self, cached: CachedSession):
+        if cached.id not in self._sessions and len(self._sessions) >= self.max_entries:
+            # Evict the entry closest to expiry
+            oldest_id = min(self._sessions, key=lambda sid: self._sessions[sid].expires_at)
+            self.invalidate(oldest_id)
+
+        previous = self._sessions.get(cached.id)
+        if previous and self._codes.get(previous.verification_code) == cached.id:
+            del self._codes[previous.verification_code]
+
+        self._sessions[cached.id] = cached
+        self._codes[cached.verification_code] = cached.id
+
+
+# Global cache instance
+active_session_cache = ActiveSessionCache(ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS)
@@ -0,0 +1,150 @@
+"""
+Maintenance of the materialized student attendance timeline.
+
+Students open the mobile app many times a day, and every open used to join
+attendance records, class sessions and teacher users for "my attendance",
+"my classes" and "active sessions". The timeline table
+(app.models.student_timeline) holds that join result, one entry per
+attendance record, so those endpoints read a single ``student_id`` index
+range with keyset pagination.
+
+Entries are written in the same transaction as the write they reflect:
+
+- AttendanceEngine upserts the entries of the records it creates, checks
+  in, overrides or bulk-updates, keyed by the record ids, and check-out
+  does the same for its record
+- session changes (ending, editing, a new verification code) copy the
+  session's columns onto its entries with one UPDATE
+
+Writes that bypass these paths, such as a teacher renaming their account,
+are picked up by ``rebuild_student_timeline``, which rebuilds the whole
+table for backfill and repair.
+"""
+import logging
+from typing import Iterable
+
+from sqlalchemy import select, delete, insert, update, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.database import upsert_insert
+from app.models.attendance import AttendanceRecord
+from app.models.class_session import ClassSession
+from app.models.student_timeline import StudentTimelineEntry
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_COLUMNS = [
+    "id", "student_id", "class_session_id",
+    "class_name", "subject", "location", "description", "teacher_name",
+    "session_status", "session_start_time", "session_end_time", "verification_code",
+    "allow_late_join", "session_created_at",
+    "status", "check_in_time", "check_out_time", "verification_method", "is_late",
+    "late_minutes", "is_manual_override", "override_reason", "override_teacher_name",
+    "notes", "created_at", "updated_at"
+]
+
+# Columns an entry copies from its attendance record
+RECORD_COLUMNS = TIMELINE_COLUMNS[TIMELINE_COLUMNS.index("status"):]
+
+
+def _timeline_source():
+    """SELECT producing timeline entries from the source rows, in TIMELINE_COLUMNS order."""
+    teacher = aliased(User)
+    override_teacher = aliased(User)
+    # Blank names fall back to the username, as ``full_name or username`` does
+    teacher_name = func.coalesce(func.nullif(teacher.full_name, ""), teacher.username)
+    # Overrides without a recorded teacher are attributed to the session's teacher
+    override_teacher_name = case(
+        (
+            AttendanceRecord.is_manual_override == True,
+            func.coalesce(func.nullif(override_teacher.full_name, ""), override_teacher.username, teacher_name)
+        ),
+        else_=None
+    )
+
+    return (
+        select(
+            AttendanceRecord.id,
+            AttendanceRecord.student_id,
+            AttendanceRecord.class_session_id,
+            ClassSession.name,
+            ClassSession.subject,
+            ClassSession.location,
+            ClassSession.description,
+            teacher_name,
+            ClassSession.status,
+            ClassSession.start_time,
+            ClassSession.end_time,
+            ClassSession.verification_code,
+            ClassSession.allow_late_join,
+            ClassSession.created_at,
+            AttendanceRecord.status,
+            AttendanceRecord.check_in_time,
+            AttendanceRecord.check_out_time,
+            AttendanceRecord.verification_method,
+            func.coalesce(AttendanceRecord.is_late, False),
+            func.coalesce(AttendanceRecord.late_minutes, 0),
+            func.coalesce(AttendanceRecord.is_manual_override, False),
+            AttendanceRecord.override_reason,
+            override_teacher_name,
+            AttendanceRecord.notes,
+            AttendanceRecord.created_at,
+            AttendanceRecord.updated_at
+        )
+        .join(ClassSession, AttendanceRecord.class_session_id == ClassSession.id)
+        .join(teacher, ClassSession.teacher_id == teacher.id)
+        .outerjoin(override_teacher, AttendanceRecord.override_by_teacher_id == override_teacher.id)
+    )
+
+
+async def upsert_timeline_entries(db: AsyncSession, record_ids: Iterable[int]):
+    """
+    Insert or update the entries of the given attendance records.
+    
+    A single INSERT ... SELECT ... ON CONFLICT keyed by the record ids; an
+    existing entry only takes the record's columns, since the session's are
+    kept current by ``update_session_timeline``. ORM changes to the records
+    must be flushed first; the caller commits.
+    """
+    record_ids = list(record_ids)
+    if not record_ids:
+        return
+    
+    stmt = upsert_insert(db, StudentTimelineEntry).from_select(
+        TIMELINE_COLUMNS, _timeline_source().where(AttendanceRecord.id.in_(record_ids))
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["id"],
+        set_={name: stmt.excluded[name] for name in RECORD_COLUMNS}
+    ))
+
+
+async def update_session_timeline(db: AsyncSession, class_session: ClassSession):
+    """Copy a class session's current values onto its entries; the caller commits."""
+    await db.execute(
+        update(StudentTimelineEntry)
+        .where(StudentTimelineEntry.class_session_id == class_session.id)
+        .values(
+            class_name=class_session.name,
+            subject=class_session.subject,
+            location=class_session.location,
+            description=class_session.description,
+            session_status=class_session.status,
+            session_start_time=class_session.start_time,
+            session_end_time=class_session.end_time,
+            verification_code=class_session.verification_code,
+            allow_late_join=class_session.allow_late_join
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rebuild_student_timeline(db: AsyncSession) -> int:
+    """Rebuild the whole timeline from the source rows; returns the number of entries."""
+    await db.execute(delete(StudentTimelineEntry).execution_options(synchronize_session=False))
+    await db.execute(insert(StudentTimelineEntry).from_select(TIMELINE_COLUMNS, _timeline_source()))
+    count = await db.scalar(select(func.count()).select_from(StudentTimelineEntry))
+    logger.info(f"Rebuilt student timeline with {count} entries")
+    return count
@@ -0,0 +1,265 @@
+"""
+Cached snapshot of the admin dashboard's system statistics.
+
+The admin dashboard polls the system statistics, which used to run six
+separate COUNT queries on every refresh, including two full counts of
+``attendance_records``. SystemStatsSnapshot serves them from memory instead:
+
+- the snapshot is built by one aggregate query over users, class sessions
+  and attendance records
+- committed writes keep it current without a query: user and class session
+  inserts, deletes and role/status changes are picked up from the ORM flush,
+  and attendance record changes from the live counter deltas that
+  AttendanceEngine records
+- a background task rebuilds it periodically to correct drift from writes
+  that bypass those paths (other worker processes, check-ins that fill a
+  pre-marked record, Core statements)
+
+Reads only query the database when there is no snapshot yet or it is older
+than ``max_age_seconds``.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Optional, Any
+
+from sqlalchemy import select, func, case, event, inspect, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.single_flight import SingleFlight
+from app.models.attendance import AttendanceStatus, AttendanceRecord
+from app.models.class_session import ClassSession
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+# Key under which uncommitted deltas are kept in Session.info
+_PENDING_KEY = "system_stats_deltas"
+
+# Snapshot field counting the users of each role
+ROLE_FIELDS = {
+    UserRole.TEACHER: "total_teachers",
+    UserRole.STUDENT: "total_students"
+}
+
+
+@dataclass
+class SystemStats:
+    """Counts shown on the admin dashboard."""
+    total_users: int = 0
+    total_teachers: int = 0
+    total_students: int = 0
+    active_classes: int = 0
+    total_attendance_records: int = 0
+    present_count: int = 0
+
+    @property
+    def attendance_rate(self) -> float:
+        if self.total_attendance_records <= 0:
+            return 0
+        return round(self.present_count / self.total_attendance_records * 100, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the statistics in the /admin/stats response format."""
+        return {
+            "total_users": self.total_users,
+            "total_teachers": self.total_teachers,
+            "total_students": self.total_students,
+            "active_classes": self.active_classes,
+            "total_attendance_records": self.total_attendance_records,
+            "attendance_rate": self.attendance_rate
+        }
+
+
+def system_stats_query():
+    """One statement returning every SystemStats count."""
+    user_counts = select(
+        func.count(User.id).label("total_users"),
+        func.coalesce(func.sum(case((User.role == UserRole.TEACHER, 1), else_=0)), 0).label("total_teachers"),
+        func.coalesce(func.sum(case((User.role == UserRole.STUDENT, 1), else_=0)), 0).label("total_students")
+    ).subquery()
+    record_counts = select(
+        func.count(AttendanceRecord.id).label("total_attendance_records"),
+        func.coalesce(
+            func.sum(case((AttendanceRecord.status == AttendanceStatus.PRESENT, 1), else_=0)), 0
+        ).label("present_count")
+    ).subquery()
+    active_classes = (
+        select(func.count(ClassSession.id))
+        .where(ClassSession.status == "active")
+        .scalar_subquery()
+    )
+
+    return select(
+        user_counts.c.total_users,
+        user_counts.c.total_teachers,
+        user_counts.c.total_students,
+        active_classes.label("active_classes"),
+        record_counts.c.total_attendance_records,
+        record_counts.c.present_count
+    ).select_from(user_counts.join(record_counts, true()))
+
+
+class SystemStatsSnapshot:
+    """In-memory system statistics, rebuilt periodically and kept current by deltas."""
+
+    def __init__(self, max_age_seconds: float = 300.0, refresh_interval_seconds: float = 60.0):
+        self.max_age_seconds = max_age_seconds
+        self.refresh_interval_seconds = refresh_interval_seconds
+
+        self._snapshot: Optional[SystemStats] = None
+        self._built_at = 0.0
+        self._rebuilds = SingleFlight()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        self._stats = {
+            'hits': 0,
+            'refreshes': 0,
+            'deltas_applied': 0,
+            'last_refresh_ms': 0.0
+        }
+
+    async def get(self, db: Optional[AsyncSession] = None) -> SystemStats:
+        """Get the statistics, rebuilding the snapshot if it is missing or too old."""
+        if self._snapshot is not None and time.monotonic() - self._built_at < self.max_age_seconds:
+            self._stats['hits'] += 1
+            return self._snapshot
+
+        return await self._rebuilds.do("snapshot", lambda: self._rebuild(db))
+
+    async def _rebuild(self, db: Optional[AsyncSession]) -> SystemStats:
+        if db is None:
+            async with AsyncSessionLocal() as own_db:
+                return await self.refresh(own_db)
+        return await self.refresh(db)
+
+    async def refresh(self, db: AsyncSession) -> SystemStats:
+        """Rebuild the snapshot with one aggregate query."""
+        started = time.perf_counter()
+        row = (await db.execute(system_stats_query())).one()
+
+        self._snapshot = SystemStats(**{key: value or 0 for key, value in row._mapping.items()})
+        self._built_at = time.monotonic()
+        self._stats['refreshes'] += 1
+        self._stats['last_refresh_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return self._snapshot
+
+    def apply(self, deltas: Dict[str, int]):
+        """Apply committed count changes, keyed by SystemStats field, to the snapshot."""
+        if self._snapshot is None or not deltas:
+            return
+        for name, delta in deltas.items():
+            setattr(self._snapshot, name, getattr(self._snapshot, name) + delta)
+        self._stats['deltas_applied'] += 1
+
+    def apply_attendance_deltas(self, status_deltas: Dict[AttendanceStatus, int]):
+        """Apply committed attendance status transitions, as recorded for the live counters."""
+        self.apply({
+            "total_attendance_records": sum(status_deltas.values()),
+            "present_count": status_deltas.get(AttendanceStatus.PRESENT, 0)
+        })
+
+    def clear(self):
+        """Drop the snapshot; the next read rebuilds it."""
+        self._snapshot = None
+
+    def start_refresh(self):
+        """Start the periodic refresh task on the running event loop."""
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.get_running_loop().create_task(self._periodic_refresh())
+
+    async def shutdown(self):
+        """Stop the periodic refresh task."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _periodic_refresh(self):
+        while True:
+            try:
+                await asyncio.sleep(self.refresh_interval_seconds)
+                async with AsyncSessionLocal() as db:
+                    await self.refresh(db)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error refreshing system stats: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get snapshot statistics."""
+        return {
+            **self._stats,
+            'snapshot_age_seconds': (
+                round(time.monotonic() - self._built_at, 1) if self._snapshot is not None else None
+            )
+        }
+
+
+def _user_deltas(user: User, sign: int, deltas: Counter):
+    deltas["total_users"] += sign
+    if user.role in ROLE_FIELDS:
+        deltas[ROLE_FIELDS[user.role]] += sign
+
+
+@event.listens_for(Session, "after_flush")
+def _queue_flushed_changes(session: Session, flush_context):
+    deltas: Counter = Counter()
+
+    for instance in session.new:
+        if isinstance(instance, User):
+            _user_deltas(instance, 1, deltas)
+        elif isinstance(instance, ClassSession) and instance.status == "active":
+            deltas["active_classes"] += 1
+
+    for instance in session.deleted:
+        if isinstance(instance, User):
+            _user_deltas(instance, -1, deltas)
+        elif isinstance(instance, ClassSession) and instance.status == "active":
+            deltas["active_classes"] -= 1
+
+    for instance in session.dirty:
+        if isinstance(instance, User):
+            history = inspect(instance).attrs.role.history
+            for role in history.deleted:
+                if role in ROLE_FIELDS:
+                    deltas[ROLE_FIELDS[role]] -= 1
+            for role in history.added:
+                if role in ROLE_FIELDS:
+                    deltas[ROLE_FIELDS[role]] += 1
+        elif isinstance(instance, ClassSession):
+            history = inspect(instance).attrs.status.history
+            deltas["active_classes"] += (
+                sum(1 for value in history.added if value == "active")
+                - sum(1 for value in history.deleted if value == "active")
+            )
+
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if deltas:
+        session.info.setdefault(_PENDING_KEY, []).append(deltas)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_changes(session: Session):
+    for deltas in session.info.pop(_PENDING_KEY, []):
+        system_stats_snapshot.apply(deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_changes(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Global snapshot instance
+system_stats_snapshot = SystemStatsSnapshot(
+    max_age_seconds=settings.SYSTEM_STATS_MAX_AGE_SECONDS,
+    refresh_interval_seconds=settings.SYSTEM_STATS_REFRESH_SECONDS
+)
@@ -8,10 +8,32 @@ from .conflict_resolution import (
     resolve_sync_conflicts,
     merge_conflicting_data
 )
+from .pagination import (
+    apply_keyset,
+    encode_cursor,
+    decode_cursor,
+    next_cursor,
+    NEXT_CURSOR_HEADER
+)
+from .export import (
+    stream_rows,
+    export_response,
+    flatten,
+    EXPORT_FORMATS
+)
 
 __all__ = [
     "ConflictResolver",
     "ConflictResolutionStrategy", 
     "resolve_sync_conflicts",
-    "merge_conflicting_data"
+    "merge_conflicting_data",
+    "apply_keyset",
+    "encode_cursor",
+    "decode_cursor",
+    "next_cursor",
+    "NEXT_CURSOR_HEADER",
+    "stream_rows",
+    "export_response",
+    "flatten",
+    "EXPORT_FORMATS"
 ]
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+Streaming CSV / NDJSON / JSON export.
+
+Exports used to load every row with ``scalars().all()`` and build the whole
+file in a ``StringIO`` before sending it, so memory grew with the table.
+Here rows are read in batches from a server-side cursor (``stream()`` with
+``yield_per``), encoded as they arrive and handed to a ``StreamingResponse``
+in chunks of about ``EXPORT_CHUNK_BYTES``. Memory stays bounded by one batch
+plus one chunk, whatever the number of rows.
+
+An export is a query, a function mapping each result row to a dict, and the
+columns to write. Nested documents such as analytics reports are exported
+through ``flatten``, one ``(field, value)`` row per leaf.
+
+The stream reads through a session of its own, because the request's
+session may be closed before the response body is sent.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from app.core.database import AsyncSessionLocal
+
+try:
+    import orjson
+
+    def _json_line(row: Dict[str, Any]) -> bytes:
+        return orjson.dumps(row, default=str, option=orjson.OPT_APPEND_NEWLINE)
+except ImportError:
+    def _json_line(row: Dict[str, Any]) -> bytes:
+        return (json.dumps(row, default=_json_default) + "\n").encode()
+
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "json": "application/json"
+}
+
+RowMapper = Callable[[Any], Dict[str, Any]]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+async def stream_rows(
+    query,
+    row_mapper: RowMapper,
+    session_factory=None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield ``row_mapper(row)`` for each row of ``query``, read in batches from a server-side cursor."""
+    async with (session_factory or AsyncSessionLocal)() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            for row in partition:
+                yield row_mapper(row)
+
+
+async def csv_chunks(
+    rows: AsyncIterable[Dict[str, Any]],
+    columns: Sequence[str],
+    headers: Optional[Sequence[str]] = None,
+    chunk_bytes: int = EXPORT_CHUNK_BYTES
+) -> AsyncIterator[bytes]:
+    """Encode rows as CSV, ``headers`` (default ``columns``) first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers or columns)
+
+    async for row in rows:
+        writer.writerow([_csv_value(row.get(column)) for column in columns])
+        if buffer.tell() >= chunk_bytes:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode()
+
+
+async def ndjson_chunks(
+    rows: AsyncIterable[Dict[str, Any]],
+    chunk_bytes: int = EXPORT_CHUNK_BYTES
+) -> AsyncIterator[bytes]:
+    """Encode rows as newline-delimited JSON, one object per line."""
+    chunk = bytearray()
+    async for row in rows:
+        chunk += _json_line(row)
+        if len(chunk) >= chunk_bytes:
+            yield bytes(chunk)
+            chunk.clear()
+
+    if chunk:
+        yield bytes(chunk)
+
+
+async def json_array_chunks(
+    rows: AsyncIterable[Dict[str, Any]],
+    chunk_bytes: int = EXPORT_CHUNK_BYTES
+) -> AsyncIterator[bytes]:
+    """Encode rows as one JSON array."""
+    chunk = bytearray(b"[")
+    separator = b""
+    async for row in rows:
+        chunk += separator + _json_line(row)[:-1]
+        separator = b","
+        if len(chunk) >= chunk_bytes:
+            yield bytes(chunk)
+            chunk.clear()
+
+    chunk += b"]"
+    yield bytes(chunk)
+
+
+def export_response(
+    rows: AsyncIterable[Dict[str, Any]],
+    format: str,
+    filename: str,
+    columns: Sequence[str],
+    headers: Optional[Sequence[str]] = None
+) -> StreamingResponse:
+    """Stream ``rows`` as a ``format`` attachment named ``filename.<format>``."""
+    if format == "csv":
+        body = csv_chunks(rows, columns, headers)
+    elif format == "ndjson":
+        body = ndjson_chunks(rows)
+    elif format == "json":
+        body = json_array_chunks(rows)
+    else:
+        raise ValueError(f"Unsupported export format: {format}")
+
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{format}"}
+    )
+
+
+def flatten(document: Any, prefix: str = "") -> Iterator[Dict[str, Any]]:
+    """
+    Yield one ``{"field", "value"}`` row per leaf of a nested document.
+
+    Fields are dotted paths, with list items addressed by index
+    (``time_series_data.0.attendance_rate``). Models and dataclasses are
+    converted through ``jsonable_encoder`` first.
+    """
+    yield from _flatten(jsonable_encoder(document), prefix)
+
+
+def _flatten(value: Any, path: str) -> Iterator[Dict[str, Any]]:
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            yield from _flatten(item, f"{path}.{key}" if path else str(key))
+    elif isinstance(value, list) and value:
+        for index, item in enumerate(value):
+            yield from _flatten(item, f"{path}.{index}" if path else str(index))
+    else:
+        yield {"field": path, "value": value}
+
+
+async def iterate(rows: Iterable[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """Adapt in-memory rows to the async row stream the encoders take."""
+    for row in rows:
+        yield row
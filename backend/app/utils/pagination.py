@@ -0,0 +1,80 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Offset pagination makes the database walk and discard every row before the
+requested page, so deep pages get slower as history grows. Keyset pagination
+instead continues from the last row of the previous page using an indexed
+``(created_at, id)`` comparison, keeping every page O(page size).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, literal, or_, select
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(row_id: int, order_value: Optional[datetime] = None) -> str:
+    """Encode the id and ordering timestamp of the last row on a page as an opaque cursor."""
+    payload = {"id": row_id, "at": order_value.isoformat() if order_value is not None else None}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[int, Optional[datetime]]:
+    """Decode a cursor produced by encode_cursor into ``(row_id, order_value)``."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        order_value = payload["at"]
+        return int(payload["id"]), datetime.fromisoformat(order_value) if order_value is not None else None
+    except (ValueError, TypeError, KeyError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def apply_keyset(query, model, cursor: Optional[str], limit: int, order_column=None):
+    """
+    Order a query newest first by ``(created_at, id)`` and continue after ``cursor``.
+
+    The anchor row's ``created_at`` is read back from the table rather than
+    taken from the cursor when the row still exists, so the comparison uses
+    the stored value (SQLite stores server-default timestamps without
+    microseconds, which breaks equality against a re-bound datetime). If the
+    anchor row was deleted in the meantime, the value carried in the cursor
+    is used instead.
+    The model must have an ``id`` column, and a ``created_at`` column unless
+    another ``order_column`` of the model is given.
+    """
+    if order_column is None:
+        order_column = model.created_at
+    if cursor:
+        row_id, order_value = decode_cursor(cursor)
+        anchor_value = func.coalesce(
+            select(order_column).where(model.id == row_id).scalar_subquery(),
+            literal(order_value, order_column.type)
+        )
+        query = query.where(
+            or_(
+                order_column < anchor_value,
+                and_(order_column == anchor_value, model.id < row_id)
+            )
+        )
+    return query.order_by(order_column.desc(), model.id.desc()).limit(limit)
+
+
+def next_cursor(rows, limit: int, order_column=None) -> Optional[str]:
+    """
+    Return the cursor for the page after ``rows``, or None on the last page.
+
+    ``order_column`` must be the one the page was ordered by in apply_keyset.
+    """
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    order_key = order_column.key if order_column is not None else "created_at"
+    return encode_cursor(last.id, getattr(last, order_key))
@@ -3,19 +3,22 @@ WebSocket handler for real-time attendance updates and teacher dashboard functio
 """
 import json
 import asyncio
+import secrets
 from datetime import datetime, timezone
 from typing import Dict, List, Set, Optional, Any
 from fastapi import WebSocket, WebSocketDisconnect, status
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, exists
 
-from ..core.security import jwt_manager
-from ..core.database import get_db
+from ..core.auth import decode_token
+from ..core.database import get_db, AsyncSessionLocal
+from ..core.websocket import websocket_server, MessageType, TEACHER_ROLES
 from ..models.user import User, UserRole
-from ..models.class_session import ClassSession
+from ..models.class_session import ClassSession, StudentEnrollment
 from ..models.attendance import AttendanceRecord, AttendanceStatus
 from ..services.attendance_engine import AttendanceEngine
+from ..services.live_counters import live_session_counters
 
 
 class AttendanceUpdate(BaseModel):
@@ -73,21 +76,65 @@ class AlertUpdate(BaseModel):
     timestamp: datetime
 
 
+async def class_session_access_role(db: AsyncSession, user_id: int, class_session_id: int) -> Optional[str]:
+    """
+    Role with which a user may follow a class session's attendance events,
+    or None if they may not.
+    
+    Admins may follow every session, teachers the sessions they teach and
+    students the sessions of a class they are enrolled in or have an
+    attendance record for.
+    """
+    user = await db.get(User, user_id)
+    if user is None or not user.is_active:
+        return None
+    if user.role == UserRole.ADMIN:
+        return user.role.value
+    
+    class_session = await db.get(ClassSession, class_session_id)
+    if class_session is None:
+        return None
+    
+    if user.role == UserRole.TEACHER:
+        return user.role.value if class_session.teacher_id == user.id else None
+    
+    conditions = [
+        exists().where(and_(
+            AttendanceRecord.student_id == user.id,
+            AttendanceRecord.class_session_id == class_session.id
+        ))
+    ]
+    if class_session.class_id is not None:
+        conditions.append(exists().where(and_(
+            StudentEnrollment.student_id == user.id,
+            StudentEnrollment.class_id == class_session.class_id,
+            StudentEnrollment.is_active == True
+        )))
+    
+    for condition in conditions:
+        if await db.scalar(select(condition)):
+            return user.role.value
+    return None
+
+
 class AttendanceConnectionManager:
-    """Manages WebSocket connections for attendance updates with role-based access."""
+    """
+    Adapter for the /ws/attendance endpoint over the shared connection registry.
     
-    def __init__(self):
-        # Dictionary of class_id -> set of WebSocket connections
-        self.teacher_connections: Dict[int, Set[WebSocket]] = {}
-        self.student_connections: Dict[int, Set[WebSocket]] = {}
-        
-        # Dictionary of WebSocket -> connection info for cleanup
-        self.connection_info: Dict[WebSocket, Dict[str, Any]] = {}
+    Connections are authenticated with a user access token and registered in
+    ``websocket_server.connection_pool`` with their role, so teacher dashboard
+    events reach them through the same single lookup and serialization as
+    every other WebSocket protocol.
+    """
+    
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.server = websocket_server
+        self.session_factory = session_factory
         
         # Track active operations to prevent conflicts
         self.active_operations: Dict[str, Dict[str, Any]] = {}
     
-    async def connect(self, websocket: WebSocket, class_id: int, token: str):
+    async def connect(self, websocket: WebSocket, class_id: int, token: str) -> Optional[str]:
         """
         Connect a WebSocket to attendance updates with authentication and role checking.
         
@@ -95,88 +142,66 @@ class AttendanceConnectionManager:
             websocket: WebSocket connection
             class_id: Class session ID
             token: JWT token for authentication
+        
+        Returns:
+            The connection id in the shared registry, or None if rejected
         """
         try:
             # Verify JWT token
-            payload = jwt_manager.verify_token(token)
-            user_id = payload.get("user_id")
-            user_role = payload.get("role")
+            payload = decode_token(token)
+            user_id = payload.get("sub") or payload.get("user_id")
             
-            if not user_id or not user_role:
+            # The role comes from the database, not the token
+            user_role = await self.authorize(user_id, class_id) if user_id else None
+            if not user_role:
                 await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-                return False
-            
-            # Get database session (simplified - in real app you'd inject this)
-            # For now, we'll just validate the connection
+                return None
             
-            # Accept connection
-            await websocket.accept()
-            
-            # Store connection info
-            self.connection_info[websocket] = {
-                "user_id": user_id,
-                "user_role": user_role,
-                "class_id": class_id,
-                "connected_at": datetime.now(timezone.utc)
-            }
+            connection_id = f"attendance_{class_id}_{secrets.token_urlsafe(8)}"
+            conn_info = await self.server.attach(
+                websocket, connection_id, str(class_id), str(user_id), user_role
+            )
+            if conn_info is None:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return None
             
-            # Add to appropriate connection pool
-            if user_role == UserRole.TEACHER.value:
-                if class_id not in self.teacher_connections:
-                    self.teacher_connections[class_id] = set()
-                self.teacher_connections[class_id].add(websocket)
-                
+            if user_role in TEACHER_ROLES:
                 # Send teacher-specific connection confirmation
-                await self._send_to_websocket(websocket, {
-                    "type": "teacher_connected",
+                await self.server.send_to_connection(connection_id, MessageType.CONNECT, {
+                    "connection_id": connection_id,
                     "class_id": class_id,
+                    "role": user_role,
                     "permissions": ["view_all", "edit_attendance", "bulk_operations"],
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
                     "message": "Connected to teacher dashboard"
                 })
             else:
-                if class_id not in self.student_connections:
-                    self.student_connections[class_id] = set()
-                self.student_connections[class_id].add(websocket)
-                
                 # Send student-specific connection confirmation
-                await self._send_to_websocket(websocket, {
-                    "type": "student_connected",
+                await self.server.send_to_connection(connection_id, MessageType.CONNECT, {
+                    "connection_id": connection_id,
                     "class_id": class_id,
+                    "role": user_role,
                     "permissions": ["view_own", "check_in"],
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
                     "message": "Connected to attendance updates"
                 })
             
-            return True
+            return connection_id
             
         except Exception as e:
             await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
-            return False
+            return None
     
-    def disconnect(self, websocket: WebSocket):
-        """Remove WebSocket connection and cleanup."""
-        if websocket not in self.connection_info:
-            return
-            
-        connection_info = self.connection_info[websocket]
-        class_id = connection_info["class_id"]
-        user_role = connection_info["user_role"]
-        
-        # Remove from appropriate connection pool
-        if user_role == UserRole.TEACHER.value:
-            if class_id in self.teacher_connections:
-                self.teacher_connections[class_id].discard(websocket)
-                if not self.teacher_connections[class_id]:
-                    del self.teacher_connections[class_id]
-        else:
-            if class_id in self.student_connections:
-                self.student_connections[class_id].discard(websocket)
-                if not self.student_connections[class_id]:
-                    del self.student_connections[class_id]
-        
-        # Remove connection info
-        del self.connection_info[websocket]
+    async def authorize(self, user_id: str, class_id: int) -> Optional[str]:
+        """Role of the user if they may follow the class session, else None."""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        async with self.session_factory() as db:
+            return await class_session_access_role(db, user_id, class_id)
+    
+    async def disconnect(self, connection_id: str):
+        """Remove a connection from the shared registry."""
+        await self.server.disconnect(connection_id)
     
     async def broadcast_attendance_update(self, update: AttendanceUpdate):
         """
@@ -185,77 +210,71 @@ class AttendanceConnectionManager:
         Args:
             update: Attendance update information
         """
-        class_id = update.class_session_id
-        message = {
-            "type": "attendance_updated",
-            "data": update.dict(),
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        
-        # Send to all teachers for this class (they can see everything)
-        await self._broadcast_to_teachers(class_id, message)
-        
-        # Send limited info to students (only their own updates)
-        student_message = {
-            "type": "attendance_updated",
-            "data": {
+        await self.publish_attendance_event(
+            update.class_session_id,
+            MessageType.ATTENDANCE_UPDATE,
+            update.model_dump(mode="json"),
+            update.student_id,
+            {
                 "student_id": update.student_id,
-                "new_status": update.new_status,
+                "new_status": update.new_status.value,
                 "is_override": update.is_override,
                 "timestamp": update.timestamp.isoformat()
-            } if update.student_id else None,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
+            }
+        )
+    
+    async def publish_attendance_event(
+        self,
+        class_session_id: int,
+        message_type: MessageType,
+        data: Dict[str, Any],
+        student_id: Optional[int] = None,
+        student_data: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Send an attendance event once to the class's teachers and, if given,
+        a limited view of it to the affected student only.
+        """
+        class_id = str(class_session_id)
         
-        await self._broadcast_to_students(class_id, student_message, update.student_id)
+        # Teachers see everything
+        await self.server.broadcast_to_class(class_id, message_type, data, roles=TEACHER_ROLES)
+        
+        # Students only see their own updates
+        if student_id and student_data is not None:
+            await self.server.send_to_user(
+                str(student_id), MessageType.ATTENDANCE_UPDATE, student_data, class_id=class_id
+            )
     
     async def broadcast_stats_update(self, stats: ClassStatsUpdate):
         """Broadcast updated class statistics to teachers."""
-        message = {
-            "type": "stats_updated",
-            "data": stats.dict(),
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        
         # Only teachers need full statistics
-        await self._broadcast_to_teachers(stats.class_session_id, message)
+        await self._broadcast_to_teachers(
+            stats.class_session_id, MessageType.STATS_UPDATED, stats.model_dump(mode="json")
+        )
     
     async def broadcast_bulk_operation(self, bulk_update: BulkOperationUpdate):
         """Broadcast bulk operation results to teachers."""
-        message = {
-            "type": "bulk_operation_completed",
-            "data": bulk_update.dict(),
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        
         # Only teachers need bulk operation results
-        await self._broadcast_to_teachers(bulk_update.class_session_id, message)
+        await self._broadcast_to_teachers(
+            bulk_update.class_session_id, MessageType.BULK_OPERATION_COMPLETED, bulk_update.model_dump(mode="json")
+        )
     
     async def broadcast_alert(self, alert: AlertUpdate):
         """Broadcast attendance alert to teachers."""
-        message = {
-            "type": "attendance_alert",
-            "data": alert.dict(),
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        
         # Only teachers need alerts
-        await self._broadcast_to_teachers(alert.class_session_id, message)
+        await self._broadcast_to_teachers(
+            alert.class_session_id, MessageType.ATTENDANCE_ALERT, alert.model_dump(mode="json")
+        )
     
     async def notify_conflict(self, class_id: int, operation: str, user_id: int):
         """Notify about potential conflicts in concurrent operations."""
-        message = {
-            "type": "operation_conflict",
-            "data": {
-                "class_id": class_id,
-                "operation": operation,
-                "conflicting_user": user_id,
-                "message": f"Another teacher is currently performing {operation}"
-            },
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        
-        await self._broadcast_to_teachers(class_id, message)
+        await self._broadcast_to_teachers(class_id, MessageType.OPERATION_CONFLICT, {
+            "class_id": class_id,
+            "operation": operation,
+            "conflicting_user": user_id,
+            "message": f"Another teacher is currently performing {operation}"
+        })
     
     def start_operation(self, operation_id: str, class_id: int, user_id: int, operation_type: str):
         """Track start of an operation to detect conflicts."""
@@ -280,59 +299,20 @@ class AttendanceConnectionManager:
                 return True
         return False
     
-    async def _broadcast_to_teachers(self, class_id: int, message: dict):
+    async def _broadcast_to_teachers(self, class_id: int, message_type: MessageType, data: Dict[str, Any]):
         """Broadcast message to all teacher connections for a class."""
-        if class_id not in self.teacher_connections:
-            return
-        
-        connections = self.teacher_connections[class_id].copy()
-        failed_connections = []
-        
-        for websocket in connections:
-            try:
-                await self._send_to_websocket(websocket, message)
-            except Exception:
-                failed_connections.append(websocket)
-        
-        # Clean up failed connections
-        for websocket in failed_connections:
-            self.disconnect(websocket)
+        await self.server.broadcast_to_class(str(class_id), message_type, data, roles=TEACHER_ROLES)
     
-    async def _broadcast_to_students(self, class_id: int, message: dict, target_student_id: Optional[int] = None):
-        """Broadcast message to student connections, optionally filtered by student ID."""
-        if class_id not in self.student_connections:
-            return
-        
-        connections = self.student_connections[class_id].copy()
-        failed_connections = []
-        
-        for websocket in connections:
-            try:
-                connection_info = self.connection_info.get(websocket)
-                if not connection_info:
-                    continue
-                
-                # If target_student_id is specified, only send to that student
-                if target_student_id and connection_info["user_id"] != target_student_id:
-                    continue
-                
-                await self._send_to_websocket(websocket, message)
-            except Exception:
-                failed_connections.append(websocket)
-        
-        # Clean up failed connections
-        for websocket in failed_connections:
-            self.disconnect(websocket)
-    
-    async def _send_to_websocket(self, websocket: WebSocket, message: dict):
-        """Send message to a specific WebSocket connection."""
-        await websocket.send_text(json.dumps(message))
+    async def send(self, connection_id: str, message_type: MessageType, data: Dict[str, Any]):
+        """Send a message to a specific connection."""
+        await self.server.send_to_connection(connection_id, message_type, data)
     
     def get_active_connections_count(self, class_id: int) -> Dict[str, int]:
         """Get number of active connections by role for a class."""
+        counts = self.server.connection_pool.count_class_connections(str(class_id))
         return {
-            "teachers": len(self.teacher_connections.get(class_id, set())),
-            "students": len(self.student_connections.get(class_id, set()))
+            "teachers": sum(counts.get(role, 0) for role in TEACHER_ROLES),
+            "students": counts.get(UserRole.STUDENT.value, 0)
         }
 
 
@@ -433,74 +413,73 @@ class AttendanceUpdateService:
         await self.connection_manager.broadcast_alert(alert)
     
     async def _update_and_broadcast_stats(self, class_session_id: int):
-        """Calculate and broadcast updated class statistics."""
+        """Broadcast the current class statistics from the live session counters."""
         try:
-            # This would typically use the database to calculate stats
-            # For now, we'll create a placeholder
+            counts = await live_session_counters.get(class_session_id)
+            if counts is None:
+                return
+            
             stats = ClassStatsUpdate(
                 class_session_id=class_session_id,
-                total_enrolled=25,  # Would be calculated from database
-                checked_in_count=20,
-                present_count=18,
-                late_count=2,
-                absent_count=5,
-                excused_count=0,
-                attendance_rate=0.8,
-                last_updated=datetime.now(timezone.utc)
+                total_enrolled=counts.total_enrolled,
+                checked_in_count=counts.checked_in_count,
+                present_count=counts.present_count,
+                late_count=counts.late_count,
+                absent_count=counts.absent_count,
+                excused_count=counts.excused_count,
+                attendance_rate=counts.to_stats().attendance_rate,
+                last_updated=counts.last_updated
             )
             
             await self.connection_manager.broadcast_stats_update(stats)
         except Exception as e:
             print(f"Error updating stats: {e}")
     
-    async def handle_websocket_messages(self, websocket: WebSocket, class_id: int):
+    async def broadcast_stats(self, class_session_id: int):
+        """Broadcast the current class statistics to teachers."""
+        await self._update_and_broadcast_stats(class_session_id)
+    
+    async def handle_websocket_messages(self, websocket: WebSocket, connection_id: str, class_id: int):
         """
         Handle incoming WebSocket messages from clients.
         
         Args:
             websocket: WebSocket connection
+            connection_id: Connection id in the shared registry
             class_id: Associated class session ID
         """
         try:
             while True:
                 data = await websocket.receive_text()
+                websocket_server.connection_pool.update_activity(connection_id)
                 
                 try:
                     message = json.loads(data)
-                    await self._process_client_message(websocket, class_id, message)
+                    await self._process_client_message(connection_id, class_id, message)
                 except json.JSONDecodeError:
-                    await self.connection_manager._send_to_websocket(
-                        websocket,
-                        {
-                            "type": "error",
-                            "message": "Invalid JSON format"
-                        }
+                    await self.connection_manager.send(
+                        connection_id, MessageType.ERROR, {"error": "Invalid JSON format"}
                     )
                 
         except WebSocketDisconnect:
-            self.connection_manager.disconnect(websocket)
+            await self.connection_manager.disconnect(connection_id)
         except Exception as e:
-            await self.connection_manager._send_to_websocket(
-                websocket,
-                {
-                    "type": "error", 
-                    "message": f"Connection error: {str(e)}"
-                }
+            await self.connection_manager.send(
+                connection_id, MessageType.ERROR, {"error": f"Connection error: {str(e)}"}
             )
-            self.connection_manager.disconnect(websocket)
+            await self.connection_manager.disconnect(connection_id)
     
-    async def _process_client_message(self, websocket: WebSocket, class_id: int, message: dict):
+    async def _process_client_message(self, connection_id: str, class_id: int, message: dict):
         """Process incoming client messages."""
         message_type = message.get("type")
-        connection_info = self.connection_manager.connection_info.get(websocket)
+        connection_info = websocket_server.connection_pool.get_connection(connection_id)
         
         if not connection_info:
             return
         
         if message_type == "ping":
-            await self.connection_manager._send_to_websocket(
-                websocket,
-                {"type": "pong", "timestamp": datetime.now(timezone.utc).isoformat()}
+            await self.connection_manager.send(
+                connection_id, MessageType.PONG, {"timestamp": datetime.now(timezone.utc).isoformat()}
             )
         elif message_type == "request_stats":
             await self._update_and_broadcast_stats(class_id)
@@ -508,33 +487,24 @@ class AttendanceUpdateService:
             # Handle operation conflict detection
             operation_type = message.get("operation_type")
             operation_id = message.get("operation_id")
-            user_id = connection_info["user_id"]
+            user_id = connection_info.user_id
             
             if self.connection_manager.check_operation_conflict(class_id, operation_type, user_id):
                 await self.connection_manager.notify_conflict(class_id, operation_type, user_id)
-                await self.connection_manager._send_to_websocket(
-                    websocket,
-                    {
-                        "type": "operation_blocked",
-                        "message": f"Another teacher is currently performing {operation_type}"
-                    }
-                )
+                await self.connection_manager.send(connection_id, MessageType.OPERATION_BLOCKED, {
+                    "message": f"Another teacher is currently performing {operation_type}"
+                })
             else:
                 self.connection_manager.start_operation(operation_id, class_id, user_id, operation_type)
-                await self.connection_manager._send_to_websocket(
-                    websocket,
-                    {
-                        "type": "operation_started",
-                        "operation_id": operation_id
-                    }
-                )
+                await self.connection_manager.send(connection_id, MessageType.OPERATION_STARTED, {
+                    "operation_id": operation_id
+                })
         elif message_type == "end_operation":
             operation_id = message.get("operation_id")
             self.connection_manager.end_operation(operation_id)
         else:
-            await self.connection_manager._send_to_websocket(
-                websocket,
-                {"type": "error", "message": f"Unknown message type: {message_type}"}
+            await self.connection_manager.send(
+                connection_id, MessageType.ERROR, {"error": f"Unknown message type: {message_type}"}
             )
 
 
@@ -564,11 +534,11 @@ class AttendanceWebSocketManager:
             return
         
         # Attempt connection with authentication
-        connected = await self.connection_manager.connect(websocket, class_id, token)
+        connection_id = await self.connection_manager.connect(websocket, class_id, token)
         
-        if connected:
+        if connection_id:
             # Handle incoming messages
-            await self.update_service.handle_websocket_messages(websocket, class_id)
+            await self.update_service.handle_websocket_messages(websocket, connection_id, class_id)
     
     async def notify_attendance_change(
         self,
@@ -589,6 +559,20 @@ class AttendanceWebSocketManager:
             updated_by, updated_by_name, reason, is_override, late_minutes
         )
     
+    async def publish_attendance_event(
+        self,
+        class_session_id: int,
+        message_type: MessageType,
+        data: Dict[str, Any],
+        student_id: Optional[int] = None,
+        student_data: Optional[Dict[str, Any]] = None
+    ):
+        """Public method to send one attendance event to teachers and the affected student."""
+        await self.connection_manager.publish_attendance_event(
+            class_session_id, message_type, data, student_id, student_data
+        )
+        await self.update_service.broadcast_stats(class_session_id)
+    
     async def notify_bulk_operation(
         self,
         class_session_id: int,
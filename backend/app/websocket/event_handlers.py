@@ -6,7 +6,8 @@ from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 
-from ..core.websocket import websocket_server, MessageType, ConnectionInfo
+from ..core.websocket import websocket_server, MessageType, ConnectionInfo, TEACHER_ROLES
+from ..services.live_counters import live_session_counters
 
 logger = logging.getLogger(__name__)
 
@@ -81,7 +82,8 @@ class AttendanceEventHandler:
             await websocket_server.broadcast_to_class(
                 event.class_id,
                 MessageType.STUDENT_JOINED,
-                event_data
+                event_data,
+                roles=TEACHER_ROLES
             )
             
             # Update session statistics and broadcast
@@ -107,7 +109,8 @@ class AttendanceEventHandler:
             await websocket_server.broadcast_to_class(
                 event.class_id,
                 MessageType.ATTENDANCE_UPDATE,
-                event_data
+                event_data,
+                roles=TEACHER_ROLES
             )
             
             # Update session statistics and broadcast
@@ -219,33 +222,31 @@ class AttendanceEventHandler:
             await websocket_server.broadcast_to_class(
                 class_id,
                 MessageType.STATS_UPDATE,
-                stats
+                stats,
+                roles=TEACHER_ROLES
             )
         except Exception as e:
             logger.error(f"Error updating and broadcasting stats: {e}")
     
     async def _get_session_stats(self, class_id: str, session_id: str) -> Dict[str, Any]:
-        """Get current session statistics."""
+        """Get current session statistics from the live session counters."""
         try:
-            # This would typically query the database for real statistics
-            # For now, we'll return placeholder data
+            counts = await live_session_counters.get(int(session_id))
+            if counts is None:
+                return {}
+            
+            stats = counts.to_stats()
             return {
                 "class_id": class_id,
                 "session_id": session_id,
-                "total_students": 25,
-                "present_count": 18,
-                "late_count": 3,
-                "absent_count": 4,
-                "attendance_rate": 72.0,
-                "time_remaining_minutes": 15,
-                "recent_joins": [
-                    {
-                        "student_name": "John Doe",
-                        "joined_at": datetime.now(timezone.utc).isoformat(),
-                        "join_method": "qr"
-                    }
-                ],
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "total_students": stats.total_students,
+                "present_count": counts.present_count,
+                "late_count": counts.late_count,
+                "absent_count": counts.absent_count,
+                "attendance_rate": round(stats.attendance_rate * 100, 1),
+                "time_remaining_minutes": counts.time_remaining_minutes,
+                "recent_joins": [],
+                "updated_at": counts.last_updated.isoformat()
             }
         except Exception as e:
             logger.error(f"Error getting session stats: {e}")
@@ -7,14 +7,14 @@ import asyncio
 import logging
 import secrets
 from datetime import datetime, timezone
-from typing import Dict, List, Set
+from typing import List
 from fastapi import WebSocket, WebSocketDisconnect, status
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
-from ..core.security import jwt_manager
-from ..core.websocket import websocket_server, MessageType
+from ..core.websocket import websocket_server, MessageType, TEACHER_ROLES
+from ..services.live_counters import live_session_counters
 from .event_handlers import attendance_event_handler, StudentJoinEvent
 
 
@@ -38,116 +38,17 @@ class LiveSessionStats(BaseModel):
     recent_joins: List[str]
 
 
-class ConnectionManager:
-    """Manages WebSocket connections for class sessions."""
-    
-    def __init__(self):
-        # Dictionary of class_id -> set of WebSocket connections
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
-        # Dictionary of WebSocket -> class_id for cleanup
-        self.connection_class_map: Dict[WebSocket, str] = {}
-    
-    async def connect(self, websocket: WebSocket, class_id: str, token: str):
-        """
-        Connect a WebSocket to a class session with authentication.
-        
-        Args:
-            websocket: WebSocket connection
-            class_id: Class session ID
-            token: JWT token for authentication
-        """
-        try:
-            # Verify JWT token
-            payload = jwt_manager.verify_class_session_token(token)
-            
-            # Verify class_id matches token
-            if payload.get("class_id") != class_id:
-                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-                return False
-            
-            # Accept connection
-            await websocket.accept()
-            
-            # Add to active connections
-            if class_id not in self.active_connections:
-                self.active_connections[class_id] = set()
-            
-            self.active_connections[class_id].add(websocket)
-            self.connection_class_map[websocket] = class_id
-            
-            # Send initial connection confirmation
-            await self._send_to_websocket(websocket, {
-                "type": "connection_confirmed",
-                "class_id": class_id,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "message": "Connected to live updates"
-            })
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Authentication failed for connection {class_id}: {e}")
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return False
-    
-    def disconnect(self, websocket: WebSocket):
-        """Remove WebSocket connection and cleanup."""
-        if websocket in self.connection_class_map:
-            class_id = self.connection_class_map[websocket]
-            
-            # Remove from active connections
-            if class_id in self.active_connections:
-                self.active_connections[class_id].discard(websocket)
-                
-                # Clean up empty class sessions
-                if not self.active_connections[class_id]:
-                    del self.active_connections[class_id]
-            
-            # Remove from connection map
-            del self.connection_class_map[websocket]
-    
-    async def broadcast_to_class(self, class_id: str, message: dict):
-        """
-        Broadcast message to all connections for a specific class.
-        
-        Args:
-            class_id: Class session ID
-            message: Message to broadcast
-        """
-        if class_id not in self.active_connections:
-            return
-        
-        # Get copy of connections to avoid modification during iteration
-        connections = self.active_connections[class_id].copy()
-        
-        # Send to all connections, removing failed ones
-        failed_connections = []
-        for websocket in connections:
-            try:
-                await self._send_to_websocket(websocket, message)
-            except Exception:
-                failed_connections.append(websocket)
-        
-        # Clean up failed connections
-        for websocket in failed_connections:
-            self.disconnect(websocket)
-    
-    async def _send_to_websocket(self, websocket: WebSocket, message: dict):
-        """Send message to a specific WebSocket connection."""
-        await websocket.send_text(json.dumps(message))
-    
-    def get_active_connections_count(self, class_id: str) -> int:
-        """Get number of active WebSocket connections for a class."""
-        return len(self.active_connections.get(class_id, set()))
-
-
 class LiveUpdateService:
-    """Service for managing real-time updates during class sessions."""
+    """
+    Service for managing real-time updates during class sessions.
+    
+    Events are published through the shared ``websocket_server`` registry, so
+    legacy /ws/{class_id} clients and every other protocol on the class
+    receive them from a single lookup.
+    """
     
-    def __init__(self, connection_manager: ConnectionManager):
-        self.connection_manager = connection_manager
-        # In-memory store for demo (use Redis in production)
-        self.session_data: Dict[str, dict] = {}
+    def __init__(self, server=websocket_server):
+        self.server = server
     
     async def student_joined(self, student_join: StudentJoin):
         """
@@ -156,20 +57,16 @@ class LiveUpdateService:
         Args:
             student_join: Student join information
         """
-        message = {
-            "type": "student_joined",
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "data": {
+        await self.server.broadcast_to_class(
+            student_join.class_id,
+            MessageType.STUDENT_JOINED,
+            {
                 "student_id": student_join.student_id,
                 "student_name": student_join.student_name,
                 "joined_at": student_join.joined_at.isoformat(),
                 "join_method": student_join.join_method
-            }
-        }
-        
-        await self.connection_manager.broadcast_to_class(
-            student_join.class_id, 
-            message
+            },
+            roles=TEACHER_ROLES
         )
         
         # Update session statistics
@@ -183,14 +80,7 @@ class LiveUpdateService:
             class_id: Class session ID
             update_data: Updated session information
         """
-        message = {
-            "type": "session_updated",
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "class_id": class_id,
-            "data": update_data
-        }
-        
-        await self.connection_manager.broadcast_to_class(class_id, message)
+        await self.server.broadcast_to_class(class_id, MessageType.SESSION_UPDATE, update_data, roles=TEACHER_ROLES)
     
     async def session_ended(self, class_id: str, final_stats: dict):
         """
@@ -200,14 +90,7 @@ class LiveUpdateService:
             class_id: Class session ID
             final_stats: Final session statistics
         """
-        message = {
-            "type": "session_ended",
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "class_id": class_id,
-            "data": final_stats
-        }
-        
-        await self.connection_manager.broadcast_to_class(class_id, message)
+        await self.server.broadcast_to_class(class_id, MessageType.SESSION_ENDED, final_stats, roles=TEACHER_ROLES)
     
     async def broadcast_stats_update(self, class_id: str, stats: LiveSessionStats):
         """
@@ -217,96 +100,44 @@ class LiveUpdateService:
             class_id: Class session ID
             stats: Current session statistics
         """
-        message = {
-            "type": "stats_update",
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "class_id": class_id,
-            "data": stats.dict()
-        }
-        
-        await self.connection_manager.broadcast_to_class(class_id, message)
+        await self.server.broadcast_to_class(class_id, MessageType.STATS_UPDATE, stats.model_dump(), roles=TEACHER_ROLES)
     
     async def _update_session_stats(self, class_id: str):
-        """Update and broadcast session statistics."""
-        # This would typically fetch from database
-        # For now, we'll create placeholder stats
+        """Broadcast session statistics from the live session counters."""
+        try:
+            counts = await live_session_counters.get(int(class_id))
+        except Exception as e:
+            logger.error(f"Error getting session stats for {class_id}: {e}")
+            return
+        
+        if counts is None:
+            return
+        
         stats = LiveSessionStats(
             class_id=class_id,
-            class_name="Sample Class",
-            status="active",
-            time_remaining_minutes=25,
-            total_joins=1,
-            unique_students=1,
+            class_name=counts.class_name,
+            status=counts.status,
+            time_remaining_minutes=counts.time_remaining_minutes or 0,
+            total_joins=counts.checked_in_count,
+            unique_students=sum(counts.status_counts.values()),
             recent_joins=[]
         )
         
         await self.broadcast_stats_update(class_id, stats)
     
-    async def handle_websocket_messages(self, websocket: WebSocket, class_id: str):
-        """
-        Handle incoming WebSocket messages from clients.
-        
-        Args:
-            websocket: WebSocket connection
-            class_id: Associated class session ID
-        """
-        try:
-            while True:
-                data = await websocket.receive_text()
-                
-                try:
-                    message = json.loads(data)
-                    await self._process_client_message(websocket, class_id, message)
-                except json.JSONDecodeError:
-                    await self.connection_manager._send_to_websocket(
-                        websocket,
-                        {
-                            "type": "error",
-                            "message": "Invalid JSON format"
-                        }
-                    )
-                
-        except WebSocketDisconnect:
-            self.connection_manager.disconnect(websocket)
-        except Exception as e:
-            await self.connection_manager._send_to_websocket(
-                websocket,
-                {
-                    "type": "error", 
-                    "message": f"Connection error: {str(e)}"
-                }
-            )
-            self.connection_manager.disconnect(websocket)
-    
-    async def _process_client_message(self, websocket: WebSocket, class_id: str, message: dict):
-        """Process incoming client messages."""
-        message_type = message.get("type")
-        
-        if message_type == "ping":
-            await self.connection_manager._send_to_websocket(
-                websocket,
-                {"type": "pong", "timestamp": datetime.now(timezone.utc).isoformat()}
-            )
-        elif message_type == "request_stats":
-            # Send current session statistics
-            await self._update_session_stats(class_id)
-        else:
-            await self.connection_manager._send_to_websocket(
-                websocket,
-                {"type": "error", "message": f"Unknown message type: {message_type}"}
-            )
+    def get_active_connections_count(self, class_id: str) -> int:
+        """Get number of active WebSocket connections for a class."""
+        return len(self.server.connection_pool.get_class_connections(class_id))
 
 
 # Global instances
-connection_manager = ConnectionManager()
-live_update_service = LiveUpdateService(connection_manager)
+live_update_service = LiveUpdateService()
 
 
 class WebSocketManager:
     """Main WebSocket manager for FastAPI integration - Legacy compatibility layer."""
     
     def __init__(self):
-        self.connection_manager = connection_manager
         self.live_service = live_update_service
     
     async def websocket_endpoint(self, websocket: WebSocket, class_id: str, token: str = None):
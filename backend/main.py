@@ -16,6 +16,10 @@ from app.api.v1 import classes, auth, attendance, admin  # Admin module for syst
 from app.websocket.live_updates import manager
 from app.websocket.event_handlers import attendance_event_handler
 from app.websocket.attendance_updates import attendance_ws_manager
+from app.services.live_counters import live_session_counters
+from app.services.attendance_rollups import attendance_rollups
+from app.services.system_stats import system_stats_snapshot
+from app.core.compute import compute_executor, event_loop_monitor
 
 logger = logging.getLogger(__name__)
 
@@ -27,9 +31,29 @@ async def lifespan(app: FastAPI):
     
     # Initialize WebSocket server
     # Event handlers are automatically registered in their __init__
+    # Receive broadcasts from the other workers over the backplane
+    await websocket_server.start()
+    
+    # Periodically reconcile live attendance counters with the database
+    live_session_counters.start_reconciliation()
+    
+    # Keep the analytics rollups current
+    attendance_rollups.start_refresh()
+    
+    # Keep the admin dashboard statistics current
+    system_stats_snapshot.start_refresh()
+    
+    # Track how long CPU-bound work holds up the event loop
+    event_loop_monitor.start()
     
     yield
     
+    await event_loop_monitor.shutdown()
+    compute_executor.shutdown()
+    await system_stats_snapshot.shutdown()
+    await attendance_rollups.shutdown()
+    await live_session_counters.shutdown()
+    
     # Cleanup WebSocket server
     await websocket_server.shutdown()
 
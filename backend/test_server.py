@@ -103,7 +103,7 @@ def test_websocket():
         print("✅ WebSocket core infrastructure imported")
         
         # Test live updates
-        from app.websocket.live_updates import connection_manager, live_update_service
+        from app.websocket.live_updates import live_update_service
         print("✅ Live updates service imported")
         
         return True
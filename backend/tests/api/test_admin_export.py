@@ -0,0 +1,69 @@
+"""
+Tests for the admin user export formats.
+"""
+import csv
+import io
+import json
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.api.v1 import admin as admin_api
+from app.core.database import Base
+from app.models import sis_integration  # noqa: F401 - sync_schedules references its table
+from app.models.user import User, UserRole
+
+# The model relationships emit overlap warnings during mapper configuration
+pytestmark = pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+
+
+@pytest_asyncio.fixture
+async def session_factory(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr("app.utils.export.AsyncSessionLocal", factory)
+
+    async with factory() as db:
+        await db.execute(insert(User), [
+            {
+                "email": f"user{i}@example.com", "username": f"user{i}", "full_name": f"User {i}",
+                "hashed_password": "x", "role": UserRole.STUDENT if i else UserRole.ADMIN
+            }
+            for i in range(3)
+        ])
+        await db.commit()
+    yield factory
+    await engine.dispose()
+
+
+async def _export(format: str):
+    response = await admin_api.export_users(format=format, current_admin=None)
+    body = b"".join([chunk async for chunk in response.body_iterator]).decode()
+    return response, body
+
+
+@pytest.mark.asyncio
+async def test_format_is_case_insensitive(session_factory):
+    response, body = await _export("CSV")
+
+    assert response.media_type == "text/csv"
+    assert response.headers["content-disposition"].endswith(".csv")
+    assert len(list(csv.DictReader(io.StringIO(body)))) == 3
+
+    response, body = await _export("NDJSON")
+
+    assert response.media_type == "application/x-ndjson"
+    assert len(body.splitlines()) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("format", ["json", "Json", "xml"])
+async def test_json_and_unknown_formats_return_an_inline_json_array(session_factory, format):
+    response, body = await _export(format)
+
+    assert response.media_type == "application/json"
+    assert "content-disposition" not in response.headers
+    assert sorted(user["username"] for user in json.loads(body)) == ["user0", "user1", "user2"]
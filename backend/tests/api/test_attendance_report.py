@@ -0,0 +1,181 @@
+"""
+Tests for the class attendance report: the single joined records query and
+the streaming JSON/CSV variant.
+"""
+import csv
+import io
+import json
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.api.v1 import attendance as attendance_api
+from app.core.database import Base
+from app.models import sis_integration  # noqa: F401 - sync_schedules references its table
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+
+# The model relationships emit overlap warnings during mapper configuration
+pytestmark = pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+
+STATUSES = [AttendanceStatus.PRESENT, AttendanceStatus.LATE, AttendanceStatus.ABSENT, AttendanceStatus.EXCUSED]
+
+
+@pytest_asyncio.fixture
+async def db_engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session_factory(db_engine, monkeypatch):
+    factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr("app.utils.export.AsyncSessionLocal", factory)
+    return factory
+
+
+async def _seed_report(factory, record_count: int, override_count: int):
+    async with factory() as db:
+        teachers = [
+            User(
+                email=f"teacher{i}@example.com", username=f"teacher{i}", full_name=f"Teacher {i}",
+                hashed_password="x", role=UserRole.TEACHER
+            )
+            for i in range(3)
+        ]
+        students = [
+            User(
+                email=f"student{i}@example.com", username=f"student{i}", full_name=f"Student {i:04d}",
+                hashed_password="x", role=UserRole.STUDENT
+            )
+            for i in range(record_count)
+        ]
+        db.add_all(teachers + students)
+        await db.flush()
+
+        session = ClassSession(
+            name="Chemistry", subject="Science", teacher_id=teachers[0].id,
+            jwt_token="token", verification_code="123456"
+        )
+        db.add(session)
+        await db.flush()
+
+        db.add_all([
+            AttendanceRecord(
+                student_id=student.id,
+                class_session_id=session.id,
+                status=STATUSES[i % len(STATUSES)],
+                is_manual_override=i < override_count,
+                override_by_teacher_id=teachers[1 + i % 2].id if i < override_count else None
+            )
+            for i, student in enumerate(students)
+        ])
+        await db.commit()
+        return session.id, teachers[0]
+
+
+async def _report(factory, db_engine, class_session_id, user):
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", on_execute)
+    async with factory() as db:
+        report = await attendance_api.get_class_attendance_report(
+            class_session_id, db=db, current_user=user
+        )
+    event.remove(db_engine.sync_engine, "before_cursor_execute", on_execute)
+    return report, len(statements)
+
+
+@pytest.mark.asyncio
+async def test_report_resolves_override_teachers(db_engine, session_factory):
+    class_session_id, teacher = await _seed_report(session_factory, 8, 4)
+
+    report, _ = await _report(session_factory, db_engine, class_session_id, teacher)
+
+    assert report.teacher_name == "Teacher 0"
+    assert [record.override_teacher_name for record in report.records] == [
+        "Teacher 1", "Teacher 2", "Teacher 1", "Teacher 2", None, None, None, None
+    ]
+    assert report.stats.total_students == 8
+    assert report.stats.present_count == 2
+    assert report.stats.late_count == 2
+    assert report.stats.attendance_rate == 0.75
+
+
+@pytest.mark.asyncio
+async def test_report_queries_do_not_grow_with_overrides(db_engine, session_factory):
+    class_session_id, teacher = await _seed_report(session_factory, 40, 40)
+
+    report, statement_count = await _report(session_factory, db_engine, class_session_id, teacher)
+
+    assert len(report.records) == 40
+    assert statement_count == 2
+
+
+@pytest.mark.asyncio
+async def test_streamed_json_matches_report(db_engine, session_factory):
+    class_session_id, teacher = await _seed_report(session_factory, 12, 5)
+    report, _ = await _report(session_factory, db_engine, class_session_id, teacher)
+
+    async with session_factory() as db:
+        response = await attendance_api.stream_class_attendance_report(
+            class_session_id, format="json", db=db, current_user=teacher
+        )
+    body = b"".join([chunk async for chunk in response.body_iterator]).decode()
+    streamed = json.loads(body)
+
+    assert streamed == json.loads(report.model_dump_json())
+
+
+@pytest.mark.asyncio
+async def test_streamed_csv_has_one_row_per_record(db_engine, session_factory):
+    class_session_id, teacher = await _seed_report(session_factory, 12, 5)
+
+    async with session_factory() as db:
+        response = await attendance_api.stream_class_attendance_report(
+            class_session_id, format="csv", db=db, current_user=teacher
+        )
+    body = b"".join([chunk async for chunk in response.body_iterator]).decode()
+    rows = list(csv.DictReader(io.StringIO(body)))
+
+    assert response.media_type == "text/csv"
+    assert len(rows) == 12
+    assert rows[0]["student_name"] == "Student 0000"
+    assert rows[0]["override_teacher_name"] == "Teacher 1"
+    assert rows[-1]["override_teacher_name"] == ""
+
+
+@pytest.mark.asyncio
+async def test_stream_is_limited_to_the_session_teacher_and_admins(db_engine, session_factory):
+    class_session_id, teacher = await _seed_report(session_factory, 3, 0)
+    async with session_factory() as db:
+        other_teacher = (await db.execute(
+            select(User).where(User.username == "teacher1")
+        )).scalar_one()
+        admin = User(
+            email="admin@example.com", username="admin", full_name="Admin",
+            hashed_password="x", role=UserRole.ADMIN
+        )
+        db.add(admin)
+        await db.commit()
+
+        with pytest.raises(HTTPException) as exc_info:
+            await attendance_api.stream_class_attendance_report(
+                class_session_id, format="csv", db=db, current_user=other_teacher
+            )
+        assert exc_info.value.status_code == 403
+
+        response = await attendance_api.stream_class_attendance_report(
+            class_session_id, format="csv", db=db, current_user=admin
+        )
+        assert response.status_code == 200
+
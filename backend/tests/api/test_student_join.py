@@ -0,0 +1,88 @@
+"""
+Tests for joining a class with its verification code.
+"""
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from starlette.requests import Request
+
+from app.api.v1.classes import student_join_class
+from app.core.database import Base
+from app.models import sis_integration  # noqa: F401 - sync_schedules references its table
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceAuditLog, AttendanceStatus
+from app.services.live_counters import live_session_counters
+
+# The model relationships emit overlap warnings during mapper configuration
+pytestmark = pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def late_session(db):
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    student = User(
+        email="student@example.com", username="student", full_name="Student",
+        hashed_password="x", role=UserRole.STUDENT
+    )
+    db.add_all([teacher, student])
+    await db.flush()
+
+    session = ClassSession(
+        name="Physics", teacher_id=teacher.id, jwt_token="token", verification_code="424242",
+        start_time=datetime.utcnow() - timedelta(minutes=20)
+    )
+    db.add(session)
+    await db.commit()
+    live_session_counters.clear()
+    return session, student
+
+
+def _request():
+    return Request({
+        "type": "http", "method": "POST", "path": "/api/v1/classes/join/424242",
+        "headers": [(b"user-agent", b"pytest")], "client": ("10.0.0.5", 1234)
+    })
+
+
+@pytest.mark.asyncio
+async def test_join_records_check_in_through_the_engine(db, late_session):
+    session, student = late_session
+    counts = await live_session_counters.get(session.id, db)
+
+    response = await student_join_class("424242", _request(), db, student)
+
+    assert response["already_joined"] is False
+    assert response["is_late"] is True
+    record = (await db.execute(select(AttendanceRecord))).scalar_one()
+    assert record.status == AttendanceStatus.LATE
+    assert record.ip_address == "10.0.0.5"
+    assert (await db.execute(select(AttendanceAuditLog))).scalar_one().action == "create"
+    assert counts.late_count == 1
+
+
+@pytest.mark.asyncio
+async def test_second_join_is_reported_as_already_joined(db, late_session):
+    session, student = late_session
+    first = await student_join_class("424242", _request(), db, student)
+
+    second = await student_join_class("424242", _request(), db, student)
+
+    assert second["already_joined"] is True
+    assert second["join_time"] == first["join_time"]
+    assert len((await db.execute(select(AttendanceRecord))).scalars().all()) == 1
@@ -0,0 +1,135 @@
+"""
+Tests for the compute executor and the event loop lag monitor.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+import pytest
+from datetime import datetime, timedelta
+
+from app.core.compute import ComputeExecutor, EventLoopLagMonitor
+from app.models.attendance import AttendanceStatus
+from app.services.history_statistics import (
+    HistoryRow, compute_history_statistics, compute_history_statistics_batch
+)
+
+
+def _rows(size: int):
+    start = datetime(2025, 3, 3, 9)
+    statuses = list(AttendanceStatus)
+    return [
+        HistoryRow(
+            statuses[i % len(statuses)], start + timedelta(days=i), start + timedelta(days=i, minutes=i % 7),
+            i % 11 or None, i % 4 == 1, i % 5 == 0, i % 9 == 0
+        )
+        for i in range(size)
+    ]
+
+
+def _worker_pid() -> int:
+    return os.getpid()
+
+
+def _crash_in_worker_process() -> str:
+    if multiprocessing.parent_process() is not None:
+        os._exit(1)
+    return "survived"
+
+
+@pytest.mark.asyncio
+async def test_process_pool_runs_kernel_with_same_result():
+    executor = ComputeExecutor(max_workers=1, use_processes=True)
+    try:
+        histories = [_rows(50), _rows(80)]
+        results = await executor.run(compute_history_statistics_batch, histories)
+        assert results == [compute_history_statistics(rows) for rows in histories]
+        assert await executor.run(_worker_pid) != os.getpid()
+        assert executor.get_stats()['mode'] == "process"
+        assert executor.get_stats()['offloaded'] == 2
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_threads_are_the_default():
+    executor = ComputeExecutor(max_workers=1)
+    try:
+        assert await executor.run(_worker_pid) == os.getpid()
+        assert executor.get_stats()['mode'] == "thread"
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_thread_mode_and_inline_threshold():
+    executor = ComputeExecutor(max_workers=2, use_processes=False, min_offload_items=100)
+    try:
+        rows = _rows(20)
+        assert await executor.run(compute_history_statistics, rows, size=len(rows)) == compute_history_statistics(rows)
+        assert executor.get_stats()['inline'] == 1
+
+        assert await executor.run(_worker_pid, size=500) == os.getpid()
+        stats = executor.get_stats()
+        assert stats['mode'] == "thread" and stats['offloaded'] == 1
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_broken_process_pool_falls_back_to_threads():
+    executor = ComputeExecutor(max_workers=1, use_processes=True)
+    try:
+        assert await executor.run(_crash_in_worker_process) == "survived"
+        stats = executor.get_stats()
+        assert stats['mode'] == "thread" and stats['fallbacks'] == 1
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_map_batches_splits_by_size():
+    executor = ComputeExecutor(max_workers=2, use_processes=False, min_offload_items=100, batch_items=150)
+    try:
+        histories = [_rows(60) for _ in range(5)]
+        sizes = [len(rows) for rows in histories]
+        results = await executor.map_batches(compute_history_statistics_batch, histories, sizes)
+        assert results == [compute_history_statistics(rows) for rows in histories]
+        # 60 + 60 per batch
+        assert executor.get_stats()['offloaded'] == 3
+
+        assert await executor.map_batches(compute_history_statistics_batch, histories[:1], sizes[:1]) == results[:1]
+        assert executor.get_stats()['inline'] == 1
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_errors_are_propagated():
+    executor = ComputeExecutor(use_processes=False)
+    try:
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(divmod, 1, 0)
+        assert executor.get_stats()['errors'] == 1
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_lag_monitor_sees_blocked_loop():
+    monitor = EventLoopLagMonitor(interval_seconds=0.01)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        time.sleep(0.1)  # Hold the loop
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.shutdown()
+
+    stats = monitor.get_stats()
+    assert stats['samples'] > 0
+    assert stats['max_ms'] >= 80
+
+
+def test_lag_monitor_without_samples():
+    assert EventLoopLagMonitor().get_stats()['samples'] == 0
@@ -0,0 +1,87 @@
+"""
+Tests for the shared single-flight loader used by the in-process caches.
+"""
+import asyncio
+
+import pytest
+
+from app.core.single_flight import SingleFlight
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return self.calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_load():
+    flight, load = SingleFlight(), Loader()
+
+    tasks = [asyncio.create_task(flight.do("key", load)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert "key" in flight
+    load.release.set()
+
+    assert await asyncio.gather(*tasks) == [1] * 5
+    assert load.calls == 1
+    assert "key" not in flight
+
+
+@pytest.mark.asyncio
+async def test_waiters_see_the_load_error():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fail():
+        await release.wait()
+        raise ValueError("database is down")
+
+    tasks = [asyncio.create_task(flight.do("key", fail)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_a_waiter_takes_over_when_the_loading_task_is_cancelled():
+    flight, load = SingleFlight(), Loader()
+
+    leader = asyncio.create_task(flight.do("key", load))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", load))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    await asyncio.sleep(0)
+    load.release.set()
+
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert await asyncio.wait_for(waiter, 1) == 2
+    assert "key" not in flight
+
+
+@pytest.mark.asyncio
+async def test_cancelling_a_waiter_leaves_the_load_running():
+    flight, load = SingleFlight(), Loader()
+
+    leader = asyncio.create_task(flight.do("key", load))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", load))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    await asyncio.sleep(0)
+    load.release.set()
+
+    assert await leader == 1
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
@@ -0,0 +1,170 @@
+"""
+Tests for cross-worker WebSocket fan-out over the pub/sub backplane.
+"""
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+
+from app.core.backplane import Backplane, InMemoryBroker, InMemoryBackplane, RedisBackplane
+from app.core.websocket import WebSocketServer, MessageType, TEACHER_ROLES
+
+
+class FakeWebSocket:
+    """Records frames sent to a client."""
+
+    def __init__(self):
+        self.client_state = SimpleNamespace(name="CONNECTED")
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.frames.append(json.loads(data))
+
+    async def close(self, code: int = 1000):
+        self.client_state = SimpleNamespace(name="DISCONNECTED")
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio.Redis pub/sub, shared through ``channels``."""
+
+    def __init__(self, channels: dict):
+        self.channels = channels
+
+    async def publish(self, channel: str, data: bytes):
+        for queue in self.channels.get(channel, []):
+            queue.put_nowait({"type": "message", "channel": channel, "data": data})
+
+    def pubsub(self):
+        return FakePubSub(self.channels)
+
+
+class FakePubSub:
+    def __init__(self, channels: dict):
+        self.channels = channels
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel: str):
+        self.channels.setdefault(channel, []).append(self.queue)
+        self.queue.put_nowait({"type": "subscribe", "channel": channel, "data": 1})
+
+    async def unsubscribe(self, channel: str):
+        self.channels[channel].remove(self.queue)
+
+    async def reset(self):
+        pass
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+
+async def _connect(server, connection_id: str, user_id: str, role: str, class_id: str = "7"):
+    websocket = FakeWebSocket()
+    await server.attach(websocket, connection_id, class_id, user_id, role)
+    return websocket
+
+
+async def _workers(backplanes):
+    servers = [WebSocketServer(backplane=backplane) for backplane in backplanes]
+    for server in servers:
+        await server.start()
+    return servers
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_connections_on_other_workers():
+    broker = InMemoryBroker()
+    worker_a, worker_b = await _workers([InMemoryBackplane(broker), InMemoryBackplane(broker)])
+    local = await _connect(worker_a, "a-1", "1", "teacher")
+    remote = await _connect(worker_b, "b-1", "2", "teacher")
+
+    await worker_a.broadcast_to_class("7", MessageType.STUDENT_JOINED, {"student_id": 5})
+    await asyncio.sleep(0.01)
+
+    assert [frame["data"] for frame in local.frames] == [{"student_id": 5}]
+    assert [frame["data"] for frame in remote.frames] == [{"student_id": 5}]
+    await worker_a.shutdown()
+    await worker_b.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_roles_and_users_are_respected_across_workers():
+    broker = InMemoryBroker()
+    worker_a, worker_b = await _workers([InMemoryBackplane(broker), InMemoryBackplane(broker)])
+    teacher = await _connect(worker_b, "b-1", "1", "teacher")
+    student = await _connect(worker_b, "b-2", "2", "student")
+    classmate = await _connect(worker_b, "b-3", "3", "student")
+
+    await worker_a.broadcast_to_class("7", MessageType.STATS_UPDATED, {"present": 1}, roles=TEACHER_ROLES)
+    await worker_a.send_to_user("2", MessageType.ATTENDANCE_UPDATE, {"new_status": "present"}, class_id="7")
+    await asyncio.sleep(0.01)
+
+    assert [frame["type"] for frame in teacher.frames] == ["stats_updated"]
+    assert [frame["type"] for frame in student.frames] == ["attendance_update"]
+    assert classmate.frames == []
+    await worker_a.shutdown()
+    await worker_b.shutdown()
+
+
+class StalledBackplane(Backplane):
+    """A backplane whose publish never completes, like an unreachable Redis."""
+
+    async def publish(self, envelope):
+        await asyncio.Event().wait()
+
+
+@pytest.mark.asyncio
+async def test_local_connections_do_not_wait_on_the_backplane():
+    (server,) = await _workers([StalledBackplane()])
+    websocket = await _connect(server, "a-1", "1", "teacher")
+
+    broadcast = asyncio.create_task(
+        server.broadcast_to_class("7", MessageType.STUDENT_JOINED, {"student_id": 5})
+    )
+    await asyncio.sleep(0.01)
+
+    assert [frame["type"] for frame in websocket.frames] == [MessageType.STUDENT_JOINED.value]
+    broadcast.cancel()
+    await server.shutdown()
+
+
+def test_backplanes_must_implement_publish():
+    with pytest.raises(TypeError):
+        Backplane()
+
+
+@pytest.mark.asyncio
+async def test_single_worker_does_not_publish():
+    backplane = InMemoryBackplane()
+    (server,) = await _workers([backplane])
+    websocket = await _connect(server, "a-1", "1", "teacher")
+
+    await server.broadcast_to_class("7", MessageType.STUDENT_JOINED, {"student_id": 5})
+    await asyncio.sleep(0.01)
+
+    assert len(websocket.frames) == 1
+    assert backplane.get_stats()["published"] == 0
+    await server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_redis_backplane_skips_own_messages():
+    channels = {}
+    backplanes = [RedisBackplane(client=FakeRedis(channels)) for _ in range(2)]
+    worker_a, worker_b = await _workers(backplanes)
+    local = await _connect(worker_a, "a-1", "1", "teacher")
+    remote = await _connect(worker_b, "b-1", "2", "teacher")
+
+    await worker_a.broadcast_to_class("7", MessageType.STUDENT_JOINED, {"student_id": 5})
+    await asyncio.sleep(0.01)
+
+    # Delivered locally once, not again when the worker hears its own publish
+    assert len(local.frames) == 1
+    assert len(remote.frames) == 1
+    assert backplanes[1].get_stats()["received"] == 1
+    await worker_a.shutdown()
+    await worker_b.shutdown()
+    assert channels["websocket:broadcast"] == []
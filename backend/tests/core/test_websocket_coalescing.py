@@ -0,0 +1,93 @@
+"""
+Tests for coalesced class broadcasts in the core WebSocket server.
+"""
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+
+from app.core.websocket import WebSocketServer, MessageType
+
+
+class FakeWebSocket:
+    """Records frames sent to a client."""
+
+    def __init__(self):
+        self.client_state = SimpleNamespace(name="CONNECTED")
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.frames.append(json.loads(data))
+
+    async def close(self):
+        self.client_state = SimpleNamespace(name="DISCONNECTED")
+
+
+async def _server_with_teachers(count: int, coalesce_window_ms: float = 0):
+    server = WebSocketServer(coalesce_window_ms=coalesce_window_ms)
+    sockets = []
+    for i in range(count):
+        websocket = FakeWebSocket()
+        await server.connection_pool.add_connection(websocket, f"conn-{i}")
+        await server.connection_pool.authenticate_connection(f"conn-{i}", "42", f"teacher-{i}", "teacher")
+        sockets.append(websocket)
+    return server, sockets
+
+
+@pytest.mark.asyncio
+async def test_without_coalescing_every_event_is_a_frame():
+    server, sockets = await _server_with_teachers(2)
+
+    for student_id in range(5):
+        await server.broadcast_to_class("42", MessageType.STUDENT_JOINED, {"student_id": student_id})
+    await asyncio.sleep(0.01)
+
+    assert all(len(websocket.frames) == 5 for websocket in sockets)
+    await server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_burst_is_sent_as_one_batched_frame():
+    server, sockets = await _server_with_teachers(3, coalesce_window_ms=20)
+
+    for student_id in range(5):
+        await server.broadcast_to_class("42", MessageType.STUDENT_JOINED, {"student_id": student_id})
+        await server.broadcast_to_class("42", MessageType.STATS_UPDATE, {"present_count": student_id + 1})
+
+    assert all(websocket.frames == [] for websocket in sockets)
+    await asyncio.sleep(0.05)
+
+    for websocket in sockets:
+        assert len(websocket.frames) == 1
+        frame = websocket.frames[0]
+        assert frame["type"] == MessageType.ATTENDANCE_UPDATE.value
+        events = frame["data"]["events"]
+        # Only the latest statistics update survives, after the joins
+        assert [event["data"] for event in events] == [
+            {"student_id": 0}, {"student_id": 1}, {"student_id": 2}, {"student_id": 3},
+            {"student_id": 4}, {"present_count": 5}
+        ]
+
+    stats = server.coalescer.get_stats()
+    assert stats["events_buffered"] == 10
+    assert stats["batches_sent"] == 1
+    assert stats["frames_saved"] == 9 * 3
+    assert 0 < stats["max_delay_seconds"] < 1
+    await server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_uncoalesced_message_flushes_buffer_first():
+    server, sockets = await _server_with_teachers(1, coalesce_window_ms=1000)
+
+    await server.broadcast_to_class("42", MessageType.STUDENT_JOINED, {"student_id": 1})
+    await server.broadcast_to_class("42", MessageType.SESSION_ENDED, {"reason": "done"})
+    await asyncio.sleep(0.01)
+
+    assert [frame["type"] for frame in sockets[0].frames] == [
+        MessageType.STUDENT_JOINED.value, MessageType.SESSION_ENDED.value
+    ]
+    await server.shutdown()
@@ -0,0 +1,58 @@
+"""
+Tests for idle connection tracking with the ConnectionPool timing wheel.
+"""
+import time
+import pytest
+from types import SimpleNamespace
+
+from app.core.websocket import ConnectionPool, IdleTimerWheel
+
+
+def _websocket():
+    return SimpleNamespace(client_state=SimpleNamespace(name="CONNECTED"))
+
+
+@pytest.mark.asyncio
+async def test_idle_connections_are_removed_and_active_ones_kept():
+    pool = ConnectionPool(idle_timeout_seconds=300)
+    await pool.add_connection(_websocket(), "idle")
+    await pool.add_connection(_websocket(), "active")
+    start = time.monotonic()
+
+    # Activity halfway through pushes the active connection's deadline out
+    pool.get_connection("active").last_activity = start + 150
+    assert await pool._cleanup_stale_connections(now=start + 301) == 1
+    assert pool.get_connection("idle") is None
+    assert pool.get_connection("active") is not None
+
+    assert await pool._cleanup_stale_connections(now=start + 452) == 1
+    assert pool.get_connection("active") is None
+    assert pool.get_stats()["idle_disconnects"] == 2
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_removed_connections_leave_the_wheel():
+    pool = ConnectionPool(idle_timeout_seconds=300)
+    await pool.add_connection(_websocket(), "conn")
+    await pool.remove_connection("conn")
+
+    assert len(pool._idle_wheel) == 0
+    assert await pool._cleanup_stale_connections(now=time.monotonic() + 1000) == 0
+    await pool.shutdown()
+
+
+def test_sweep_only_touches_due_buckets():
+    wheel = IdleTimerWheel(resolution_seconds=1.0)
+    now = time.monotonic()
+    for i in range(100):
+        wheel.schedule(f"conn-{i}", now + 10 + i)
+
+    assert wheel.pop_due(now + 5) == []
+    assert sorted(wheel.pop_due(now + 15)) == sorted(f"conn-{i}" for i in range(5))
+    assert len(wheel) == 95
+
+    # Rescheduling never leaves a connection in two buckets
+    wheel.schedule("conn-50", now + 500)
+    wheel.schedule("conn-50", now + 600)
+    assert wheel.pop_due(now + 1000).count("conn-50") == 1
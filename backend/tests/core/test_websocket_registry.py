@@ -0,0 +1,116 @@
+"""
+Tests for the shared connection registry used by every WebSocket protocol.
+"""
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+
+from app.core.auth import create_access_token
+from app.core.websocket import WebSocketServer, MessageType, TEACHER_ROLES
+from app.websocket.attendance_updates import AttendanceConnectionManager
+
+
+class FakeWebSocket:
+    """Records frames sent to a client."""
+
+    def __init__(self):
+        self.client_state = SimpleNamespace(name="CONNECTED")
+        self.frames = []
+        self.sends = 0
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.sends += 1
+        self.frames.append(json.loads(data))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+        self.client_state = SimpleNamespace(name="DISCONNECTED")
+
+
+async def _connect(manager, user_id: int, role: str, class_id: int = 7):
+    websocket = FakeWebSocket()
+    token = create_access_token({"sub": str(user_id), "role": role})
+    connection_id = await manager.connect(websocket, class_id, token)
+    assert connection_id is not None
+    return websocket
+
+
+async def _authorize(user_id: str, class_id: int):
+    """Stands in for the database check: user 1 teaches class 7, everyone else attends it."""
+    return "teacher" if user_id == "1" else "student"
+
+
+@pytest.fixture
+def manager():
+    manager = AttendanceConnectionManager()
+    manager.server = WebSocketServer()
+    manager.authorize = _authorize
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_connections_are_indexed_by_role(manager):
+    await _connect(manager, 1, "teacher")
+    await _connect(manager, 2, "student")
+    await _connect(manager, 3, "student")
+
+    assert manager.get_active_connections_count(7) == {"teachers": 1, "students": 2}
+    pool = manager.server.connection_pool
+    assert [c.user_id for c in pool.get_class_connections("7", TEACHER_ROLES)] == ["1"]
+    assert len(pool.get_class_connections("7")) == 3
+    await manager.server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_rejects_invalid_token(manager):
+    websocket = FakeWebSocket()
+    assert await manager.connect(websocket, 7, "not-a-token") is None
+    assert websocket.closed_with is not None
+    assert manager.server.connection_pool.get_class_connections("7") == []
+    await manager.server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_attendance_event_is_sent_once_per_connection(manager):
+    teacher = await _connect(manager, 1, "teacher")
+    student = await _connect(manager, 2, "student")
+    classmate = await _connect(manager, 3, "student")
+    await asyncio.sleep(0.01)
+    for websocket in (teacher, student, classmate):
+        websocket.frames.clear()
+        websocket.sends = 0
+
+    await manager.publish_attendance_event(
+        7,
+        MessageType.ATTENDANCE_UPDATE,
+        {"attendance_record": {"student_id": 2, "status": "present", "override_reason": "late bus"}},
+        student_id=2,
+        student_data={"student_id": 2, "new_status": "present"}
+    )
+    await asyncio.sleep(0.01)
+
+    assert teacher.sends == 1
+    assert teacher.frames[0]["data"]["attendance_record"]["override_reason"] == "late bus"
+    assert student.sends == 1
+    assert student.frames[0]["data"] == {"student_id": 2, "new_status": "present"}
+    # Other students never see someone else's attendance
+    assert classmate.sends == 0
+    await manager.server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_removes_role_index(manager):
+    websocket = FakeWebSocket()
+    token = create_access_token({"sub": "1", "role": "teacher"})
+    connection_id = await manager.connect(websocket, 7, token)
+
+    await manager.disconnect(connection_id)
+
+    assert manager.get_active_connections_count(7) == {"teachers": 0, "students": 0}
+    assert manager.server.connection_pool.count_class_connections("7") == {}
+    await manager.server.shutdown()
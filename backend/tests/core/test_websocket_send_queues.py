@@ -0,0 +1,99 @@
+"""
+Tests for serialize-once fan-out through bounded per-connection send queues.
+"""
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+
+from app.core.websocket import WebSocketServer, MessageType, OverflowPolicy, OutboundQueue
+
+
+class FakeWebSocket:
+    """Records frames sent to a client, optionally blocking until released."""
+
+    def __init__(self, blocked: bool = False):
+        self.client_state = SimpleNamespace(name="CONNECTED")
+        self.frames = []
+        self.closed_with = None
+        self.release = asyncio.Event()
+        if not blocked:
+            self.release.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        await self.release.wait()
+        self.frames.append(json.loads(data))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+        self.client_state = SimpleNamespace(name="DISCONNECTED")
+
+
+async def _connect(server, websocket, index: int):
+    await server.connection_pool.add_connection(websocket, f"conn-{index}")
+    await server.connection_pool.authenticate_connection(f"conn-{index}", "7", f"teacher-{index}", "teacher")
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_delay_others():
+    server = WebSocketServer(send_queue_size=16)
+    slow, fast = FakeWebSocket(blocked=True), FakeWebSocket()
+    await _connect(server, slow, 0)
+    await _connect(server, fast, 1)
+
+    for student_id in range(3):
+        await asyncio.wait_for(
+            server.broadcast_to_class("7", MessageType.STUDENT_JOINED, {"student_id": student_id}),
+            timeout=0.5
+        )
+    await asyncio.sleep(0.01)
+
+    assert len(fast.frames) == 3
+    assert slow.frames == []
+
+    slow.release.set()
+    await asyncio.sleep(0.01)
+    assert [frame["data"]["student_id"] for frame in slow.frames] == [0, 1, 2]
+    await server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_disconnects_under_disconnect_policy():
+    server = WebSocketServer(send_queue_size=2, overflow_policy=OverflowPolicy.DISCONNECT)
+    slow = FakeWebSocket(blocked=True)
+    await _connect(server, slow, 0)
+
+    for student_id in range(5):
+        await server.broadcast_to_class("7", MessageType.STUDENT_JOINED, {"student_id": student_id})
+
+    assert server.connection_pool.get_connection("conn-0") is None
+    assert slow.closed_with == 1013
+    assert server.connection_pool.get_stats()["slow_disconnects"] == 1
+    await server.shutdown()
+
+
+def test_drop_oldest_keeps_newest_frames():
+    queue = OutboundQueue(maxsize=2, policy=OverflowPolicy.DROP_OLDEST)
+    for payload in ["a", "b", "c"]:
+        assert queue.put("student_joined", payload)
+
+    assert [frame for _, frame in queue._frames] == ["b", "c"]
+    assert queue.dropped == 1
+
+
+def test_coalesce_replaces_latest_frame_of_same_type():
+    queue = OutboundQueue(maxsize=3, policy=OverflowPolicy.COALESCE)
+    queue.put("student_joined", "join-1")
+    queue.put("stats_update", "stats-1")
+    queue.put("student_joined", "join-2")
+
+    queue.put("stats_update", "stats-2")
+    assert [frame for _, frame in queue._frames] == ["join-1", "join-2", "stats-2"]
+
+    # Nothing of the same type queued: fall back to dropping the oldest frame
+    queue.put("session_update", "update-1")
+    assert [frame for _, frame in queue._frames] == ["join-2", "stats-2", "update-1"]
+    assert queue.dropped == 2
@@ -0,0 +1,135 @@
+"""
+Benchmark for analytics served from the attendance rollups.
+
+Compares a year-long institutional report computed from the raw records
+with the same report read from the rollups, and measures an incremental
+refresh after a day of changes.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.core.database import Base
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.services.attendance_analytics import AttendanceAnalyticsService
+from app.services.analytics_cache import AnalyticsResultCache
+from app.services.attendance_rollups import AttendanceRollups
+
+
+STUDENT_COUNT = 200
+DAYS = 365
+SUBJECTS = ["Math", "Science", "History", "Art"]
+
+# The model relationships emit overlap warnings during mapper configuration
+pytestmark = pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+
+
+async def _seed(session: AsyncSession):
+    rng = random.Random(DAYS)
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    session.add(teacher)
+    await session.flush()
+    await session.execute(insert(User), [
+        {
+            "email": f"student{i}@example.com", "username": f"student{i}",
+            "full_name": f"Student {i}", "hashed_password": "x", "role": UserRole.STUDENT
+        }
+        for i in range(STUDENT_COUNT)
+    ])
+
+    now = datetime.utcnow()
+    sessions = [
+        ClassSession(
+            name="Lesson", subject=SUBJECTS[(day + hour) % len(SUBJECTS)], teacher_id=teacher.id,
+            jwt_token="token", verification_code="123456",
+            start_time=now - timedelta(days=day, hours=hour), status="ended"
+        )
+        for day in range(1, DAYS)
+        for hour in (2, 4)
+    ]
+    session.add_all(sessions)
+    await session.flush()
+
+    statuses = [AttendanceStatus.PRESENT, AttendanceStatus.LATE, AttendanceStatus.ABSENT]
+    await session.execute(insert(AttendanceRecord), [
+        {
+            "student_id": teacher.id + 1 + i, "class_session_id": class_session.id,
+            "status": rng.choices(statuses, weights=[80, 8, 12])[0],
+            "verification_method": "qr_code"
+        }
+        for i in range(STUDENT_COUNT)
+        for class_session in sessions
+    ])
+    await session.commit()
+    return sessions
+
+
+async def _timed(coroutine):
+    start = time.perf_counter()
+    result = await coroutine
+    return result, time.perf_counter() - start
+
+
+@pytest.mark.asyncio
+@pytest.mark.performance
+async def test_year_report_from_rollups():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        sessions = await _seed(session)
+
+        # Rollups that never count as fresh, so the report reads the raw records
+        raw_only = AttendanceRollups(max_staleness_seconds=-1)
+        raw, raw_time = await _timed(
+            AttendanceAnalyticsService(session, raw_only, AnalyticsResultCache())
+            .generate_institutional_analytics(period_days=DAYS)
+        )
+
+        rollups = AttendanceRollups(overlap_seconds=0)
+        days_built, build_time = await _timed(rollups.refresh(session))
+        rolled, rolled_time = await _timed(
+            AttendanceAnalyticsService(session, rollups, AnalyticsResultCache())
+            .generate_institutional_analytics(period_days=DAYS)
+        )
+
+        # A day of changes: every record of yesterday's sessions
+        await session.execute(
+            update(AttendanceRecord)
+            .where(AttendanceRecord.class_session_id.in_([s.id for s in sessions[:2]]))
+            .values(status=AttendanceStatus.EXCUSED, updated_at=datetime.utcnow())
+        )
+        await session.commit()
+        # Served before the next refresh, with the changed day aggregated from the records
+        _, changed_time = await _timed(
+            AttendanceAnalyticsService(session, rollups, AnalyticsResultCache())
+            .generate_institutional_analytics(period_days=DAYS)
+        )
+        days_refreshed, refresh_time = await _timed(rollups.refresh(session))
+
+    await engine.dispose()
+
+    assert rolled.total_students == raw.total_students == STUDENT_COUNT
+    assert rolled.overall_attendance_rate == raw.overall_attendance_rate
+    assert rolled.performance_distribution == raw.performance_distribution
+    assert days_refreshed == 1
+
+    print(
+        f"\n{len(sessions) * STUDENT_COUNT} records over {DAYS} days: raw {raw_time * 1000:.0f} ms, "
+        f"rollups {rolled_time * 1000:.1f} ms ({changed_time * 1000:.1f} ms with a changed day "
+        f"not yet refreshed); full build {build_time * 1000:.0f} ms "
+        f"({days_built} days), incremental refresh {refresh_time * 1000:.1f} ms"
+    )
+    assert rolled_time < raw_time / 5
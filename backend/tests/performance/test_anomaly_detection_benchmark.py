@@ -0,0 +1,124 @@
+"""
+Benchmark for whole-population anomaly detection.
+
+Compares the single streaming query plus NumPy pass with the previous loop,
+which ran one history query per active student.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.core.database import Base
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.services.pattern_detection import AdvancedPatternDetector
+from app.services.analytics_cache import AnalyticsResultCache
+
+
+STUDENT_COUNTS = [500, 2000]
+
+# The model relationships emit overlap warnings during mapper configuration
+pytestmark = pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+
+
+async def _seed(session: AsyncSession, student_count: int):
+    rng = random.Random(student_count)
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    session.add(teacher)
+    await session.flush()
+    await session.execute(insert(User), [
+        {
+            "email": f"student{i}@example.com", "username": f"student{i}",
+            "full_name": f"Student {i}", "hashed_password": "x", "role": UserRole.STUDENT
+        }
+        for i in range(student_count)
+    ])
+
+    now = datetime.utcnow()
+    sessions = [
+        ClassSession(
+            name="Homeroom", teacher_id=teacher.id, jwt_token="token",
+            verification_code="123456", start_time=now - timedelta(days=day, hours=1), status="ended"
+        )
+        for day in range(28)
+        if (now - timedelta(days=day, hours=1)).weekday() < 5
+    ]
+    session.add_all(sessions)
+    await session.flush()
+
+    await session.execute(insert(AttendanceRecord), [
+        {
+            "student_id": teacher.id + 1 + i, "class_session_id": class_session.id,
+            "status": AttendanceStatus.ABSENT if rng.random() < 0.15 else AttendanceStatus.PRESENT,
+            "verification_method": "qr_code"
+        }
+        for i in range(student_count)
+        for class_session in sessions
+    ])
+    await session.commit()
+
+
+async def _timed(engine, coroutine):
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+    start = time.perf_counter()
+    result = await coroutine
+    elapsed = time.perf_counter() - start
+    event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+    return result, len(statements), elapsed
+
+
+async def _per_student_loop(detector: AdvancedPatternDetector):
+    """The previous population mode: one history query per active student."""
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=30)
+    anomalies = []
+    for student_id in sorted(await detector._get_active_students(start_date)):
+        anomalies.extend(await detector._detect_student_anomalies(student_id, start_date, end_date))
+    return anomalies
+
+
+@pytest.mark.asyncio
+@pytest.mark.performance
+@pytest.mark.parametrize("student_count", STUDENT_COUNTS)
+async def test_population_anomalies_use_one_query(student_count):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        await _seed(session, student_count)
+        detector = AdvancedPatternDetector(session, AnalyticsResultCache())
+
+        vectorized, vectorized_queries, vectorized_time = await _timed(
+            engine, detector.detect_attendance_anomalies()
+        )
+        looped, looped_queries, looped_time = await _timed(engine, _per_student_loop(detector))
+
+    await engine.dispose()
+
+    key = lambda a: (a["student_id"], a["period"], a["description"])
+    assert [key(a) for a in vectorized] == [key(a) for a in looped]
+    assert vectorized_queries == 1
+    assert looped_queries == student_count + 1
+
+    print(
+        f"\n{student_count} students: vectorized {vectorized_time * 1000:.0f} ms "
+        f"({vectorized_queries} query), per-student loop {looped_time * 1000:.0f} ms "
+        f"({looped_queries} queries), {len(vectorized)} anomalies"
+    )
+    assert vectorized_time < looped_time
@@ -0,0 +1,144 @@
+"""
+Benchmark for set-based bulk attendance operations.
+
+Verifies that AttendanceEngine.bulk_update_attendance issues a constant number
+of database round trips regardless of roster size.
+"""
+
+import time
+import pytest
+from sqlalchemy import event, select, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.core.database import Base
+from app.models.user import User, UserRole
+from app.models.class_session import Class, ClassSession, StudentEnrollment
+from app.models.attendance import AttendanceRecord, AttendanceStatus, AttendanceAuditLog
+from app.schemas.attendance import BulkAttendanceOperation
+from app.services.attendance_engine import AttendanceEngine
+
+
+ROSTER_SIZES = [50, 500, 5000]
+
+# The model relationships emit overlap warnings during mapper configuration
+pytestmark = pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+
+
+async def _seed_class(session: AsyncSession, roster_size: int) -> ClassSession:
+    """Create a teacher, a class with ``roster_size`` enrolled students and an active session."""
+    teacher = User(
+        email="teacher@example.com",
+        username="teacher",
+        full_name="Teacher",
+        hashed_password="x",
+        role=UserRole.TEACHER
+    )
+    session.add(teacher)
+    await session.flush()
+
+    class_ = Class(name="Assembly", teacher_id=teacher.id)
+    session.add(class_)
+    await session.flush()
+
+    students = [
+        User(
+            email=f"student{i}@example.com",
+            username=f"student{i}",
+            full_name=f"Student {i}",
+            hashed_password="x",
+            role=UserRole.STUDENT
+        )
+        for i in range(roster_size)
+    ]
+    session.add_all(students)
+    await session.flush()
+
+    session.add_all([
+        StudentEnrollment(student_id=student.id, class_id=class_.id, is_active=True)
+        for student in students
+    ])
+
+    class_session = ClassSession(
+        name="Assembly",
+        class_id=class_.id,
+        teacher_id=teacher.id,
+        jwt_token="token",
+        verification_code="123456"
+    )
+    session.add(class_session)
+    await session.flush()
+
+    # Half of the roster has already checked in, so the bulk run mixes updates and inserts
+    session.add_all([
+        AttendanceRecord(
+            student_id=student.id,
+            class_session_id=class_session.id,
+            status=AttendanceStatus.PRESENT,
+            verification_method="qr_code"
+        )
+        for student in students[: roster_size // 2]
+    ])
+    await session.commit()
+    return class_session
+
+
+async def _run_bulk(roster_size: int):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        class_session = await _seed_class(session, roster_size)
+        teacher_id = class_session.teacher_id
+
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+        start = time.perf_counter()
+        result = await AttendanceEngine(session).bulk_update_attendance(
+            class_session.id,
+            BulkAttendanceOperation.MARK_EXCUSED,
+            None,
+            teacher_id,
+            "School assembly"
+        )
+        await session.commit()
+        elapsed = time.perf_counter() - start
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+
+        excused = await session.scalar(
+            select(func.count(AttendanceRecord.id)).where(
+                AttendanceRecord.status == AttendanceStatus.EXCUSED
+            )
+        )
+        audit_entries = await session.scalar(select(func.count(AttendanceAuditLog.id)))
+
+    await engine.dispose()
+    return result, len(statements), elapsed, excused, audit_entries
+
+
+@pytest.mark.asyncio
+@pytest.mark.performance
+async def test_bulk_update_round_trips_are_constant():
+    """Round trips must not grow with the number of students in the roster."""
+    round_trips = {}
+
+    for roster_size in ROSTER_SIZES:
+        result, statement_count, elapsed, excused, audit_entries = await _run_bulk(roster_size)
+
+        assert result["processed_count"] == roster_size
+        assert result["failed_count"] == 0
+        assert excused == roster_size
+        assert audit_entries == roster_size
+
+        round_trips[roster_size] = statement_count
+        print(
+            f"\n{roster_size} students: {statement_count} round trips, "
+            f"{elapsed * 1000:.1f} ms"
+        )
+
+    assert len(set(round_trips.values())) == 1, f"Round trips grew with roster size: {round_trips}"
@@ -0,0 +1,97 @@
+"""
+Benchmark of event loop lag while the pattern statistics kernel runs.
+
+Scores a batch of student histories, as one early warning alert chunk does,
+inline on the event loop and through the compute executor's process and
+thread pools, while an EventLoopLagMonitor samples the loop.
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.compute import ComputeExecutor, EventLoopLagMonitor
+from app.models.attendance import AttendanceStatus
+from app.services.history_statistics import HistoryRow, compute_history_statistics_batch
+
+
+STUDENTS = 2000
+HISTORY_LENGTH = 120
+
+
+def _histories():
+    rng = random.Random(17)
+    statuses = list(AttendanceStatus)
+    start = datetime(2025, 1, 6, 8)
+    histories = []
+    for _ in range(STUDENTS):
+        rows = []
+        for i in range(HISTORY_LENGTH):
+            begins = start + timedelta(days=i // 2, hours=3 * (i % 2))
+            status = rng.choices(statuses, weights=[6, 2, 1, 1])[0]
+            rows.append(tuple(HistoryRow(
+                status, begins, begins + timedelta(minutes=rng.randint(0, 15)),
+                rng.randint(1, 20) if status == AttendanceStatus.LATE else None,
+                status == AttendanceStatus.LATE, rng.random() < 0.1, rng.random() < 0.05
+            )))
+        histories.append(rows)
+    return histories
+
+
+async def _measure(run):
+    monitor = EventLoopLagMonitor(interval_seconds=0.005, window=10000)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    started = time.perf_counter()
+    results = await run()
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.02)
+    await monitor.shutdown()
+    return results, elapsed, monitor.get_stats()
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+async def test_offloading_keeps_event_loop_responsive():
+    histories = _histories()
+    sizes = [len(rows) for rows in histories]
+
+    async def inline():
+        return compute_history_statistics_batch(histories)
+
+    process_executor = ComputeExecutor(max_workers=2, use_processes=True)
+    thread_executor = ComputeExecutor(max_workers=2, use_processes=False)
+    try:
+        # Start the worker process outside the measurement
+        await process_executor.run(compute_history_statistics_batch, histories[:1])
+
+        expected, inline_seconds, inline_lag = await _measure(inline)
+        processed, process_seconds, process_lag = await _measure(
+            lambda: process_executor.map_batches(compute_history_statistics_batch, histories, sizes)
+        )
+        threaded, thread_seconds, thread_lag = await _measure(
+            lambda: thread_executor.map_batches(compute_history_statistics_batch, histories, sizes)
+        )
+    finally:
+        process_executor.shutdown()
+        thread_executor.shutdown()
+
+    print(f"\nStatistics kernel over {STUDENTS} students x {HISTORY_LENGTH} records")
+    for name, seconds, lag in (
+        ("inline", inline_seconds, inline_lag),
+        ("process pool", process_seconds, process_lag),
+        ("thread pool", thread_seconds, thread_lag),
+    ):
+        print(
+            f"  {name:>12}: {seconds * 1000:7.0f} ms, loop lag p50 {lag['p50_ms']:6.1f} ms, "
+            f"p99 {lag['p99_ms']:6.1f} ms, max {lag['max_ms']:6.1f} ms"
+        )
+
+    assert processed == expected
+    assert threaded == expected
+    # Inline, the whole computation is one stall of the loop
+    assert inline_lag['max_ms'] >= inline_seconds * 1000 * 0.8
+    assert process_lag['max_ms'] < inline_lag['max_ms'] / 2
@@ -0,0 +1,138 @@
+"""
+Benchmark for the streaming export engine.
+
+Exports one million users as CSV and NDJSON from an on-disk database and
+checks that resident memory stays under a fixed cap while the export runs.
+The previous ``scalars().all()`` + ``StringIO`` export is measured alongside
+for comparison.
+"""
+
+import csv
+import gc
+import io
+import time
+
+import psutil
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.core.database import Base
+from app.models.user import User, UserRole
+# Importing app.utils loads the sync models, whose foreign keys target the SIS tables
+import app.models.sis_integration  # noqa: F401
+from app.utils.export import export_response, stream_rows
+
+
+ROW_COUNT = 1_000_000
+SEED_BATCH = 50_000
+RSS_CAP_BYTES = 64 * 2**20
+COLUMNS = ["id", "full_name", "username", "email", "role", "is_active", "created_at"]
+
+# The model relationships emit overlap warnings during mapper configuration
+pytestmark = pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+
+
+async def _seed(session_factory):
+    async with session_factory() as session:
+        for offset in range(0, ROW_COUNT, SEED_BATCH):
+            await session.execute(insert(User), [
+                {
+                    "email": f"user{i}@example.com", "username": f"user{i}",
+                    "full_name": f"User {i}", "hashed_password": "x", "role": UserRole.STUDENT
+                }
+                for i in range(offset, offset + SEED_BATCH)
+            ])
+            await session.commit()
+
+
+async def _seeded_database(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'export.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await _seed(session_factory)
+    return engine, session_factory
+
+
+def _row(row):
+    return {
+        "id": row.id,
+        "full_name": row.full_name,
+        "username": row.username,
+        "email": row.email,
+        "role": row.role,
+        "is_active": row.is_active,
+        "created_at": row.created_at
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.slow
+@pytest.mark.performance
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+async def test_export_of_a_million_rows_stays_under_rss_cap(tmp_path, format):
+    engine, session_factory = await _seeded_database(tmp_path)
+
+    process = psutil.Process()
+    gc.collect()
+    baseline = process.memory_info().rss
+    peak = baseline
+
+    query = select(
+        User.id, User.full_name, User.username, User.email, User.role, User.is_active, User.created_at
+    ).order_by(User.id)
+    response = export_response(stream_rows(query, _row, session_factory), format, "users", COLUMNS)
+
+    start = time.perf_counter()
+    written = 0
+    chunks = 0
+    async for chunk in response.body_iterator:
+        written += len(chunk)
+        chunks += 1
+        if chunks % 64 == 0:
+            peak = max(peak, process.memory_info().rss)
+    elapsed = time.perf_counter() - start
+    peak = max(peak, process.memory_info().rss)
+
+    await engine.dispose()
+
+    print(
+        f"\n{format}: {ROW_COUNT} rows, {written / 2**20:.0f} MiB in {chunks} chunks, "
+        f"{elapsed:.1f} s, RSS growth {(peak - baseline) / 2**20:.1f} MiB"
+    )
+    assert written > ROW_COUNT * 40
+    assert peak - baseline < RSS_CAP_BYTES
+
+
+@pytest.mark.asyncio
+@pytest.mark.slow
+@pytest.mark.performance
+async def test_previous_in_memory_csv_export_for_comparison(tmp_path):
+    engine, session_factory = await _seeded_database(tmp_path)
+
+    process = psutil.Process()
+    gc.collect()
+    baseline = process.memory_info().rss
+
+    # The previous export: every row as an ORM object, the whole file in a StringIO
+    start = time.perf_counter()
+    async with session_factory() as session:
+        users = (await session.execute(select(User).order_by(User.id))).scalars().all()
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(COLUMNS)
+        for user in users:
+            writer.writerow([getattr(user, column) for column in COLUMNS])
+        body = output.getvalue().encode()
+        peak = process.memory_info().rss
+    elapsed = time.perf_counter() - start
+
+    await engine.dispose()
+
+    print(
+        f"\nin-memory csv: {ROW_COUNT} rows, {len(body) / 2**20:.0f} MiB, "
+        f"{elapsed:.1f} s, RSS growth {(peak - baseline) / 2**20:.1f} MiB"
+    )
+    assert peak - baseline > RSS_CAP_BYTES
+
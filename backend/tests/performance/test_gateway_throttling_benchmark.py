@@ -0,0 +1,96 @@
+"""
+Microbenchmarks for the outbound SIS rate limiting decisions.
+
+Measures decisions per second for the lock-free TokenBucket against the
+previous lock-per-call bucket, and for RequestThrottler.should_throttle with
+a full last-second window, which previously rebuilt lists of request times
+on every check.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.gateway.throttler import RequestThrottler, ThrottleConfig
+from app.middleware.rate_limiting import TokenBucket
+from app.services.api_gateway import GatewayRequest, ProviderType, RequestMethod
+
+
+DECISIONS = 200_000
+
+
+class LockedTokenBucket:
+    """The previous bucket: wall clock and an asyncio.Lock on every call."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_update = time.time()
+        self._lock = asyncio.Lock()
+
+    async def consume(self, tokens: int = 1) -> bool:
+        async with self._lock:
+            now = time.time()
+            elapsed = now - self.last_update
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.last_update = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+
+async def _decisions_per_second(decide) -> float:
+    start = time.perf_counter()
+    for _ in range(DECISIONS):
+        await decide()
+    return DECISIONS / (time.perf_counter() - start)
+
+
+@pytest.mark.asyncio
+@pytest.mark.performance
+async def test_token_bucket_decisions_per_second():
+    # A slow refill keeps most decisions on the deny path, as during a bulk sync
+    locked = await _decisions_per_second(LockedTokenBucket(rate=1.0, capacity=50).consume)
+    lock_free = await _decisions_per_second(TokenBucket(rate=1.0, capacity=50).consume)
+
+    bucket = TokenBucket(rate=1.0, capacity=50)
+    start = time.perf_counter()
+    for _ in range(DECISIONS):
+        bucket.try_consume()
+    sync_path = DECISIONS / (time.perf_counter() - start)
+
+    print(
+        f"\nToken bucket: {locked:,.0f} decisions/s with a lock, "
+        f"{lock_free:,.0f} without, {sync_path:,.0f} on the synchronous path"
+    )
+    assert lock_free > locked
+
+
+@pytest.mark.asyncio
+@pytest.mark.performance
+async def test_throttler_decisions_per_second():
+    request = GatewayRequest(provider=ProviderType.POWERSCHOOL, method=RequestMethod.GET, path="/students")
+
+    results = {}
+    for adaptive in (False, True):
+        throttler = RequestThrottler("benchmark", ThrottleConfig(
+            provider="benchmark",
+            max_requests_per_second=1000.0,
+            max_burst_size=DECISIONS,
+            min_interval_ms=0,
+            adaptive_enabled=adaptive
+        ))
+        # Fill the last-second window so the checks run against a full history
+        for _ in range(1000):
+            await throttler.should_throttle(request)
+
+        results[adaptive] = await _decisions_per_second(lambda: throttler.should_throttle(request))
+
+    print(
+        f"\nRequestThrottler with 1000 requests in the window: "
+        f"{results[False]:,.0f} decisions/s fixed, {results[True]:,.0f} adaptive"
+    )
+    assert min(results.values()) > 10_000
@@ -0,0 +1,137 @@
+"""
+Benchmark for institution-wide analytics.
+
+Compares loading the period into the columnar fact store with the previous
+load of one (AttendanceRecord, ClassSession, student name) ORM tuple per
+record, by peak traced memory and latency.
+"""
+
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.core.database import Base
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.services.attendance_analytics import AttendanceAnalyticsService
+from app.services.analytics_cache import AnalyticsResultCache
+from app.services.attendance_facts import load_attendance_facts
+
+
+STUDENT_COUNTS = [500, 2000]
+SESSION_COUNT = 40
+SUBJECTS = ["Math", "Science", "History", "Art"]
+
+# The model relationships emit overlap warnings during mapper configuration
+pytestmark = pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+
+
+async def _seed(session: AsyncSession, student_count: int):
+    rng = random.Random(student_count)
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    session.add(teacher)
+    await session.flush()
+    await session.execute(insert(User), [
+        {
+            "email": f"student{i}@example.com", "username": f"student{i}",
+            "full_name": f"Student {i}", "hashed_password": "x", "role": UserRole.STUDENT
+        }
+        for i in range(student_count)
+    ])
+
+    now = datetime.utcnow()
+    sessions = [
+        ClassSession(
+            name="Lesson", subject=SUBJECTS[n % len(SUBJECTS)], teacher_id=teacher.id,
+            jwt_token="token", verification_code="123456",
+            start_time=now - timedelta(hours=6 * n + 1), status="ended"
+        )
+        for n in range(SESSION_COUNT)
+    ]
+    session.add_all(sessions)
+    await session.flush()
+
+    statuses = [AttendanceStatus.PRESENT, AttendanceStatus.LATE, AttendanceStatus.ABSENT]
+    await session.execute(insert(AttendanceRecord), [
+        {
+            "student_id": teacher.id + 1 + i, "class_session_id": class_session.id,
+            "status": rng.choices(statuses, weights=[80, 8, 12])[0],
+            "verification_method": "qr_code"
+        }
+        for i in range(student_count)
+        for class_session in sessions
+    ])
+    await session.commit()
+
+
+async def _orm_tuples(session: AsyncSession, start_date: datetime, end_date: datetime):
+    """The previous load: every ORM tuple of the period."""
+    result = await session.execute(
+        select(AttendanceRecord, ClassSession, User.full_name.label('student_name'))
+        .join(ClassSession, AttendanceRecord.class_session_id == ClassSession.id)
+        .join(User, AttendanceRecord.student_id == User.id)
+        .where(ClassSession.start_time.between(start_date, end_date))
+    )
+    return result.all()
+
+
+async def _measure(session: AsyncSession, coroutine):
+    session.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = await coroutine
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+@pytest.mark.asyncio
+@pytest.mark.performance
+@pytest.mark.parametrize("student_count", STUDENT_COUNTS)
+async def test_fact_store_is_smaller_and_faster(student_count):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        await _seed(session, student_count)
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=30)
+
+        facts, facts_peak, facts_time = await _measure(
+            session, load_attendance_facts(session, start_date, end_date)
+        )
+        rows, orm_peak, orm_time = await _measure(
+            session, _orm_tuples(session, start_date, end_date)
+        )
+        analytics_start = time.perf_counter()
+        service = AttendanceAnalyticsService(session, result_cache=AnalyticsResultCache())
+        analytics = await service.generate_institutional_analytics(30)
+        analytics_time = time.perf_counter() - analytics_start
+
+    await engine.dispose()
+
+    record_count = student_count * SESSION_COUNT
+    assert len(facts) == len(rows) == record_count
+    assert analytics.total_students == student_count
+    assert set(analytics.department_breakdown["departments"]) == set(SUBJECTS)
+
+    print(
+        f"\n{record_count} records: facts {facts.nbytes / 1024:.0f} KiB resident, "
+        f"peak {facts_peak / 2**20:.1f} MiB in {facts_time * 1000:.0f} ms; "
+        f"ORM tuples peak {orm_peak / 2**20:.1f} MiB in {orm_time * 1000:.0f} ms; "
+        f"full analytics {analytics_time * 1000:.0f} ms"
+    )
+    assert facts_peak < orm_peak / 2
+    assert facts_time < orm_time
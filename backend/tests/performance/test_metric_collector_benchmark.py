@@ -0,0 +1,81 @@
+"""
+Microbenchmarks for the gateway MetricCollector.
+
+Compares recording into a full series and summarising the last hour with
+the ring-buffer MetricSeries against the previous list of MetricDataPoint
+objects that was re-sliced on every insert once full and filtered in Python
+for every summary.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.gateway.monitoring import MetricCollector, MetricDataPoint, MetricType
+
+
+MAX_DATA_POINTS = 10_000
+INSERTS = 20_000
+SUMMARIES = 200
+
+
+class ListMetricCollector:
+    """The previous storage: a list per metric, re-sliced to the limit."""
+
+    def __init__(self, max_data_points: int):
+        self.max_data_points = max_data_points
+        self.metrics = {}
+        self.lock = threading.RLock()
+
+    def record_metric(self, metric_name, value, metric_type=MetricType.GAUGE, labels=None, timestamp=None):
+        with self.lock:
+            points = self.metrics.setdefault(metric_name, [])
+            points.append(MetricDataPoint(timestamp=timestamp or datetime.utcnow(), value=value, labels=labels or {}))
+            if len(points) > self.max_data_points:
+                self.metrics[metric_name] = points[-self.max_data_points:]
+
+    def get_metric_summary(self, metric_name, minutes=60):
+        since = datetime.utcnow() - timedelta(minutes=minutes)
+        with self.lock:
+            values = [point.value for point in self.metrics.get(metric_name, []) if point.timestamp >= since]
+        return {'min': min(values), 'max': max(values), 'avg': sum(values) / len(values)}
+
+
+def _fill(collector):
+    for i in range(MAX_DATA_POINTS):
+        collector.record_metric("response_time_powerschool", i * 0.001, MetricType.HISTOGRAM)
+
+
+def _time_inserts(collector) -> float:
+    start = time.perf_counter()
+    for i in range(INSERTS):
+        collector.record_metric("response_time_powerschool", i * 0.001, MetricType.HISTOGRAM)
+    return time.perf_counter() - start
+
+
+def _time_summaries(collector) -> float:
+    start = time.perf_counter()
+    for _ in range(SUMMARIES):
+        collector.get_metric_summary("response_time_powerschool")
+    return time.perf_counter() - start
+
+
+@pytest.mark.performance
+def test_ring_buffer_inserts_and_summaries_beat_list_storage():
+    ring, old = MetricCollector(MAX_DATA_POINTS), ListMetricCollector(MAX_DATA_POINTS)
+    _fill(ring)
+    _fill(old)
+
+    ring_insert, old_insert = _time_inserts(ring), _time_inserts(old)
+    ring_summary, old_summary = _time_summaries(ring), _time_summaries(old)
+
+    print(
+        f"\nInserts into a full {MAX_DATA_POINTS}-point series: "
+        f"{INSERTS / old_insert:,.0f}/s with list re-slicing, {INSERTS / ring_insert:,.0f}/s with the ring buffer"
+        f"\nLast-hour summaries: {old_summary / SUMMARIES * 1e3:.2f} ms with list filtering, "
+        f"{ring_summary / SUMMARIES * 1e3:.2f} ms with the ring buffer (including percentiles)"
+    )
+    assert ring_insert < old_insert
+    assert ring_summary < old_summary
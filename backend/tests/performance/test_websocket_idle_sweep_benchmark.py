@@ -0,0 +1,76 @@
+"""
+Benchmark for idle connection tracking in ConnectionPool.
+
+Compares a timing wheel sweep with the previous full scan, which walked every
+connection and compared datetimes on each cleanup tick, at 10k and 50k
+connections.
+"""
+
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.websocket import ConnectionPool
+
+
+CONNECTION_COUNTS = [10_000, 50_000]
+
+
+async def _fill_pool(connection_count: int) -> ConnectionPool:
+    pool = ConnectionPool(max_connections=connection_count, idle_timeout_seconds=300)
+    websocket = SimpleNamespace(client_state=SimpleNamespace(name="CONNECTED"))
+    for i in range(connection_count):
+        await pool.add_connection(websocket, f"conn-{i}")
+    return pool
+
+
+def _full_scan(pool: ConnectionPool, activity: dict) -> list:
+    """The previous sweep: visit every connection and compare datetimes."""
+    current_time = datetime.now(timezone.utc)
+    return [
+        conn_id for conn_id in pool._connections
+        if (current_time - activity[conn_id]).total_seconds() > 300
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.performance
+@pytest.mark.parametrize("connection_count", CONNECTION_COUNTS)
+async def test_idle_sweep_touches_only_expiring_connections(connection_count):
+    pool = await _fill_pool(connection_count)
+    start = time.monotonic()
+
+    # update_activity is a plain attribute write
+    began = time.perf_counter()
+    for i in range(connection_count):
+        pool.update_activity(f"conn-{i}")
+    update_ns = (time.perf_counter() - began) / connection_count * 1e9
+
+    # A routine sweep while nothing is close to its deadline
+    began = time.perf_counter()
+    removed = await pool._cleanup_stale_connections(now=start + 30)
+    wheel_quiet = time.perf_counter() - began
+    assert removed == 0
+
+    activity = {conn_id: datetime.now(timezone.utc) for conn_id in pool._connections}
+    began = time.perf_counter()
+    assert _full_scan(pool, activity) == []
+    full_scan = time.perf_counter() - began
+
+    # Once the timeout passes every connection is removed exactly once
+    began = time.perf_counter()
+    removed = await pool._cleanup_stale_connections(now=start + 302)
+    wheel_expiry = time.perf_counter() - began
+    assert removed == connection_count
+    assert pool.get_stats()["active_connections"] == 0
+    assert len(pool._idle_wheel) == 0
+
+    print(
+        f"\n{connection_count} connections: update_activity {update_ns:.0f} ns, "
+        f"quiet sweep {wheel_quiet * 1000:.3f} ms (full scan {full_scan * 1000:.1f} ms), "
+        f"expiring sweep {wheel_expiry * 1000:.1f} ms"
+    )
+    assert wheel_quiet < full_scan
+    await pool.shutdown()
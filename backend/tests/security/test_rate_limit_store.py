@@ -0,0 +1,124 @@
+"""
+Tests for the sliding window rate limit stores used by SecurityMiddleware.
+"""
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core.rate_limit_store import (
+    InMemoryRateLimitStore, RateLimitStore, RedisRateLimitStore, sliding_window_estimate
+)
+from app.middleware.security import SecurityMiddleware
+
+
+class FakeRedis:
+    """Runs the sliding window script in Python over a shared ``data`` dict."""
+
+    def __init__(self, data):
+        self.data = data
+        self.expiry = {}
+
+    async def eval(self, script, numkeys, current_key, previous_key, limit, window, elapsed):
+        current = self.data.get(current_key, 0)
+        previous = self.data.get(previous_key, 0)
+        if sliding_window_estimate(previous, current, window, elapsed) >= limit:
+            return 0
+        self.data[current_key] = current + 1
+        self.expiry[current_key] = window * 2
+        return 1
+
+
+class BrokenRedis:
+    async def eval(self, *args):
+        raise ConnectionError("redis is down")
+
+
+async def _allowed(store, key, limit, window, now, count):
+    return sum([await store.hit(key, limit, window, now=now) for _ in range(count)])
+
+
+@pytest.mark.asyncio
+async def test_limit_applies_within_a_window():
+    store = InMemoryRateLimitStore()
+
+    assert await _allowed(store, "10.0.0.1:auth", 5, 60, 1000.0, 8) == 5
+    # Other keys are counted separately
+    assert await _allowed(store, "10.0.0.2:auth", 5, 60, 1000.0, 8) == 5
+    assert store.get_stats()["limited"] == 6
+
+
+@pytest.mark.asyncio
+async def test_previous_window_is_weighted_by_overlap():
+    store = InMemoryRateLimitStore()
+    await _allowed(store, "ip:api", 10, 60, 60.0, 10)
+
+    # A quarter into the next window, 3/4 of the previous 10 requests still count
+    assert await _allowed(store, "ip:api", 10, 60, 135.0, 10) == 3
+    # Two windows later nothing is carried over
+    assert await _allowed(store, "ip:api", 10, 60, 240.0, 20) == 10
+
+
+@pytest.mark.asyncio
+async def test_least_recently_seen_keys_are_evicted():
+    store = InMemoryRateLimitStore(max_keys=2)
+    await store.hit("a", 1, 60, now=0.0)
+    await store.hit("b", 1, 60, now=0.0)
+    await store.hit("a", 1, 60, now=1.0)
+    await store.hit("c", 1, 60, now=2.0)
+
+    assert len(store) == 2
+    assert store.get_stats()["evicted"] == 1
+    # "a" was seen more recently than "b" and is still limited; "b" starts over
+    assert not await store.hit("a", 1, 60, now=3.0)
+    assert await store.hit("b", 1, 60, now=3.0)
+
+
+@pytest.mark.asyncio
+async def test_redis_store_shares_counts_between_workers():
+    data = {}
+    workers = [RedisRateLimitStore(client=FakeRedis(data)) for _ in range(2)]
+
+    allowed = [await workers[n % 2].hit("ip:auth", 5, 60, now=1000.0) for n in range(8)]
+
+    assert sum(allowed) == 5
+    assert data == {"ratelimit:ip:auth:16": 5}
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_fail_open():
+    store = RedisRateLimitStore(client=BrokenRedis())
+
+    assert await store.hit("ip:auth", 0, 60)
+    assert store.get_stats()["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_middleware_rejects_with_retry_after(monkeypatch):
+    middleware = SecurityMiddleware(app=None, rate_limit_store=InMemoryRateLimitStore())
+
+    async def no_log(*args):
+        pass
+
+    monkeypatch.setattr(middleware, "_log_rate_limit_exceeded", no_log)
+    request = Request({"type": "http", "method": "POST", "path": "/auth/login", "headers": []})
+
+    for _ in range(5):
+        await middleware._check_rate_limiting("10.0.0.1", request)
+    with pytest.raises(HTTPException) as exc_info:
+        await middleware._check_rate_limiting("10.0.0.1", request)
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers == {"Retry-After": "60"}
+    assert middleware.suspicious_ips["10.0.0.1"] == 1
+
+
+def test_middleware_keeps_an_empty_injected_store():
+    # An empty in-memory store has len() == 0 and must not be swapped for a new one
+    store = InMemoryRateLimitStore()
+
+    assert SecurityMiddleware(app=None, rate_limit_store=store).rate_limit_store is store
+
+
+def test_stores_must_implement_hit():
+    with pytest.raises(TypeError):
+        RateLimitStore()
@@ -0,0 +1,79 @@
+"""
+Tests for the compiled threat-pattern matcher used by SecurityMiddleware.
+"""
+import re
+
+import pytest
+
+from app.middleware.security import ThreatMatcher, THREAT_PATTERNS
+
+
+# The patterns as originally written, with capturing groups
+ORIGINAL_PATTERNS = {
+    "sql_injection": [
+        r"(\%27)|(\')|(\-\-)|(\%23)|(#)",
+        r"((\%3D)|(=))[^\n]*((\%27)|(\')|(\-\-)|(\%3B)|(;))",
+        r"\w*((\%27)|(\'))((\%6F)|o|(\%4F))((\%72)|r|(\%52))",
+    ],
+    "xss": [
+        r"<[^>]*script[^>]*>",
+        r"javascript:",
+        r"on\w+\s*=",
+        r"<[^>]*iframe[^>]*>",
+    ],
+    "path_traversal": [
+        r"\.\.\/",
+        r"\.\.\\",
+        r"\%2e\%2e\%2f",
+        r"\%2e\%2e\%5c",
+    ],
+    "command_injection": [
+        r"[;&|`]",
+        r"\$\(.*\)",
+        r"curl\s",
+        r"wget\s",
+    ]
+}
+
+
+def _per_pattern_scan(components):
+    """The previous scan: every original pattern searched separately."""
+    detected = []
+    for threat_type, patterns in ORIGINAL_PATTERNS.items():
+        if any(re.search(pattern, component, re.IGNORECASE) for component in components for pattern in patterns):
+            detected.append(threat_type)
+    return detected
+
+
+@pytest.mark.parametrize("components", [
+    ["/api/v1/classes", "limit=10", "application/json\ngzip, deflate"],
+    ["/api/v1/users", "name=O%27Brien", ""],
+    ["/search", "q=<SCRIPT>alert(1)</script>", ""],
+    ["/files/../../etc/passwd", "", ""],
+    ["/files/%2E%2E%2Fsecret", "", ""],
+    ["/run", "cmd=$(whoami)", "curl http://evil"],
+    ["/", "", "text/html;q=0.9"],
+    ["/login", "user=admin'--", "javascript:void(0)"],
+    ["/login", "user=%27OR%271", ""],
+    ["/page", "a=1%3Bdrop", "<img src=x onerror=alert(1)>"],
+    ["/files/..\\windows", "", "wget http://evil"],
+])
+def test_matches_the_same_categories_as_per_pattern_search(components):
+    assert ThreatMatcher(THREAT_PATTERNS).scan(components) == _per_pattern_scan(components)
+
+
+def test_clean_request_has_no_threats():
+    matcher = ThreatMatcher(THREAT_PATTERNS)
+    assert matcher.scan(["/api/v1/attendance/my-classes", "limit=50", "Bearer abc.def.ghi\nen-US"]) == []
+
+
+def test_each_category_is_reported_once():
+    matcher = ThreatMatcher(THREAT_PATTERNS)
+    assert matcher.scan(["a;b", "c|d", "e`f"]) == ["command_injection"]
+
+
+def test_padding_does_not_hide_a_payload():
+    matcher = ThreatMatcher(THREAT_PATTERNS)
+
+    assert matcher.scan(["a" * 100_000 + "<script>"]) == ["xss"]
+    assert matcher.scan(["/api", "", "x" * 100_000 + "javascript:alert(1)"]) == ["xss"]
@@ -0,0 +1,235 @@
+"""
+Tests for the analytics results cache and its invalidation by AttendanceEngine
+writes.
+"""
+import asyncio
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert, select
+
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.services.analytics_cache import AnalyticsResultCache, INSTITUTION_TAG
+from app.services.attendance_analytics import AttendanceAnalyticsService
+from app.services.attendance_engine import AttendanceEngine
+
+
+@pytest_asyncio.fixture
+async def class_session(db):
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    db.add(teacher)
+    await db.flush()
+    await db.execute(insert(User), [
+        {
+            "email": f"student{i}@example.com", "username": f"student{i}",
+            "full_name": f"Student {i}", "hashed_password": "x", "role": UserRole.STUDENT
+        }
+        for i in range(2)
+    ])
+    session = ClassSession(
+        name="Biology", teacher_id=teacher.id, jwt_token="token", verification_code="654321",
+        start_time=datetime.utcnow() - timedelta(days=1), status="ended"
+    )
+    db.add(session)
+    await db.flush()
+    await db.execute(insert(AttendanceRecord), [
+        {
+            "student_id": student_id, "class_session_id": session.id,
+            "status": AttendanceStatus.ABSENT, "verification_method": "manual"
+        }
+        for student_id in (teacher.id + 1, teacher.id + 2)
+    ])
+    await db.commit()
+    return session
+
+
+def _count_statements(db_engine):
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", on_execute)
+    return statements, lambda: event.remove(db_engine.sync_engine, "before_cursor_execute", on_execute)
+
+
+class TestAnalyticsResultCache:
+    """Test the LRU/TTL cache itself."""
+
+    @staticmethod
+    def _compute(value, calls):
+        async def compute():
+            calls.append(value)
+            return value
+        return compute
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_entry_is_evicted(self):
+        cache = AnalyticsResultCache(max_entries=2)
+        calls = []
+        for key in ("a", "b", "a", "c"):
+            await cache.get_or_compute(key, INSTITUTION_TAG, self._compute(key, calls))
+        await cache.get_or_compute("a", INSTITUTION_TAG, self._compute("a", calls))
+
+        assert calls == ["a", "b", "c"]
+        stats = cache.get_stats()
+        assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 3, 1)
+
+    @pytest.mark.asyncio
+    async def test_entries_expire_after_ttl(self):
+        cache = AnalyticsResultCache(ttl_seconds=0)
+        calls = []
+        await cache.get_or_compute("a", INSTITUTION_TAG, self._compute(1, calls))
+        await cache.get_or_compute("a", INSTITUTION_TAG, self._compute(2, calls))
+
+        assert calls == [1, 2]
+        assert cache.get_stats()['expirations'] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidation_is_scoped_to_the_tag(self):
+        cache = AnalyticsResultCache()
+        calls = []
+        await cache.get_or_compute("s1", ("student", 1), self._compute("s1", calls))
+        await cache.get_or_compute("s2", ("student", 2), self._compute("s2", calls))
+
+        cache.invalidate([("student", 1)])
+        await cache.get_or_compute("s1", ("student", 1), self._compute("s1", calls))
+        await cache.get_or_compute("s2", ("student", 2), self._compute("s2", calls))
+
+        assert calls == ["s1", "s2", "s1"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_computation(self):
+        cache = AnalyticsResultCache()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(
+            cache.get_or_compute("key", INSTITUTION_TAG, slow) for _ in range(5)
+        ))
+
+        assert results == ["result"] * 5
+        assert calls == [1]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_computation_does_not_strand_waiters(self):
+        cache = AnalyticsResultCache()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "result"
+
+        first = asyncio.create_task(cache.get_or_compute("key", INSTITUTION_TAG, slow))
+        await started.wait()
+        second = asyncio.create_task(cache.get_or_compute("key", INSTITUTION_TAG, slow))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await asyncio.wait_for(second, 1) == "result"
+        assert cache.get_stats()['entries'] == 1
+
+    @pytest.mark.asyncio
+    async def test_result_computed_across_a_write_is_not_stored(self):
+        cache = AnalyticsResultCache()
+
+        async def racing():
+            cache.invalidate_records(1, [7])
+            return "stale"
+
+        await cache.get_or_compute("key", ("student", 7), racing)
+
+        assert cache.get_stats()['entries'] == 0
+
+    @pytest.mark.asyncio
+    async def test_invalidations_do_not_accumulate_tag_versions(self):
+        cache = AnalyticsResultCache()
+        await cache.get_or_compute("key", ("student", 1), self._compute("value", []))
+
+        for student_id in range(1000):
+            cache.invalidate_records(1, [student_id])
+
+        assert cache._tag_versions == {}
+        assert cache._computing_tags == {}
+
+    @pytest.mark.asyncio
+    async def test_callers_get_their_own_copy(self):
+        cache = AnalyticsResultCache()
+
+        async def compute():
+            return {"students": [1, 2]}
+
+        first = await cache.get_or_compute("key", INSTITUTION_TAG, compute)
+        first["students"].append(3)
+        second = await cache.get_or_compute("key", INSTITUTION_TAG, compute)
+
+        assert second == {"students": [1, 2]}
+        assert cache.get_stats()['hits'] == 1
+
+
+class TestWriteInvalidation:
+    """Test that AttendanceEngine writes invalidate the affected results."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_call_is_served_from_cache(self, db, db_engine, class_session):
+        service = AttendanceAnalyticsService(db, result_cache=AnalyticsResultCache())
+        first = await service.generate_class_analytics(class_session.id)
+
+        statements, stop = _count_statements(db_engine)
+        second = await service.generate_class_analytics(class_session.id)
+        stop()
+
+        assert second == first
+        assert statements == []
+
+    @pytest.mark.asyncio
+    async def test_committed_write_invalidates_affected_results(self, db, class_session):
+        cache = AnalyticsResultCache()
+        service = AttendanceAnalyticsService(db, result_cache=cache)
+        records = (await db.execute(select(AttendanceRecord).order_by(AttendanceRecord.id))).scalars().all()
+        changed, other = records
+
+        before = await service.generate_student_analytics(changed.student_id)
+        other_before = await service.generate_student_analytics(other.student_id)
+        class_before = await service.generate_class_analytics(class_session.id)
+
+        await AttendanceEngine(db).update_attendance_status(
+            changed, AttendanceStatus.EXCUSED, class_session.teacher_id, "Doctor's note"
+        )
+        # Nothing is dropped until the write commits
+        assert await service.generate_student_analytics(changed.student_id) == before
+        await db.commit()
+
+        after = await service.generate_student_analytics(changed.student_id)
+        assert after.overall_stats.excused_count == 1
+        assert before.overall_stats.excused_count == 0
+        assert await service.generate_student_analytics(other.student_id) == other_before
+        assert (await service.generate_class_analytics(class_session.id)).attendance_summary.excused_count == 1
+        assert class_before.attendance_summary.excused_count == 0
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_write_keeps_results(self, db, class_session):
+        cache = AnalyticsResultCache()
+        service = AttendanceAnalyticsService(db, result_cache=cache)
+        record = (await db.execute(select(AttendanceRecord))).scalars().first()
+        student_id = record.student_id
+        before = await service.generate_student_analytics(student_id)
+
+        await AttendanceEngine(db).update_attendance_status(
+            record, AttendanceStatus.EXCUSED, class_session.teacher_id, "Mistake"
+        )
+        await db.rollback()
+
+        assert await service.generate_student_analytics(student_id) == before
+        assert cache.get_stats()['invalidations'] == 0
+        assert cache.get_stats()['hits'] == 1
@@ -0,0 +1,131 @@
+"""
+Tests for the columnar attendance fact store and the institutional analytics
+built on it.
+"""
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.services.attendance_analytics import AttendanceAnalyticsService
+from app.services.analytics_cache import AnalyticsResultCache
+from app.services.attendance_facts import load_attendance_facts, STATUSES
+
+
+@pytest_asyncio.fixture
+async def seeded(db):
+    """Two subjects over three weeks; student i misses every (i + 2)th session."""
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    db.add(teacher)
+    await db.flush()
+    await db.execute(insert(User), [
+        {
+            "email": f"student{i}@example.com", "username": f"student{i}",
+            "full_name": f"Student {i}", "hashed_password": "x", "role": UserRole.STUDENT
+        }
+        for i in range(8)
+    ])
+    student_ids = [teacher.id + 1 + i for i in range(8)]
+
+    now = datetime.utcnow()
+    sessions = [
+        ClassSession(
+            name="Lesson", subject=["Math", "Art"][day % 2], teacher_id=teacher.id,
+            jwt_token="token", verification_code="123456",
+            start_time=now - timedelta(days=day, hours=1), status="ended"
+        )
+        for day in range(1, 21)
+    ]
+    # Outside the period
+    sessions.append(ClassSession(
+        name="Old", subject="Math", teacher_id=teacher.id, jwt_token="token",
+        verification_code="123456", start_time=now - timedelta(days=90), status="ended"
+    ))
+    db.add_all(sessions)
+    await db.flush()
+
+    records = []
+    for i, student_id in enumerate(student_ids):
+        for n, session in enumerate(sessions):
+            if n % (i + 2) == 0:
+                status = AttendanceStatus.ABSENT
+            elif n % 5 == 0:
+                status = AttendanceStatus.LATE
+            else:
+                status = AttendanceStatus.PRESENT
+            records.append({
+                "student_id": student_id, "class_session_id": session.id,
+                "status": status, "verification_method": "qr_code"
+            })
+    await db.execute(insert(AttendanceRecord), records)
+    await db.commit()
+    return records, sessions
+
+
+@pytest.mark.asyncio
+async def test_facts_hold_the_period_records(db, seeded):
+    records, sessions = seeded
+    in_period = [r for r in records if r["class_session_id"] != sessions[-1].id]
+    end_date = datetime.utcnow()
+
+    facts = await load_attendance_facts(db, end_date - timedelta(days=30), end_date, batch_size=37)
+
+    assert len(facts) == len(in_period)
+    assert facts.nbytes == 29 * len(in_period)
+    assert sorted(zip(facts.student_id.tolist(), facts.session_id.tolist(), [STATUSES[c] for c in facts.status])) == \
+        sorted((r["student_id"], r["class_session_id"], r["status"]) for r in in_period)
+    assert sorted(facts.subjects) == ["Art", "Math"]
+
+
+@pytest.mark.asyncio
+async def test_institutional_analytics_from_facts(db, seeded):
+    records, sessions = seeded
+    in_period = [r for r in records if r["class_session_id"] != sessions[-1].id]
+    attended = [r for r in in_period if r["status"] != AttendanceStatus.ABSENT]
+
+    service = AttendanceAnalyticsService(db, result_cache=AnalyticsResultCache())
+    analytics = await service.generate_institutional_analytics(period_days=30)
+
+    assert analytics.total_students == 8
+    assert analytics.total_classes == 20
+    assert analytics.overall_attendance_rate == round(len(attended) / len(in_period), 3)
+
+    departments = analytics.department_breakdown["departments"]
+    assert set(departments) == {"Math", "Art"}
+    assert departments["Math"]["total_classes"] == 10
+    assert departments["Math"]["total_students"] == 8
+    assert sum(d["total_records"] for d in departments.values()) == len(in_period)
+
+    distribution = analytics.performance_distribution
+    assert distribution["total_students"] == 8
+    assert sum(c["count"] for c in distribution["categories"].values()) == 8
+    # Student 0 misses every other session
+    assert distribution["categories"]["critical"]["count"] >= 1
+
+    assert analytics.trend_analysis["trend_direction"] in ("improving", "declining", "stable")
+    assert sum(w["total_records"] for w in analytics.trend_analysis["weekly_attendance"]) == len(in_period)
+    assert analytics.alert_summary["students_at_risk"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_department_filter_uses_session_subject(db, seeded):
+    service = AttendanceAnalyticsService(db, result_cache=AnalyticsResultCache())
+    analytics = await service.generate_institutional_analytics(period_days=30, department_filter="Art")
+
+    assert list(analytics.department_breakdown["departments"]) == ["Art"]
+    assert analytics.total_classes == 10
+
+
+@pytest.mark.asyncio
+async def test_empty_period(db):
+    service = AttendanceAnalyticsService(db, result_cache=AnalyticsResultCache())
+    analytics = await service.generate_institutional_analytics(period_days=30)
+
+    assert analytics.total_students == 0
+    assert analytics.trend_analysis == {"status": "no_data"}
@@ -0,0 +1,225 @@
+"""
+Tests for the attendance rollups: incremental refresh from the watermark and
+analytics served from the rollups.
+"""
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import insert, update, select, func
+
+from app.models.user import User, UserRole
+from app.models.class_session import Class, ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.models.attendance_rollup import AttendanceDailyRollup, AttendanceStudentRollup, RollupWatermark
+from app.services.attendance_analytics import AttendanceAnalyticsService
+from app.services.analytics_cache import AnalyticsResultCache
+from app.services.attendance_rollups import AttendanceRollups, ROLLUP_NAME
+
+
+@pytest_asyncio.fixture
+async def sessions(db):
+    """Two subjects of one class over four weeks; student i misses every (i + 2)th session."""
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    db.add(teacher)
+    await db.flush()
+    await db.execute(insert(User), [
+        {
+            "email": f"student{i}@example.com", "username": f"student{i}",
+            "full_name": f"Student {i}", "hashed_password": "x", "role": UserRole.STUDENT
+        }
+        for i in range(6)
+    ])
+    student_ids = [teacher.id + 1 + i for i in range(6)]
+    class_ = Class(name="Homeroom", teacher_id=teacher.id)
+    db.add(class_)
+    await db.flush()
+
+    # Noon sessions, so that whole-day rollup buckets match the period exactly
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    class_sessions = [
+        ClassSession(
+            name="Lesson", subject=["Math", None][day % 2], class_id=class_.id,
+            teacher_id=teacher.id, jwt_token="token", verification_code="123456",
+            start_time=today - timedelta(days=day), status="ended"
+        )
+        for day in range(1, 29)
+    ]
+    db.add_all(class_sessions)
+    await db.flush()
+
+    records = []
+    for i, student_id in enumerate(student_ids):
+        for n, session in enumerate(class_sessions):
+            late = n % 5 == 0 and n % (i + 2) != 0
+            records.append({
+                "student_id": student_id, "class_session_id": session.id,
+                "status": (
+                    AttendanceStatus.ABSENT if n % (i + 2) == 0
+                    else AttendanceStatus.LATE if late
+                    else AttendanceStatus.PRESENT
+                ),
+                "is_late": late, "late_minutes": (n % 7) + 1 if late else 0,
+                "verification_method": "qr_code"
+            })
+    await db.execute(insert(AttendanceRecord), records)
+    await db.commit()
+    return class_sessions
+
+
+def _raw_only():
+    """Rollups that never count as fresh, so analytics read the raw records."""
+    return AttendanceRollups(max_staleness_seconds=-1)
+
+
+@pytest.mark.asyncio
+async def test_first_refresh_builds_every_day(db, sessions):
+    rollups = AttendanceRollups(day_chunk=5)
+
+    assert not await rollups.covers(db, datetime.utcnow())
+    assert await rollups.refresh(db) == 28
+    assert await rollups.covers(db, datetime.utcnow())
+
+    total = await db.scalar(select(func.sum(
+        AttendanceDailyRollup.present_count + AttendanceDailyRollup.late_count +
+        AttendanceDailyRollup.absent_count + AttendanceDailyRollup.excused_count
+    )))
+    assert total == 6 * 28
+    assert await db.scalar(select(func.count()).select_from(AttendanceStudentRollup)) == 6 * 28
+
+
+@pytest.mark.asyncio
+async def test_refresh_rebuilds_only_changed_days(db, sessions):
+    rollups = AttendanceRollups(overlap_seconds=0)
+    await rollups.refresh(db)
+    assert await rollups.refresh(db) == 0
+
+    record = (await db.execute(
+        select(AttendanceRecord)
+        .where(AttendanceRecord.class_session_id == sessions[0].id)
+        .where(AttendanceRecord.status == AttendanceStatus.ABSENT)
+    )).scalars().first()
+    record.status = AttendanceStatus.EXCUSED
+    record.updated_at = datetime.utcnow()
+    await db.commit()
+
+    assert await rollups.refresh(db) == 1
+    day = (await db.execute(
+        select(AttendanceDailyRollup).where(AttendanceDailyRollup.day == sessions[0].start_time.date())
+    )).scalar_one()
+    assert day.excused_count == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_rollups_are_not_used(db, sessions):
+    rollups = AttendanceRollups(max_staleness_seconds=60)
+    await rollups.refresh(db)
+
+    state = await db.get(RollupWatermark, ROLLUP_NAME)
+    state.refreshed_at = datetime.utcnow() - timedelta(minutes=5)
+    await db.commit()
+
+    assert not await rollups.covers(db, datetime.utcnow())
+
+
+@pytest.mark.asyncio
+async def test_institutional_analytics_match_raw_records(db, sessions):
+    raw = await AttendanceAnalyticsService(db, _raw_only(), AnalyticsResultCache()) \
+        .generate_institutional_analytics(period_days=30)
+
+    rollups = AttendanceRollups()
+    await rollups.refresh(db)
+    rolled = await AttendanceAnalyticsService(db, rollups, AnalyticsResultCache()) \
+        .generate_institutional_analytics(period_days=30)
+
+    assert rolled.total_students == raw.total_students == 6
+    assert rolled.total_classes == raw.total_classes == 28
+    assert rolled.overall_attendance_rate == raw.overall_attendance_rate
+    assert rolled.department_breakdown == raw.department_breakdown
+    assert rolled.performance_distribution == raw.performance_distribution
+    assert rolled.alert_summary == raw.alert_summary
+    # Rollups bucket by day, so sessions may land in a neighbouring week
+    assert sum(week["total_records"] for week in rolled.trend_analysis["weekly_attendance"]) == 6 * 28
+
+
+@pytest.mark.asyncio
+async def test_student_analytics_match_raw_records(db, sessions):
+    student_id = (await db.execute(select(AttendanceRecord.student_id))).scalars().first()
+    raw = await AttendanceAnalyticsService(db, _raw_only(), AnalyticsResultCache()) \
+        .generate_student_analytics(student_id, analysis_period_days=60)
+
+    rollups = AttendanceRollups()
+    await rollups.refresh(db)
+    rolled = await AttendanceAnalyticsService(db, rollups, AnalyticsResultCache()).generate_student_analytics(
+        student_id, analysis_period_days=60
+    )
+
+    assert rolled.overall_stats == raw.overall_stats
+    assert rolled.performance_trends == raw.performance_trends
+    assert rolled.punctuality_analysis == raw.punctuality_analysis
+    assert rolled.risk_indicators == raw.risk_indicators
+
+
+@pytest.mark.asyncio
+async def test_class_time_series_from_rollups(db, sessions):
+    rollups = AttendanceRollups()
+    service = AttendanceAnalyticsService(db, rollups, AnalyticsResultCache())
+    assert (await service.generate_class_analytics(sessions[0].id)).time_series_data == []
+
+    await rollups.refresh(db)
+    service = AttendanceAnalyticsService(db, rollups, AnalyticsResultCache())
+    series = (await service.generate_class_analytics(sessions[0].id)).time_series_data
+
+    assert len(series) == 28
+    assert series[-1]["class_session_id"] == sessions[0].id
+    assert series[-1]["total_records"] == 6
+    assert [point["date"] for point in series] == sorted(point["date"] for point in series)
+
+
+@pytest.mark.asyncio
+async def test_reads_include_changes_since_the_last_refresh(db, sessions):
+    # Seeded a day ago, so that only the writes below are newer than the watermark
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    await db.execute(update(AttendanceRecord).values(created_at=yesterday, updated_at=yesterday))
+    await db.commit()
+    rollups = AttendanceRollups(overlap_seconds=0)
+    await rollups.refresh(db)
+
+    # Written after the refresh: an override on one day and a new session today
+    record = (await db.execute(
+        select(AttendanceRecord).where(
+            AttendanceRecord.class_session_id == sessions[3].id,
+            AttendanceRecord.status == AttendanceStatus.ABSENT
+        )
+    )).scalars().first()
+    record.status = AttendanceStatus.EXCUSED
+    today = ClassSession(
+        name="Lesson", subject="Math", class_id=sessions[0].class_id, teacher_id=sessions[0].teacher_id,
+        jwt_token="token", verification_code="123456", start_time=datetime.utcnow(), status="active"
+    )
+    db.add(today)
+    await db.flush()
+    db.add(AttendanceRecord(
+        student_id=record.student_id, class_session_id=today.id, status=AttendanceStatus.PRESENT
+    ))
+    await db.commit()
+
+    assert await rollups.covers(db, datetime.utcnow())
+    raw = await AttendanceAnalyticsService(db, _raw_only(), AnalyticsResultCache()) \
+        .generate_institutional_analytics(period_days=30)
+    rolled = await AttendanceAnalyticsService(db, rollups, AnalyticsResultCache()) \
+        .generate_institutional_analytics(period_days=30)
+
+    assert rolled.total_classes == raw.total_classes == 29
+    assert rolled.overall_attendance_rate == raw.overall_attendance_rate
+    assert rolled.department_breakdown == raw.department_breakdown
+
+    series = (await AttendanceAnalyticsService(db, rollups, AnalyticsResultCache())
+              .generate_class_analytics(today.id)).time_series_data
+    assert series[-1]["class_session_id"] == today.id
+    assert series[-1]["total_records"] == 1
+
+    # The rollup tables themselves are untouched until the next refresh
+    assert await db.scalar(select(func.count()).select_from(AttendanceDailyRollup)) == 28
@@ -0,0 +1,161 @@
+"""
+Tests for who may follow a class session's attendance events over the
+/ws/attendance WebSocket.
+"""
+import asyncio
+import json
+import pytest
+import pytest_asyncio
+from types import SimpleNamespace
+from starlette.requests import Request
+
+from app.api.v1 import attendance as attendance_api, classes as classes_api
+from app.api.v1.attendance import teacher_override_attendance
+from app.api.v1.classes import student_join_class
+from app.core.auth import create_access_token
+from app.core.websocket import WebSocketServer
+from app.models.user import User, UserRole
+from app.models.class_session import Class, ClassSession, StudentEnrollment
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.schemas.attendance import TeacherOverrideRequest
+from app.websocket.attendance_updates import AttendanceConnectionManager, class_session_access_role
+
+
+@pytest_asyncio.fixture
+async def people(session_factory):
+    """A session taught by one teacher, with an enrolled, a recorded and an unrelated student."""
+    async with session_factory() as db:
+        users = {
+            name: User(
+                email=f"{name}@example.com", username=name, full_name=name.title(),
+                hashed_password="x", role=role
+            )
+            for name, role in [
+                ("owner", UserRole.TEACHER), ("other_teacher", UserRole.TEACHER), ("admin", UserRole.ADMIN),
+                ("enrolled", UserRole.STUDENT), ("recorded", UserRole.STUDENT), ("outsider", UserRole.STUDENT)
+            ]
+        }
+        db.add_all(users.values())
+        await db.flush()
+
+        course = Class(name="Math", teacher_id=users["owner"].id)
+        db.add(course)
+        await db.flush()
+
+        class_session = ClassSession(
+            name="Lesson", class_id=course.id, teacher_id=users["owner"].id,
+            jwt_token="token", verification_code="123456"
+        )
+        db.add(class_session)
+        await db.flush()
+
+        db.add_all([
+            StudentEnrollment(student_id=users["enrolled"].id, class_id=course.id),
+            AttendanceRecord(
+                student_id=users["recorded"].id, class_session_id=class_session.id,
+                status=AttendanceStatus.PRESENT
+            )
+        ])
+        await db.commit()
+        return {name: user.id for name, user in users.items()}, class_session.id
+
+
+@pytest.mark.asyncio
+async def test_access_role_per_relationship(session_factory, people):
+    user_ids, class_session_id = people
+
+    async with session_factory() as db:
+        roles = {
+            name: await class_session_access_role(db, user_id, class_session_id)
+            for name, user_id in user_ids.items()
+        }
+        missing_session = await class_session_access_role(db, user_ids["owner"], class_session_id + 1)
+
+    assert roles == {
+        "owner": "teacher",
+        "other_teacher": None,
+        "admin": "admin",
+        "enrolled": "student",
+        "recorded": "student",
+        "outsider": None
+    }
+    assert missing_session is None
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.client_state = SimpleNamespace(name="CONNECTED")
+        self.frames = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.frames.append(json.loads(data))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+        self.client_state = SimpleNamespace(name="DISCONNECTED")
+
+
+@pytest.mark.asyncio
+async def test_connect_rejects_users_outside_the_session(session_factory, people):
+    user_ids, class_session_id = people
+    manager = AttendanceConnectionManager(session_factory=session_factory)
+    manager.server = WebSocketServer()
+
+    # Claiming a role in the token does not help
+    intruder = FakeWebSocket()
+    token = create_access_token({"sub": str(user_ids["other_teacher"]), "role": "admin"})
+    assert await manager.connect(intruder, class_session_id, token) is None
+    assert intruder.closed_with == 1008
+
+    owner = FakeWebSocket()
+    token = create_access_token({"sub": str(user_ids["owner"]), "role": "teacher"})
+    assert await manager.connect(owner, class_session_id, token) is not None
+    assert owner.closed_with is None
+    assert manager.get_active_connections_count(class_session_id) == {"teachers": 1, "students": 0}
+    await manager.server.shutdown()
+
+
+def _request(path: str):
+    return Request({
+        "type": "http", "method": "POST", "path": path,
+        "headers": [(b"user-agent", b"pytest")], "client": ("10.0.0.5", 1234)
+    })
+
+
+@pytest.mark.asyncio
+async def test_students_do_not_receive_classmates_attendance(session_factory, people, monkeypatch):
+    user_ids, class_session_id = people
+    server = WebSocketServer()
+    monkeypatch.setattr(classes_api, "websocket_server", server)
+    monkeypatch.setattr(attendance_api, "websocket_server", server)
+    manager = AttendanceConnectionManager(session_factory=session_factory)
+    manager.server = server
+
+    teacher, student = FakeWebSocket(), FakeWebSocket()
+    for websocket, name in ((teacher, "owner"), (student, "enrolled")):
+        token = create_access_token({"sub": str(user_ids[name])})
+        assert await manager.connect(websocket, class_session_id, token) is not None
+    await asyncio.sleep(0.01)
+    teacher.frames.clear()
+    student.frames.clear()
+
+    async with session_factory() as db:
+        classmate = await db.get(User, user_ids["outsider"])
+        owner = await db.get(User, user_ids["owner"])
+        await student_join_class("123456", _request("/api/v1/classes/join/123456"), db, classmate)
+        await teacher_override_attendance(
+            class_session_id,
+            TeacherOverrideRequest(student_id=user_ids["recorded"], new_status=AttendanceStatus.EXCUSED, reason="Doctor"),
+            _request(f"/api/v1/attendance/override/{class_session_id}"),
+            db,
+            owner
+        )
+    await asyncio.sleep(0.01)
+
+    assert {frame["type"] for frame in teacher.frames} >= {"student_joined", "attendance_update"}
+    assert student.frames == []
+    await server.shutdown()
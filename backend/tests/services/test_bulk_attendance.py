@@ -0,0 +1,125 @@
+"""
+Tests for AttendanceEngine.bulk_update_attendance.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+
+from app.models.user import User, UserRole
+from app.models.class_session import Class, ClassSession, StudentEnrollment
+from app.models.attendance import AttendanceRecord, AttendanceStatus, AttendanceAuditLog
+from app.schemas.attendance import BulkAttendanceOperation
+from app.services.attendance_engine import AttendanceEngine
+from app.services.live_counters import live_session_counters
+
+
+@pytest_asyncio.fixture
+async def class_session(db):
+    """A session with four enrolled students, the first two of them checked in."""
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    students = [
+        User(
+            email=f"student{i}@example.com", username=f"student{i}", full_name=f"Student {i}",
+            hashed_password="x", role=UserRole.STUDENT
+        )
+        for i in range(4)
+    ]
+    db.add(teacher)
+    db.add_all(students)
+    await db.flush()
+
+    class_ = Class(name="Chemistry", teacher_id=teacher.id)
+    db.add(class_)
+    await db.flush()
+    db.add_all([
+        StudentEnrollment(student_id=student.id, class_id=class_.id, is_active=True)
+        for student in students
+    ])
+
+    session = ClassSession(
+        name="Chemistry", class_id=class_.id, teacher_id=teacher.id,
+        jwt_token="token", verification_code="246810"
+    )
+    db.add(session)
+    await db.flush()
+    db.add_all([
+        AttendanceRecord(
+            student_id=student.id, class_session_id=session.id,
+            status=AttendanceStatus.PRESENT, verification_method="qr_code"
+        )
+        for student in students[:2]
+    ])
+    await db.commit()
+    live_session_counters.clear()
+    return session, [student.id for student in students]
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_overrides_and_creates_records(db, class_session):
+    session, student_ids = class_session
+
+    result = await AttendanceEngine(db).bulk_update_attendance(
+        session.id, BulkAttendanceOperation.MARK_EXCUSED, None, session.teacher_id, "Field trip"
+    )
+    await db.commit()
+
+    assert result == {"processed_count": 4, "failed_count": 0, "failed_students": []}
+    records = (await db.execute(select(AttendanceRecord).order_by(AttendanceRecord.student_id))).scalars().all()
+    assert [record.student_id for record in records] == student_ids
+    assert all(record.status == AttendanceStatus.EXCUSED for record in records)
+    assert all(record.override_reason == "Field trip" for record in records)
+
+    audits = (await db.execute(select(AttendanceAuditLog).order_by(AttendanceAuditLog.attendance_record_id))).scalars().all()
+    assert [audit.old_status for audit in audits] == [AttendanceStatus.PRESENT] * 2 + [None] * 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_reports_unknown_students(db, class_session):
+    """Unknown student ids are reported per student instead of aborting the batch."""
+    session, student_ids = class_session
+
+    result = await AttendanceEngine(db).bulk_update_attendance(
+        session.id, BulkAttendanceOperation.MARK_ABSENT, student_ids + [99999], session.teacher_id, "Fire drill"
+    )
+
+    assert result["processed_count"] == 4
+    assert result["failed_count"] == 1
+    assert result["failed_students"] == [{"student_id": 99999, "error": "Student not found"}]
+
+
+@pytest.mark.asyncio
+async def test_check_in_between_read_and_write_does_not_fail_the_batch(db, db_engine, class_session):
+    session, student_ids = class_session
+    late_student = student_ids[3]
+    await live_session_counters.get(session.id, db)
+    checked_in = []
+
+    def check_in_first(conn, cursor, statement, parameters, context, executemany):
+        # Another request's check-in commits just before the bulk write
+        if statement.startswith("INSERT INTO attendance_records") and not checked_in:
+            checked_in.append(late_student)
+            cursor.execute(
+                "INSERT INTO attendance_records (student_id, class_session_id, status, version) "
+                "VALUES (?, ?, 'PRESENT', 1)",
+                (late_student, session.id)
+            )
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", check_in_first)
+    result = await AttendanceEngine(db).bulk_update_attendance(
+        session.id, BulkAttendanceOperation.MARK_EXCUSED, None, session.teacher_id, "Field trip"
+    )
+    await db.commit()
+    event.remove(db_engine.sync_engine, "before_cursor_execute", check_in_first)
+
+    assert checked_in
+    assert result["processed_count"] == 4
+    record = (await db.execute(
+        select(AttendanceRecord).where(AttendanceRecord.student_id == late_student)
+    )).scalar_one()
+    assert record.status == AttendanceStatus.EXCUSED
+    assert record.version == 2
+    # The previous status is unknown, so the live counters are rebuilt
+    assert live_session_counters.peek(session.id) is None
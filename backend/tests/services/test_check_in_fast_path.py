@@ -0,0 +1,206 @@
+"""
+Tests for the student check-in fast path: the active session cache and the
+single-statement check-in upsert in AttendanceEngine.
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import event, select, func
+
+from app.models.user import User, UserRole
+from app.models.class_session import Class, ClassSession, StudentEnrollment
+from app.models.attendance import AttendanceRecord, AttendanceStatus, AttendanceAuditLog
+from app.services.attendance_engine import AttendanceEngine
+from app.services.session_cache import ActiveSessionCache
+
+
+@pytest_asyncio.fixture
+async def class_session(db):
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    students = [
+        User(
+            email=f"student{i}@example.com", username=f"student{i}", full_name=f"Student {i}",
+            hashed_password="x", role=UserRole.STUDENT
+        )
+        for i in range(3)
+    ]
+    db.add(teacher)
+    db.add_all(students)
+    await db.flush()
+
+    class_ = Class(name="Biology", teacher_id=teacher.id)
+    db.add(class_)
+    await db.flush()
+    db.add(StudentEnrollment(student_id=students[0].id, class_id=class_.id, is_active=True))
+
+    session = ClassSession(
+        name="Biology", class_id=class_.id, teacher_id=teacher.id,
+        jwt_token="token", verification_code="654321",
+        start_time=datetime.utcnow() - timedelta(minutes=2)
+    )
+    db.add(session)
+    await db.commit()
+    return session
+
+
+def _count_statements(db_engine):
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", on_execute)
+    return statements, lambda: event.remove(db_engine.sync_engine, "before_cursor_execute", on_execute)
+
+
+class TestRecordCheckIn:
+    """Test the single-statement check-in upsert."""
+
+    @pytest.mark.asyncio
+    async def test_first_check_in_is_recorded(self, db, class_session):
+        student_id = 2
+        record, recorded = await AttendanceEngine(db).record_check_in(
+            class_session, student_id, "qr_code", "Student self-check-in via QR code"
+        )
+        await db.commit()
+
+        assert recorded
+        assert record.status == AttendanceStatus.PRESENT
+        assert record.version == 1
+
+        audit = (await db.execute(select(AttendanceAuditLog))).scalar_one()
+        assert audit.action == "create"
+        assert audit.attendance_record_id == record.id
+
+    @pytest.mark.asyncio
+    async def test_duplicate_scan_costs_one_statement(self, db, db_engine, class_session):
+        engine = AttendanceEngine(db)
+        first, _ = await engine.record_check_in(class_session, 2, "qr_code", "scan")
+        await db.commit()
+
+        statements, stop = _count_statements(db_engine)
+        second, recorded = await engine.record_check_in(class_session, 2, "qr_code", "scan")
+        stop()
+        await db.commit()
+
+        assert not recorded
+        assert second.id == first.id
+        assert second.check_in_time == first.check_in_time
+        assert len(statements) == 1
+
+        count = await db.scalar(select(func.count(AttendanceRecord.id)))
+        assert count == 1
+
+    @pytest.mark.asyncio
+    async def test_fills_pre_marked_absent_record(self, db, class_session):
+        db.add(AttendanceRecord(
+            student_id=3, class_session_id=class_session.id,
+            status=AttendanceStatus.ABSENT, verification_method="teacher_override"
+        ))
+        await db.commit()
+
+        record, recorded = await AttendanceEngine(db).record_check_in(
+            class_session, 3, "verification_code", "scan"
+        )
+        await db.commit()
+
+        assert recorded
+        assert record.status == AttendanceStatus.PRESENT
+        assert record.check_in_time is not None
+        assert record.version == 2
+
+        # Picked up by the analytics rollup refresh
+        updated_at = await db.scalar(select(AttendanceRecord.updated_at).where(AttendanceRecord.id == record.id))
+        assert updated_at is not None
+
+        audit = (await db.execute(select(AttendanceAuditLog))).scalar_one()
+        assert audit.action == "update_status"
+
+    @pytest.mark.asyncio
+    async def test_ensure_enrollment_is_idempotent(self, db, class_session):
+        engine = AttendanceEngine(db)
+        await engine.ensure_enrollment(2, class_session.class_id)
+        await engine.ensure_enrollment(2, class_session.class_id)
+        await db.commit()
+
+        count = await db.scalar(
+            select(func.count(StudentEnrollment.id)).where(StudentEnrollment.student_id == 2)
+        )
+        assert count == 1
+
+
+class TestActiveSessionCache:
+    """Test the in-process active session cache."""
+
+    @pytest.mark.asyncio
+    async def test_hits_skip_the_database(self, db, db_engine, class_session):
+        cache = ActiveSessionCache(ttl_seconds=60)
+        cached = await cache.get(db, class_session.id)
+        assert cached.verification_code == "654321"
+        assert cached.enrolled_student_ids == {2}
+
+        statements, stop = _count_statements(db_engine)
+        assert (await cache.get(db, class_session.id)) is cached
+        assert (await cache.get_by_code(db, "654321")) is cached
+        stop()
+
+        assert statements == []
+        assert cache.get_stats()["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate_drops_ended_session(self, db, class_session):
+        cache = ActiveSessionCache(ttl_seconds=60)
+        await cache.get_by_code(db, "654321")
+
+        class_session.status = "ended"
+        await db.commit()
+        cache.invalidate(class_session.id)
+
+        assert await cache.get_by_code(db, "654321") is None
+        assert await cache.get(db, class_session.id) is None
+
+    @pytest.mark.asyncio
+    async def test_regenerated_code_no_longer_resolves(self, db, class_session):
+        cache = ActiveSessionCache(ttl_seconds=60)
+        await cache.get(db, class_session.id)
+
+        class_session.verification_code = "111111"
+        await db.commit()
+        cache.invalidate(class_session.id)
+
+        assert await cache.get_by_code(db, "654321") is None
+        assert (await cache.get_by_code(db, "111111")).id == class_session.id
+
+    @pytest.mark.asyncio
+    async def test_entries_expire_after_ttl(self, db, class_session):
+        cache = ActiveSessionCache(ttl_seconds=0)
+        await cache.get(db, class_session.id)
+        await cache.get(db, class_session.id)
+
+        assert cache.get_stats()["misses"] == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_load_does_not_strand_waiters(self, db, class_session):
+        cache = ActiveSessionCache(ttl_seconds=60)
+        fetch, started = cache._fetch, asyncio.Event()
+
+        async def slow_fetch(db, criteria):
+            started.set()
+            await asyncio.sleep(0.05)
+            return await fetch(db, criteria)
+
+        cache._fetch = slow_fetch
+        first = asyncio.create_task(cache.get(db, class_session.id))
+        await started.wait()
+        second = asyncio.create_task(cache.get(db, class_session.id))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert (await asyncio.wait_for(second, 1)).id == class_session.id
+        assert cache.get_stats()["misses"] == 2
+
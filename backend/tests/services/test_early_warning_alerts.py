@@ -0,0 +1,133 @@
+"""
+Tests for batched early warning alert generation in AdvancedPatternDetector.
+"""
+import random
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert, select, func
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import Base
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.models.attendance_pattern import AttendanceAlert as AttendanceAlertRecord, AlertSeverity
+from app.services.pattern_detection import AdvancedPatternDetector
+
+
+@pytest_asyncio.fixture
+async def db_engine(tmp_path):
+    # A file database so that concurrent chunks can use sessions of their own
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'alerts.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+async def _seed(db, student_count: int = 40):
+    """Students with attendance ranging from perfect to mostly absent."""
+    rng = random.Random(3)
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    db.add(teacher)
+    await db.flush()
+    await db.execute(insert(User), [
+        {
+            "email": f"student{i}@example.com", "username": f"student{i}",
+            "full_name": f"Student {i}", "hashed_password": "x", "role": UserRole.STUDENT
+        }
+        for i in range(student_count)
+    ])
+
+    now = datetime.utcnow()
+    sessions = [
+        ClassSession(
+            name="Homeroom", teacher_id=teacher.id, jwt_token="token",
+            verification_code="123456", start_time=now - timedelta(days=day, hours=1), status="ended"
+        )
+        for day in range(1, 16)
+    ]
+    db.add_all(sessions)
+    await db.flush()
+
+    records = []
+    for i in range(student_count):
+        absence_rate = [0.0, 0.3, 0.6, 0.9][i % 4]
+        for session in sessions:
+            records.append({
+                "student_id": teacher.id + 1 + i, "class_session_id": session.id,
+                "status": AttendanceStatus.ABSENT if rng.random() < absence_rate else AttendanceStatus.PRESENT,
+                "verification_method": "qr_code"
+            })
+    await db.execute(insert(AttendanceRecord), records)
+    await db.commit()
+
+
+def _comparable(alerts):
+    return [(a.student_id, a.severity, a.student_name, a.message, a.data) for a in alerts]
+
+
+@pytest.mark.asyncio
+async def test_batched_alerts_match_per_student_analysis(db):
+    await _seed(db)
+    detector = AdvancedPatternDetector(db)
+
+    batched = await detector.generate_early_warning_alerts(chunk_size=7)
+
+    expected = []
+    for student_id in await detector._get_active_students():
+        expected.extend(await detector._generate_student_alerts(student_id, "medium"))
+    expected.sort(key=lambda x: ({"high": 3, "medium": 2, "low": 1}[x.severity], x.data["confidence"]), reverse=True)
+
+    assert batched, "seed data should produce alerts"
+    assert _comparable(batched) == _comparable(expected)
+
+
+@pytest.mark.asyncio
+async def test_history_is_loaded_and_persisted_once_per_chunk(db, db_engine):
+    await _seed(db)
+    detector = AdvancedPatternDetector(db)
+
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", on_execute)
+    alerts = await detector.generate_early_warning_alerts(chunk_size=10, persist=True)
+    event.remove(db_engine.sync_engine, "before_cursor_execute", on_execute)
+
+    # One student listing, then a history query and an insert for each of 4 chunks
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT INTO ATTENDANCE_ALERTS")]
+    assert len(selects) == 5
+    assert len(inserts) == 4
+
+    stored = (await db.execute(select(AttendanceAlertRecord))).scalars().all()
+    assert len(stored) == len(alerts)
+    assert {row.student_id for row in stored} == {alert.student_id for alert in alerts}
+    assert all(row.severity in (AlertSeverity.MEDIUM, AlertSeverity.HIGH) for row in stored)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_chunks_report_progress(db, session_factory):
+    await _seed(db)
+    detector = AdvancedPatternDetector(db)
+    snapshots = []
+
+    async def on_progress(progress):
+        snapshots.append((progress.chunks_completed, progress.processed_students, progress.alerts_persisted))
+
+    alerts = await detector.generate_early_warning_alerts(
+        chunk_size=6, concurrency=3, persist=True,
+        session_factory=session_factory, progress_callback=on_progress
+    )
+
+    assert [chunks for chunks, _, _ in snapshots] == list(range(1, 8))
+    assert snapshots[-1][1] == 40
+    assert snapshots[-1][2] == len(alerts)
+    assert await db.scalar(select(func.count(AttendanceAlertRecord.id))) == len(alerts)
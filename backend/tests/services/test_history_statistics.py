@@ -0,0 +1,148 @@
+"""
+Tests for the single-pass attendance history statistics and the pattern
+detection helpers built on them.
+"""
+import random
+import statistics
+import pytest
+from collections import defaultdict
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.models.attendance import AttendanceStatus
+from app.services.history_statistics import (
+    history_rows, compute_history_statistics, compute_history_statistics_batch, week_key, STATUS_SCORES
+)
+from app.services.pattern_detection import AdvancedPatternDetector
+from app.services.analytics_cache import AnalyticsResultCache
+
+
+def _history(size: int, seed: int = 5):
+    """(record, session, user) stand-ins over several weeks, oldest first."""
+    rng = random.Random(seed)
+    statuses = list(AttendanceStatus)
+    start = datetime(2024, 12, 16, 8)
+    history = []
+    for i in range(size):
+        session = SimpleNamespace(start_time=start + timedelta(days=i // 3, hours=2 * (i % 3)))
+        status = rng.choices(statuses, weights=[5, 2, 2, 1])[0]
+        late = status == AttendanceStatus.LATE
+        record = SimpleNamespace(
+            status=status,
+            late_minutes=rng.randint(1, 30) if late else None,
+            is_late=late,
+            check_in_time=(
+                None if status == AttendanceStatus.ABSENT
+                else session.start_time + timedelta(minutes=rng.randint(0, 20))
+            ),
+            grace_period_used=rng.random() < 0.2,
+            is_manual_override=rng.random() < 0.15
+        )
+        history.append((record, session, None))
+    return history
+
+
+def _max_run(statuses, target):
+    longest = current = 0
+    for status in statuses:
+        current = current + 1 if status == target else 0
+        longest = max(longest, current)
+    return longest
+
+
+def test_week_key_matches_strftime():
+    day = datetime(2019, 12, 20, 10)
+    for offset in range(5 * 366):
+        moment = day + timedelta(days=offset)
+        year, week = week_key(moment)
+        assert f"{year}-{week:02d}" == moment.strftime("%Y-%W")
+
+
+def test_kernel_matches_per_helper_scans():
+    history = _history(200)
+    stats = compute_history_statistics(history_rows(history))
+    statuses = [record.status for record, _, _ in history]
+
+    assert stats.total == 200
+    assert stats.status_counts == {status: statuses.count(status) for status in AttendanceStatus}
+    for status in AttendanceStatus:
+        assert stats.max_streaks[status] == _max_run(statuses, status)
+    assert stats.status_changes == sum(1 for a, b in zip(statuses, statuses[1:]) if a != b)
+
+    late_minutes = [record.late_minutes for record, _, _ in history if record.late_minutes]
+    assert stats.late_minutes.count == len(late_minutes)
+    assert stats.late_minutes.mean == pytest.approx(statistics.mean(late_minutes))
+    assert stats.late_minutes.stdev == pytest.approx(statistics.stdev(late_minutes))
+    assert stats.late_minutes.maximum == max(late_minutes)
+
+    weekly = defaultdict(list)
+    for record, session, _ in history:
+        weekly[session.start_time.strftime("%Y-%W")].append(STATUS_SCORES[record.status])
+    assert list(stats.weekly_scores.averages().values()) == pytest.approx(
+        [statistics.mean(scores) for scores in weekly.values()]
+    )
+
+    attended = [
+        (record, session) for record, session, _ in history
+        if record.check_in_time and record.status != AttendanceStatus.ABSENT
+    ]
+    delays = [(record.check_in_time - session.start_time).total_seconds() / 60 for record, session in attended]
+    assert stats.check_in_delays.mean == pytest.approx(statistics.mean(delays))
+    assert stats.check_in_delays.stdev == pytest.approx(statistics.stdev(delays))
+    assert stats.grace_period_uses == sum(1 for record, _ in attended if record.grace_period_used)
+    assert stats.late_arrivals == sum(1 for record, _ in attended if record.is_late)
+    assert stats.manual_overrides == sum(1 for record, _, _ in history if record.is_manual_override)
+
+
+def test_empty_history():
+    stats = compute_history_statistics([])
+    assert stats.total == 0
+    assert stats.late_minutes.mean == 0 and stats.late_minutes.stdev == 0
+    assert stats.late_minutes.maximum == 0
+
+
+def test_batch_matches_one_call_per_history():
+    histories = [history_rows(_history(size, seed)) for size, seed in [(40, 1), (0, 2), (75, 3)]]
+
+    assert compute_history_statistics_batch(histories) == [
+        compute_history_statistics(rows) for rows in histories
+    ]
+
+
+@pytest.mark.asyncio
+async def test_helpers_consume_kernel():
+    detector = AdvancedPatternDetector(None, result_cache=AnalyticsResultCache())
+    history = _history(60)
+    stats = compute_history_statistics(history_rows(history))
+    statuses = [record.status for record, _, _ in history]
+
+    basic = await detector._calculate_advanced_statistics(stats)
+    assert basic["total_sessions"] == 60
+    assert basic["status_distribution"]["absent"] == statuses.count(AttendanceStatus.ABSENT)
+    assert basic["consecutive_patterns"]["max_absences"] == _max_run(statuses, AttendanceStatus.ABSENT)
+
+    trend = await detector._analyze_attendance_trends(stats)
+    assert trend.period == "weekly"
+    assert len(trend.data_points) == len(stats.weekly_scores.counts)
+
+    seasonal = await detector._detect_seasonal_patterns(stats)
+    assert set(seasonal) == {"day_of_week", "time_of_day"}
+    assert seasonal["time_of_day"].best_periods[0] in {"08:00", "10:00", "12:00"}
+
+    behavior = await detector._analyze_behavioral_patterns(stats)
+    assert behavior["consistency_metrics"]["status_consistency_score"] == round(
+        1 - stats.status_changes / 59, 3
+    )
+
+    *_, risk = await detector._assess_history_risk(stats)
+    assert risk["risk_level"] in {"minimal", "low", "medium", "high"}
+
+
+@pytest.mark.asyncio
+async def test_short_history_skips_helpers():
+    detector = AdvancedPatternDetector(None, result_cache=AnalyticsResultCache())
+    stats = compute_history_statistics(history_rows(_history(4)))
+
+    assert (await detector._analyze_attendance_trends(stats)).period == "insufficient_data"
+    assert await detector._detect_seasonal_patterns(stats) == {}
+    assert await detector._analyze_behavioral_patterns(stats) == {}
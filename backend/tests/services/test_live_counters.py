@@ -0,0 +1,166 @@
+"""
+Tests for the in-memory live session counters and the AttendanceEngine
+deltas that keep them current.
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import event, update
+
+from app.models.user import User, UserRole
+from app.models.class_session import Class, ClassSession, StudentEnrollment
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.schemas.attendance import BulkAttendanceOperation
+from app.services.attendance_engine import AttendanceEngine
+from app.services.live_counters import live_session_counters
+
+
+@pytest.fixture(autouse=True)
+def clear_counters():
+    yield
+    live_session_counters.clear()
+
+
+@pytest_asyncio.fixture
+async def class_session(db):
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    students = [
+        User(
+            email=f"student{i}@example.com", username=f"student{i}", full_name=f"Student {i}",
+            hashed_password="x", role=UserRole.STUDENT
+        )
+        for i in range(4)
+    ]
+    db.add(teacher)
+    db.add_all(students)
+    await db.flush()
+
+    class_ = Class(name="History", teacher_id=teacher.id)
+    db.add(class_)
+    await db.flush()
+    db.add_all([
+        StudentEnrollment(student_id=student.id, class_id=class_.id, is_active=True)
+        for student in students
+    ])
+
+    session = ClassSession(
+        name="History", class_id=class_.id, teacher_id=teacher.id,
+        jwt_token="token", verification_code="222222",
+        start_time=datetime.utcnow() - timedelta(minutes=1)
+    )
+    db.add(session)
+    await db.flush()
+    db.add(AttendanceRecord(
+        student_id=students[0].id, class_session_id=session.id,
+        status=AttendanceStatus.PRESENT, check_in_time=datetime.utcnow()
+    ))
+    await db.commit()
+    live_session_counters.clear()
+    return session
+
+
+@pytest.mark.asyncio
+async def test_seeded_once_then_served_from_memory(db, db_engine, class_session):
+    counts = await live_session_counters.get(class_session.id, db)
+    assert counts.total_enrolled == 4
+    assert counts.present_count == 1
+    assert counts.checked_in_count == 1
+
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", on_execute)
+    assert (await live_session_counters.get(class_session.id, db)) is counts
+    event.remove(db_engine.sync_engine, "before_cursor_execute", on_execute)
+
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_cancelled_seed_does_not_strand_concurrent_readers(db, class_session, monkeypatch):
+    seed, started = live_session_counters._seed, asyncio.Event()
+
+    async def slow_seed(db, class_session_id):
+        started.set()
+        await asyncio.sleep(0.05)
+        return await seed(db, class_session_id)
+
+    monkeypatch.setattr(live_session_counters, "_seed", slow_seed)
+    first = asyncio.create_task(live_session_counters.get(class_session.id, db))
+    await started.wait()
+    second = asyncio.create_task(live_session_counters.get(class_session.id, db))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    counts = await asyncio.wait_for(second, 1)
+    assert counts.present_count == 1
+    assert live_session_counters.peek(class_session.id) is counts
+
+
+@pytest.mark.asyncio
+async def test_check_in_delta_applies_on_commit(db, class_session):
+    counts = await live_session_counters.get(class_session.id, db)
+
+    await AttendanceEngine(db).record_check_in(class_session, 3, "qr_code", "scan")
+    assert counts.present_count == 1
+
+    await db.commit()
+    assert counts.present_count == 2
+    assert counts.checked_in_count == 2
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_delta_is_dropped(db, class_session):
+    counts = await live_session_counters.get(class_session.id, db)
+
+    await AttendanceEngine(db).record_check_in(class_session, 3, "qr_code", "scan")
+    await db.rollback()
+    await db.commit()
+
+    assert counts.present_count == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_operation_moves_counts(db, class_session):
+    counts = await live_session_counters.get(class_session.id, db)
+
+    await AttendanceEngine(db).bulk_update_attendance(
+        class_session.id, BulkAttendanceOperation.MARK_ABSENT, None,
+        class_session.teacher_id, "Trip"
+    )
+    await db.commit()
+
+    assert counts.present_count == 0
+    assert counts.absent_count == 4
+    assert counts.checked_in_count == 1
+    assert counts.to_stats().attendance_rate == 0.0
+
+
+@pytest.mark.asyncio
+async def test_reconcile_corrects_drift_and_drops_ended_sessions(db, class_session):
+    counts = await live_session_counters.get(class_session.id, db)
+
+    # A write that bypassed the engine, e.g. from another process
+    await db.execute(
+        update(AttendanceRecord)
+        .where(AttendanceRecord.class_session_id == class_session.id)
+        .values(status=AttendanceStatus.LATE)
+    )
+    await db.commit()
+
+    assert await live_session_counters.reconcile(db) == 1
+    assert counts.present_count == 0
+    assert counts.late_count == 1
+
+    class_session.status = "ended"
+    await db.commit()
+    await live_session_counters.reconcile(db)
+
+    assert live_session_counters.peek(class_session.id) is None
@@ -0,0 +1,105 @@
+"""
+Tests for whole-population anomaly detection in AdvancedPatternDetector.
+"""
+import random
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.services.pattern_detection import AdvancedPatternDetector
+from app.services.analytics_cache import AnalyticsResultCache
+
+
+async def _seed_history(db, student_count: int, days: int = 28, seed: int = 7):
+    """Students attending one session per weekday, with occasional absence streaks."""
+    rng = random.Random(seed)
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    db.add(teacher)
+    await db.flush()
+
+    await db.execute(insert(User), [
+        {
+            "email": f"student{i}@example.com", "username": f"student{i}",
+            "full_name": f"Student {i}", "hashed_password": "x", "role": UserRole.STUDENT
+        }
+        for i in range(student_count)
+    ])
+    student_ids = list(range(teacher.id + 1, teacher.id + 1 + student_count))
+
+    now = datetime.utcnow()
+    sessions = []
+    for day in range(days):
+        start_time = now - timedelta(days=day, hours=1)
+        if start_time.weekday() < 5:
+            sessions.append(ClassSession(
+                name="Homeroom", teacher_id=teacher.id, jwt_token="token",
+                verification_code="123456", start_time=start_time, status="ended"
+            ))
+    db.add_all(sessions)
+    await db.flush()
+
+    records = []
+    for student_id in student_ids:
+        absence_rate = rng.choice([0.05, 0.1, 0.2])
+        bad_week = rng.choice([None, None, sessions[0].start_time.strftime("%Y-%W")])
+        for session in sessions:
+            spike = session.start_time.strftime("%Y-%W") == bad_week
+            absent = rng.random() < (0.8 if spike else absence_rate)
+            records.append({
+                "student_id": student_id, "class_session_id": session.id,
+                "status": AttendanceStatus.ABSENT if absent else AttendanceStatus.PRESENT,
+                "verification_method": "qr_code"
+            })
+    await db.execute(insert(AttendanceRecord), records)
+    await db.commit()
+    return student_ids
+
+
+async def _per_student(detector, period_days: int = 30):
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=period_days)
+    anomalies = []
+    for student_id in sorted(await detector._get_active_students(start_date)):
+        anomalies.extend(await detector._detect_student_anomalies(student_id, start_date, end_date))
+    return anomalies
+
+
+def _comparable(anomalies):
+    return [(a["student_id"], a["period"], a["description"]) for a in anomalies]
+
+
+@pytest.mark.asyncio
+async def test_population_mode_matches_per_student_loop(db):
+    await _seed_history(db, 60)
+    detector = AdvancedPatternDetector(db, AnalyticsResultCache())
+
+    population = await detector.detect_attendance_anomalies()
+    expected = await _per_student(detector)
+
+    assert expected, "seed data should contain absence spikes"
+    assert _comparable(population) == _comparable(expected)
+
+
+@pytest.mark.asyncio
+async def test_population_mode_skips_students_with_few_records(db):
+    await _seed_history(db, 3, days=3)
+    detector = AdvancedPatternDetector(db, AnalyticsResultCache())
+
+    assert await detector.detect_attendance_anomalies() == []
+
+
+@pytest.mark.asyncio
+async def test_single_student_mode_is_unchanged(db):
+    student_ids = await _seed_history(db, 20)
+    detector = AdvancedPatternDetector(db, AnalyticsResultCache())
+
+    population = await detector.detect_attendance_anomalies()
+    for student_id in student_ids:
+        single = await detector.detect_attendance_anomalies(student_id=student_id)
+        assert _comparable(single) == [a for a in _comparable(population) if a[0] == student_id]
@@ -0,0 +1,245 @@
+"""
+Tests for the materialized student attendance timeline and the student
+endpoints that read it.
+"""
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from fastapi import Response
+from sqlalchemy import event, select, func
+
+from app.api.v1 import attendance as attendance_api
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.models.student_timeline import StudentTimelineEntry
+from app.schemas.attendance import BulkAttendanceOperation
+from app.services.attendance_engine import AttendanceEngine
+from app.services.student_timeline import update_session_timeline, rebuild_student_timeline
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+
+@pytest_asyncio.fixture
+async def school(db):
+    """A teacher, an assistant who overrides, two students and three sessions."""
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Ms Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    assistant = User(
+        email="assistant@example.com", username="assistant", full_name="Mr Assistant",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    students = [
+        User(
+            email=f"student{i}@example.com", username=f"student{i}", full_name=f"Student {i}",
+            hashed_password="x", role=UserRole.STUDENT
+        )
+        for i in range(2)
+    ]
+    db.add_all([teacher, assistant, *students])
+    await db.flush()
+
+    now = datetime.utcnow()
+    sessions = [
+        ClassSession(
+            name=f"Lesson {n}", subject="Math", location="Room 1", teacher_id=teacher.id,
+            jwt_token="token", verification_code=f"{n:06d}",
+            start_time=now - timedelta(minutes=5 + n), status="active",
+            created_at=now - timedelta(days=3 - n)
+        )
+        for n in range(3)
+    ]
+    db.add_all(sessions)
+    await db.commit()
+    return teacher, assistant, students, sessions
+
+
+async def _entries(db, student_id):
+    result = await db.execute(
+        select(StudentTimelineEntry)
+        .where(StudentTimelineEntry.student_id == student_id)
+        .order_by(StudentTimelineEntry.id)
+    )
+    return result.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_check_in_and_override_update_the_timeline(db, school):
+    teacher, assistant, students, sessions = school
+    engine = AttendanceEngine(db)
+
+    record, recorded = await engine.record_check_in(sessions[0], students[0].id, "qr_code", "scan")
+    await db.commit()
+    assert recorded
+
+    [entry] = await _entries(db, students[0].id)
+    assert entry.id == record.id
+    assert entry.class_name == "Lesson 0"
+    assert entry.teacher_name == "Ms Teacher"
+    assert entry.session_status == "active"
+    assert entry.status == AttendanceStatus.PRESENT
+    assert entry.check_in_time is not None
+    assert not entry.is_manual_override
+
+    attendance = await db.get(AttendanceRecord, record.id)
+    await engine.update_attendance_status(
+        attendance, AttendanceStatus.EXCUSED, assistant.id, "Doctor's note"
+    )
+    await db.commit()
+
+    db.expunge_all()
+    [entry] = await _entries(db, students[0].id)
+    assert entry.status == AttendanceStatus.EXCUSED
+    assert entry.is_manual_override
+    assert entry.override_reason == "Doctor's note"
+    assert entry.override_teacher_name == "Mr Assistant"
+
+
+@pytest.mark.asyncio
+async def test_blank_teacher_names_fall_back_to_the_username(db, school):
+    teacher, assistant, students, sessions = school
+    teacher.full_name = ""
+    assistant.full_name = ""
+    await db.flush()
+
+    engine = AttendanceEngine(db)
+    record, _ = await engine.record_check_in(sessions[0], students[0].id, "qr_code", "scan")
+    attendance = await db.get(AttendanceRecord, record.id)
+    await engine.update_attendance_status(attendance, AttendanceStatus.EXCUSED, assistant.id, "Note")
+    await db.commit()
+
+    db.expunge_all()
+    [entry] = await _entries(db, students[0].id)
+    assert entry.teacher_name == "teacher"
+    assert entry.override_teacher_name == "assistant"
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_and_session_changes_refresh_entries(db, school):
+    teacher, _, students, sessions = school
+    engine = AttendanceEngine(db)
+
+    await engine.bulk_update_attendance(
+        sessions[1].id, BulkAttendanceOperation.MARK_ABSENT,
+        [student.id for student in students], teacher.id, "Field trip"
+    )
+    await db.commit()
+
+    for student in students:
+        [entry] = await _entries(db, student.id)
+        assert entry.status == AttendanceStatus.ABSENT
+        assert entry.override_teacher_name == "Ms Teacher"
+
+    sessions[1].status = "ended"
+    sessions[1].verification_code = "999999"
+    await update_session_timeline(db, sessions[1])
+    await db.commit()
+
+    db.expunge_all()
+    statuses = await db.scalars(
+        select(StudentTimelineEntry.session_status)
+        .where(StudentTimelineEntry.class_session_id == sessions[1].id)
+    )
+    assert set(statuses) == {"ended"}
+
+
+@pytest.mark.asyncio
+async def test_check_in_upserts_only_its_own_entry(db, db_engine, school):
+    _, _, students, sessions = school
+    engine = AttendanceEngine(db)
+    await engine.record_check_in(sessions[0], students[1].id, "qr_code", "scan")
+    await db.commit()
+
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", on_execute)
+    await engine.record_check_in(sessions[0], students[0].id, "qr_code", "scan")
+    event.remove(db_engine.sync_engine, "before_cursor_execute", on_execute)
+    await db.commit()
+
+    timeline_statements = [s for s in statements if "student_attendance_timeline" in s]
+    assert len(timeline_statements) == 1
+    assert timeline_statements[0].startswith("INSERT")
+    assert not any(s.startswith("DELETE") for s in statements)
+    assert len(await _entries(db, students[0].id)) == 1
+    assert len(await _entries(db, students[1].id)) == 1
+
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_incremental_entries(db, school):
+    teacher, _, students, sessions = school
+    engine = AttendanceEngine(db)
+    for class_session in sessions:
+        await engine.record_check_in(class_session, students[0].id, "qr_code", "scan")
+    await engine.bulk_update_attendance(
+        sessions[2].id, BulkAttendanceOperation.MARK_LATE, [students[1].id], teacher.id, "Bus"
+    )
+    await db.commit()
+
+    columns = [getattr(StudentTimelineEntry, name) for name in ("id", "status", "teacher_name", "session_status")]
+    incremental = (await db.execute(select(*columns).order_by(StudentTimelineEntry.id))).all()
+
+    assert await rebuild_student_timeline(db) == 4
+    await db.commit()
+    rebuilt = (await db.execute(select(*columns).order_by(StudentTimelineEntry.id))).all()
+
+    assert rebuilt == incremental
+
+
+@pytest.mark.asyncio
+async def test_my_attendance_pages_with_a_cursor(db, school):
+    _, _, students, sessions = school
+    engine = AttendanceEngine(db)
+    for class_session in sessions:
+        await engine.record_check_in(class_session, students[0].id, "qr_code", "scan")
+    await db.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        response = Response()
+        page = await attendance_api.get_my_attendance(
+            response, db=db, current_user=students[0], limit=2, offset=0, cursor=cursor
+        )
+        seen.extend(item.id for item in page)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    record_ids = await db.scalars(select(AttendanceRecord.id).where(AttendanceRecord.student_id == students[0].id))
+    assert sorted(seen) == sorted(record_ids)
+    assert len(seen) == len(set(seen)) == 3
+
+
+@pytest.mark.asyncio
+async def test_my_classes_and_active_sessions_read_the_timeline(db, school):
+    teacher, _, students, sessions = school
+    engine = AttendanceEngine(db)
+    await engine.record_check_in(sessions[0], students[0].id, "qr_code", "scan")
+    # Pre-marked absent by the teacher: enrolled but not checked in
+    await engine.bulk_update_attendance(
+        sessions[2].id, BulkAttendanceOperation.MARK_ABSENT, [students[0].id], teacher.id, "Roll call"
+    )
+    await db.commit()
+
+    response = Response()
+    classes = await attendance_api.get_my_enrolled_classes(
+        response, db=db, current_user=students[0], status_filter=None, limit=10, offset=0, cursor=None
+    )
+    # Newest sessions first
+    assert [item["id"] for item in classes] == [sessions[2].id, sessions[0].id]
+    assert classes[0]["requires_checkin"]
+    assert not classes[1]["requires_checkin"]
+    assert classes[0]["verification_code"] == "000002"
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+    active = await attendance_api.get_active_sessions_for_student(db=db, current_user=students[0])
+    assert [item["id"] for item in active] == [sessions[2].id]
+    assert active[0]["teacher_name"] == "Ms Teacher"
+
+    count = await db.scalar(select(func.count()).select_from(StudentTimelineEntry))
+    assert count == 2
@@ -0,0 +1,181 @@
+"""
+Tests for the admin system stats snapshot: the single aggregate query and
+the write-driven deltas that keep it current.
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.services.attendance_engine import AttendanceEngine
+from app.services.system_stats import SystemStatsSnapshot, system_stats_snapshot
+
+
+@pytest_asyncio.fixture
+async def seeded(db):
+    """One admin, one teacher, three students, two sessions (one active), four records."""
+    teacher = User(
+        email="teacher@example.com", username="teacher", full_name="Teacher",
+        hashed_password="x", role=UserRole.TEACHER
+    )
+    admin = User(
+        email="admin@example.com", username="admin", full_name="Admin",
+        hashed_password="x", role=UserRole.ADMIN
+    )
+    students = [
+        User(
+            email=f"student{i}@example.com", username=f"student{i}", full_name=f"Student {i}",
+            hashed_password="x", role=UserRole.STUDENT
+        )
+        for i in range(3)
+    ]
+    db.add_all([teacher, admin, *students])
+    await db.flush()
+
+    sessions = [
+        ClassSession(
+            name=f"Lesson {n}", teacher_id=teacher.id, jwt_token="token",
+            verification_code=f"{n:06d}", status=status,
+            start_time=datetime.utcnow() - timedelta(minutes=5)
+        )
+        for n, status in enumerate(["active", "ended"])
+    ]
+    db.add_all(sessions)
+    await db.flush()
+
+    db.add_all([
+        AttendanceRecord(student_id=students[0].id, class_session_id=sessions[1].id, status=AttendanceStatus.PRESENT),
+        AttendanceRecord(student_id=students[1].id, class_session_id=sessions[1].id, status=AttendanceStatus.PRESENT),
+        AttendanceRecord(student_id=students[2].id, class_session_id=sessions[1].id, status=AttendanceStatus.ABSENT),
+        AttendanceRecord(student_id=students[0].id, class_session_id=sessions[0].id, status=AttendanceStatus.LATE),
+    ])
+    await db.commit()
+    return teacher, students, sessions
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    """A fresh snapshot installed as the one the write hooks update."""
+    fresh = SystemStatsSnapshot(max_age_seconds=300)
+    monkeypatch.setattr("app.services.system_stats.system_stats_snapshot", fresh)
+    monkeypatch.setattr("app.services.live_counters.system_stats_snapshot", fresh)
+    return fresh
+
+
+def _count_statements(db_engine):
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", on_execute)
+    return statements, lambda: event.remove(db_engine.sync_engine, "before_cursor_execute", on_execute)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_built_by_one_query_and_then_served_from_memory(db, db_engine, seeded, snapshot):
+    statements, stop = _count_statements(db_engine)
+    stats = await snapshot.get(db)
+    again = await snapshot.get(db)
+    stop()
+
+    assert len(statements) == 1
+    assert again is stats
+    assert stats.to_dict() == {
+        "total_users": 5,
+        "total_teachers": 1,
+        "total_students": 3,
+        "active_classes": 1,
+        "total_attendance_records": 4,
+        "attendance_rate": 50.0
+    }
+    assert snapshot.get_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_committed_user_and_session_changes_apply_deltas(db, seeded, snapshot):
+    teacher, _, sessions = seeded
+    await snapshot.get(db)
+
+    db.add(User(
+        email="new@example.com", username="new", full_name="New",
+        hashed_password="x", role=UserRole.STUDENT
+    ))
+    sessions[0].status = "ended"
+    await db.commit()
+
+    stats = await snapshot.get(db)
+    assert stats.total_users == 6
+    assert stats.total_students == 4
+    assert stats.active_classes == 0
+
+    teacher.role = UserRole.STUDENT
+    await db.flush()
+    await db.rollback()
+
+    assert (await snapshot.get(db)).total_teachers == 1
+
+
+@pytest.mark.asyncio
+async def test_engine_writes_update_attendance_counts(db, seeded, snapshot):
+    teacher, students, sessions = seeded
+    await snapshot.get(db)
+
+    await AttendanceEngine(db).record_check_in(sessions[0], students[1].id, "qr_code", "scan")
+    await db.commit()
+
+    stats = await snapshot.get(db)
+    assert stats.total_attendance_records == 5
+    assert stats.present_count == 3
+    assert stats.attendance_rate == 60.0
+
+
+@pytest.mark.asyncio
+async def test_check_in_over_an_existing_record_rebuilds_the_snapshot(db, seeded, snapshot):
+    teacher, students, sessions = seeded
+    # Pre-marked absent by the teacher; the check-in's upsert does not return the old status
+    db.add(AttendanceRecord(student_id=students[2].id, class_session_id=sessions[0].id, status=AttendanceStatus.ABSENT))
+    await db.commit()
+    await snapshot.get(db)
+
+    await AttendanceEngine(db).record_check_in(sessions[0], students[2].id, "qr_code", "scan")
+    await db.commit()
+
+    stats = await snapshot.get(db)
+    assert stats.total_attendance_records == 5
+    assert stats.present_count == 3
+    assert snapshot.get_stats()["refreshes"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_rebuild_does_not_strand_readers(db, seeded, snapshot, monkeypatch):
+    refresh, started = snapshot.refresh, asyncio.Event()
+
+    async def slow_refresh(db):
+        started.set()
+        await asyncio.sleep(0.05)
+        return await refresh(db)
+
+    monkeypatch.setattr(snapshot, "refresh", slow_refresh)
+    first = asyncio.create_task(snapshot.get(db))
+    await started.wait()
+    second = asyncio.create_task(snapshot.get(db))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert (await asyncio.wait_for(second, 1)).total_users == 5
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_is_rebuilt(db, seeded):
+    snapshot = SystemStatsSnapshot(max_age_seconds=0)
+    await snapshot.get(db)
+    await snapshot.get(db)
+
+    assert snapshot.get_stats()["refreshes"] == 2
+    assert system_stats_snapshot is not snapshot
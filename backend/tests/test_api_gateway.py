@@ -18,11 +18,11 @@ from app.services.api_gateway import (
 from app.core.circuit_breaker import CircuitBreaker, CircuitState
 from app.middleware.rate_limiting import RateLimiter, TokenBucket
 from app.gateway.router import GatewayRouter
-from app.gateway.request_queue import RequestQueue, RequestPriority
-from app.gateway.throttler import RequestThrottler, ThrottleConfig
+from app.gateway.request_queue import RequestQueue, RequestPriority, QueueStrategy
+from app.gateway.throttler import RequestThrottler, ThrottleConfig, RequestHistory
 from app.gateway.api_key_manager import APIKeyManager, APIKey, KeyType, KeyStatus
 from app.gateway.coordinator import GatewayCoordinator
-from app.gateway.monitoring import GatewayMonitor
+from app.gateway.monitoring import GatewayMonitor, MetricCollector, MetricSeries, MetricType
 
 
 class TestAPIGatewayService:
@@ -247,6 +247,14 @@ class TestRateLimiter:
         await asyncio.sleep(0.2)  # 0.2s should give 2 tokens at 10 tokens/sec
         assert await bucket.consume() is True
     
+    def test_token_bucket_wait_time(self):
+        """Test wait time estimate from the synchronous fast path."""
+        bucket = TokenBucket(rate=10.0, capacity=2)
+        
+        assert bucket.try_consume(2) is True
+        assert bucket.try_consume() is False
+        assert 0.0 < bucket.wait_time() <= 0.1
+    
     @pytest.mark.asyncio
     async def test_rate_limiter_allow_deny(self):
         """Test rate limiter allow/deny logic."""
@@ -476,6 +484,78 @@ class TestRequestQueue:
         assert 'max_size' in status
         assert 'queue_sizes' in status
         assert 'active_requests' in status
+    
+    @staticmethod
+    async def _drain_order(queue, backlog):
+        """Enqueue ``backlog`` (provider, count) pairs and return the providers in dequeue order."""
+        for provider, count in backlog:
+            for i in range(count):
+                await queue.enqueue(GatewayRequest(provider=provider, method=RequestMethod.GET, path=f"/{i}"))
+        
+        order = []
+        while (queued_request := await queue._get_next_request()) is not None:
+            order.append(queued_request.request.provider)
+        return order
+    
+    @pytest.mark.asyncio
+    async def test_round_robin_alternates_providers(self):
+        """Test that round robin gives every provider a turn despite a large backlog."""
+        queue = RequestQueue(strategy=QueueStrategy.ROUND_ROBIN)
+        
+        order = await self._drain_order(queue, [(ProviderType.POWERSCHOOL, 100), (ProviderType.SKYWARD, 3)])
+        
+        assert order[:6] == [ProviderType.POWERSCHOOL, ProviderType.SKYWARD] * 3
+        assert len(order) == 103
+    
+    @pytest.mark.asyncio
+    async def test_weighted_fair_shares_by_weight(self):
+        """Test that weighted fair queuing serves providers in proportion to their weights."""
+        queue = RequestQueue(
+            strategy=QueueStrategy.WEIGHTED_FAIR,
+            provider_weights={'powerschool': 3.0, 'skyward': 1.0, 'infinite_campus': 0.5}
+        )
+        
+        order = await self._drain_order(queue, [
+            (ProviderType.POWERSCHOOL, 60),
+            (ProviderType.SKYWARD, 60),
+            (ProviderType.INFINITE_CAMPUS, 60)
+        ])
+        
+        first = order[:45]
+        assert first.count(ProviderType.POWERSCHOOL) == 30
+        assert first.count(ProviderType.SKYWARD) == 10
+        assert first.count(ProviderType.INFINITE_CAMPUS) == 5
+        assert len(order) == 180
+    
+    @pytest.mark.asyncio
+    async def test_weighted_fair_priority_within_provider(self):
+        """Test that higher priority requests of a provider go first."""
+        queue = RequestQueue(strategy=QueueStrategy.WEIGHTED_FAIR)
+        for priority in (RequestPriority.LOW, RequestPriority.URGENT, RequestPriority.NORMAL):
+            await queue.enqueue(
+                GatewayRequest(provider=ProviderType.SKYWARD, method=RequestMethod.GET, path="/"),
+                priority=priority
+            )
+        
+        priorities = [(await queue._get_next_request()).priority for _ in range(3)]
+        assert priorities == [RequestPriority.URGENT, RequestPriority.NORMAL, RequestPriority.LOW]
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_provider_leaves_the_round(self):
+        """Test that a provider emptied by cancellation is skipped."""
+        queue = RequestQueue(strategy=QueueStrategy.WEIGHTED_FAIR)
+        request_id = await queue.enqueue(
+            GatewayRequest(provider=ProviderType.POWERSCHOOL, method=RequestMethod.GET, path="/")
+        )
+        await queue.enqueue(GatewayRequest(provider=ProviderType.SKYWARD, method=RequestMethod.GET, path="/"))
+        
+        assert await queue.cancel_request(request_id) is True
+        
+        assert (await queue._get_next_request()).request.provider == ProviderType.SKYWARD
+        assert await queue._get_next_request() is None
+        
+        with pytest.raises(ValueError):
+            queue.set_provider_weight('skyward', 0)
 
 
 class TestRequestThrottler:
@@ -508,6 +588,43 @@ class TestRequestThrottler:
         assert should_throttle is True
         assert delay > 0
     
+    @pytest.mark.asyncio
+    async def test_throttler_rate_window(self):
+        """Test the per-second rate limit and the request counts."""
+        config = ThrottleConfig(
+            provider="test",
+            max_requests_per_second=3.0,
+            min_interval_ms=0,
+            adaptive_enabled=False
+        )
+        throttler = RequestThrottler("test", config)
+        request = GatewayRequest(
+            provider=ProviderType.CUSTOM,
+            method=RequestMethod.GET,
+            path="/test"
+        )
+        
+        for _ in range(3):
+            assert (await throttler.should_throttle(request))[0] is False
+        
+        # The fourth request in the same second waits for the first to leave the window
+        should_throttle, delay = await throttler.should_throttle(request)
+        assert should_throttle is True
+        assert 0.1 <= delay <= 1.0
+        assert throttler.get_status()['current_state']['requests_last_minute'] == 3
+    
+    def test_request_history_ring(self):
+        """Test the fixed-size request history."""
+        history = RequestHistory(3)
+        for now in [10.0, 10.5, 11.2, 11.4]:
+            history.record(now)
+        
+        assert history.nth_latest(1) == 11.4
+        assert history.nth_latest(3) == 10.5
+        assert history.nth_latest(4) == float("-inf")
+        assert history.count_since(11.4, 1) == 2
+        assert history.count_since(11.4, 60) == 4
+    
     @pytest.mark.asyncio
     async def test_throttler_response_recording(self):
         """Test throttler response recording for adaptive behavior."""
@@ -768,6 +885,42 @@ class TestGatewayMonitoring:
         system_info = dashboard_data['system']
         assert 'uptime_seconds' in system_info
         assert 'status' in system_info
+    
+    def test_metric_series_ring_buffer(self):
+        """Test that a full series overwrites its oldest samples and stays in time order."""
+        series = MetricSeries(capacity=4)
+        for i in range(6):
+            series.append(100.0 + i, float(i))
+        
+        assert len(series) == 4
+        assert series.values().tolist() == [2.0, 3.0, 4.0, 5.0]
+        assert series.position_since(103.5) == 2
+        assert series.values(series.position_since(103.5)).tolist() == [4.0, 5.0]
+        assert series.position_since(200.0) == 4
+    
+    def test_metric_summary_over_time_range(self):
+        """Test summary statistics and data lookup over a time range."""
+        collector = MetricCollector(max_data_points=100)
+        start = datetime.utcnow() - timedelta(minutes=30)
+        for i in range(200):
+            collector.record_metric(
+                "response_time_powerschool", float(i), MetricType.HISTOGRAM,
+                labels={'provider': 'powerschool'},
+                timestamp=start + timedelta(seconds=i * 9)
+            )
+        
+        # Samples 100-199 are kept; those in the last 10 minutes are 134 onwards
+        summary = collector.get_metric_summary("response_time_powerschool", minutes=10)
+        assert summary['data_points'] == 66
+        assert summary['min'] == 134.0
+        assert summary['max'] == 199.0
+        assert summary['p50'] == 166.5
+        assert summary['latest'] == 199.0
+        
+        data = collector.get_metric_data("response_time_powerschool", limit=2)
+        assert [point.value for point in data] == [198.0, 199.0]
+        assert data[-1].labels == {'provider': 'powerschool'}
+        assert abs(data[-1].timestamp - (start + timedelta(seconds=199 * 9))) < timedelta(milliseconds=1)
 
 
 class TestIntegrationScenarios:
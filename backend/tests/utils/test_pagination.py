@@ -0,0 +1,106 @@
+"""
+Tests for keyset pagination of class session lists.
+"""
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.core.database import Base
+from app.models.user import User, UserRole
+from app.models.class_session import ClassSession
+# Importing app.utils loads the sync models, whose foreign keys target the SIS tables
+import app.models.sis_integration  # noqa: F401
+from app.utils.pagination import apply_keyset, next_cursor, decode_cursor, encode_cursor
+
+# The model relationships emit overlap warnings during mapper configuration
+pytestmark = pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        teacher = User(
+            email="teacher@example.com", username="teacher", full_name="Teacher",
+            hashed_password="x", role=UserRole.TEACHER
+        )
+        session.add(teacher)
+        await session.flush()
+
+        # Inserted in one flush, so most rows share the same created_at second
+        session.add_all([
+            ClassSession(
+                name=f"Session {i}", teacher_id=teacher.id,
+                jwt_token=f"token{i}", verification_code=f"{i:06d}"
+            )
+            for i in range(7)
+        ])
+        await session.commit()
+        yield session
+
+    await engine.dispose()
+
+
+async def _page(db, cursor, limit):
+    rows = (await db.execute(apply_keyset(select(ClassSession), ClassSession, cursor, limit))).scalars().all()
+    return rows, next_cursor(rows, limit)
+
+
+@pytest.mark.asyncio
+async def test_pages_cover_every_row_once(db):
+    seen = []
+    cursor = None
+    while True:
+        rows, cursor = await _page(db, cursor, 3)
+        seen.extend(row.id for row in rows)
+        if cursor is None:
+            break
+
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 7
+
+
+@pytest.mark.asyncio
+async def test_last_full_page_returns_empty_next_page(db):
+    rows, cursor = await _page(db, None, 7)
+    assert len(rows) == 7
+
+    rows, cursor = await _page(db, cursor, 7)
+    assert rows == []
+    assert cursor is None
+
+
+@pytest.mark.asyncio
+async def test_deleted_anchor_row_does_not_end_pagination(db):
+    # Distinct timestamps written by the application, as on a server database
+    sessions = (await db.execute(select(ClassSession).order_by(ClassSession.id))).scalars().all()
+    start = datetime(2026, 9, 1, 8, 0)
+    for i, session in enumerate(sessions):
+        session.created_at = start + timedelta(minutes=i)
+    await db.commit()
+
+    first_page, cursor = await _page(db, None, 3)
+    await db.delete(first_page[-1])
+    await db.commit()
+
+    rows, _ = await _page(db, cursor, 3)
+    assert [row.id for row in rows] == [first_page[-1].id - 1, first_page[-1].id - 2, first_page[-1].id - 3]
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 9, 1, 8, 30, 15, 250000)
+    assert decode_cursor(encode_cursor(42, created_at)) == (42, created_at)
+    assert decode_cursor(encode_cursor(42)) == (42, None)
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor")
+    assert exc.value.status_code == 400